@@ -24,12 +24,23 @@ contract DocumentVerification is AccessControl {
         string phash;
     }
 
+    // One storage write for a whole batch: the documents (hash and p-hash)
+    // are the leaves of a Merkle tree and only its root is kept (see
+    // ocr-service merkle.py)
+    struct DocumentBatch {
+        bytes32 organizationId;
+        address owner;
+        uint64 timestamp;
+        uint32 documentCount;
+    }
+
     mapping(bytes32 => Organization) public organizations;
     mapping(bytes32 => Document) public documents;
     mapping(bytes32 => bool) public documentExists;
     mapping(address => bytes32[]) public adminOrganizations;
     mapping(bytes32 => mapping(bytes32 => bool)) public organizationDocuments;
     bytes32[] public allOrganizationIds;
+    mapping(bytes32 => DocumentBatch) public documentBatches;
 
     event OrganizationRegistered(
         bytes32 indexed organizationId,
@@ -53,6 +64,15 @@ contract DocumentVerification is AccessControl {
         uint256 timestamp
     );
 
+    event DocumentBatchRegistered(
+        bytes32 indexed merkleRoot,
+        bytes32 indexed organizationId,
+        address owner,
+        uint256 documentCount,
+        uint256 timestamp
+    );
+
+    event DocumentBatchRevoked(bytes32 indexed merkleRoot, bytes32 indexed organizationId, address admin, uint256 timestamp);
     event DocumentDeleted(bytes32 indexed documentHash, bytes32 indexed organizationId, address admin, uint256 timestamp);
     event OrganizationEdited(bytes32 indexed organizationId, string newName, string newDescription, bool newStatus, address admin, uint256 timestamp);
 
@@ -63,6 +83,9 @@ contract DocumentVerification is AccessControl {
     error NotAuthorized();
     error OrganizationNotFound();
     error NotOrganizationAdmin();
+    error BatchAlreadyRegistered();
+    error BatchNotFound();
+    error OrganizationInactive();
 
     constructor() {
         _grantRole(DEFAULT_ADMIN_ROLE, msg.sender);
@@ -172,6 +195,110 @@ contract DocumentVerification is AccessControl {
         );
     }
 
+    /**
+     * @dev Register a batch of documents in one transaction by its Merkle root.
+     * Only the root is stored, so the contract cannot see the batch's documents:
+     * it does not check documentExists for them, and a batched document can still
+     * be registered on its own later. Build batches with the OCR service's
+     * /merkle/batch, which leaves out documents its chain index already has.
+     * @param organizationId The ID of the organization
+     * @param merkleRoot Root over the batch's documents and p-hashes (OCR service /merkle/batch)
+     * @param documentCount Number of documents in the batch
+     */
+    function registerDocumentBatch(
+        bytes32 organizationId,
+        bytes32 merkleRoot,
+        uint32 documentCount
+    ) external {
+        address admin = organizations[organizationId].admin;
+        if (admin == address(0)) {
+            revert OrganizationNotFound();
+        }
+        if (admin != msg.sender) {
+            revert NotOrganizationAdmin();
+        }
+        if (merkleRoot == bytes32(0) || documentCount == 0) {
+            revert EmptyInput();
+        }
+        if (documentBatches[merkleRoot].owner != address(0)) {
+            revert BatchAlreadyRegistered();
+        }
+
+        documentBatches[merkleRoot] = DocumentBatch({
+            organizationId: organizationId,
+            owner: msg.sender,
+            timestamp: uint64(block.timestamp),
+            documentCount: documentCount
+        });
+
+        emit DocumentBatchRegistered(
+            merkleRoot,
+            organizationId,
+            msg.sender,
+            documentCount,
+            block.timestamp
+        );
+    }
+
+    /**
+     * @dev Revoke a batch (admin only). Like deleteDocument for a single
+     * document: its proofs stop verifying, and the root can be registered again.
+     * @param organizationId The ID of the organization
+     * @param merkleRoot The batch root
+     */
+    function revokeDocumentBatch(bytes32 organizationId, bytes32 merkleRoot) external {
+        address admin = organizations[organizationId].admin;
+        if (admin == address(0)) {
+            revert OrganizationNotFound();
+        }
+        if (admin != msg.sender) {
+            revert NotOrganizationAdmin();
+        }
+        if (documentBatches[merkleRoot].owner == address(0) || documentBatches[merkleRoot].organizationId != organizationId) {
+            revert BatchNotFound();
+        }
+        delete documentBatches[merkleRoot];
+        emit DocumentBatchRevoked(merkleRoot, organizationId, msg.sender, block.timestamp);
+    }
+
+    /**
+     * @dev Check that a document belongs to a registered batch of an active organization
+     * @param _documentHash The hash of the document
+     * @param _phash The p-hash the document was batched with, to compare with the
+     * p-hash of the copy being verified (as for documents registered one by one)
+     * @param _organizationId The organization the batch was registered by
+     * @param _merkleRoot The batch root
+     * @param _proof Sibling hashes from the document's leaf up to the root
+     */
+    function verifyBatchDocument(
+        bytes32 _documentHash,
+        string calldata _phash,
+        bytes32 _organizationId,
+        bytes32 _merkleRoot,
+        bytes32[] calldata _proof
+    ) external view returns (bool) {
+        DocumentBatch storage batch = documentBatches[_merkleRoot];
+        if (batch.owner == address(0) || batch.organizationId != _organizationId) {
+            revert BatchNotFound();
+        }
+        if (!organizations[_organizationId].isActive) {
+            revert OrganizationInactive();
+        }
+
+        // Leaves and inner nodes are SHA-256 like the document hashes, with
+        // 0x00 / 0x01 prefixes so an inner node cannot be proven as a leaf;
+        // a leaf commits to the p-hash after the fixed-size document hash;
+        // pairs are hashed in sorted order, so proofs need no positions
+        bytes32 node = sha256(abi.encodePacked(bytes1(0x00), _documentHash, _phash));
+        for (uint256 i = 0; i < _proof.length; i++) {
+            bytes32 sibling = _proof[i];
+            node = node < sibling
+                ? sha256(abi.encodePacked(bytes1(0x01), node, sibling))
+                : sha256(abi.encodePacked(bytes1(0x01), sibling, node));
+        }
+        return node == _merkleRoot;
+    }
+
     /**
      * @dev Verify a document against organization records
      * @param _documentHash The hash of the document to verify
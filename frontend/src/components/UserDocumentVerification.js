@@ -18,6 +18,15 @@ import { useAccount } from 'wagmi';
 const SUBGRAPH_URL =
   "https://api.studio.thegraph.com/query/111188/doc-guard-sg/0.7.0";
 const OCR_API_URL = "https://ocr-service-1.onrender.com/ocr";
+const VERIFY_API_URL = "https://ocr-service-1.onrender.com/verify";
+// p-hash match rule. By default a document counts as verified when fewer
+// than 10 of the 16 hex digits of the p-hashes differ, the rule this page
+// has always used. Set NEXT_PUBLIC_MAX_PHASH_BITS to count differing bits
+// instead, as the OCR service's /verify does with max_distance
+const MAX_PHASH_BITS = process.env.NEXT_PUBLIC_MAX_PHASH_BITS
+  ? Number(process.env.NEXT_PUBLIC_MAX_PHASH_BITS)
+  : null;
+const MAX_PHASH_HEX_DIGITS = 9;
 const CONTRACT_ADDRESS = "0x3A632ee2c3F3B8BaFb85acD06427a2E3728d7F69";
 
 function arrayBufferToHex(buffer) {
@@ -149,7 +158,7 @@ const UserDocumentVerification = () => {
   };
 
   // Hamming distance function for hex strings
-  function hammingDistance(a, b) {
+  function hexDigitDistance(a, b) {
     if (!a || !b || a.length !== b.length) return 999;
     let dist = 0;
     for (let i = 0; i < a.length; i++) {
@@ -158,6 +167,32 @@ const UserDocumentVerification = () => {
     return dist;
   }
 
+  // Hamming distance in bits between two hex p-hashes, the measure the
+  // OCR service's /verify uses for max_distance
+  function bitDistance(a, b) {
+    if (!a || !b || a.length !== b.length) return 999;
+    let diff;
+    try {
+      diff = BigInt(`0x${a}`) ^ BigInt(`0x${b}`);
+    } catch (err) {
+      return 999;
+    }
+    let dist = 0;
+    for (; diff > 0n; diff >>= 1n) {
+      if (diff & 1n) dist++;
+    }
+    return dist;
+  }
+
+  // "verified" or "tampered" for a registered document's stored p-hash
+  function phashStatus(storedPhash) {
+    const dist = MAX_PHASH_BITS !== null
+      ? bitDistance(phash, storedPhash)
+      : hexDigitDistance(phash, storedPhash);
+    console.log("[DEBUG] Comparing p-hash:", { uploadedPhash: phash, storedPhash, hammingDistance: dist });
+    return dist <= (MAX_PHASH_BITS !== null ? MAX_PHASH_BITS : MAX_PHASH_HEX_DIGITS) ? "verified" : "tampered";
+  }
+
   // Handle verification
   const handleVerify = async () => {
     if (!selectedOrg || !fileHash || !phash) {
@@ -167,6 +202,35 @@ const UserDocumentVerification = () => {
     setIsVerifying(true);
     setResult(null);
     setError(null);
+    // Local chain index of the OCR service first: one lookup, no subgraph
+    // round trip. Falls back to the subgraph when it is unavailable, or when
+    // it has not found the document and has not indexed up to the chain head
+    // (the registration may be in a block it has not reached yet)
+    try {
+      const params = new URLSearchParams({
+        document_hash: fileHash,
+        org: selectedOrg,
+      });
+      // With the default rule the p-hash is compared here, as in the fallback
+      if (MAX_PHASH_BITS !== null) {
+        params.set("phash", phash);
+        params.set("max_distance", String(MAX_PHASH_BITS));
+      }
+      const res = await fetch(`${VERIFY_API_URL}?${params}`);
+      if (res.ok) {
+        const data = await res.json();
+        const behind = data.headBlock == null || data.indexedBlock < data.headBlock;
+        if (data.success && !(data.status === "not_verified" && behind)) {
+          setResult(data.status === "verified" && MAX_PHASH_BITS === null
+            ? phashStatus(data.document.phash)
+            : data.status);
+          setIsVerifying(false);
+          return;
+        }
+      }
+    } catch (err) {
+      console.warn("Verification index unavailable, using subgraph:", err);
+    }
     // Query subgraph for org's document hashes, deleted status, and phash
     const query = `query GetOrganizationDocuments($orgId: Bytes!, $docHash: Bytes!) {
       organization(id: $orgId) {
@@ -191,14 +255,7 @@ const UserDocumentVerification = () => {
           setResult("deleted");
         } else {
           // Compare p-hash using Hamming distance
-          const storedPhash = docs[0].phash;
-          const dist = hammingDistance(phash, storedPhash);
-          console.log("[DEBUG] Comparing p-hash:", { uploadedPhash: phash, storedPhash, hammingDistance: dist });
-          if (dist < 10) {
-            setResult("verified");
-          } else {
-            setResult("tampered");
-          }
+          setResult(phashStatus(docs[0].phash));
         }
       } else {
         setResult("not_verified");
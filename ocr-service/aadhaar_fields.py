@@ -0,0 +1,185 @@
+import re
+from itertools import cycle
+from typing import Dict, Any, List, Optional, Tuple
+
+# Extracted fields: OCRService.CLASS_MAPPING's field set plus the mobile number
+FIELDS = ("name", "aadhaar_number", "dob", "gender", "address", "mobile")
+
+# Verhoeff tables (dihedral group D5 multiplication, position permutation, inverse)
+_VERHOEFF_D = (
+    (0, 1, 2, 3, 4, 5, 6, 7, 8, 9),
+    (1, 2, 3, 4, 0, 6, 7, 8, 9, 5),
+    (2, 3, 4, 0, 1, 7, 8, 9, 5, 6),
+    (3, 4, 0, 1, 2, 8, 9, 5, 6, 7),
+    (4, 0, 1, 2, 3, 9, 5, 6, 7, 8),
+    (5, 9, 8, 7, 6, 0, 4, 3, 2, 1),
+    (6, 5, 9, 8, 7, 1, 0, 4, 3, 2),
+    (7, 6, 5, 9, 8, 2, 1, 0, 4, 3),
+    (8, 7, 6, 5, 9, 3, 2, 1, 0, 4),
+    (9, 8, 7, 6, 5, 4, 3, 2, 1, 0),
+)
+_VERHOEFF_P = (
+    (0, 1, 2, 3, 4, 5, 6, 7, 8, 9),
+    (1, 5, 7, 6, 2, 8, 3, 0, 9, 4),
+    (5, 8, 0, 3, 7, 9, 6, 1, 4, 2),
+    (8, 9, 1, 6, 0, 4, 3, 5, 2, 7),
+    (9, 4, 5, 3, 1, 2, 6, 8, 7, 0),
+    (4, 2, 8, 6, 5, 7, 3, 9, 0, 1),
+    (2, 7, 9, 3, 8, 0, 6, 4, 1, 5),
+    (7, 0, 4, 6, 9, 1, 3, 2, 5, 8),
+)
+_VERHOEFF_INV = (0, 4, 3, 2, 1, 5, 6, 7, 8, 9)
+# Permutation rows keyed by digit character, so validation needs no int()
+_VERHOEFF_P_CHARS = tuple({str(digit): value for digit, value in enumerate(row)} for row in _VERHOEFF_P)
+
+
+def verhoeff_valid(number: str) -> bool:
+    """Whether a digit string ends in a correct Verhoeff check digit (as every Aadhaar number does)."""
+    check = 0
+    for permutation, digit in zip(cycle(_VERHOEFF_P_CHARS), reversed(number)):
+        check = _VERHOEFF_D[check][permutation[digit]]
+    return check == 0
+
+
+def verhoeff_check_digit(number: str) -> str:
+    """Check digit to append to a digit string."""
+    check = 0
+    for i, digit in enumerate(reversed(number)):
+        check = _VERHOEFF_D[check][_VERHOEFF_P[(i + 1) % 8][ord(digit) - 48]]
+    return str(_VERHOEFF_INV[check])
+
+
+# Every field is an alternative of one pattern, so the text is scanned once.
+# The Aadhaar alternative accepts "XXXXXXXXXXXX", "XXXX XXXX XXXX" and
+# "XXXX-XXXX-XXXX" (never starting with 0 or 1), but not 12 digits out of a
+# longer run such as the 16-digit VID.
+# The leading gate (word start, then one of the alternatives' first
+# characters) rejects most positions before any alternative is tried; keep it
+# in sync when adding a label.
+_FIELD_PATTERN = re.compile(r"""
+    \b(?=[2-9abcdfglmprty])
+    (?:
+    (?P<aadhaar>(?<!\d)(?<!\d[ -])[2-9]\d{3}(?:[ -]?\d{4}){2}(?![ -]?\d))
+  | (?P<dob_label>\b(?:DOB|D\.O\.B\.?|Date\s+of\s+Birth|Birth\s+Date|Year\s+of\s+Birth|YOB)
+        \s*[:\-]?\s*(?P<dob>\d{1,2}[/\-.]\d{1,2}[/\-.]\d{4}|(?:19|20)\d{2})\b)
+  | (?P<gender>\b(?:FEMALE|MALE|TRANSGENDER)\b)
+  | (?P<mobile_label>\b(?:Mobile|Mob|Phone|Ph|Contact)\b(?:\s*No\b\.?)?\s*[:\-]?\s*(?:\+?91[\s\-]?)?
+        (?P<mobile>[6-9]\d{4}\s?\d{5})\b)
+  | (?P<address_label>\b(?:Address|Residence|Location)\b\s*[:\-]?)
+  | (?P<header>\bGOVERNMENT\s+OF\s+INDIA\b)
+    )
+""", re.IGNORECASE | re.VERBOSE)
+
+# End of an address: a PIN code (kept) or a blank line
+_ADDRESS_END = re.compile(r"\b\d{3} ?\d{3}\b|\n[ \t\r]*\n")
+_ADDRESS_MAX_CHARS = 300
+# A plausible name line: Latin letters, spaces, dots and apostrophes only
+_NAME_LINE = re.compile(r"[A-Za-z][A-Za-z .']{1,60}")
+_NOT_NAMES = {"government of india", "unique identification authority of india", "male", "female", "transgender"}
+_WHITESPACE = re.compile(r"\s+")
+_DATE_SEPARATORS = re.compile(r"[\-.]")
+
+
+def _line_at(text: str, end: int) -> Tuple[int, str]:
+    """Start offset and stripped content of the line that ends at `end`."""
+    start = text.rfind("\n", 0, end) + 1
+    return start, text[start:end].strip()
+
+
+def _name_line(line: str) -> Optional[str]:
+    if _NAME_LINE.fullmatch(line) and line.lower() not in _NOT_NAMES:
+        return _WHITESPACE.sub(" ", line)
+    return None
+
+
+def _name_before(text: str, pos: int, lines: int = 2) -> Optional[str]:
+    """First name-like line among the few lines above pos (the front side prints the name above the DOB)."""
+    end = text.rfind("\n", 0, pos)
+    for _ in range(lines):
+        if end < 0:
+            return None
+        start, line = _line_at(text, end)
+        name = _name_line(line)
+        if name:
+            return name
+        end = start - 1
+    return None
+
+
+def _name_after(text: str, pos: int, lines: int = 3) -> Optional[str]:
+    """First name-like line among the few lines below pos (the name follows the card header)."""
+    start = text.find("\n", pos)
+    for _ in range(lines):
+        if start < 0:
+            return None
+        end = text.find("\n", start + 1)
+        name = _name_line(text[start + 1:end if end >= 0 else len(text)].strip())
+        if name:
+            return name
+        start = end
+    return None
+
+
+def _address_after(text: str, pos: int) -> Optional[str]:
+    window = text[pos:pos + _ADDRESS_MAX_CHARS]
+    end = _ADDRESS_END.search(window)
+    if end is not None:
+        window = window[:end.end()] if end.group().strip() else window[:end.start()]
+    address = _WHITESPACE.sub(" ", window.replace("\n", ", ")).strip(" ,:-")
+    return address.replace(" ,", ",").replace(",,", ",") or None
+
+
+def extract_fields(text: str) -> Dict[str, Any]:
+    """
+    Pull the Aadhaar card fields out of OCR text in a single scan.
+
+    One precompiled alternation finds every labelled field, Aadhaar number
+    candidate and the card header in order of appearance; the name and the
+    address are then read from the lines around their anchors. Aadhaar
+    numbers must pass the Verhoeff checksum, which rejects OCR misreads and
+    other 12-digit numbers on the card.
+
+    Args:
+        text (str): Raw OCR text (any line endings)
+
+    Returns:
+        Dict[str, Any]: FIELDS as strings (None when not found), with the
+            Aadhaar number formatted "XXXX XXXX XXXX", the DOB as printed
+            (DD/MM/YYYY or a year), the mobile as 10 digits, plus
+            'aadhaar_candidates': every 12-digit candidate seen, in order
+    """
+    fields: Dict[str, Any] = dict.fromkeys(FIELDS)
+    candidates: List[str] = []
+    header_end = -1
+    dob_start = -1
+
+    for match in _FIELD_PATTERN.finditer(text):
+        kind = match.lastgroup
+        if kind == "aadhaar":
+            digits = match.group().replace(" ", "").replace("-", "")
+            candidates.append(digits)
+            if fields["aadhaar_number"] is None and verhoeff_valid(digits):
+                fields["aadhaar_number"] = f"{digits[:4]} {digits[4:8]} {digits[8:]}"
+        elif kind == "dob_label":
+            if fields["dob"] is None:
+                fields["dob"] = _DATE_SEPARATORS.sub("/", match.group("dob"))
+                dob_start = match.start()
+        elif kind == "gender":
+            if fields["gender"] is None:
+                fields["gender"] = match.group().capitalize()
+        elif kind == "mobile_label":
+            if fields["mobile"] is None:
+                fields["mobile"] = match.group("mobile").replace(" ", "")
+        elif kind == "address_label":
+            if fields["address"] is None:
+                fields["address"] = _address_after(text, match.end())
+        elif header_end < 0:
+            header_end = match.end()
+
+    if dob_start >= 0:
+        fields["name"] = _name_before(text, dob_start)
+    if fields["name"] is None and header_end >= 0:
+        fields["name"] = _name_after(text, header_end)
+
+    fields["aadhaar_candidates"] = candidates
+    return fields
@@ -0,0 +1,190 @@
+import io
+import os
+import json
+import time
+import asyncio
+import logging
+import zipfile
+from typing import Dict, Any, List, Optional, AsyncIterator, Callable
+
+from ocr_service import OCRService, is_pdf_upload
+from merkle import merkle_batch
+from worker_pool import OCRWorkerPool
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Same per-file limit as /ocr
+MAX_FILE_BYTES = 16 * 1024 * 1024
+ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.pdf', '.tif', '.tiff', '.bmp'}
+
+
+class BatchError(Exception):
+    """Raised when a batch request is rejected as a whole (bad archive, too large...)."""
+
+
+class BatchDocument:
+    """One document of a batch; its bytes are loaded only when a worker picks it up."""
+
+    def __init__(self, index: int, filename: str, load: Callable[[], bytes], size: int):
+        self.index = index
+        self.filename = filename
+        self.load = load
+        self.size = size
+
+
+def documents_from_uploads(files: List[Any], max_files: int, max_bytes: int) -> List[BatchDocument]:
+    """
+    Build batch documents from already-read uploads.
+
+    Args:
+        files (List[Any]): (filename, bytes) pairs
+        max_files (int): Maximum number of documents per batch
+        max_bytes (int): Maximum combined upload size
+
+    Returns:
+        List[BatchDocument]: Documents in upload order
+    """
+    if len(files) > max_files:
+        raise BatchError(f"Too many files in batch: {len(files)} (max {max_files})")
+    total = sum(len(data) for _, data in files)
+    if total > max_bytes:
+        raise BatchError(f"Batch too large: {total} bytes (max {max_bytes}); upload a zip archive instead")
+    return [
+        BatchDocument(index, filename, (lambda data=data: data), len(data))
+        for index, (filename, data) in enumerate(files)
+    ]
+
+
+def documents_from_zip(archive: bytes, max_files: int) -> List[BatchDocument]:
+    """
+    Build batch documents from a zip archive; members are decompressed lazily.
+
+    Directories, macOS resource forks and unsupported extensions are
+    skipped. Member sizes are checked from the central directory before
+    anything is decompressed.
+
+    Args:
+        archive (bytes): Zip file content
+        max_files (int): Maximum number of documents per batch
+
+    Returns:
+        List[BatchDocument]: Documents in archive order
+    """
+    try:
+        zf = zipfile.ZipFile(io.BytesIO(archive))
+    except zipfile.BadZipFile as e:
+        raise BatchError(f"Invalid zip archive: {str(e)}")
+
+    members = [
+        info for info in zf.infolist()
+        if not info.is_dir()
+        and not info.filename.startswith('__MACOSX/')
+        and os.path.splitext(info.filename)[1].lower() in ALLOWED_EXTENSIONS
+    ]
+    if not members:
+        raise BatchError("Zip archive contains no supported documents")
+    if len(members) > max_files:
+        raise BatchError(f"Too many files in archive: {len(members)} (max {max_files})")
+
+    # ZipFile serialises reads on the shared file object, so concurrent loads are safe
+    return [
+        BatchDocument(index, info.filename, (lambda info=info: zf.read(info)), info.file_size)
+        for index, info in enumerate(members)
+    ]
+
+
+async def _process_document(
+    doc: BatchDocument,
+    ocr_service: OCRService,
+    worker_pool: OCRWorkerPool,
+    semaphore: asyncio.Semaphore,
+    engine_policy: Optional[str],
+) -> Dict[str, Any]:
+    """Run one document through the pipeline; failures become error lines, not exceptions."""
+    async with semaphore:
+        started = time.monotonic()
+        line = {'index': doc.index, 'filename': doc.filename}
+        try:
+            if doc.size > MAX_FILE_BYTES:
+                raise ValueError("File size must be less than 16MB")
+            data = await asyncio.get_running_loop().run_in_executor(None, doc.load)
+            result = await worker_pool.run(data, is_pdf_upload(doc.filename), wait=True,
+                                           engine_policy=engine_policy)
+            del data
+            line['success'] = True
+            line['data'] = ocr_service.prepare_for_smart_contract(result)
+        except Exception as e:
+            logger.warning(f"Batch document {doc.index} failed: {str(e)}")
+            line['success'] = False
+            line['error'] = f"OCR processing failed: {str(e)}"
+        line['elapsed_ms'] = round((time.monotonic() - started) * 1000, 1)
+        return line
+
+
+async def run_batch(
+    docs: List[BatchDocument],
+    ocr_service: OCRService,
+    worker_pool: OCRWorkerPool,
+    parallelism: int,
+    engine_policy: Optional[str] = None,
+    merkle: bool = False,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Process documents concurrently and yield one result per document as it finishes.
+
+    A final summary line with 'done': True is yielded after every document;
+    with merkle=True it also carries the Merkle root over the successful
+    documents and each one's inclusion proof (see merkle.merkle_batch()).
+
+    Args:
+        docs (List[BatchDocument]): Documents to process
+        ocr_service (OCRService): Service used to build the smart contract payload
+        worker_pool (OCRWorkerPool): Pool that runs the OCR pipeline
+        parallelism (int): Maximum documents processed at once
+        engine_policy (Optional[str]): OCR engine policy, see EngineRouter
+        merkle (bool): Add the batch Merkle root and proofs to the summary
+    """
+    started = time.monotonic()
+    semaphore = asyncio.Semaphore(parallelism)
+    tasks = [
+        asyncio.create_task(_process_document(doc, ocr_service, worker_pool, semaphore, engine_policy))
+        for doc in docs
+    ]
+    succeeded = []
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            line = await next_done
+            if line['success']:
+                succeeded.append((line['index'], {
+                    'documentHash': line['data']['documentHash'],
+                    'phash': line['data']['phash'],
+                }))
+            yield line
+    finally:
+        # Client went away mid-stream: stop the remaining work
+        for task in tasks:
+            task.cancel()
+
+    summary = {
+        'done': True,
+        'total': len(docs),
+        'succeeded': len(succeeded),
+        'failed': len(docs) - len(succeeded),
+        'elapsed_ms': round((time.monotonic() - started) * 1000, 1),
+    }
+    if merkle and succeeded:
+        # Proofs in upload order, not completion order
+        summary['merkle'] = await asyncio.get_running_loop().run_in_executor(
+            None, merkle_batch, [document for _, document in sorted(succeeded, key=lambda item: item[0])]
+        )
+    yield summary
+
+
+def format_line(line: Dict[str, Any], stream_format: str) -> str:
+    """Encode one result as an NDJSON line or an SSE event."""
+    payload = json.dumps(line)
+    if stream_format == 'sse':
+        event = 'summary' if line.get('done') else 'document'
+        return f"event: {event}\ndata: {payload}\n\n"
+    return payload + "\n"
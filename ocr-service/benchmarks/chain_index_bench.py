@@ -0,0 +1,149 @@
+"""
+Chain index benchmark: how fast the service catches up with the contract's
+events, how fast it answers /verify from the index, and whether a restart
+resumes instead of re-reading the chain.
+
+Usage:
+    npx hardhat node
+    SEED_OUT=seed.json npx hardhat run scripts/seed-documents.js --network localhost
+    python benchmarks/chain_index_bench.py --seed ../seed.json
+                                           [--rpc http://127.0.0.1:8545]
+                                           [--max-range 2000] [--lookups 100000]
+                                           [--json out.json]
+
+    catch_up    empty index to caught up: wall time, eth_getLogs ranges and
+                events applied per second
+    statuses    /verify status of every seeded document from the index
+                (deleted ones included), compared with what the seed
+                script left on-chain
+    restart     opening the same index file again: load time and whether
+                the next sync resumes from the stored block
+    lookup      latency of the in-memory document lookup /verify does
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chain_index import ChainIndex, ChainFollower  # noqa: E402
+from phash_index import phash_to_int  # noqa: E402
+from merkle import verify_proof  # noqa: E402
+
+
+def status_of(index: ChainIndex, organization_id: str, document: dict) -> str:
+    """The status GET /verify would answer for a seeded document, with its own p-hash."""
+    stored = index.get_document(document['documentHash'])
+    if stored is None or stored['organizationId'] != organization_id.lower():
+        return 'not_verified'
+    if stored['deleted']:
+        return 'deleted'
+    distance = bin(phash_to_int(stored['phash']) ^ phash_to_int(document['phash'])).count('1')
+    return 'verified' if distance <= 9 else 'tampered'
+
+
+async def catch_up(follower: ChainFollower) -> dict:
+    started = time.perf_counter()
+    events = ranges = 0
+    while True:
+        applied, caught_up = await follower.sync_once()
+        events += applied
+        ranges += 1
+        if caught_up:
+            break
+    elapsed = time.perf_counter() - started
+    return {
+        'seconds': round(elapsed, 3),
+        'events': events,
+        'ranges': ranges,
+        'events_per_s': round(events / elapsed, 1) if elapsed else None,
+        'last_block': follower.index.last_block,
+    }
+
+
+def follow(db_path: str, args, seed: dict) -> ChainFollower:
+    index = ChainIndex(db_path=db_path, contract=seed['contract'], start_block=seed['startBlock'])
+    # Not started: the benchmark drives sync_once() itself
+    return ChainFollower(index, args.rpc, confirmations=args.confirmations, max_range=args.max_range)
+
+
+async def run(args) -> dict:
+    with open(args.seed) as f:
+        seed = json.load(f)
+    report = {'documents': len(seed['documents'])}
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'chain_index.sqlite3')
+
+        follower = follow(db_path, args, seed)
+        report['catch_up'] = await catch_up(follower)
+        index = follower.index
+
+        mismatches = [document['documentHash'] for document in seed['documents']
+                      if status_of(index, seed['organizationId'], document) != document['status']]
+        batch = index.get_batch(seed['batch']['root'])
+        batch_ok = batch is not None and all(
+            verify_proof(document['documentHash'], document['phash'],
+                         seed['batch']['proofs'][document['documentHash']], seed['batch']['root'])
+            for document in seed['batch']['documents'])
+        report['statuses'] = {'mismatches': len(mismatches), 'batch_indexed': batch_ok}
+
+        rng = random.Random(args.seed_value)
+        hashes = [document['documentHash'] for document in seed['documents']]
+        queries = [rng.choice(hashes) for _ in range(args.lookups)]
+        started = time.perf_counter()
+        for document_hash in queries:
+            index.get_document(document_hash)
+        per_lookup = (time.perf_counter() - started) / len(queries)
+        samples = []
+        for document_hash in queries[:1000]:
+            t0 = time.perf_counter()
+            status_of(index, seed['organizationId'], {'documentHash': document_hash, 'phash': '0' * 16})
+            samples.append(time.perf_counter() - t0)
+        report['lookup'] = {
+            'get_document_us': round(per_lookup * 1e6, 2),
+            'verify_status_p50_us': round(statistics.median(samples) * 1e6, 2),
+            'verify_status_p99_us': round(sorted(samples)[int(len(samples) * 0.99)] * 1e6, 2),
+        }
+        last_block = index.last_block
+        await follower.stop()
+
+        started = time.perf_counter()
+        follower = follow(db_path, args, seed)
+        load_ms = (time.perf_counter() - started) * 1000
+        resumed = follower.index.last_block == last_block
+        again = await catch_up(follower)
+        report['restart'] = {
+            'load_ms': round(load_ms, 2),
+            'resumed_from_block': follower.index.last_block if resumed else None,
+            'events_reread': again['events'],
+        }
+        await follower.stop()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', required=True, help="JSON written by scripts/seed-documents.js")
+    parser.add_argument('--rpc', default='http://127.0.0.1:8545')
+    parser.add_argument('--confirmations', type=int, default=2)
+    parser.add_argument('--max-range', type=int, default=2000)
+    parser.add_argument('--lookups', type=int, default=100000)
+    parser.add_argument('--seed-value', type=int, default=1, help="random seed for lookup order")
+    parser.add_argument('--json', help="write the report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""
+Cold-start benchmark: import profile and time-to-first-request of the service.
+
+Usage:
+    python benchmarks/cold_start_bench.py [--repeat 3] [--top 15]
+                                          [--api-url http://127.0.0.1:8090/parse/image]
+                                          [--json out.json]
+
+For each import mode (OCR_LAZY_IMPORTS=1 and =0) it measures:
+
+    imports   `python -X importtime -c "import main"`: total import time,
+              the modules with the most self time and which of the heavy
+              imaging modules got loaded (the first run is discarded so the
+              bytecode cache is warm). Modules loaded eagerly through
+              importlib do not get their own importtime line; their cost
+              shows up as self time of ocr_service.
+    server    a fresh `uvicorn main:app` process: milliseconds from spawn to
+              the first 200 from /health, and the phases the service
+              itself reports on /startup (imported, ready, first_request,
+              warm, all relative to process start)
+    first_ocr with --api-url (e.g. benchmarks/fake_ocrspace.py --latency
+              fixed:0), latency of a POST /ocr sent as soon as /health
+              answers, i.e. while the warm-up may still be running, and of
+              a second one after the warm-up has finished
+
+Each server run uses its own temporary SQLite stores so no state (job
+queue, cache) carries over between runs. Reported values are medians.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import tempfile
+import argparse
+import statistics
+import subprocess
+import urllib.error
+import urllib.request
+
+import cv2
+import numpy as np
+
+SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+# Modules that lazy imports keep out of `import main`
+HEAVY_MODULES = ('numpy', 'cv2', 'PIL.Image', 'pdf2image', 'image_hashes', 'card_detect')
+# Passed through to the service; with OCR_WARMUP=0 there is no 'warm' phase to wait for
+WARMUP = os.environ.get('OCR_WARMUP', '1') != '0'
+
+
+def service_env(workdir: str, lazy: bool, api_url: str = None) -> dict:
+    env = dict(os.environ)
+    env.update({
+        'OCR_LAZY_IMPORTS': '1' if lazy else '0',
+        'OCR_API_KEY': env.get('OCR_API_KEY', 'cold-start-bench'),
+        'OCR_JOB_DB': os.path.join(workdir, 'jobs.sqlite3'),
+        'OCR_CACHE_DB': os.path.join(workdir, 'cache.sqlite3'),
+        'OCR_PHASH_INDEX_DB': os.path.join(workdir, 'phash.sqlite3'),
+        'OCR_JOB_WORKERS': '0',
+    })
+    if api_url:
+        env['OCR_API_URL'] = api_url
+    return env
+
+
+def parse_importtime(stderr: str) -> list:
+    """(self_us, cumulative_us, depth, module) rows from -X importtime output (depth 0 = top level)."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        module = name.rstrip()
+        depth = (len(module) - len(module.lstrip())) // 2
+        rows.append((int(self_us), int(cumulative_us), depth, module.strip()))
+    return rows
+
+
+def import_profile(lazy: bool, repeat: int, top: int) -> dict:
+    totals, samples = [], []
+    with tempfile.TemporaryDirectory() as workdir:
+        for run in range(repeat + 1):
+            completed = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c',
+                 f"import main, sys, json; print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"],
+                cwd=SERVICE_DIR, env=service_env(workdir, lazy), capture_output=True, text=True,
+            )
+            if completed.returncode != 0:
+                raise RuntimeError(f"import main failed:\n{completed.stderr[-2000:]}")
+            rows = parse_importtime(completed.stderr)
+            loaded = json.loads(completed.stdout.strip().splitlines()[-1])
+            if run == 0:
+                continue
+            totals.append(next(cumulative for _, cumulative, _, module in rows if module == 'main') / 1000.0)
+            samples.append(rows)
+
+    median_run = samples[totals.index(sorted(totals)[len(totals) // 2])]
+    heaviest = sorted(median_run, key=lambda row: row[0], reverse=True)[:top]
+    return {
+        'import_ms': round(statistics.median(totals), 1),
+        'modules': len(median_run),
+        'heavy_modules_loaded': loaded,
+        'top_self_ms': [{'module': module, 'self_ms': round(self_us / 1000.0, 1),
+                         'cumulative_ms': round(cumulative_us / 1000.0, 1)}
+                        for self_us, cumulative_us, _, module in heaviest],
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def get_json(url: str, timeout: float = 5.0) -> dict:
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def post_ocr(base_url: str, image: bytes) -> float:
+    """POST one JPEG to /ocr and return the latency in milliseconds."""
+    boundary = uuid.uuid4().hex
+    body = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="card.jpg"\r\n'
+        f'Content-Type: image/jpeg\r\n\r\n'
+    ).encode() + image + f'\r\n--{boundary}--\r\n'.encode()
+    request = urllib.request.Request(f"{base_url}/ocr", data=body, method='POST', headers={
+        'Content-Type': f'multipart/form-data; boundary={boundary}',
+    })
+    started = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=120) as response:
+        result = json.loads(response.read())
+    elapsed = (time.perf_counter() - started) * 1000
+    if not result.get('success'):
+        raise RuntimeError(f"/ocr failed: {result.get('error')}")
+    return elapsed
+
+
+def card_jpeg(seed: int) -> bytes:
+    """A phone-photo sized card image, different per seed so the cache never hits."""
+    rng = np.random.default_rng(seed)
+    image = np.full((3000, 4000, 3), 225, dtype=np.uint8)
+    for row in range(12):
+        cv2.putText(image, f'{rng.integers(1000, 9999)} {rng.integers(1000, 9999)}', (200, 250 + row * 220),
+                    cv2.FONT_HERSHEY_SIMPLEX, 5.0, (30, 30, 30), 10)
+    return cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+
+def server_run(lazy: bool, api_url: str, seed: int, timeout: float = 60.0) -> dict:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    image = card_jpeg(seed) if api_url else None
+    with tempfile.TemporaryDirectory() as workdir:
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1', '--port', str(port),
+             '--log-level', 'warning'],
+            cwd=SERVICE_DIR, env=service_env(workdir, lazy, api_url),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with status {process.returncode}")
+                if time.perf_counter() - started > timeout:
+                    raise RuntimeError("service did not answer /health in time")
+                try:
+                    get_json(f"{base_url}/health", timeout=1.0)
+                    break
+                except (urllib.error.URLError, ConnectionError):
+                    time.sleep(0.005)
+            result = {'first_health_ms': round((time.perf_counter() - started) * 1000, 1)}
+
+            if image is not None:
+                result['first_ocr_ms'] = round(post_ocr(base_url, image), 1)
+            # Wait for the background warm-up to report back
+            deadline = time.perf_counter() + timeout
+            report = get_json(f"{base_url}/startup")
+            while WARMUP and 'warm' not in report['phases'] and time.perf_counter() < deadline:
+                time.sleep(0.05)
+                report = get_json(f"{base_url}/startup")
+            if image is not None:
+                result['warm_ocr_ms'] = round(post_ocr(base_url, card_jpeg(seed + 1000)), 1)
+            result['phases_ms'] = {phase: round(seconds * 1000, 1) for phase, seconds in report['phases'].items()}
+            return result
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def median_of(runs: list, key: str):
+    values = [run[key] for run in runs if key in run]
+    return round(statistics.median(values), 1) if values else None
+
+
+def server_profile(lazy: bool, repeat: int, api_url: str) -> dict:
+    runs = [server_run(lazy, api_url, seed) for seed in range(repeat)]
+    phases = sorted({phase for run in runs for phase in run['phases_ms']})
+    summary = {key: median_of(runs, key) for key in ('first_health_ms', 'first_ocr_ms', 'warm_ocr_ms')}
+    summary['phases_ms'] = {
+        phase: round(statistics.median(run['phases_ms'][phase] for run in runs if phase in run['phases_ms']), 1)
+        for phase in phases
+    }
+    return {key: value for key, value in summary.items() if value is not None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--top', type=int, default=15, help='Modules listed by self import time')
+    parser.add_argument('--api-url', help='OCR.space endpoint for the first /ocr (use benchmarks/fake_ocrspace.py)')
+    parser.add_argument('--skip-server', action='store_true', help='Only profile imports')
+    parser.add_argument('--json', help='Write the report to this file')
+    args = parser.parse_args()
+
+    report = {}
+    for lazy in (True, False):
+        mode = 'lazy' if lazy else 'eager'
+        report[mode] = {'imports': import_profile(lazy, args.repeat, args.top)}
+        if not args.skip_server:
+            report[mode]['server'] = server_profile(lazy, args.repeat, args.api_url)
+        print(f"{mode}: import {report[mode]['imports']['import_ms']}ms"
+              + (f", first /health {report[mode]['server']['first_health_ms']}ms" if not args.skip_server else ''),
+              file=sys.stderr)
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""
+Card crop benchmark: card detection rate and the effect of cropping on the
+CPU stage, the upload and the p-hash.
+
+Usage:
+    python benchmarks/crop_bench.py [--cards 40] [--size 3000x4000] [--seed 1]
+                                    [--json out.json]
+
+Each synthetic card (ID-1 proportions, header band, photo box, text lines)
+is photographed twice: pasted onto a textured table or skin-toned
+background covering 20-45% of the frame, tilted, with perspective, uneven
+lighting and sensor noise, and saved as a phone-sized JPEG. A share of
+the shots are portrait (card turned 90 degrees).
+
+Every shot goes through preprocess_image() with crop_card off and on:
+
+    detection   share of shots where a card was found, and the IoU of the
+                found outline with the true one (found shots only)
+    cpu_ms      median CPU stage time (decode + crop + p-hash + encode)
+    crop_ms     median card_detect_ms (detection + perspective warp)
+    upload_kb   median encoded JPEG size sent to the OCR provider
+    phash       median Hamming distance of the shot's p-hash to the p-hash of
+                the flat card image (lower = less background in the hash),
+                between the two shots of the same card, and between shots of
+                different cards (all cards share one layout, as real ones do)
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+
+import cv2
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ocr_service import preprocess_image, decode_image, _target_dim  # noqa: E402
+from card_detect import find_card  # noqa: E402
+from image_hashes import phash_hex  # noqa: E402
+
+# Same defaults as OCRService
+PARAMS = {
+    'pdf_dpi': 150,
+    'max_image_dimension': 2000,
+    'max_dim': 1500,
+    'jpeg_quality': 70,
+    'min_jpeg_quality': 40,
+    'max_size_kb': 1024,
+}
+CARD_SIZE = (856, 540)
+
+
+def card_image(rng: np.random.Generator) -> np.ndarray:
+    w, h = CARD_SIZE
+    card = np.full((h, w, 3), rng.integers(225, 250, 3), dtype=np.uint8)
+    # Tricolour header band and footer line
+    card[:60] = (51, 153, 255)
+    card[60:110] = (250, 250, 250)
+    card[h - 40:] = (19, 136, 8)
+    cv2.putText(card, 'GOVERNMENT OF INDIA', (250, 95), cv2.FONT_HERSHEY_SIMPLEX, 1.1, (20, 20, 20), 2)
+    # Photo box
+    cv2.rectangle(card, (40, 140), (230, 380), tuple(int(c) for c in rng.integers(60, 160, 3)), -1)
+    lines = [
+        ' '.join(''.join(chr(65 + int(c)) for c in rng.integers(0, 26, int(n))) for n in rng.integers(4, 9, 2)),
+        f"DOB: {rng.integers(1, 29):02d}/{rng.integers(1, 13):02d}/{rng.integers(1950, 2015)}",
+        rng.choice(['MALE', 'FEMALE']),
+    ]
+    for row, line in enumerate(lines):
+        cv2.putText(card, line, (260, 180 + row * 55), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (25, 25, 25), 2)
+    number = ' '.join(str(rng.integers(1000, 9999)) for _ in range(3))
+    cv2.putText(card, number, (250, 450), cv2.FONT_HERSHEY_SIMPLEX, 1.6, (10, 10, 10), 4)
+    return card
+
+
+def background(rng: np.random.Generator, height: int, width: int) -> np.ndarray:
+    small = rng.normal(0, 1, (height // 16, width // 16)).astype(np.float32)
+    texture = cv2.resize(cv2.GaussianBlur(small, (0, 0), 2), (width, height))
+    if rng.random() < 0.5:
+        # Wood-like table: streaks along one axis
+        streaks = cv2.resize(rng.normal(0, 1, (1, width // 8)).astype(np.float32), (width, height))
+        base, texture = np.array([60, 95, 140], np.float32), texture * 12 + streaks * 18
+    else:
+        # Hand / skin tone, smoother
+        base, texture = np.array([120, 150, 200], np.float32), texture * 8
+    return np.clip(base + texture[..., None], 0, 255).astype(np.uint8)
+
+
+def shot(card: np.ndarray, rng: np.random.Generator, height: int, width: int,
+         portrait: bool) -> tuple:
+    """(JPEG bytes, true card corners in full-resolution pixels)"""
+    scene = background(rng, height, width)
+    ch, cw = card.shape[:2]
+    coverage = rng.uniform(0.2, 0.45)
+    scale = np.sqrt(coverage * height * width / (cw * ch))
+    angle = np.deg2rad(rng.uniform(-20, 20) + (90 if portrait else 0))
+    rotation = np.array([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+    corners = np.array([[0, 0], [cw, 0], [cw, ch], [0, ch]], np.float32) - (cw / 2, ch / 2)
+    while True:
+        placed = corners @ rotation.T * scale + (width / 2, height / 2) + rng.uniform(-0.1, 0.1, 2) * (width, height)
+        # Perspective: move each corner a little
+        placed += rng.uniform(-0.04, 0.04, (4, 2)) * scale * cw
+        placed = placed.astype(np.float32)
+        # Keep the whole card in the frame
+        if placed.min() >= 0 and (placed < (width, height)).all():
+            break
+    matrix = cv2.getPerspectiveTransform((corners + (cw / 2, ch / 2)).astype(np.float32), placed)
+    warped = cv2.warpPerspective(card, matrix, (width, height))
+    mask = cv2.warpPerspective(np.full((ch, cw), 255, np.uint8), matrix, (width, height))
+    scene[mask > 0] = warped[mask > 0]
+    # Uneven lighting and sensor noise
+    light = np.linspace(rng.uniform(0.75, 1.0), rng.uniform(1.0, 1.15), width, dtype=np.float32)[None, :, None]
+    scene = np.clip(scene * light + rng.normal(0, 4, scene.shape), 0, 255).astype(np.uint8)
+    return cv2.imencode('.jpg', scene, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes(), placed
+
+
+def iou(quad_a: np.ndarray, quad_b: np.ndarray) -> float:
+    area, _ = cv2.intersectConvexConvex(quad_a.astype(np.float32), quad_b.astype(np.float32))
+    union = cv2.contourArea(quad_a.astype(np.float32)) + cv2.contourArea(quad_b.astype(np.float32)) - area
+    return area / union if union else 0.0
+
+
+def hamming(a: str, b: str) -> int:
+    return bin(int(a, 16) ^ int(b, 16)).count('1')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cards', type=int, default=40)
+    parser.add_argument('--size', default='3000x4000', help='Photo size HEIGHTxWIDTH')
+    parser.add_argument('--portrait-share', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='Write the report to this file')
+    args = parser.parse_args()
+    height, width = (int(v) for v in args.size.split('x'))
+
+    rng = np.random.default_rng(args.seed)
+    found, ious, crop_ms = 0, [], []
+    runs = {crop: {'cpu_ms': [], 'upload_kb': [], 'to_flat': [], 'pairs': []} for crop in (False, True)}
+    for _ in range(args.cards):
+        card = card_image(rng)
+        flat = phash_hex(Image.fromarray(cv2.cvtColor(card, cv2.COLOR_BGR2RGB)))
+        portrait = rng.random() < args.portrait_share
+        shots = [shot(card, rng, height, width, portrait) for _ in range(2)]
+        for data, corners in shots:
+            decoded, _ = decode_image(data, _target_dim(PARAMS))
+            detected = find_card(decoded)
+            if detected is not None:
+                found += 1
+                ious.append(iou(detected[0], corners * (decoded.shape[1] / width)))
+        for crop in (False, True):
+            phashes = []
+            for data, _ in shots:
+                prepared = preprocess_image(data, False, dict(PARAMS, crop_card=crop))
+                stats = prepared['stats']
+                runs[crop]['cpu_ms'].append(sum(stats.get(key, 0) for key in (
+                    'decode_ms', 'resize_ms', 'card_detect_ms', 'phash_ms', 'encode_ms')))
+                runs[crop]['upload_kb'].append(stats['encoded_bytes'] / 1024)
+                runs[crop]['to_flat'].append(hamming(flat, prepared['phash']))
+                phashes.append(prepared['phash'])
+                if crop:
+                    crop_ms.append(stats['card_detect_ms'])
+            runs[crop]['pairs'].append(phashes)
+
+    report = {'shots': 2 * args.cards, 'size': args.size,
+              'detection': {'found': round(found / (2 * args.cards), 3),
+                            'median_iou': round(statistics.median(ious), 3) if ious else None,
+                            'min_iou': round(min(ious), 3) if ious else None},
+              'crop_ms': round(statistics.median(crop_ms), 2)}
+    for crop in (False, True):
+        pairs = runs[crop]['pairs']
+        different = [hamming(pairs[i][0], pairs[j][0]) for i in range(len(pairs)) for j in range(i + 1, len(pairs))]
+        report['crop' if crop else 'no_crop'] = {
+            'cpu_ms': round(statistics.median(runs[crop]['cpu_ms']), 2),
+            'upload_kb': round(statistics.median(runs[crop]['upload_kb']), 1),
+            'phash_to_flat_card': statistics.median(runs[crop]['to_flat']),
+            'phash_same_card': statistics.median(hamming(a, b) for a, b in pairs),
+            'phash_different_cards': statistics.median(different) if different else None,
+        }
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Decode benchmark: full-resolution decode + resize cascade vs size-aware reduced decode.
+
+Usage:
+    python benchmarks/decode_bench.py [--repeat 5] [--json out.json]
+
+Synthetic JPEGs of phone-photo and scanner sizes are generated in memory.
+For each one both paths are timed (best of --repeat) and their peak traced
+allocation is measured with tracemalloc (NumPy/OpenCV output arrays are
+allocated through NumPy and therefore traced).
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+import cv2
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ocr_service import decode_image  # noqa: E402
+
+MAX_IMAGE_DIMENSION = 2000
+MAX_DIM = 1500
+
+SIZES = {
+    'phone_12mp': (4032, 3024),
+    'phone_48mp': (8000, 6000),
+    'scan_a4_300dpi': (2480, 3508),
+    'small_1200': (1200, 900),
+}
+
+
+def make_jpeg(width: int, height: int, quality: int = 92) -> bytes:
+    """Generate a card-like JPEG with text-ish high-frequency detail."""
+    rng = np.random.default_rng(width * height)
+    image = np.full((height, width, 3), 235, dtype=np.uint8)
+    gradient = np.linspace(0, 40, width, dtype=np.uint8)
+    image -= gradient[np.newaxis, :, np.newaxis]
+    for _ in range(200):
+        x, y = int(rng.integers(0, width - 200)), int(rng.integers(0, height - 40))
+        cv2.putText(image, 'XXXX 1234 5678', (x, y + 30), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (20, 20, 20), 2)
+    noise = rng.integers(0, 12, size=image.shape, dtype=np.uint8)
+    image = cv2.add(image, noise)
+    ok, buffer = cv2.imencode('.jpg', image, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+    return buffer.tobytes()
+
+
+def legacy_decode(data: bytes) -> np.ndarray:
+    """The previous pipeline: full decode, LANCZOS to 2000, then resize to 1500."""
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    h, w = image.shape[:2]
+    if max(w, h) > MAX_IMAGE_DIMENSION:
+        scale = MAX_IMAGE_DIMENSION / max(w, h)
+        image = cv2.resize(image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_LANCZOS4)
+    h, w = image.shape[:2]
+    if max(h, w) > MAX_DIM:
+        scale = MAX_DIM / max(h, w)
+        image = cv2.resize(image, (int(w * scale), int(h * scale)))
+    return image
+
+
+def reduced_decode(data: bytes) -> np.ndarray:
+    image, _ = decode_image(data, min(MAX_IMAGE_DIMENSION, MAX_DIM))
+    return image
+
+
+def measure(fn, data: bytes, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(data)
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    result = fn(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'best_ms': round(min(timings) * 1000, 2),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 2),
+        'peak_mb': round(peak / (1024 * 1024), 2),
+        'output_shape': list(result.shape[:2]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', help='Write results to this file')
+    args = parser.parse_args()
+
+    results = {}
+    for name, (width, height) in SIZES.items():
+        data = make_jpeg(width, height)
+        before = measure(legacy_decode, data, args.repeat)
+        after = measure(reduced_decode, data, args.repeat)
+        results[name] = {
+            'source': [width, height],
+            'bytes': len(data),
+            'before': before,
+            'after': after,
+            'speedup': round(before['best_ms'] / after['best_ms'], 2) if after['best_ms'] else None,
+            'memory_ratio': round(after['peak_mb'] / before['peak_mb'], 3) if before['peak_mb'] else None,
+        }
+        print(f"{name:16s} {width}x{height}: "
+              f"{before['best_ms']:8.1f} ms / {before['peak_mb']:6.1f} MB  ->  "
+              f"{after['best_ms']:8.1f} ms / {after['peak_mb']:6.1f} MB")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
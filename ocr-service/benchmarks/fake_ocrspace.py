@@ -0,0 +1,208 @@
+"""
+Local stand-in for the OCR.space parse/image API, for load tests without quota.
+
+Usage:
+    python benchmarks/fake_ocrspace.py [--port 8090] [--latency lognormal:1800,0.5]
+                                       [--error-rate 0.02] [--http-error-rate 0.01]
+                                       [--burst-every 60 --burst-duration 5] [--rps-limit 10]
+
+Then run the service against it:
+    OCR_API_URL=http://127.0.0.1:8090/parse/image OCR_API_KEY=test uvicorn main:app
+
+Accepts the same form fields as OCR.space (base64Image data URI, or a
+'file' part) and answers with realistic ParsedResults JSON: an
+Aadhaar-like card text derived from the image bytes (so the same image
+always yields the same text and document hash) and, when
+isOverlayRequired is true, a word-level TextOverlay.
+
+Failure injection:
+    --latency          fixed:MS | uniform:MIN_MS,MAX_MS | lognormal:MEDIAN_MS,SIGMA
+    --error-rate       share of 200 responses with IsErroredOnProcessing (E500-style)
+    --http-error-rate  share of bare 500/502/503 responses
+    --burst-every/--burst-duration
+                       every N seconds, answer 429 with Retry-After for D seconds
+    --rps-limit        token bucket over all requests; excess gets 429
+
+GET /stats returns request and outcome counters.
+"""
+import os
+import sys
+import math
+import time
+import json
+import base64
+import random
+import asyncio
+import hashlib
+import argparse
+from typing import Dict, Any
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from aadhaar_fields import verhoeff_check_digit  # noqa: E402
+
+
+def parse_latency(spec: str):
+    """Build a latency sampler (seconds) from a distribution spec."""
+    kind, _, args = spec.partition(':')
+    values = [float(v) for v in args.split(',')] if args else []
+    if kind == 'fixed':
+        return lambda: values[0] / 1000.0
+    if kind == 'uniform':
+        return lambda: random.uniform(values[0], values[1]) / 1000.0
+    if kind == 'lognormal':
+        mu, sigma = math.log(values[0] / 1000.0), values[1]
+        return lambda: random.lognormvariate(mu, sigma)
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def card_text(image: bytes) -> str:
+    """Deterministic Aadhaar-like card text for an image."""
+    digest = hashlib.sha256(image).hexdigest()
+    # Real numbers never start with 0 or 1 and end in a Verhoeff check digit
+    number = str(2 + int(digest[0], 16) % 8) + ''.join(str(int(c, 16) % 10) for c in digest[1:11])
+    number += verhoeff_check_digit(number)
+    day, month, year = int(digest[12:14], 16) % 28 + 1, int(digest[14:16], 16) % 12 + 1, 1960 + int(digest[16:18], 16) % 45
+    return (
+        "GOVERNMENT OF INDIA\n"
+        f"Test Resident {''.join(chr(65 + int(c, 16)) for c in digest[:6])}\n"
+        f"DOB: {day:02d}/{month:02d}/{year}\n"
+        f"{'MALE' if int(digest[18], 16) % 2 else 'FEMALE'}\n"
+        f"{number[:4]} {number[4:8]} {number[8:]}\n"
+        "Aadhaar - Aam Aadmi ka Adhikar"
+    )
+
+
+def text_overlay(text: str) -> Dict[str, Any]:
+    lines = []
+    for row, line in enumerate(text.split('\n')):
+        left, words = 40, []
+        for word in line.split():
+            width = 18 * len(word)
+            words.append({'WordText': word, 'Left': left, 'Top': 60 + row * 48, 'Height': 30, 'Width': width})
+            left += width + 12
+        lines.append({'LineText': line, 'Words': words, 'MaxHeight': 30, 'MinTop': 60 + row * 48})
+    return {'Lines': lines, 'HasOverlay': True, 'Message': 'Total lines: %d' % len(lines)}
+
+
+class FakeOCRSpace:
+    def __init__(self, latency, error_rate: float, http_error_rate: float,
+                 burst_every: float, burst_duration: float, rps_limit: float):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.http_error_rate = http_error_rate
+        self.burst_every = burst_every
+        self.burst_duration = burst_duration
+        self.rps_limit = rps_limit
+        self.started = time.monotonic()
+        self.tokens = rps_limit
+        self.refilled = self.started
+        self.in_flight = 0
+        self.stats = {'requests': 0, 'ok': 0, 'processing_errors': 0, 'http_errors': 0,
+                      'rate_limited': 0, 'bad_requests': 0, 'bytes_received': 0, 'max_in_flight': 0}
+
+    def _rate_limited(self) -> bool:
+        now = time.monotonic()
+        if self.burst_every > 0 and (now - self.started) % self.burst_every < self.burst_duration:
+            return True
+        if self.rps_limit > 0:
+            self.tokens = min(self.rps_limit, self.tokens + (now - self.refilled) * self.rps_limit)
+            self.refilled = now
+            if self.tokens < 1:
+                return True
+            self.tokens -= 1
+        return False
+
+    async def parse(self, request: web.Request) -> web.Response:
+        self.stats['requests'] += 1
+        self.stats['bytes_received'] += request.content_length or 0
+        if self._rate_limited():
+            self.stats['rate_limited'] += 1
+            return web.json_response({'ErrorMessage': ['You may only perform this action upto maximum requests']},
+                                     status=429, headers={'Retry-After': '1'})
+
+        form = await request.post()
+        image = None
+        if 'base64Image' in form:
+            _, _, encoded = str(form['base64Image']).partition('base64,')
+            try:
+                image = base64.b64decode(encoded, validate=True)
+            except ValueError:
+                image = None
+        elif 'file' in form and hasattr(form['file'], 'file'):
+            image = form['file'].file.read()
+        if not form.get('apikey') or not image:
+            self.stats['bad_requests'] += 1
+            return web.json_response({
+                'OCRExitCode': 99, 'IsErroredOnProcessing': True,
+                'ErrorMessage': ['Invalid request: apikey and an image are required'],
+            })
+
+        self.in_flight += 1
+        self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self.in_flight)
+        started = time.monotonic()
+        try:
+            await asyncio.sleep(self.latency())
+        finally:
+            self.in_flight -= 1
+        elapsed_ms = str(int((time.monotonic() - started) * 1000))
+
+        roll = random.random()
+        if roll < self.http_error_rate:
+            self.stats['http_errors'] += 1
+            return web.Response(status=random.choice((500, 502, 503)), text='upstream error')
+        if roll < self.http_error_rate + self.error_rate:
+            self.stats['processing_errors'] += 1
+            return web.json_response({
+                'OCRExitCode': 3, 'IsErroredOnProcessing': True,
+                'ErrorMessage': ['E500: Resource Exhaustion'], 'ProcessingTimeInMilliseconds': elapsed_ms,
+            })
+
+        text = card_text(image)
+        result = {
+            'TextOrientation': '0', 'FileParseExitCode': 1,
+            'ParsedText': text.replace('\n', '\r\n'), 'ErrorMessage': '', 'ErrorDetails': '',
+        }
+        if str(form.get('isOverlayRequired', 'false')).lower() == 'true':
+            result['TextOverlay'] = text_overlay(text)
+        self.stats['ok'] += 1
+        return web.json_response({
+            'ParsedResults': [result],
+            'OCRExitCode': 1,
+            'IsErroredOnProcessing': False,
+            'ProcessingTimeInMilliseconds': elapsed_ms,
+            'SearchablePDFURL': 'Searchable PDF not generated as it was not requested.',
+        })
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response({**self.stats, 'in_flight': self.in_flight,
+                                  'uptime_seconds': round(time.monotonic() - self.started, 1)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--latency', default='lognormal:1800,0.5')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--http-error-rate', type=float, default=0.0)
+    parser.add_argument('--burst-every', type=float, default=0.0)
+    parser.add_argument('--burst-duration', type=float, default=0.0)
+    parser.add_argument('--rps-limit', type=float, default=0.0)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    fake = FakeOCRSpace(parse_latency(args.latency), args.error_rate, args.http_error_rate,
+                        args.burst_every, args.burst_duration, args.rps_limit)
+    app = web.Application(client_max_size=32 * 1024 * 1024)
+    app.router.add_post('/parse/image', fake.parse)
+    app.router.add_get('/stats', fake.get_stats)
+    print(json.dumps({'listening': f"http://{args.host}:{args.port}/parse/image", **vars(args)}))
+    web.run_app(app, host=args.host, port=args.port, print=None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""
+Field extraction benchmark: single-pass extract_fields() against the old
+line-by-line extraction, on synthetic OCR output.
+
+Usage:
+    python benchmarks/field_bench.py [--samples 5000] [--repeat 5] [--seed 1]
+                                     [--json out.json]
+
+Samples mimic what OCR.space returns for Aadhaar cards: front sides
+(header, Hindi line, name, DOB or year of birth, gender, number, sometimes
+the 16-digit VID), back sides (multi-line address ending in a PIN code,
+mobile number) and combined front+back uploads, with CRLF line endings,
+the number printed spaced, hyphenated or unspaced, stray OCR noise and a
+share of misread digits (where the right answer is "no number").
+
+    legacy   the extraction as it was before: three passes over the lines
+             for name / mobile / residence plus re.findall(r'\\d{12}') for
+             the number
+    single   aadhaar_fields.extract_fields()
+
+Reported per extractor: microseconds per sample (median over --repeat runs)
+and per-field accuracy against the generated ground truth. Addresses are
+compared ignoring case, spacing and punctuation.
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from aadhaar_fields import extract_fields, verhoeff_check_digit  # noqa: E402
+
+FIRST_NAMES = ('Aarav', 'Priya', 'Rahul', 'Sneha', 'Vikram', 'Ananya', 'Mohammed', 'Lakshmi', 'Arjun', 'Fatima')
+LAST_NAMES = ('Sharma', 'Patel', 'Reddy', 'Khan', 'Iyer', 'Singh', 'Das', 'Nair', 'Gupta', "D'Souza")
+STREETS = ('MG Road', 'Station Road', 'Gandhi Nagar', 'Lake View Colony', 'Main Bazaar', 'Temple Street')
+CITIES = (('Bengaluru', 'Karnataka'), ('Pune', 'Maharashtra'), ('Chennai', 'Tamil Nadu'),
+          ('Lucknow', 'Uttar Pradesh'), ('Kochi', 'Kerala'), ('Jaipur', 'Rajasthan'))
+NOISE = ('|', '~', '.', "'", '_', '::')
+FIELDS = ('aadhaar_number', 'name', 'mobile', 'address')
+
+
+def aadhaar_number(rng: random.Random) -> str:
+    number = str(rng.randint(2, 9)) + ''.join(str(rng.randint(0, 9)) for _ in range(10))
+    return number + verhoeff_check_digit(number)
+
+
+def printed_number(number: str, rng: random.Random) -> str:
+    separator = rng.choice((' ', ' ', ' ', '-', ''))
+    return separator.join((number[:4], number[4:8], number[8:]))
+
+
+def sample(rng: random.Random) -> tuple:
+    """(ocr_text, truth) for one synthetic card."""
+    side = rng.choice(('front', 'front', 'back', 'both'))
+    truth = dict.fromkeys(FIELDS)
+    lines = []
+
+    number = aadhaar_number(rng)
+    if rng.random() < 0.05:
+        # OCR misread one digit: the checksum no longer holds
+        position = rng.randrange(12)
+        digits = '23456789' if position == 0 else '0123456789'
+        wrong = rng.choice(digits.replace(number[position], ''))
+        number = number[:position] + wrong + number[position + 1:]
+    else:
+        truth['aadhaar_number'] = f"{number[:4]} {number[4:8]} {number[8:]}"
+
+    if side in ('front', 'both'):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        truth['name'] = name
+        lines += ['भारत सरकार', 'GOVERNMENT OF INDIA', rng.choice(('', rng.choice(NOISE))), name]
+        if rng.random() < 0.8:
+            lines.append(f"DOB: {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(1950, 2015)}")
+        else:
+            lines.append(f"Year of Birth : {rng.randint(1950, 2015)}")
+        lines.append(rng.choice(('MALE', 'FEMALE', 'Male', 'Female')))
+        lines.append(printed_number(number, rng))
+        if rng.random() < 0.3:
+            lines.append(f"VID : {' '.join(str(rng.randint(1000, 9999)) for _ in range(4))}")
+        lines.append('मेरा आधार, मेरी पहचान')
+
+    if side in ('back', 'both'):
+        city, state = rng.choice(CITIES)
+        relation = f"{rng.choice(('S/O', 'D/O', 'W/O', 'C/O'))} {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        street = f"{rng.randint(1, 999)}, {rng.choice(STREETS)}"
+        pin = f"{rng.randint(110, 859)}{rng.randint(0, 999):03d}"
+        lines += ['Unique Identification Authority of India', f"Address: {relation},", street + ',',
+                  f"{city}, {state} - {pin}"]
+        truth['address'] = f"{relation}, {street}, {city}, {state} - {pin}"
+        if side == 'back':
+            lines.append(printed_number(number, rng))
+        if rng.random() < 0.6:
+            mobile = str(rng.randint(6, 9)) + ''.join(str(rng.randint(0, 9)) for _ in range(9))
+            truth['mobile'] = mobile
+            lines.append(f"{rng.choice(('Mobile No:', 'Mobile No :', 'Mob:'))} {rng.choice(('', '+91 '))}{mobile}")
+        lines.append('help@uidai.gov.in | www.uidai.gov.in')
+
+    return '\r\n'.join(lines), truth
+
+
+def legacy_extract(text: str) -> dict:
+    """The pre-extract_fields logic, verbatim apart from returning a dict."""
+    name = ""
+    contact_number = ""
+    residence = ""
+    lines = text.split('\n')
+    for i, line in enumerate(lines):
+        if "GOVERNMENT OF INDIA" in line and i + 1 < len(lines):
+            name = lines[i + 1].strip()
+            break
+    for line in lines:
+        if "Mobile No:" in line:
+            contact_number = re.search(r'\d{10}', line)
+            if contact_number:
+                contact_number = contact_number.group()
+            break
+    for line in lines:
+        if any(keyword in line.lower() for keyword in ['address', 'residence', 'location']):
+            residence = line.strip()
+            break
+
+    number = None
+    digits = re.findall(r'\d{12}', text)
+    if digits:
+        cleaned = re.sub(r'\D', '', digits[0])
+        if len(cleaned) == 12:
+            number = f"{cleaned[:4]} {cleaned[4:8]} {cleaned[8:]}"
+    return {'aadhaar_number': number, 'name': name, 'mobile': contact_number, 'address': residence}
+
+
+def normalize(field: str, value):
+    if not value:
+        return None
+    if field == 'address':
+        return re.sub(r'[^a-z0-9/]', '', value.lower())
+    return value
+
+
+def measure(extract, texts: list, repeat: int) -> float:
+    """Median microseconds per sample over `repeat` passes."""
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in texts:
+            extract(text)
+        runs.append((time.perf_counter() - started) / len(texts) * 1e6)
+    return statistics.median(runs)
+
+
+def accuracy(extract, samples: list) -> dict:
+    correct = dict.fromkeys(FIELDS, 0)
+    for text, truth in samples:
+        result = extract(text)
+        for field in FIELDS:
+            correct[field] += normalize(field, result[field]) == normalize(field, truth[field])
+    return {field: round(count / len(samples), 4) for field, count in correct.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--samples', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='Write the report to this file')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    samples = [sample(rng) for _ in range(args.samples)]
+    texts = [text for text, _ in samples]
+
+    report = {'samples': args.samples, 'mean_chars': round(statistics.mean(len(text) for text in texts), 1)}
+    for label, extract in (('legacy', legacy_extract), ('single', extract_fields)):
+        report[label] = {
+            'us_per_sample': round(measure(extract, texts, args.repeat), 2),
+            'accuracy': accuracy(extract, samples),
+        }
+        print(f"{label}: {report[label]['us_per_sample']}us/sample, accuracy {report[label]['accuracy']}",
+              file=sys.stderr)
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Hash benchmark: per-image imagehash.phash() vs the batched NumPy hasher.
+
+Usage:
+    python benchmarks/hash_bench.py [--count 1000] [--repeat 5] [--json out.json]
+
+Synthetic grayscale document-like images are generated in memory and
+reduced to 32x32 samples once (the resize is shared by both paths and is
+reported separately). The per-image path runs imagehash.phash() in a
+Python loop; the batched path computes pHash, dHash and aHash for the
+whole stack at once. Every batched pHash, and those of blank and uniform
+pages, is checked bit-for-bit against imagehash before timings are
+reported; the script exits with status 1 on any mismatch. imagehash comes
+from requirements-dev.txt.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from image_hashes import prepare_image, hash_samples, to_hex  # noqa: E402
+
+try:
+    import imagehash
+except ImportError:
+    sys.exit("imagehash is needed for the reference comparison: pip install -r requirements-dev.txt")
+
+
+def make_images(count: int, size: int = 256):
+    """Gradients plus blocky 'text' so the DCT has real structure."""
+    rng = np.random.default_rng(count)
+    images = []
+    for _ in range(count):
+        image = np.tile(np.linspace(200, 250, size, dtype=np.uint8), (size, 1))
+        for _ in range(12):
+            x, y = rng.integers(0, size - 40, size=2)
+            image[y:y + 8, x:x + int(rng.integers(10, 40))] = int(rng.integers(0, 80))
+        images.append(Image.fromarray(image))
+    # Most DCT coefficients of these are zero, so only their signs decide the bits
+    images[:4] = [Image.new('L', (size, size), value) for value in (255, 240, 128, 0)]
+    return images
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', help='Write results to this file')
+    args = parser.parse_args()
+
+    images = make_images(args.count)
+    started = time.perf_counter()
+    samples = np.stack([prepare_image(image) for image in images])
+    prepare_s = time.perf_counter() - started
+
+    batched_s = best_of(lambda: hash_samples(samples), args.repeat)
+    phash_only_s = best_of(lambda: hash_samples(samples, ("phash",)), args.repeat)
+    results = {
+        'count': args.count,
+        'prepare_us_per_image': round(prepare_s / args.count * 1e6, 2),
+        'batched_all_us_per_image': round(batched_s / args.count * 1e6, 2),
+        'batched_phash_us_per_image': round(phash_only_s / args.count * 1e6, 2),
+    }
+
+    reference = [str(imagehash.phash(image)) for image in images]
+    batched = to_hex(hash_samples(samples, ("phash",))["phash"])
+    mismatches = sum(1 for a, b in zip(reference, batched) if a != b)
+    small = [Image.fromarray(sample) for sample in samples]
+    loop_s = best_of(lambda: [imagehash.phash(image) for image in small], args.repeat)
+    results['imagehash_phash_us_per_image'] = round(loop_s / args.count * 1e6, 2)
+    results['phash_mismatches'] = mismatches
+    results['speedup'] = round(loop_s / phash_only_s, 1) if phash_only_s else None
+    print(f"imagehash.phash loop: {results['imagehash_phash_us_per_image']:8.2f} us/image")
+    print(f"pHash mismatches vs imagehash: {mismatches}/{args.count}")
+
+    print(f"prepare (luma + Lanczos 32x32): {results['prepare_us_per_image']:8.2f} us/image")
+    print(f"batched pHash:                  {results['batched_phash_us_per_image']:8.2f} us/image")
+    print(f"batched pHash+dHash+aHash:      {results['batched_all_us_per_image']:8.2f} us/image")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
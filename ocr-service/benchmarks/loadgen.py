@@ -0,0 +1,219 @@
+"""
+Load generator for the OCR service: open-loop arrivals at a target rate.
+
+Usage:
+    python benchmarks/loadgen.py [--url http://127.0.0.1:8000] [--mode ocr|jobs|batch]
+                                 [--rps 5] [--duration 60] [--files DIR] [--unique]
+                                 [--batch-size 10] [--timeout 120] [--json out.json]
+
+Requests are started on a fixed schedule (Poisson with --poisson)
+regardless of how fast earlier ones finish, so queueing inside the
+service shows up as latency and 503s instead of silently lowering the
+offered load. Pair with benchmarks/fake_ocrspace.py to test offline.
+
+Modes:
+    ocr    POST /ocr, latency until the response body is read
+    jobs   POST /jobs, then long-poll GET /jobs/{id}?wait=30 until done;
+           latency is submit to result
+    batch  POST /ocr/batch with --batch-size files, latency until the
+           summary line; per-document failures are counted too
+
+With --unique every upload gets random trailing bytes (ignored by image
+decoders) so the result cache and job dedup never short-circuit.
+
+Reports achieved throughput, latency p50/p95/p99/max and a breakdown of
+outcomes (HTTP status, timeouts, connection errors, application errors).
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from collections import Counter
+from typing import Dict, Any, List
+
+import aiohttp
+import numpy as np
+import cv2
+
+
+def synthetic_documents(count: int = 8) -> List[tuple]:
+    """Small set of distinct card-like JPEGs (phone-photo sized)."""
+    documents = []
+    for i in range(count):
+        rng = np.random.default_rng(i)
+        image = np.full((1800, 2400, 3), 230, dtype=np.uint8)
+        for _ in range(30):
+            x, y = int(rng.integers(0, 1600)), int(rng.integers(60, 1800))
+            cv2.putText(image, f'{rng.integers(1000, 9999)} {rng.integers(1000, 9999)}', (x, y),
+                        cv2.FONT_HERSHEY_SIMPLEX, 2.0, (30, 30, 30), 4)
+        image = cv2.add(image, rng.integers(0, 10, size=image.shape, dtype=np.uint8))
+        documents.append((f'synthetic_{i}.jpg', cv2.imencode('.jpg', image)[1].tobytes(), 'image/jpeg'))
+    return documents
+
+
+def load_documents(directory: str) -> List[tuple]:
+    types = {'.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.png': 'image/png', '.pdf': 'application/pdf'}
+    documents = []
+    for filename in sorted(os.listdir(directory)):
+        content_type = types.get(os.path.splitext(filename)[1].lower())
+        if content_type:
+            with open(os.path.join(directory, filename), 'rb') as f:
+                documents.append((filename, f.read(), content_type))
+    return documents
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class LoadGenerator:
+    def __init__(self, args, documents: List[tuple]):
+        self.args = args
+        self.documents = documents
+        self.latencies: List[float] = []
+        self.outcomes: Counter = Counter()
+        self.document_outcomes: Counter = Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def _document(self) -> tuple:
+        filename, data, content_type = random.choice(self.documents)
+        if self.args.unique:
+            data = data + os.urandom(16)
+        return filename, data, content_type
+
+    def _form(self, count: int = 1) -> aiohttp.FormData:
+        form = aiohttp.FormData()
+        field = 'files' if self.args.mode == 'batch' else 'file'
+        for _ in range(count):
+            filename, data, content_type = self._document()
+            form.add_field(field, data, filename=filename, content_type=content_type)
+        return form
+
+    async def _ocr(self, session: aiohttp.ClientSession) -> str:
+        async with session.post(f"{self.args.url}/ocr", data=self._form()) as response:
+            body = await response.json(content_type=None)
+            if response.status == 200 and not body.get('success'):
+                return 'app_error'
+            return str(response.status)
+
+    async def _jobs(self, session: aiohttp.ClientSession) -> str:
+        async with session.post(f"{self.args.url}/jobs", data=self._form()) as response:
+            body = await response.json(content_type=None)
+            if response.status not in (200, 202):
+                return f"submit_{response.status}"
+        job_id = body['jobId']
+        while True:
+            async with session.get(f"{self.args.url}/jobs/{job_id}", params={'wait': '30'}) as response:
+                body = await response.json(content_type=None)
+                if response.status != 200:
+                    return f"poll_{response.status}"
+            if body['status'] == 'done':
+                return '200'
+            if body['status'] == 'failed':
+                return 'job_failed'
+
+    async def _batch(self, session: aiohttp.ClientSession) -> str:
+        async with session.post(f"{self.args.url}/ocr/batch", data=self._form(self.args.batch_size)) as response:
+            if response.status != 200:
+                return str(response.status)
+            async for raw in response.content:
+                line = json.loads(raw)
+                if line.get('done'):
+                    return '200' if line['failed'] == 0 else 'partial'
+                self.document_outcomes['ok' if line.get('success') else 'failed'] += 1
+        return 'truncated'
+
+    async def _one(self, session: aiohttp.ClientSession):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        started = time.perf_counter()
+        try:
+            run = {'ocr': self._ocr, 'jobs': self._jobs, 'batch': self._batch}[self.args.mode]
+            outcome = await asyncio.wait_for(run(session), timeout=self.args.timeout)
+        except asyncio.TimeoutError:
+            outcome = 'timeout'
+        except aiohttp.ClientError as e:
+            outcome = f"connection_error:{type(e).__name__}"
+        except Exception as e:
+            outcome = f"error:{type(e).__name__}"
+        finally:
+            self.in_flight -= 1
+        self.outcomes[outcome] += 1
+        if outcome == '200':
+            self.latencies.append(time.perf_counter() - started)
+
+    async def run(self) -> Dict[str, Any]:
+        connector = aiohttp.TCPConnector(limit=self.args.max_connections)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            tasks = []
+            started = time.perf_counter()
+            next_at = started
+            while next_at - started < self.args.duration:
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(self._one(session)))
+                interval = 1.0 / self.args.rps
+                next_at += random.expovariate(1.0 / interval) if self.args.poisson else interval
+            await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - started
+
+        ok = self.outcomes.get('200', 0)
+        return {
+            'mode': self.args.mode,
+            'target_rps': self.args.rps,
+            'sent': len(tasks),
+            'succeeded': ok,
+            'elapsed_seconds': round(elapsed, 2),
+            'throughput_rps': round(ok / elapsed, 3) if elapsed else 0.0,
+            'latency_ms': {
+                'p50': round(percentile(self.latencies, 50) * 1000, 1),
+                'p95': round(percentile(self.latencies, 95) * 1000, 1),
+                'p99': round(percentile(self.latencies, 99) * 1000, 1),
+                'max': round(max(self.latencies, default=0) * 1000, 1),
+            },
+            'outcomes': dict(self.outcomes),
+            'document_outcomes': dict(self.document_outcomes),
+            'max_in_flight': self.max_in_flight,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--mode', choices=('ocr', 'jobs', 'batch'), default='ocr')
+    parser.add_argument('--rps', type=float, default=5.0)
+    parser.add_argument('--duration', type=float, default=60.0)
+    parser.add_argument('--poisson', action='store_true', help='Exponential inter-arrival times')
+    parser.add_argument('--files', help='Directory of .jpg/.png/.pdf documents (default: synthetic)')
+    parser.add_argument('--unique', action='store_true', help='Defeat the result cache and job dedup')
+    parser.add_argument('--batch-size', type=int, default=10)
+    parser.add_argument('--timeout', type=float, default=120.0)
+    parser.add_argument('--max-connections', type=int, default=0, help='Client connection cap (0 = unlimited)')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--json', help='Write the report to this file')
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    documents = load_documents(args.files) if args.files else synthetic_documents()
+    if not documents:
+        sys.exit(f"No documents found in {args.files}")
+
+    report = asyncio.run(LoadGenerator(args, documents).run())
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+p-hash index benchmark: what a /similar or POST /verify lookup costs as an
+organization's registrations grow, and what filling the index costs.
+
+Usage:
+    python benchmarks/phash_index_bench.py [--sizes 10000,100000,1000000]
+                                           [--distances 8,10,12] [--queries 200]
+                                           [--persist] [--seed 1] [--json out.json]
+
+Random 64-bit hashes are indexed under one organization; half the queries
+are stored hashes with a few bits flipped (so there are matches), half
+are random. For every size:
+
+    insert_many_s    one insert_many() call for the whole set (one SQLite
+                     transaction with --persist)
+    insert_us        one more insert() afterwards, per call (median)
+    load_s           re-opening the SQLite file (--persist only)
+    search           per max_distance: search() latency median / p99 in ms
+                     and the mean number of matches
+    numpy_scan_ms    a plain vectorized scan over every hash, for scale
+
+Every query's result is checked against that scan before timings are
+reported.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from phash_index import PHashIndex, _popcount_array  # noqa: E402
+
+ORG = '0x' + '01' * 32
+
+
+def make_hashes(rng: np.random.Generator, count: int) -> np.ndarray:
+    return rng.integers(0, 2 ** 63, size=count, dtype=np.uint64) * np.uint64(2) + rng.integers(0, 2, size=count, dtype=np.uint64)
+
+
+def make_queries(rng: np.random.Generator, values: np.ndarray, count: int) -> list:
+    queries = []
+    for i in range(count):
+        if i % 2:
+            queries.append(int(make_hashes(rng, 1)[0]))
+            continue
+        value = int(values[rng.integers(len(values))])
+        for bit in rng.choice(64, size=rng.integers(0, 12), replace=False):
+            value ^= 1 << int(bit)
+        queries.append(value)
+    return queries
+
+
+def percentile(samples: list, q: float) -> float:
+    return sorted(samples)[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def bench_size(size: int, args, rng: np.random.Generator, tmp: str) -> dict:
+    values = make_hashes(rng, size)
+    ids = [f"0x{i:064x}" for i in range(size)]
+    rows = [(ORG, document_hash, f"{int(value):016x}") for document_hash, value in zip(ids, values)]
+    db_path = os.path.join(tmp, f"phash_{size}.sqlite3") if args.persist else None
+    report = {}
+
+    index = PHashIndex(db_path=db_path)
+    started = time.perf_counter()
+    index.insert_many(rows)
+    report['insert_many_s'] = round(time.perf_counter() - started, 3)
+
+    extra = make_hashes(rng, 200)
+    samples = []
+    for i, value in enumerate(extra):
+        t0 = time.perf_counter()
+        index.insert(ORG, f"0x{size + i:064x}", f"{int(value):016x}")
+        samples.append(time.perf_counter() - t0)
+    report['insert_us'] = round(statistics.median(samples) * 1e6, 1)
+    all_ids = np.array(ids + [f"0x{size + i:064x}" for i in range(len(extra))], dtype=object)
+    all_values = np.concatenate([values, extra])
+
+    if db_path:
+        index.close()
+        started = time.perf_counter()
+        index = PHashIndex(db_path=db_path)
+        report['load_s'] = round(time.perf_counter() - started, 3)
+
+    queries = make_queries(rng, all_values, args.queries)
+    report['search'] = {}
+    scan_ms = []
+    for max_distance in args.distances:
+        latencies, found = [], []
+        for query in queries:
+            t0 = time.perf_counter()
+            matches = index.search(ORG, f"{query:016x}", max_distance)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+            t0 = time.perf_counter()
+            distances = _popcount_array(all_values ^ np.uint64(query))
+            expected = set(all_ids[distances <= max_distance].tolist())
+            scan_ms.append((time.perf_counter() - t0) * 1000)
+            if {match['documentHash'] for match in matches} != expected:
+                raise AssertionError(f"search() disagrees with a full scan at size {size}, distance {max_distance}")
+            found.append(len(matches))
+        report['search'][max_distance] = {
+            'median_ms': round(statistics.median(latencies), 3),
+            'p99_ms': round(percentile(latencies, 0.99), 3),
+            'matches': round(statistics.mean(found), 2),
+        }
+    report['numpy_scan_ms'] = round(statistics.median(scan_ms), 3)
+    index.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10000,100000,1000000', help='Hashes per organization')
+    parser.add_argument('--distances', default='8,10,12', help='max_distance values to query with')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--persist', action='store_true', help='Back the index with a SQLite file')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='Write the report to this file')
+    args = parser.parse_args()
+    args.distances = [int(d) for d in args.distances.split(',')]
+
+    rng = np.random.default_rng(args.seed)
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in (int(s) for s in args.sizes.split(',')):
+            report[size] = bench_size(size, args, rng, tmp)
+            print(f"{size} hashes: {json.dumps(report[size])}", file=sys.stderr)
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,331 @@
+"""
+Pipeline benchmark: time and peak RSS of every preprocessing stage.
+
+Usage:
+    python benchmarks/pipeline_bench.py [--repeat 5] [--cases phone_12mp,pdf_10_pages]
+                                        [--fixtures DIR] [--json out.json]
+                                        [--save-baseline baseline.json]
+                                        [--baseline baseline.json] [--tolerance 0.25]
+
+Cases are synthetic documents of realistic sizes (phone photos, a ~16MB
+600 DPI scan, single and multi-page PDFs), plus every image/PDF found in
+--fixtures. Stages are measured with the service's own functions:
+
+    decode   decode_image() minus its resize (reduced JPEG decode where possible)
+    resize   the single INTER_AREA resize inside decode_image() (same call as
+             decode, so its peak RSS is the decode's)
+    phash    phash_hex() on the decoded image
+    encode   encode_jpeg_to_size() against the provider limit
+    hash     SHA-256 request key of the upload (cache and job dedup key)
+    render   pdftoppm rasterization of one PDF page (needs poppler)
+    document every page of a PDF through preprocess_pdf_page()
+
+Each (case, stage) runs in a fresh spawned process that only reads the
+upload from a temp file. After the stage's inputs are built the kernel's
+RSS high-water mark is reset (/proc/self/clear_refs), so 'peak_rss_mb' is
+how far the stage itself pushed memory above what was already resident.
+
+With --baseline, results are compared against a stored run and the exit
+status is 1 if any stage got slower or hungrier than --tolerance allows,
+so the script can gate a deploy. Baselines are machine-specific: record
+one with --save-baseline on the machine (or CI runner) that will compare.
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import hashlib
+import argparse
+import platform
+import resource
+import statistics
+import multiprocessing
+
+import cv2
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ocr_service import (  # noqa: E402
+    decode_image, encode_jpeg_to_size, pdf_info, pdf_render_dpi,
+    preprocess_pdf_page, _render_pdf_page,
+)
+from image_hashes import phash_hex  # noqa: E402
+from ocr_cache import OCRCache  # noqa: E402
+
+# Same defaults as OCRService
+PARAMS = {
+    'pdf_dpi': 150,
+    'max_image_dimension': 2000,
+    'max_dim': 1500,
+    'jpeg_quality': 70,
+    'min_jpeg_quality': 40,
+    'max_size_kb': 1024,
+}
+TARGET_DIM = min(PARAMS['max_image_dimension'], PARAMS['max_dim'])
+
+# Absolute slack so tiny stages do not fail on scheduler noise
+MIN_SLACK_MS = 2.0
+MIN_SLACK_MB = 4.0
+
+IMAGE_STAGES = ('decode', 'resize', 'phash', 'encode', 'hash')
+PDF_STAGES = ('render', 'phash', 'encode', 'hash', 'document')
+
+
+def card_image(width: int, height: int, seed: int) -> np.ndarray:
+    """Card/scan-like BGR image: paper gradient, text lines and sensor noise."""
+    rng = np.random.default_rng(seed)
+    image = np.full((height, width, 3), 235, dtype=np.uint8)
+    image -= np.linspace(0, 40, width, dtype=np.uint8)[np.newaxis, :, np.newaxis]
+    scale = max(width, height) / 2000
+    for _ in range(120):
+        x = int(rng.integers(0, max(1, width - int(600 * scale))))
+        y = int(rng.integers(int(40 * scale), height))
+        cv2.putText(image, 'XXXX 1234 5678 9012', (x, y), cv2.FONT_HERSHEY_SIMPLEX,
+                    1.0 * scale, (20, 20, 20), max(1, int(2 * scale)))
+    return cv2.add(image, rng.integers(0, 12, size=image.shape, dtype=np.uint8))
+
+
+def encode(image: np.ndarray, ext: str, quality: int = 92) -> bytes:
+    params = [int(cv2.IMWRITE_JPEG_QUALITY), quality] if ext == '.jpg' else []
+    ok, buffer = cv2.imencode(ext, image, params)
+    return buffer.tobytes()
+
+
+def make_pdf(pages: int, dpi: int = 200) -> bytes:
+    """A4 PDF with one scanned-looking image per page."""
+    width, height = int(8.27 * dpi), int(11.69 * dpi)
+    images = [Image.fromarray(cv2.cvtColor(card_image(width, height, i), cv2.COLOR_BGR2RGB)) for i in range(pages)]
+    out = io.BytesIO()
+    images[0].save(out, format='PDF', save_all=True, append_images=images[1:], resolution=dpi)
+    return out.getvalue()
+
+
+SYNTHETIC_CASES = {
+    'small_1200': lambda: encode(card_image(1200, 900, 1), '.jpg'),
+    'phone_12mp': lambda: encode(card_image(4032, 3024, 2), '.jpg'),
+    'phone_48mp': lambda: encode(card_image(8000, 6000, 3), '.jpg'),
+    'scan_a4_600dpi_16mb': lambda: encode(card_image(4960, 7016, 4), '.jpg', quality=98),
+    'scan_a4_300dpi_png': lambda: encode(card_image(2480, 3508, 5), '.png'),
+    'pdf_1_page': lambda: make_pdf(1),
+    'pdf_10_pages': lambda: make_pdf(10),
+}
+
+
+def load_case(name: str, fixtures: dict) -> bytes:
+    if name in fixtures:
+        with open(fixtures[name], 'rb') as f:
+            return f.read()
+    return SYNTHETIC_CASES[name]()
+
+
+def read_file(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def is_pdf(data: bytes) -> bool:
+    return data[:5] == b'%PDF-'
+
+
+def _proc_status_kb(field: str) -> int:
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    raise OSError(f"{field} not in /proc/self/status")
+
+
+def reset_peak_rss() -> int:
+    """
+    Reset the RSS high-water mark to the current RSS and return it in bytes.
+
+    Without /proc (non-Linux) the high-water mark cannot be reset, so the
+    stage's peak is only visible when it exceeds its setup.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return _proc_status_kb('VmRSS') * 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def peak_rss() -> int:
+    """RSS high-water mark in bytes."""
+    try:
+        return _proc_status_kb('VmHWM') * 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def stage_runner(data: bytes, stage: str):
+    """Build the inputs of a stage outside the measurement and return the measured call."""
+    if is_pdf(data):
+        page_count, max_points = pdf_info(data)
+        dpi = pdf_render_dpi(max_points, PARAMS['pdf_dpi'], TARGET_DIM)
+        if stage == 'render':
+            return lambda: _render_pdf_page(data, 1, dpi, TARGET_DIM)
+        if stage == 'document':
+            return lambda: [preprocess_pdf_page(data, page, dpi, PARAMS) for page in range(1, page_count + 1)]
+        image, _, _ = _render_pdf_page(data, 1, dpi, TARGET_DIM)
+    else:
+        if stage in ('decode', 'resize'):
+            return lambda: decode_image(data, TARGET_DIM)
+        image, _ = decode_image(data, TARGET_DIM)
+
+    if stage == 'phash':
+        rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        pil_image = Image.frombuffer('RGB', (rgb.shape[1], rgb.shape[0]), rgb, 'raw', 'RGB', 0, 1)
+        return lambda: phash_hex(pil_image)
+    if stage == 'encode':
+        return lambda: encode_jpeg_to_size(image, PARAMS['max_size_kb'] * 1024,
+                                           PARAMS['jpeg_quality'], PARAMS['min_jpeg_quality'])
+    if stage == 'hash':
+        return lambda: (hashlib.sha256(data).hexdigest(), OCRCache.make_key(data, PARAMS))
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def measure_stage(path: str, stage: str, repeat: int, queue):
+    """Child process body: measure one stage of one case."""
+    try:
+        data = read_file(path)
+        run = stage_runner(data, stage)
+        floor = reset_peak_rss()
+
+        timings, extra = [], {}
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = run()
+            timings.append(time.perf_counter() - started)
+            if stage in ('decode', 'resize'):
+                # decode_image() times its own decode and resize
+                key = 'decode_ms' if stage == 'decode' else 'resize_ms'
+                timings[-1] = result[1][key] / 1000.0
+                extra = {'decode_factor': result[1]['decode_factor']}
+            elif stage == 'encode':
+                extra = {k: result[1][k] for k in ('encode_passes', 'jpeg_quality', 'encode_scale', 'encoded_bytes')}
+            del result
+
+        queue.put({
+            'best_ms': round(min(timings) * 1000, 2),
+            'median_ms': round(statistics.median(timings) * 1000, 2),
+            'peak_rss_mb': round(max(0, peak_rss() - floor) / (1024 * 1024), 1),
+            **extra,
+        })
+    except Exception as e:
+        queue.put({'error': f"{type(e).__name__}: {e}"})
+
+
+def run_isolated(path: str, stage: str, repeat: int) -> dict:
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    process = ctx.Process(target=measure_stage, args=(path, stage, repeat, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """List of regressions against a baseline run."""
+    regressions = []
+    for name, stages in results['cases'].items():
+        for stage, current in stages.get('stages', {}).items():
+            before = baseline.get('cases', {}).get(name, {}).get('stages', {}).get(stage)
+            if not before or 'error' in current or 'error' in before:
+                continue
+            if current['best_ms'] > before['best_ms'] * (1 + tolerance) + MIN_SLACK_MS:
+                regressions.append(f"{name}/{stage}: {before['best_ms']} ms -> {current['best_ms']} ms")
+            if current['peak_rss_mb'] > before['peak_rss_mb'] * (1 + tolerance) + MIN_SLACK_MB:
+                regressions.append(f"{name}/{stage}: {before['peak_rss_mb']} MB -> {current['peak_rss_mb']} MB")
+    return regressions
+
+
+def run_case(name: str, fixtures: dict, workdir: str, have_poppler: bool, repeat: int, results: dict):
+    """Materialize one case to a temp file and measure each of its stages in isolation."""
+    data = load_case(name, fixtures)
+    pdf = is_pdf(data)
+    case = {'bytes': len(data), 'kind': 'pdf' if pdf else 'image', 'stages': {}}
+    if pdf:
+        case['pages'] = pdf_info(data)[0] if have_poppler else None
+    results['cases'][name] = case
+    path = os.path.join(workdir, name.replace(os.sep, '_'))
+    with open(path, 'wb') as f:
+        f.write(data)
+    del data
+
+    if pdf and not have_poppler:
+        print(f"{name:24s} skipped: poppler (pdftoppm) not installed")
+        return
+    for stage in (PDF_STAGES if pdf else IMAGE_STAGES):
+        outcome = run_isolated(path, stage, repeat)
+        case['stages'][stage] = outcome
+        if 'error' in outcome:
+            print(f"{name:24s} {stage:9s} ERROR {outcome['error']}")
+        else:
+            print(f"{name:24s} {stage:9s} {outcome['best_ms']:9.2f} ms  {outcome['peak_rss_mb']:7.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--cases', help='Comma-separated case names (default: all)')
+    parser.add_argument('--fixtures', help='Directory of extra .jpg/.png/.pdf fixtures')
+    parser.add_argument('--json', help='Write results to this file')
+    parser.add_argument('--save-baseline', help='Write results as the new baseline')
+    parser.add_argument('--baseline', help='Compare against this baseline and fail on regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed relative slowdown/growth')
+    args = parser.parse_args()
+
+    fixtures = {}
+    if args.fixtures:
+        for filename in sorted(os.listdir(args.fixtures)):
+            if os.path.splitext(filename)[1].lower() in ('.jpg', '.jpeg', '.png', '.pdf', '.tif', '.tiff'):
+                fixtures[f"fixture:{filename}"] = os.path.join(args.fixtures, filename)
+
+    names = args.cases.split(',') if args.cases else list(SYNTHETIC_CASES) + list(fixtures)
+    have_poppler = shutil.which('pdftoppm') is not None
+
+    results = {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'opencv': cv2.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'repeat': args.repeat,
+            'params': PARAMS,
+        },
+        'cases': {},
+    }
+    workdir = tempfile.mkdtemp(prefix='pipeline_bench_')
+    try:
+        for name in names:
+            run_case(name, fixtures, workdir, have_poppler, args.repeat, results)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+Response path benchmark: what a finished /ocr request costs to answer and
+to log, before and after projection, MessagePack and log redaction.
+
+Usage:
+    python benchmarks/response_bench.py [--samples 2000] [--repeat 5] [--seed 1]
+                                        [--json out.json]
+
+Payloads are built from the synthetic card texts of field_bench.py, in the
+shape OCRService.prepare_for_smart_contract() returns.
+
+    provider    OCR.space response size and json.loads time with and without
+                isOverlayRequired (word boxes laid out like fake_ocrspace.py)
+    response    body size and encode time (Starlette render included) for:
+                json          the full payload, as /ocr used to answer
+                json_hashes   ?fields=hexHash,phash
+                msgpack       ?format=msgpack
+                msgpack_hashes  both
+    logging     per-request cost of the old INFO line with the whole
+                response vs redacted_summary() at INFO (and at DEBUG, the
+                default now, where the line is not emitted), written to a
+                real file handler; bytes are log bytes per request
+"""
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import logging
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fake_ocrspace import text_overlay  # noqa: E402
+from field_bench import sample  # noqa: E402
+from aadhaar_fields import extract_fields  # noqa: E402
+from responses import parse_fields, project, encode_response, redacted_summary  # noqa: E402
+
+
+def payload_for(text: str, rng: random.Random) -> dict:
+    fields = extract_fields(text)
+    hex_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    return {
+        'documentHash': '0x' + hex_hash,
+        'name': fields['name'] or '',
+        'contactNumber': fields['mobile'] or '',
+        'residence': fields['address'] or '',
+        'rawText': text,
+        'hexHash': hex_hash,
+        'phash': f"{rng.getrandbits(64):016x}",
+    }
+
+
+def provider_response(text: str, overlay: bool) -> str:
+    result = {'TextOrientation': '0', 'FileParseExitCode': 1, 'ParsedText': text,
+              'ErrorMessage': '', 'ErrorDetails': ''}
+    if overlay:
+        result['TextOverlay'] = text_overlay(text.replace('\r\n', '\n'))
+    return json.dumps({'ParsedResults': [result], 'OCRExitCode': 1, 'IsErroredOnProcessing': False,
+                       'ProcessingTimeInMilliseconds': '1200',
+                       'SearchablePDFURL': 'Searchable PDF not generated as it was not requested.'})
+
+
+def timed(work, items: list, repeat: int) -> float:
+    """Median microseconds per item over `repeat` passes."""
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for item in items:
+            work(item)
+        runs.append((time.perf_counter() - started) / len(items) * 1e6)
+    return round(statistics.median(runs), 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--samples', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='Write the report to this file')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    texts = [sample(rng)[0] for _ in range(args.samples)]
+    payloads = [payload_for(text, rng) for text in texts]
+    report = {'samples': args.samples}
+
+    report['provider'] = {}
+    for overlay in (True, False):
+        bodies = [provider_response(text, overlay) for text in texts]
+        report['provider']['overlay' if overlay else 'no_overlay'] = {
+            'bytes': round(statistics.mean(len(body) for body in bodies)),
+            'parse_us': timed(json.loads, bodies, args.repeat),
+        }
+
+    report['response'] = {}
+    for label, response_format, spec in (('json', 'json', None), ('json_hashes', 'json', 'hexHash,phash'),
+                                         ('msgpack', 'msgpack', None), ('msgpack_hashes', 'msgpack', 'hexHash,phash')):
+        selected = parse_fields(spec)
+
+        def render(payload, response_format=response_format, selected=selected):
+            return encode_response({'success': True, 'data': project(payload, selected)}, response_format).body
+
+        report['response'][label] = {
+            'bytes': round(statistics.mean(len(render(payload)) for payload in payloads)),
+            'encode_us': timed(render, payloads, args.repeat),
+        }
+
+    report['logging'] = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        log_path = os.path.join(workdir, 'service.log')
+        handler = logging.FileHandler(log_path)
+        handler.setFormatter(logging.Formatter('%(levelname)s:%(name)s:%(message)s'))
+        bench_logger = logging.getLogger('response_bench')
+        bench_logger.addHandler(handler)
+        bench_logger.propagate = False
+        bench_logger.setLevel(logging.INFO)
+        modes = {
+            'full_response_info': lambda p: bench_logger.info(f"Sending response: {{'success': True, 'data': {p}}}"),
+            'redacted_info': lambda p: bench_logger.info(f"Sending response: {redacted_summary(p)}"),
+            'redacted_debug': lambda p: bench_logger.debug(f"Sending response: {redacted_summary(p)}"),
+        }
+        for label, log in modes.items():
+            before = os.path.getsize(log_path)
+            for payload in payloads:
+                log(payload)
+            handler.flush()
+            report['logging'][label] = {
+                'bytes': round((os.path.getsize(log_path) - before) / len(payloads)),
+                'us': timed(log, payloads, args.repeat),
+            }
+        handler.close()
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
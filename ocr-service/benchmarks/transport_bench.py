@@ -0,0 +1,148 @@
+"""
+Upload transport benchmark: base64 data URI form vs binary multipart file part.
+
+Usage:
+    python benchmarks/transport_bench.py [--sizes-kb 64,256,1024] [--repeat 20]
+                                         [--json out.json]
+
+For JPEG payloads of each size, one request is sent to a local HTTP sink
+(in this process, answering a small OCR.space-shaped JSON) in two ways:
+
+    base64     what build_payload() used to do: a data:image/jpeg;base64,...
+               string in a url-encoded form
+    multipart  the service's current path, OCRSpaceClient.parse() with the
+               JPEG as a binary 'file' part
+
+Reported per mode and size:
+
+    wire_bytes      request body bytes as received by the sink
+    overhead        wire_bytes / JPEG bytes
+    peak_alloc_kb   tracemalloc peak of Python allocations from building the
+                    payload to the parsed response (the copies the transport
+                    makes; includes the sink's one copy of the received body)
+    ms              median request latency over --repeat requests
+"""
+import os
+import sys
+import json
+import time
+import base64
+import asyncio
+import argparse
+import statistics
+import tracemalloc
+
+import aiohttp
+import cv2
+import numpy as np
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ocr_client import OCRSpaceClient  # noqa: E402
+from resilience import CircuitBreaker  # noqa: E402
+
+RESPONSE = {'ParsedResults': [{'ParsedText': 'ok', 'FileParseExitCode': 1}], 'OCRExitCode': 1,
+            'IsErroredOnProcessing': False}
+FIELDS = {'apikey': 'bench', 'language': 'eng', 'isOverlayRequired': 'true', 'OCREngine': '2',
+          'scale': 'true', 'detectOrientation': 'true', 'isTable': 'false', 'filetype': 'jpg'}
+
+
+def jpeg_of_size(kilobytes: int) -> bytes:
+    """A noisy JPEG close to the requested size (noise keeps it incompressible, like a photo)."""
+    rng = np.random.default_rng(kilobytes)
+    side = 64
+    while True:
+        image = rng.integers(0, 256, (side, side, 3), dtype=np.uint8)
+        buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+        if len(buffer) >= kilobytes * 1024:
+            return buffer
+        side = int(side * max(1.05, (kilobytes * 1024 / len(buffer)) ** 0.5))
+
+
+async def start_sink() -> tuple:
+    received = []
+
+    async def handle(request: web.Request) -> web.Response:
+        received.append(len(await request.read()))
+        return web.json_response(RESPONSE)
+
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app.router.add_post('/parse/image', handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f'http://127.0.0.1:{port}/parse/image', received
+
+
+async def send_base64(session: aiohttp.ClientSession, url: str, jpeg: bytes) -> dict:
+    payload = dict(FIELDS, base64Image=f"data:image/jpeg;base64,{base64.b64encode(jpeg).decode('utf-8')}")
+    async with session.post(url, data=payload) as response:
+        return json.loads(await response.text())
+
+
+async def send_multipart(client: OCRSpaceClient, jpeg: bytes) -> dict:
+    return await client.parse(dict(FIELDS, file=jpeg))
+
+
+async def run(sizes_kb: list, repeat: int) -> dict:
+    runner, url, received = await start_sink()
+    report = {}
+    try:
+        async with aiohttp.ClientSession() as session, \
+                OCRSpaceClient(url, breaker=CircuitBreaker(min_calls=10 ** 9)) as client:
+            modes = {
+                'base64': lambda jpeg: send_base64(session, url, jpeg),
+                'multipart': lambda jpeg: send_multipart(client, jpeg),
+            }
+            for kilobytes in sizes_kb:
+                jpeg = jpeg_of_size(kilobytes)
+                row = report[f'{kilobytes}KB'] = {'jpeg_bytes': len(jpeg)}
+                for mode, send in modes.items():
+                    # Warm the connection, then measure allocations on one request
+                    await send(jpeg)
+                    received.clear()
+                    tracemalloc.start()
+                    tracemalloc.reset_peak()
+                    await send(jpeg)
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    wire_bytes = received[-1]
+
+                    latencies = []
+                    for _ in range(repeat):
+                        started = time.perf_counter()
+                        await send(jpeg)
+                        latencies.append((time.perf_counter() - started) * 1000)
+                    row[mode] = {
+                        'wire_bytes': wire_bytes,
+                        'overhead': round(wire_bytes / len(jpeg), 3),
+                        'peak_alloc_kb': round(peak / 1024, 1),
+                        'ms': round(statistics.median(latencies), 2),
+                    }
+                print(f"{kilobytes}KB: " + ', '.join(
+                    f"{mode} {row[mode]['overhead']}x wire, {row[mode]['peak_alloc_kb']}KB alloc, {row[mode]['ms']}ms"
+                    for mode in modes), file=sys.stderr)
+    finally:
+        await runner.cleanup()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes-kb', default='64,256,1024')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--json', help='Write the report to this file')
+    args = parser.parse_args()
+
+    report = asyncio.run(run([int(size) for size in args.sizes_kb.split(',')], args.repeat))
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Fast verification benchmark: what POST /verify's cheap paths cost and how
+far a p-hash short-circuit can be trusted.
+
+Usage:
+    python benchmarks/verify_bench.py [--cards 25] [--size 3000x4000] [--seed 1]
+                                      [--thresholds 0,2,4,6] [--json out.json]
+
+Synthetic cards are photographed twice as in crop_bench.py; the first
+shot is also re-encoded at JPEG quality 80 (same picture, other bytes, as
+after a messenger app). With crop_card off and on:
+
+    file_hash_ms     SHA-256 of the upload plus a FileHashIndex lookup (the
+                     file_hash path)
+    phash_ms         phash_image(): reduced decode (+ crop) + p-hash (the
+                     phash path, before any OCR)
+    full_cpu_ms      preprocess_image(), the CPU stage the ocr path runs
+                     before its OCR.space round trip
+    phash_vs_full    bits between phash_image() and preprocess_image() for
+                     the same upload (median / max)
+    reencoded        bits between the re-encoded shot's quick p-hash and
+                     the original's registered one (median / max)
+    match_rate       per threshold: share of re-encoded shots that take the
+                     phash path, and share of pairs of different cards that
+                     would (a false 'verified' without OCR)
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from crop_bench import PARAMS, card_image, shot, hamming  # noqa: E402
+from ocr_service import preprocess_image, phash_image  # noqa: E402
+from file_index import FileHashIndex, file_hash  # noqa: E402
+
+
+def reencode(data: bytes, quality: int = 80) -> bytes:
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    return cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cards', type=int, default=25)
+    parser.add_argument('--size', default='3000x4000', help='Photo size HEIGHTxWIDTH')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--thresholds', default='0,2,4,6', help='p-hash distances to report match rates for')
+    parser.add_argument('--json', help='Write the report to this file')
+    args = parser.parse_args()
+    height, width = (int(v) for v in args.size.split('x'))
+    thresholds = [int(t) for t in args.thresholds.split(',')]
+
+    rng = np.random.default_rng(args.seed)
+    uploads = []
+    for _ in range(args.cards):
+        card = card_image(rng)
+        first, _ = shot(card, rng, height, width, rng.random() < 0.2)
+        uploads.append((first, reencode(first)))
+
+    index = FileHashIndex()
+    for i, (first, _) in enumerate(uploads):
+        index.set(file_hash(first), f"0x{i:064x}", None)
+    file_hash_ms = [timed(lambda data: index.get(file_hash(data)), first)[1] for first, _ in uploads]
+
+    report = {'cards': args.cards, 'size': args.size,
+              'file_hash_ms': round(statistics.median(file_hash_ms), 2)}
+    for crop in (False, True):
+        params = dict(PARAMS, crop_card=crop)
+        phash_ms, full_ms, to_full, registered, quick_reencoded = [], [], [], [], []
+        for first, second in uploads:
+            prepared, elapsed = timed(preprocess_image, first, False, params)
+            full_ms.append(elapsed)
+            registered.append(prepared['phash'])
+            quick, elapsed = timed(phash_image, first, False, params)
+            phash_ms.append(elapsed)
+            to_full.append(hamming(quick['phash'], prepared['phash']))
+            quick_reencoded.append(phash_image(second, False, params)['phash'])
+
+        reencoded = [hamming(q, r) for q, r in zip(quick_reencoded, registered)]
+        different = [hamming(quick_reencoded[i], registered[j])
+                     for i in range(len(uploads)) for j in range(len(uploads)) if i != j]
+        report['crop' if crop else 'no_crop'] = {
+            'phash_ms': round(statistics.median(phash_ms), 2),
+            'full_cpu_ms': round(statistics.median(full_ms), 2),
+            'phash_vs_full': [statistics.median(to_full), max(to_full)],
+            'reencoded': [statistics.median(reencoded), max(reencoded)],
+            'match_rate': {
+                threshold: {
+                    'reencoded': round(sum(d <= threshold for d in reencoded) / len(reencoded), 3),
+                    'different_cards': round(sum(d <= threshold for d in different) / len(different), 4),
+                }
+                for threshold in thresholds
+            },
+        }
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
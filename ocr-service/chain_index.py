@@ -0,0 +1,451 @@
+import os
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+import aiohttp
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# topic0 (keccak256 of the event signature) of the DocumentVerification
+# events the index follows; see contracts/DocumentVerification.sol
+ORGANIZATION_REGISTERED = "0x23596683ea7055a7257a2c7f3f68451d1616dd7ac2d71d534648e34a79b83117"
+ORGANIZATION_EDITED = "0x6b05e14ea7cd0166aa3bbc004396a23e438e73b60d9ffc21599268abdcbcfd21"
+DOCUMENT_REGISTERED = "0x52031612bedf82b57bb1ceec2b090e2e1148704e1cc452cb16acbef24716fd79"
+DOCUMENT_VERIFIED = "0x6d4c13423f27e85076d2286014b8ede99a6e64f5eed82ee9f93f647b7b63d2b3"
+DOCUMENT_DELETED = "0x329ee4d053eb63b7cde699b2b8507b838af4c98a0942c2c2e2331a0a6496d8b5"
+DOCUMENT_BATCH_REGISTERED = "0xb4b8746f6548d65db85f23d90515ae8dfc3a2ba16737deaa15470834407f4b72"
+DOCUMENT_BATCH_REVOKED = "0xed3601b193febc06f0febb7883fcd96256fa61765e3f0b7548ea847d7be67f43"
+TOPICS = (ORGANIZATION_REGISTERED, ORGANIZATION_EDITED, DOCUMENT_REGISTERED, DOCUMENT_VERIFIED,
+          DOCUMENT_DELETED, DOCUMENT_BATCH_REGISTERED, DOCUMENT_BATCH_REVOKED)
+
+
+class ChainRPCError(Exception):
+    """Raised when the RPC endpoint answers with a JSON-RPC error."""
+
+
+def _word(data: bytes, index: int) -> bytes:
+    return data[index * 32:(index + 1) * 32]
+
+
+def _uint(data: bytes, index: int) -> int:
+    return int.from_bytes(_word(data, index), 'big')
+
+
+def _address(data: bytes, index: int) -> str:
+    return '0x' + _word(data, index)[12:].hex()
+
+
+def _string(data: bytes, index: int) -> str:
+    """ABI-decode the dynamic string whose offset is in head word `index`."""
+    offset = _uint(data, index)
+    length = int.from_bytes(data[offset:offset + 32], 'big')
+    return data[offset + 32:offset + 32 + length].decode('utf-8', errors='replace')
+
+
+def decode_log(log: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Decode a DocumentVerification log as returned by eth_getLogs.
+
+    Args:
+        log (Dict[str, Any]): JSON-RPC log object
+
+    Returns:
+        Optional[Dict[str, Any]]: 'event', 'block' and the event's fields
+            (hashes and addresses as lowercase 0x hex), or None for logs of
+            other events
+    """
+    topics = [topic.lower() for topic in log.get('topics', [])]
+    if not topics or topics[0] not in TOPICS:
+        return None
+    data = bytes.fromhex(log.get('data', '0x')[2:])
+    event = {'block': int(log['blockNumber'], 16)}
+    if topics[0] == ORGANIZATION_REGISTERED:
+        event.update(event='OrganizationRegistered', organizationId=topics[1],
+                     name=_string(data, 0), admin=_address(data, 1))
+    elif topics[0] == ORGANIZATION_EDITED:
+        event.update(event='OrganizationEdited', organizationId=topics[1],
+                     name=_string(data, 0), isActive=bool(_uint(data, 2)))
+    elif topics[0] == DOCUMENT_REGISTERED:
+        event.update(event='DocumentRegistered', documentHash=topics[1], organizationId=topics[2],
+                     owner=_address(data, 0), phash=_string(data, 2))
+    elif topics[0] == DOCUMENT_VERIFIED:
+        event.update(event='DocumentVerified', documentHash=topics[1], organizationId=topics[2])
+    elif topics[0] == DOCUMENT_DELETED:
+        event.update(event='DocumentDeleted', documentHash=topics[1], organizationId=topics[2])
+    elif topics[0] == DOCUMENT_BATCH_REGISTERED:
+        event.update(event='DocumentBatchRegistered', merkleRoot=topics[1], organizationId=topics[2],
+                     documentCount=_uint(data, 1))
+    else:
+        event.update(event='DocumentBatchRevoked', merkleRoot=topics[1], organizationId=topics[2])
+    return event
+
+
+class ChainIndex:
+    """
+    Local copy of the contract's document and organization records, built
+    from its events.
+
+    Everything is held in dicts (so lookups are O(1)) and written through
+    to SQLite. Each synced block range is applied in one transaction
+    together with the new last processed block, so after a crash or
+    restart the index resumes from a consistent point and never applies
+    an event twice.
+    """
+
+    def __init__(self, db_path: str = "chain_index.sqlite3", contract: str = "", start_block: int = 0):
+        self.db_path = db_path
+        self.contract = contract.lower()
+        self.start_block = start_block
+        self.last_block = start_block - 1
+        self.last_block_hash: Optional[str] = None
+        self._documents: Dict[str, Dict[str, Any]] = {}
+        self._organizations: Dict[str, Dict[str, Any]] = {}
+        self._batches: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+        self._init_db()
+        self._load()
+
+    def _init_db(self):
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "document_hash TEXT PRIMARY KEY, organization_id TEXT NOT NULL, phash TEXT NOT NULL, "
+                "owner TEXT, block INTEGER NOT NULL, verified INTEGER NOT NULL DEFAULT 0, "
+                "deleted INTEGER NOT NULL DEFAULT 0)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS organizations ("
+                "organization_id TEXT PRIMARY KEY, name TEXT, admin TEXT, is_active INTEGER NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS batches ("
+                "merkle_root TEXT PRIMARY KEY, organization_id TEXT NOT NULL, document_count INTEGER NOT NULL, "
+                "block INTEGER NOT NULL)"
+            )
+            self._db.execute("CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT)")
+            self._db.commit()
+
+    def _load(self):
+        state = dict(self._db.execute("SELECT key, value FROM sync_state"))
+        if state.get('contract', self.contract) != self.contract:
+            # Pointed at another deployment: its records do not apply
+            logger.warning(f"Chain index {self.db_path} was built for {state['contract']}, starting over")
+            self.reset()
+            return
+        if 'last_block' in state:
+            self.last_block = int(state['last_block'])
+            self.last_block_hash = state.get('last_block_hash')
+        for document_hash, organization_id, phash, owner, block, verified, deleted in self._db.execute(
+            "SELECT document_hash, organization_id, phash, owner, block, verified, deleted FROM documents"
+        ):
+            self._documents[document_hash] = {
+                'organizationId': organization_id, 'phash': phash, 'owner': owner, 'block': block,
+                'verified': bool(verified), 'deleted': bool(deleted),
+            }
+        for organization_id, name, admin, is_active in self._db.execute(
+            "SELECT organization_id, name, admin, is_active FROM organizations"
+        ):
+            self._organizations[organization_id] = {'name': name, 'admin': admin, 'isActive': bool(is_active)}
+        for merkle_root, organization_id, document_count, block in self._db.execute(
+            "SELECT merkle_root, organization_id, document_count, block FROM batches"
+        ):
+            self._batches[merkle_root] = {'organizationId': organization_id, 'documentCount': document_count,
+                                          'block': block}
+        logger.info(f"Chain index loaded {len(self._documents)} documents up to block {self.last_block}")
+
+    def reset(self):
+        """Forget everything and start again from the start block (other deployment or a reorg)."""
+        with self._lock:
+            for table in ('documents', 'organizations', 'batches', 'sync_state'):
+                self._db.execute(f"DELETE FROM {table}")
+            self._db.execute("INSERT INTO sync_state (key, value) VALUES ('contract', ?)", (self.contract,))
+            self._db.commit()
+            self._documents.clear()
+            self._organizations.clear()
+            self._batches.clear()
+            self.last_block = self.start_block - 1
+            self.last_block_hash = None
+
+    def apply(self, events: List[Dict[str, Any]], to_block: int, to_block_hash: Optional[str] = None):
+        """
+        Apply the decoded events of a block range and advance the last
+        processed block, atomically.
+
+        Args:
+            events (List[Dict[str, Any]]): decode_log() output in chain order
+            to_block (int): Last block of the range
+            to_block_hash (Optional[str]): Its hash, checked on the next sync to detect reorgs
+        """
+        with self._lock:
+            try:
+                for event in events:
+                    self._write(event)
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)",
+                    [('contract', self.contract), ('last_block', str(to_block)), ('last_block_hash', to_block_hash)]
+                )
+                self._db.commit()
+            except Exception:
+                self._db.rollback()
+                raise
+            # Memory only follows once the range is on disk
+            for event in events:
+                self._remember(event)
+            self.last_block = to_block
+            self.last_block_hash = to_block_hash
+
+    def _write(self, event: Dict[str, Any]):
+        name = event['event']
+        if name == 'OrganizationRegistered':
+            self._db.execute(
+                "INSERT OR REPLACE INTO organizations (organization_id, name, admin, is_active) VALUES (?, ?, ?, 1)",
+                (event['organizationId'], event['name'], event['admin'])
+            )
+        elif name == 'OrganizationEdited':
+            self._db.execute("UPDATE organizations SET name = ?, is_active = ? WHERE organization_id = ?",
+                             (event['name'], int(event['isActive']), event['organizationId']))
+        elif name == 'DocumentRegistered':
+            # A deleted document can be registered again
+            self._db.execute(
+                "INSERT OR REPLACE INTO documents (document_hash, organization_id, phash, owner, block, verified, deleted) "
+                "VALUES (?, ?, ?, ?, ?, 0, 0)",
+                (event['documentHash'], event['organizationId'], event['phash'], event['owner'], event['block'])
+            )
+        elif name == 'DocumentVerified':
+            self._db.execute("UPDATE documents SET verified = 1 WHERE document_hash = ?", (event['documentHash'],))
+        elif name == 'DocumentDeleted':
+            self._db.execute("UPDATE documents SET deleted = 1 WHERE document_hash = ?", (event['documentHash'],))
+        elif name == 'DocumentBatchRegistered':
+            self._db.execute(
+                "INSERT OR REPLACE INTO batches (merkle_root, organization_id, document_count, block) VALUES (?, ?, ?, ?)",
+                (event['merkleRoot'], event['organizationId'], event['documentCount'], event['block'])
+            )
+        elif name == 'DocumentBatchRevoked':
+            # The contract deletes the batch, so the root can be registered again
+            self._db.execute("DELETE FROM batches WHERE merkle_root = ?", (event['merkleRoot'],))
+
+    def _remember(self, event: Dict[str, Any]):
+        name = event['event']
+        if name == 'OrganizationRegistered':
+            self._organizations[event['organizationId']] = {'name': event['name'], 'admin': event['admin'],
+                                                            'isActive': True}
+        elif name == 'OrganizationEdited':
+            organization = self._organizations.get(event['organizationId'])
+            if organization is not None:
+                organization.update(name=event['name'], isActive=event['isActive'])
+        elif name == 'DocumentRegistered':
+            self._documents[event['documentHash']] = {
+                'organizationId': event['organizationId'], 'phash': event['phash'], 'owner': event['owner'],
+                'block': event['block'], 'verified': False, 'deleted': False,
+            }
+        elif name in ('DocumentVerified', 'DocumentDeleted'):
+            document = self._documents.get(event['documentHash'])
+            if document is not None:
+                document['verified' if name == 'DocumentVerified' else 'deleted'] = True
+        elif name == 'DocumentBatchRegistered':
+            self._batches[event['merkleRoot']] = {'organizationId': event['organizationId'],
+                                                  'documentCount': event['documentCount'], 'block': event['block']}
+        elif name == 'DocumentBatchRevoked':
+            self._batches.pop(event['merkleRoot'], None)
+
+    def get_document(self, document_hash: str) -> Optional[Dict[str, Any]]:
+        """A copy of a document's record ({organizationId, phash, owner, block, verified, deleted}) or None."""
+        document = self._documents.get(document_hash.lower())
+        return dict(document) if document is not None else None
+
+    def documents(self) -> List[Dict[str, Any]]:
+        """Copies of every document record, each with its documentHash."""
+        with self._lock:
+            return [dict(document, documentHash=document_hash) for document_hash, document in self._documents.items()]
+
+    def get_organization(self, organization_id: str) -> Optional[Dict[str, Any]]:
+        organization = self._organizations.get(organization_id.lower())
+        return dict(organization) if organization is not None else None
+
+    def get_batch(self, merkle_root: str) -> Optional[Dict[str, Any]]:
+        batch = self._batches.get(merkle_root.lower())
+        return dict(batch) if batch is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        """Record counts and the last processed block."""
+        return {
+            'documents': len(self._documents),
+            'organizations': len(self._organizations),
+            'batches': len(self._batches),
+            'last_block': self.last_block,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class ChainFollower:
+    """
+    Keeps a ChainIndex in step with the contract by polling eth_getLogs.
+
+    Only blocks with at least `confirmations` blocks on top are indexed.
+    Ranges are capped at `max_range` blocks and halved when the endpoint
+    refuses a range as too large. If the last indexed block's hash changes
+    (a reorg deeper than the confirmation depth), the index is rebuilt
+    from the start block.
+    """
+
+    def __init__(self, index: ChainIndex, rpc_url: str, confirmations: int = 2,
+                 poll_interval: float = 2.0, max_range: int = 2000):
+        self.index = index
+        self.rpc_url = rpc_url
+        self.confirmations = confirmations
+        self.poll_interval = poll_interval
+        self.max_range = max_range
+        self.head_block: Optional[int] = None
+        self._session = None
+        self._task = None
+        self._request_id = 0
+        self._stats = {'events': 0, 'ranges': 0, 'rpc_errors': 0, 'resets': 0, 'last_sync_at': None}
+        # Called (in the executor) with each batch of decoded events once it is indexed
+        self.on_events: Optional[Callable[[List[Dict[str, Any]]], None]] = None
+        # Called (in the executor) after a reorg reset the index, so copies of it can be dropped too
+        self.on_reset: Optional[Callable[[], None]] = None
+
+    @classmethod
+    def from_env(cls) -> Optional["ChainFollower"]:
+        """
+        Build a follower from OCR_CHAIN_* environment variables, or None if
+        OCR_CHAIN_RPC_URL / OCR_CHAIN_CONTRACT are not set (indexer disabled).
+
+        OCR_CHAIN_RPC_URL: JSON-RPC endpoint, e.g. http://127.0.0.1:8545 for a Hardhat node
+        OCR_CHAIN_CONTRACT: DocumentVerification address
+        OCR_CHAIN_START_BLOCK: deployment block, where indexing starts (default 0)
+        OCR_CHAIN_INDEX_DB: path of the SQLite file (default chain_index.sqlite3)
+        OCR_CHAIN_CONFIRMATIONS: blocks to wait before indexing a block (default 2)
+        OCR_CHAIN_POLL_INTERVAL: seconds between polls once caught up (default 2)
+        OCR_CHAIN_MAX_RANGE: most blocks per eth_getLogs call (default 2000)
+        """
+        rpc_url = os.environ.get("OCR_CHAIN_RPC_URL")
+        contract = os.environ.get("OCR_CHAIN_CONTRACT")
+        if not rpc_url or not contract:
+            return None
+        index = ChainIndex(
+            db_path=os.environ.get("OCR_CHAIN_INDEX_DB", "chain_index.sqlite3"),
+            contract=contract,
+            start_block=int(os.environ.get("OCR_CHAIN_START_BLOCK", "0")),
+        )
+        return cls(
+            index,
+            rpc_url,
+            confirmations=int(os.environ.get("OCR_CHAIN_CONFIRMATIONS", "2")),
+            poll_interval=float(os.environ.get("OCR_CHAIN_POLL_INTERVAL", "2")),
+            max_range=int(os.environ.get("OCR_CHAIN_MAX_RANGE", "2000")),
+        )
+
+    def start(self):
+        """Start following. Call from the running event loop."""
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Following {self.index.contract} from block {self.index.last_block + 1} via {self.rpc_url}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        self.index.close()
+
+    async def _rpc(self, method: str, params: list) -> Any:
+        if self._session is None:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30))
+        self._request_id += 1
+        payload = {'jsonrpc': '2.0', 'id': self._request_id, 'method': method, 'params': params}
+        async with self._session.post(self.rpc_url, json=payload) as response:
+            response.raise_for_status()
+            body = await response.json(content_type=None)
+        if body.get('error'):
+            raise ChainRPCError(f"{method}: {body['error'].get('message', body['error'])}")
+        return body.get('result')
+
+    async def _block_hash(self, number: int) -> Optional[str]:
+        block = await self._rpc('eth_getBlockByNumber', [hex(number), False])
+        return block['hash'] if block else None
+
+    async def sync_once(self) -> Tuple[int, bool]:
+        """
+        Index the next block range.
+
+        Returns:
+            Tuple[int, bool]: (events applied, whether the index is caught up)
+        """
+        loop = asyncio.get_running_loop()
+        self.head_block = int(await self._rpc('eth_blockNumber', []), 16)
+        if self.index.last_block_hash is not None:
+            if await self._block_hash(self.index.last_block) != self.index.last_block_hash:
+                logger.error(f"Block {self.index.last_block} changed (reorg), rebuilding the chain index")
+                self._stats['resets'] += 1
+                await loop.run_in_executor(None, self.index.reset)
+                if self.on_reset is not None:
+                    await loop.run_in_executor(None, self.on_reset)
+
+        safe_block = self.head_block - self.confirmations
+        from_block = self.index.last_block + 1
+        if from_block > safe_block:
+            return 0, True
+        while True:
+            to_block = min(safe_block, from_block + self.max_range - 1)
+            try:
+                logs = await self._rpc('eth_getLogs', [{
+                    'address': self.index.contract,
+                    'fromBlock': hex(from_block),
+                    'toBlock': hex(to_block),
+                    'topics': [list(TOPICS)],
+                }])
+                break
+            except ChainRPCError:
+                if to_block == from_block:
+                    raise
+                # Range too large for the endpoint: ask for less
+                self.max_range = max(1, self.max_range // 2)
+
+        logs = sorted((log for log in logs if not log.get('removed')),
+                      key=lambda log: (int(log['blockNumber'], 16), int(log['logIndex'], 16)))
+        events = [event for event in map(decode_log, logs) if event is not None]
+        to_block_hash = await self._block_hash(to_block)
+        await loop.run_in_executor(None, self.index.apply, events, to_block, to_block_hash)
+        if self.on_events is not None and events:
+            await loop.run_in_executor(None, self.on_events, events)
+        self._stats['events'] += len(events)
+        self._stats['ranges'] += 1
+        self._stats['last_sync_at'] = time.time()
+        return len(events), to_block >= safe_block
+
+    async def _run(self):
+        while True:
+            try:
+                _, caught_up = await self.sync_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._stats['rpc_errors'] += 1
+                logger.warning(f"Chain index sync failed: {e!r}")
+                caught_up = True
+            if caught_up:
+                await asyncio.sleep(self.poll_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        """Index counts, sync progress and RPC counters."""
+        return {
+            **self.index.stats(),
+            **self._stats,
+            'head_block': self.head_block,
+            'lag_blocks': None if self.head_block is None else max(0, self.head_block - self.index.last_block),
+        }
@@ -0,0 +1,134 @@
+import os
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+def file_hash(data: bytes) -> str:
+    """SHA-256 hex digest of the uploaded bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class FileHashIndex:
+    """
+    Remembers which documentHash each uploaded file produced.
+
+    Keyed by the SHA-256 of the raw upload, so verifying a byte-identical
+    copy of a file that went through /ocr needs neither a decode nor an
+    OCR call: its documentHash (and p-hash) are looked up here and checked
+    against the registrations. Unlike OCRCache entries these do not
+    expire; the text hash of a file never changes.
+
+    Recent entries are kept in an in-process LRU; an optional SQLite file
+    holds all of them across restarts and uvicorn workers.
+    """
+
+    def __init__(self, max_entries: int = 100000, db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'sets': 0}
+        self._db = None
+        if self.db_path:
+            self._init_db()
+
+    @classmethod
+    def from_env(cls) -> "FileHashIndex":
+        """
+        Build an index from the environment.
+
+        OCR_FILE_INDEX_MAX_ENTRIES: size of the in-process LRU (default 100000)
+        OCR_FILE_INDEX_DB: path of the SQLite file for persistence (in-memory only if unset)
+        """
+        return cls(
+            max_entries=int(os.environ.get("OCR_FILE_INDEX_MAX_ENTRIES", "100000")),
+            db_path=os.environ.get("OCR_FILE_INDEX_DB") or None,
+        )
+
+    def _init_db(self):
+        self._db = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS file_index ("
+            "file_hash TEXT PRIMARY KEY, document_hash TEXT NOT NULL, phash TEXT)"
+        )
+        self._db.commit()
+
+    def get(self, file_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up an upload by its SHA-256.
+
+        Returns:
+            Optional[Dict[str, Any]]: {'documentHash', 'phash'}, or None if
+                the file was never seen
+        """
+        with self._lock:
+            entry = self._memory.get(file_hash)
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT document_hash, phash FROM file_index WHERE file_hash = ?", (file_hash,)
+                ).fetchone()
+                if row is not None:
+                    entry = {'documentHash': row[0], 'phash': row[1]}
+                    self._store_memory(file_hash, entry)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            self._memory.move_to_end(file_hash)
+            self._stats['hits'] += 1
+            return dict(entry)
+
+    def set(self, file_hash: str, document_hash: str, phash: Optional[str]):
+        """
+        Record the documentHash (and p-hash) an upload produced.
+
+        Args:
+            file_hash (str): file_hash() of the upload
+            document_hash (str): documentHash returned by /ocr ('0x' + 64 hex)
+            phash (Optional[str]): p-hash returned by /ocr
+        """
+        entry = {'documentHash': document_hash.lower(), 'phash': phash}
+        with self._lock:
+            self._store_memory(file_hash, entry)
+            self._stats['sets'] += 1
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO file_index (file_hash, document_hash, phash) VALUES (?, ?, ?)",
+                        (file_hash, entry['documentHash'], phash)
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    # Best-effort: a missing entry only means the next verification runs OCR
+                    logger.warning(f"File index write failed: {e}")
+
+    def _store_memory(self, file_hash: str, entry: Dict[str, Any]):
+        """Insert into the LRU, evicting the oldest entries when full. Caller holds the lock."""
+        self._memory[file_hash] = entry
+        self._memory.move_to_end(file_hash)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and sizes."""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot['memory_entries'] = len(self._memory)
+            snapshot['persistent'] = self._db is not None
+            if self._db is not None:
+                snapshot['disk_entries'] = self._db.execute("SELECT COUNT(*) FROM file_index").fetchone()[0]
+        return snapshot
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
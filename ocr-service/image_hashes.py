@@ -0,0 +1,212 @@
+import os
+import sys
+import json
+import logging
+from functools import lru_cache
+from typing import Dict, List, Iterable, Union
+
+import numpy as np
+from PIL import Image
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+HASH_SIZE = 8
+# pHash samples a 32x32 grayscale image and keeps the 8x8 lowest DCT frequencies
+HIGHFREQ_FACTOR = 4
+SAMPLE_SIZE = HASH_SIZE * HIGHFREQ_FACTOR
+# DCT coefficients below this are rounding noise of the matrix product
+# (~1e-10 for a blank page, whose coefficients are ~1e6 at most); scipy's
+# FFT-based DCT in imagehash returns exact zeros there, and on uniform or
+# row-constant pages the median is zero, so the noise's sign would set bits
+PHASH_EPSILON = 1e-6
+HASH_TYPES = ("phash", "dhash", "ahash")
+
+
+@lru_cache(maxsize=None)
+def _dct_matrix(n_out: int, n_in: int) -> np.ndarray:
+    """
+    First n_out rows of the unnormalized DCT-II matrix (scipy.fftpack.dct type 2).
+
+    The factor 2 matches scipy exactly, although only the ordering of the
+    coefficients matters for the hash.
+    """
+    k = np.arange(n_out)[:, None]
+    n = np.arange(n_in)[None, :]
+    return 2.0 * np.cos(np.pi * k * (2 * n + 1) / (2 * n_in))
+
+
+@lru_cache(maxsize=None)
+def _area_matrix(n_out: int, n_in: int) -> np.ndarray:
+    """Box-filter resampling weights from n_in samples down to n_out (rows sum to 1)."""
+    weights = np.zeros((n_out, n_in))
+    edges = np.linspace(0, n_in, n_out + 1)
+    for i in range(n_out):
+        lo, hi = edges[i], edges[i + 1]
+        for j in range(int(np.floor(lo)), int(np.ceil(hi))):
+            weights[i, j] = min(hi, j + 1) - max(lo, j)
+        weights[i] /= hi - lo
+    return weights
+
+
+def prepare_image(image: Image.Image) -> np.ndarray:
+    """
+    Reduce an image to the 32x32 grayscale sample the hashes work on.
+
+    This is the exact preprocessing imagehash.phash() does (PIL luma
+    conversion, Lanczos resize), so pHashes computed from it are
+    bit-identical to the strings already registered on-chain.
+
+    Args:
+        image (Image.Image): Any PIL image
+
+    Returns:
+        np.ndarray: (32, 32) uint8 array
+    """
+    return np.asarray(image.convert('L').resize((SAMPLE_SIZE, SAMPLE_SIZE), Image.LANCZOS))
+
+
+def pack_bits(bits: np.ndarray) -> np.ndarray:
+    """
+    Pack (N, 64) boolean rows into uint64, first bit most significant.
+
+    This is the bit order imagehash uses for its hex strings.
+    """
+    packed = np.packbits(bits.reshape(len(bits), -1), axis=1)
+    return packed.view('>u8').ravel().astype(np.uint64)
+
+
+def to_hex(values: Iterable[int]) -> List[str]:
+    """Format packed 64-bit hashes as 16-character hex strings (imagehash format)."""
+    return [f"{int(value):016x}" for value in values]
+
+
+def from_hex(hashes: Iterable[str]) -> np.ndarray:
+    """Parse hex hash strings into a uint64 array."""
+    return np.array([int(h, 16) for h in hashes], dtype=np.uint64)
+
+
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def hamming_distance(a: np.ndarray, b: Union[np.ndarray, int]) -> np.ndarray:
+    """
+    Element-wise Hamming distance between packed uint64 hashes (broadcasts).
+
+    Args:
+        a (np.ndarray): uint64 hashes
+        b (Union[np.ndarray, int]): uint64 hashes or a single hash
+
+    Returns:
+        np.ndarray: Distances in bits
+    """
+    xor = np.bitwise_xor(np.asarray(a, dtype=np.uint64), np.asarray(b, dtype=np.uint64))
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(xor).astype(np.int64)
+    return _POPCOUNT_TABLE[xor[..., None].view(np.uint8)].sum(axis=-1, dtype=np.int64)
+
+
+def hash_samples(samples: np.ndarray, hash_types: Iterable[str] = HASH_TYPES) -> Dict[str, np.ndarray]:
+    """
+    Compute perceptual hashes for a stack of 32x32 grayscale samples in one pass.
+
+    Every hash is a pair of small matrix products over the whole stack, so
+    the per-image cost is a few thousand multiply-adds with no Python loop.
+
+    - phash: 2-D DCT via (8x32) . X . (32x8), coefficients within
+      PHASH_EPSILON of zero snapped to zero, bits above the median of the
+      8x8 low frequencies; bit-compatible with imagehash.phash(), blank and
+      uniform pages included (tests/test_image_hashes.py)
+    - ahash: 8x8 box-filtered sample, bits above its mean
+    - dhash: 8x9 box-filtered sample, bits where brightness increases left
+      to right
+
+    aHash and dHash are derived from the same 32x32 sample rather than
+    separate resizes, so they are not bit-compatible with imagehash.ahash()
+    and imagehash.dhash(); they are consistent with each other across runs.
+
+    Args:
+        samples (np.ndarray): (N, 32, 32) grayscale stack, e.g. from prepare_image()
+        hash_types (Iterable[str]): Any of "phash", "dhash", "ahash"
+
+    Returns:
+        Dict[str, np.ndarray]: Hash type -> (N,) uint64 array
+    """
+    samples = np.asarray(samples, dtype=np.float64)
+    if samples.ndim == 2:
+        samples = samples[None]
+    if samples.shape[1:] != (SAMPLE_SIZE, SAMPLE_SIZE):
+        raise ValueError(f"Expected samples of shape (N, {SAMPLE_SIZE}, {SAMPLE_SIZE}), got {samples.shape}")
+
+    hashes = {}
+    for hash_type in hash_types:
+        if hash_type == "phash":
+            dct = _dct_matrix(HASH_SIZE, SAMPLE_SIZE)
+            low = (dct @ samples @ dct.T).reshape(len(samples), -1)
+            low[np.abs(low) < PHASH_EPSILON] = 0.0
+            hashes["phash"] = pack_bits(low > np.median(low, axis=1, keepdims=True))
+        elif hash_type == "ahash":
+            area = _area_matrix(HASH_SIZE, SAMPLE_SIZE)
+            small = (area @ samples @ area.T).reshape(len(samples), -1)
+            hashes["ahash"] = pack_bits(small > small.mean(axis=1, keepdims=True))
+        elif hash_type == "dhash":
+            rows = _area_matrix(HASH_SIZE, SAMPLE_SIZE)
+            cols = _area_matrix(HASH_SIZE + 1, SAMPLE_SIZE)
+            small = rows @ samples @ cols.T
+            hashes["dhash"] = pack_bits(small[:, :, 1:] > small[:, :, :-1])
+        else:
+            raise ValueError(f"Unknown hash type: {hash_type}. Expected one of {HASH_TYPES}")
+    return hashes
+
+
+def hash_images(images: List[Image.Image], hash_types: Iterable[str] = HASH_TYPES) -> Dict[str, np.ndarray]:
+    """
+    Hash a batch of PIL images.
+
+    Args:
+        images (List[Image.Image]): Images to hash
+        hash_types (Iterable[str]): Any of "phash", "dhash", "ahash"
+
+    Returns:
+        Dict[str, np.ndarray]: Hash type -> (N,) uint64 array, in input order
+    """
+    if not images:
+        return {hash_type: np.zeros(0, dtype=np.uint64) for hash_type in hash_types}
+    return hash_samples(np.stack([prepare_image(image) for image in images]), hash_types)
+
+
+def phash_hex(image: Image.Image) -> str:
+    """
+    p-hash of a single image, as the hex string stored on-chain.
+
+    Drop-in replacement for str(imagehash.phash(image)).
+    """
+    return to_hex(hash_samples(prepare_image(image), ("phash",))["phash"])[0]
+
+
+if __name__ == "__main__":
+    # Backfill helper: hash every image under the given paths, one JSON line per file
+    logging.basicConfig(level=logging.INFO)
+    paths = []
+    for arg in sys.argv[1:] or ["."]:
+        if os.path.isdir(arg):
+            for root, _, files in os.walk(arg):
+                paths.extend(os.path.join(root, name) for name in sorted(files))
+        else:
+            paths.append(arg)
+
+    chunk_size = 256
+    for start in range(0, len(paths), chunk_size):
+        chunk, samples = [], []
+        for path in paths[start:start + chunk_size]:
+            try:
+                with Image.open(path) as image:
+                    samples.append(prepare_image(image))
+                chunk.append(path)
+            except Exception as e:
+                logger.warning(f"Skipping {path}: {str(e)}")
+        if not samples:
+            continue
+        hashes = {name: to_hex(values) for name, values in hash_samples(np.stack(samples)).items()}
+        for i, path in enumerate(chunk):
+            print(json.dumps({"path": path, **{name: hashes[name][i] for name in hashes}}))
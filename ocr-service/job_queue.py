@@ -0,0 +1,477 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import logging
+import threading
+from typing import Dict, Any, Optional, Tuple, List
+
+import aiohttp
+
+from ocr_engines import EngineUnavailableError
+from responses import project
+from webhooks import WebhookPolicy, PublicResolver
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Job states; done and failed are terminal
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Next to this module rather than in whatever directory the process starts in
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ocr_jobs.sqlite3")
+
+
+class JobQueue:
+    """
+    Durable OCR job queue stored in SQLite (WAL mode).
+
+    Uploads are kept in the queue until their job finishes, so queued and
+    running jobs survive restarts. A running job holds a lease that its
+    worker keeps renewing; if the worker dies, the lease expires and the
+    job is handed to another worker. Any number of processes can consume
+    the same file: claiming is a single atomic UPDATE.
+
+    Submitting bytes that already have a queued, running or finished job
+    (same content and OCR parameters) returns that job instead of a new one.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, ttl_seconds: float = 86400.0,
+                 lease_seconds: float = 120.0, max_attempts: int = 3):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._init_db()
+
+    @classmethod
+    def from_env(cls) -> "JobQueue":
+        """
+        Build a queue from OCR_JOB_* environment variables.
+
+        OCR_JOB_DB: path of the SQLite file (default ocr_jobs.sqlite3 next to this module)
+        OCR_JOB_TTL: how long finished jobs and their results are kept, in seconds (default 86400)
+        OCR_JOB_LEASE: seconds before a silent running job is handed to another worker (default 120)
+        OCR_JOB_MAX_ATTEMPTS: attempts before a job is marked failed (default 3)
+        """
+        return cls(
+            db_path=os.environ.get("OCR_JOB_DB") or DEFAULT_DB_PATH,
+            ttl_seconds=float(os.environ.get("OCR_JOB_TTL", "86400")),
+            lease_seconds=float(os.environ.get("OCR_JOB_LEASE", "120")),
+            max_attempts=int(os.environ.get("OCR_JOB_MAX_ATTEMPTS", "3")),
+        )
+
+    def _init_db(self):
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, dedup_key TEXT NOT NULL, status TEXT NOT NULL, "
+                "filename TEXT, is_pdf INTEGER NOT NULL, all_pages INTEGER NOT NULL, "
+                "engine_policy TEXT, webhook_url TEXT, data BLOB, result TEXT, error TEXT, "
+                "attempts INTEGER NOT NULL DEFAULT 0, lease_expires_at REAL, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL, finished_at REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_dedup ON jobs (dedup_key)")
+            columns = {row['name'] for row in self._db.execute("PRAGMA table_info(jobs)")}
+            if 'webhook_fields' not in columns:
+                self._db.execute("ALTER TABLE jobs ADD COLUMN webhook_fields TEXT")
+            self._db.commit()
+        logger.info(f"OCR job queue at {self.db_path}")
+
+    def submit(self, data: bytes, dedup_key: str, filename: Optional[str], is_pdf: bool,
+               all_pages: bool = False, engine_policy: Optional[str] = None,
+               webhook_url: Optional[str] = None,
+               webhook_fields: Optional[List[str]] = None) -> Tuple[Dict[str, Any], bool]:
+        """
+        Enqueue an upload, or return the existing job for the same content.
+
+        Args:
+            data (bytes): Raw uploaded file content
+            dedup_key (str): Content-addressed key, see OCRService.request_key()
+            filename (Optional[str]): Original filename
+            is_pdf (bool): Whether the content is a PDF
+            all_pages (bool): OCR every PDF page instead of just the first
+            engine_policy (Optional[str]): OCR engine policy, see EngineRouter
+            webhook_url (Optional[str]): URL POSTed with the job id and status once it finishes
+            webhook_fields (Optional[List[str]]): Result keys to add to the webhook
+                (see responses.parse_fields()); none by default
+
+        Returns:
+            Tuple[Dict[str, Any], bool]: (job, whether it was newly created)
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM jobs WHERE dedup_key = ? AND status != ? AND (finished_at IS NULL OR finished_at > ?) "
+                "ORDER BY created_at DESC LIMIT 1",
+                (dedup_key, FAILED, now - self.ttl_seconds)
+            ).fetchone()
+            if row is not None:
+                return self._public(row), False
+
+            job_id = uuid.uuid4().hex
+            self._db.execute(
+                "INSERT INTO jobs (id, dedup_key, status, filename, is_pdf, all_pages, engine_policy, "
+                "webhook_url, webhook_fields, data, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, dedup_key, QUEUED, filename, int(is_pdf), int(all_pages), engine_policy,
+                 webhook_url, ','.join(webhook_fields) if webhook_fields else None, sqlite3.Binary(data), now, now)
+            )
+            self._db.commit()
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return self._public(row), True
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """
+        Atomically take the oldest queued job (or one whose lease expired).
+
+        Returns:
+            Optional[Dict[str, Any]]: Job including its 'data' bytes, or None if the queue is empty
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_expires_at = ?, updated_at = ? "
+                "WHERE id = (SELECT id FROM jobs WHERE status = ? OR (status = ? AND lease_expires_at < ?) "
+                "ORDER BY created_at LIMIT 1) RETURNING *",
+                (RUNNING, now + self.lease_seconds, now, QUEUED, RUNNING, now)
+            ).fetchone()
+            self._db.commit()
+        if row is None:
+            return None
+        job = self._public(row)
+        job['data'] = row['data']
+        job['webhookUrl'] = row['webhook_url']
+        job['webhookFields'] = row['webhook_fields'].split(',') if row['webhook_fields'] else None
+        job['engine_policy'] = row['engine_policy']
+        job['is_pdf'] = bool(row['is_pdf'])
+        job['all_pages'] = bool(row['all_pages'])
+        return job
+
+    def release(self, job_id: str):
+        """Put a running job back in the queue without counting the attempt (clean shutdown, provider unavailable)."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, attempts = MAX(attempts - 1, 0), lease_expires_at = NULL, "
+                "updated_at = ? WHERE id = ? AND status = ?",
+                (QUEUED, time.time(), job_id, RUNNING)
+            )
+            self._db.commit()
+
+    def renew(self, job_id: str):
+        """Extend a running job's lease."""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET lease_expires_at = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (now + self.lease_seconds, now, job_id, RUNNING)
+            )
+            self._db.commit()
+
+    def complete(self, job_id: str, result: Dict[str, Any]):
+        """Store a job's result and drop its upload."""
+        self._finish(job_id, DONE, result=json.dumps(result))
+
+    def fail(self, job_id: str, error: str, attempts: int) -> bool:
+        """
+        Record a failed attempt: requeue the job, or fail it after max_attempts.
+
+        Returns:
+            bool: Whether the job is now terminally failed
+        """
+        if attempts < self.max_attempts:
+            with self._lock:
+                self._db.execute(
+                    "UPDATE jobs SET status = ?, error = ?, lease_expires_at = NULL, updated_at = ? WHERE id = ?",
+                    (QUEUED, error, time.time(), job_id)
+                )
+                self._db.commit()
+            return False
+        self._finish(job_id, FAILED, error=error)
+        return True
+
+    def _finish(self, job_id: str, status: str, result: Optional[str] = None, error: Optional[str] = None):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, data = NULL, lease_expires_at = NULL, "
+                "updated_at = ?, finished_at = ? WHERE id = ?",
+                (status, result, error, now, now, job_id)
+            )
+            self._db.commit()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Public view of a job (without its upload), or None if unknown."""
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._public(row) if row is not None else None
+
+    def purge(self) -> int:
+        """Delete finished jobs older than the TTL. Returns the number removed."""
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (time.time() - self.ttl_seconds,)
+            )
+            self._db.commit()
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        """Job counts by status."""
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        counts.update({status: count for status, count in rows})
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    @staticmethod
+    def _public(row: sqlite3.Row) -> Dict[str, Any]:
+        job = {
+            'jobId': row['id'],
+            'status': row['status'],
+            'filename': row['filename'],
+            'attempts': row['attempts'],
+            'createdAt': row['created_at'],
+            'finishedAt': row['finished_at'],
+        }
+        if row['status'] == DONE:
+            job['data'] = json.loads(row['result'])
+        if row['error']:
+            job['error'] = row['error']
+        return job
+
+
+class JobRunner:
+    """
+    Consumes a JobQueue with a fixed number of async workers.
+
+    Each worker runs the same pipeline as /ocr (through the shared
+    OCRWorkerPool, so CPU and network limits still apply) and stores the
+    prepare_for_smart_contract() payload as the job result. The worker
+    count is independent of the number of HTTP workers: run it inside the
+    API process (OCR_JOB_WORKERS) or as a separate process with
+    `python job_queue.py`.
+
+    Webhooks carry the job id and status (plus any result fields the job
+    asked for, never the text by default) and only go to hosts the
+    WebhookPolicy allows, at public addresses.
+    """
+
+    def __init__(self, queue: JobQueue, ocr_service, worker_pool, workers: int = 4,
+                 poll_interval: float = 1.0, webhook_attempts: int = 3,
+                 webhooks: Optional[WebhookPolicy] = None):
+        self.queue = queue
+        self.ocr_service = ocr_service
+        self.worker_pool = worker_pool
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.webhook_attempts = webhook_attempts
+        self.webhooks = webhooks if webhooks is not None else WebhookPolicy.from_env()
+        self._tasks: List[asyncio.Task] = []
+        self._running = set()
+        self._wakeup = None
+        self._changed = None
+        self._session = None
+
+    def start(self):
+        """Start the workers. Call from the running event loop."""
+        self._wakeup = asyncio.Event()
+        self._changed = asyncio.Event()
+        self._session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=10),
+            connector=aiohttp.TCPConnector(resolver=PublicResolver()),
+        )
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._janitor()))
+        logger.info(f"OCR job runner started with {self.workers} workers")
+
+    async def stop(self):
+        """Stop the workers and put the jobs they were running back in the queue."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for job_id in self._running:
+            self.queue.release(job_id)
+        self._running.clear()
+        if self._session is not None:
+            await self._session.close()
+        logger.info("OCR job runner stopped")
+
+    def notify(self):
+        """Wake an idle worker after a submit in this process."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _signal_changed(self):
+        # Wake every long-poll waiter; each re-reads its own job
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Long-poll a job until it is done or failed, or the timeout passes.
+
+        Jobs finished by this process wake the waiter immediately; jobs
+        finished by another process are picked up on the next poll.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            job = await loop.run_in_executor(None, self.queue.get, job_id)
+            remaining = deadline - loop.time()
+            if job is None or job['status'] in (DONE, FAILED) or remaining <= 0:
+                return job
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=min(remaining, self.poll_interval))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _worker(self, worker_id: int):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                job = await loop.run_in_executor(None, self.queue.claim)
+            except Exception as e:
+                logger.error(f"Job worker {worker_id} could not claim a job: {str(e)}")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._process(job)
+
+    async def _janitor(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                removed = await loop.run_in_executor(None, self.queue.purge)
+                if removed:
+                    logger.info(f"Purged {removed} expired jobs")
+            except Exception as e:
+                logger.error(f"Job purge failed: {str(e)}")
+            await asyncio.sleep(3600)
+
+    async def _heartbeat(self, job_id: str):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            await loop.run_in_executor(None, self.queue.renew, job_id)
+
+    async def _process(self, job: Dict[str, Any]):
+        loop = asyncio.get_running_loop()
+        job_id = job['jobId']
+        logger.info(f"Running job {job_id} (attempt {job['attempts']})")
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        self._running.add(job_id)
+        try:
+            if job['is_pdf'] and job['all_pages']:
+                result = await self.worker_pool.run_pdf_document(job['data'], wait=True,
+                                                                 engine_policy=job['engine_policy'])
+            else:
+                result = await self.worker_pool.run(job['data'], job['is_pdf'], wait=True,
+                                                    engine_policy=job['engine_policy'])
+            payload = self.ocr_service.prepare_for_smart_contract(result)
+            await loop.run_in_executor(None, self.queue.complete, job_id, payload)
+            self._running.discard(job_id)
+            logger.info(f"Job {job_id} done")
+        except asyncio.CancelledError:
+            raise
+        except EngineUnavailableError as e:
+            # The provider is shedding load: requeue without using up an
+            # attempt, and back this worker off until it may be available
+            logger.warning(f"Job {job_id} deferred: {str(e)}")
+            self._running.discard(job_id)
+            await loop.run_in_executor(None, self.queue.release, job_id)
+            heartbeat.cancel()
+            await asyncio.sleep(e.retry_after)
+            self.notify()
+            return
+        except Exception as e:
+            logger.warning(f"Job {job_id} attempt {job['attempts']} failed: {str(e)}")
+            self._running.discard(job_id)
+            failed = await loop.run_in_executor(
+                None, self.queue.fail, job_id, f"OCR processing failed: {str(e)}", job['attempts']
+            )
+            if not failed:
+                self.notify()
+                return
+        finally:
+            heartbeat.cancel()
+
+        self._signal_changed()
+        if job['webhookUrl']:
+            finished = await loop.run_in_executor(None, self.queue.get, job_id)
+            await self._deliver_webhook(job['webhookUrl'], finished, job['webhookFields'])
+
+    async def _deliver_webhook(self, url: str, job: Dict[str, Any], fields: Optional[List[str]] = None):
+        """POST the finished job's id and status to its webhook, retrying a few times; best effort."""
+        try:
+            # Checked again: the job may predate the current allowlist
+            self.webhooks.check(url)
+        except ValueError as e:
+            logger.warning(f"Not sending webhook for job {job['jobId']}: {str(e)}")
+            return
+        payload = {'jobId': job['jobId'], 'status': job['status']}
+        if fields and 'data' in job:
+            payload['data'] = project(job['data'], fields)
+        for attempt in range(1, self.webhook_attempts + 1):
+            try:
+                # No redirects: they could point anywhere, IP literals included
+                async with self._session.post(url, json=payload, allow_redirects=False) as response:
+                    if response.status < 300:
+                        return
+                    logger.warning(f"Webhook for job {job['jobId']} returned {response.status}")
+            except Exception as e:
+                logger.warning(f"Webhook for job {job['jobId']} failed: {str(e)}")
+            if attempt < self.webhook_attempts:
+                await asyncio.sleep(2 ** attempt)
+        logger.error(f"Giving up on webhook for job {job['jobId']}")
+
+
+if __name__ == "__main__":
+    # Standalone job worker process, scaled independently of the API:
+    #   OCR_JOB_WORKERS=0 uvicorn main:app ...   (API only enqueues)
+    #   OCR_JOB_WORKERS=8 python job_queue.py    (workers only)
+    from ocr_service import OCRService
+    from worker_pool import OCRWorkerPool
+
+    logging.basicConfig(level=logging.INFO)
+
+    async def run_workers():
+        ocr_service = OCRService()
+        worker_pool = OCRWorkerPool.from_env(ocr_service)
+        queue = JobQueue.from_env()
+        runner = JobRunner(queue, ocr_service, worker_pool, workers=int(os.environ.get("OCR_JOB_WORKERS", "4")))
+        await ocr_service.client.start()
+        worker_pool.start()
+        runner.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.stop()
+            worker_pool.shutdown()
+            await ocr_service.client.close()
+            queue.close()
+
+    try:
+        asyncio.run(run_workers())
+    except KeyboardInterrupt:
+        pass
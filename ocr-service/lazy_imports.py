@@ -0,0 +1,85 @@
+import os
+import time
+import types
+import logging
+import importlib
+import threading
+from typing import Dict, Any
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# OCR_LAZY_IMPORTS=0 imports everything at module load (the old behaviour)
+LAZY = os.environ.get("OCR_LAZY_IMPORTS", "1") != "0"
+
+_registry: Dict[str, "LazyModule"] = {}
+_import_seconds: Dict[str, float] = {}
+_lock = threading.RLock()
+
+
+class LazyModule(types.ModuleType):
+    """
+    Stand-in for a heavy module that is imported on first attribute access.
+
+    `cv2 = lazy_module("cv2")` costs nothing at import time; the real
+    import happens the first time cv2.<anything> is used (or in the
+    background warm-up), and how long it took is recorded.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_target"] = None
+
+    def _load(self) -> types.ModuleType:
+        target = self.__dict__["_lazy_target"]
+        if target is None:
+            with _lock:
+                target = self.__dict__["_lazy_target"]
+                if target is None:
+                    started = time.perf_counter()
+                    target = importlib.import_module(self.__name__)
+                    _import_seconds[self.__name__] = time.perf_counter() - started
+                    self.__dict__["_lazy_target"] = target
+                    logger.info(f"Imported {self.__name__} in {_import_seconds[self.__name__] * 1000:.0f}ms")
+        return target
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __reduce__(self):
+        # Pickle as the real module reference so process pools still work
+        return importlib.import_module, (self.__name__,)
+
+
+def lazy_module(name: str):
+    """
+    Return a module that is imported on first use (or right away when
+    OCR_LAZY_IMPORTS=0).
+
+    Args:
+        name (str): Dotted module name, e.g. "PIL.Image"
+    """
+    if not LAZY:
+        started = time.perf_counter()
+        module = importlib.import_module(name)
+        _import_seconds.setdefault(name, time.perf_counter() - started)
+        return module
+    with _lock:
+        if name not in _registry:
+            _registry[name] = LazyModule(name)
+        return _registry[name]
+
+
+def load_all() -> Dict[str, float]:
+    """Import every module registered so far (used by the warm-up). Returns import times in seconds."""
+    for module in list(_registry.values()):
+        module._load()
+    return import_times()
+
+
+def import_times() -> Dict[str, float]:
+    """Seconds spent importing each lazily loaded module (only those loaded so far)."""
+    return dict(_import_seconds)
@@ -1,15 +1,29 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import JSONResponse
+from startup import STARTUP
+from fastapi import FastAPI, File, UploadFile, HTTPException, Query, Request, Header
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from ocr_service import OCRService
-import shutil
-import os
-import tempfile
-import cv2
-import numpy as np
-from pdf2image import convert_from_path
+from ocr_service import OCRService, is_pdf_upload, combine_pages, warm_up
+from worker_pool import OCRWorkerPool, PoolSaturatedError
+from memory_budget import MemoryBudgetError
+from batch import BatchError, documents_from_uploads, documents_from_zip, run_batch, format_line
+from ocr_engines import POLICIES, EngineUnavailableError
+from phash_index import PHashIndex, phash_to_int
+from chain_index import ChainFollower
+from file_index import FileHashIndex, file_hash
+from job_queue import JobQueue, JobRunner
+from merkle import merkle_batch, verify_proof, document_hash_bytes
+from responses import FORMAT_PATTERN, parse_fields, project, encode_response, redacted_summary
+import metrics
+import lazy_imports
+from pydantic import BaseModel
+from typing import List, Optional
+import time
+import hmac
+import math
+import random
 import traceback
 import logging
+import os
 import asyncio
 import aiohttp
 from datetime import datetime
@@ -22,15 +36,41 @@ logger = logging.getLogger(__name__)
 # Global variable to store the keep-alive task
 keep_alive_task = None
 
+# Share of successful requests that get an access log line and, for /ocr,
+# the redacted response summary (errors are always logged)
+LOG_SAMPLE_RATE = float(os.environ.get("OCR_LOG_SAMPLE_RATE", "0.01"))
+
+# POST /verify: largest p-hash distance at which an upload counts as a
+# registered document without running OCR (unset: never skip OCR on a
+# p-hash alone, only on a byte-identical file)
+FAST_VERIFY_PHASH_DISTANCE = os.environ.get("OCR_FAST_VERIFY_PHASH_DISTANCE")
+FAST_VERIFY_PHASH_DISTANCE = int(FAST_VERIFY_PHASH_DISTANCE) if FAST_VERIFY_PHASH_DISTANCE else None
+
+# Bearer token for writing the p-hash index directly (POST/DELETE
+# /index/documents); unset, those endpoints are disabled
+ADMIN_TOKEN = os.environ.get("OCR_ADMIN_TOKEN")
+
+# Background warm-up after startup (OCR_WARMUP=0 to disable)
+WARMUP = os.environ.get("OCR_WARMUP", "1") != "0"
+warmup_task = None
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan event handler for startup and shutdown"""
-    global keep_alive_task
+    global keep_alive_task, warmup_task
     
     # Startup
     logger.info("Starting OCR service...")
+    await ocr_service.client.start()
+    worker_pool.start()
+    job_runner.start()
+    if chain_follower is not None:
+        chain_follower.start()
     keep_alive_task = asyncio.create_task(keep_alive_loop())
     logger.info("Keep-alive task started")
+    STARTUP.mark("ready")
+    if WARMUP:
+        warmup_task = asyncio.create_task(run_warmup())
     
     yield
     
@@ -43,6 +83,21 @@ async def lifespan(app: FastAPI):
         except asyncio.CancelledError:
             pass
     logger.info("Keep-alive task cancelled")
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+        try:
+            await warmup_task
+        except asyncio.CancelledError:
+            pass
+    await job_runner.stop()
+    if chain_follower is not None:
+        await chain_follower.stop()
+    worker_pool.shutdown()
+    await ocr_service.client.close()
+    ocr_service.cache.close()
+    phash_index.close()
+    file_index.close()
+    job_queue.close()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -67,6 +122,162 @@ app.add_middleware(
 )
 
 ocr_service = OCRService()
+worker_pool = OCRWorkerPool.from_env(ocr_service)
+phash_index = PHashIndex.from_env()
+# Local copy of the contract's records, followed from its events (None unless OCR_CHAIN_* is set)
+chain_follower = ChainFollower.from_env()
+# documentHash of every file that went through OCR, by SHA-256 of its bytes
+file_index = FileHashIndex.from_env()
+
+def _index_chain_phashes(events):
+    """Mirror on-chain registrations into the p-hash index, so POST /verify can match uploads by p-hash"""
+    # Last event per document wins; then one write for all of them
+    latest = {}
+    for event in events:
+        if event['event'] == 'DocumentRegistered':
+            try:
+                phash_to_int(event['phash'])
+            except ValueError:
+                logger.warning(f"Not indexing malformed on-chain p-hash of {event['documentHash']}")
+                continue
+            latest[event['documentHash']] = event
+        elif event['event'] == 'DocumentDeleted':
+            latest[event['documentHash']] = event
+    phash_index.delete_many([(event['organizationId'], document_hash) for document_hash, event in latest.items()
+                             if event['event'] == 'DocumentDeleted'])
+    phash_index.insert_many([(event['organizationId'], document_hash, event['phash'])
+                             for document_hash, event in latest.items() if event['event'] == 'DocumentRegistered'])
+
+def _mirror_chain_phashes():
+    """
+    Make the p-hash index match the chain index's live registrations: at
+    startup (the chain index may have been reset for another contract, or
+    advanced without this index) and after a reorg reset it. Entries without
+    a live registration are dropped, including ones added through POST
+    /index/documents, which the chain index never answers for.
+    """
+    live = {document['documentHash']: document for document in chain_follower.index.documents()
+            if not document['deleted']}
+    phash_index.delete_many([(organization_id, document_hash)
+                             for organization_id, document_hash, _ in phash_index.documents()
+                             if document_hash not in live or live[document_hash]['organizationId'] != organization_id])
+    # Only missing or changed ones are written
+    _index_chain_phashes([
+        {'event': 'DocumentRegistered', **document} for document in live.values()
+        if phash_index.get(document['organizationId'], document['documentHash']) != document['phash'].lower()
+    ])
+
+if chain_follower is not None:
+    chain_follower.on_events = _index_chain_phashes
+    chain_follower.on_reset = _mirror_chain_phashes
+    _mirror_chain_phashes()
+
+# Async jobs: the queue is shared through SQLite, so job workers can run in
+# this process (OCR_JOB_WORKERS > 0) or separately via `python job_queue.py`
+job_queue = JobQueue.from_env()
+job_runner = JobRunner(job_queue, ocr_service, worker_pool, workers=int(os.environ.get("OCR_JOB_WORKERS", "4")))
+
+def _collect_component_metrics():
+    """Expose the components' stats() counters on /metrics at scrape time"""
+    metrics.PEAK_RSS.set_max(metrics.peak_rss_bytes(), role="api")
+    cache_stats = ocr_service.cache.stats()
+    engine_stats = ocr_service.engines.stats()['engines']
+    return (
+        metrics.stats_metrics("ocr_cache", "OCR result cache", [({}, cache_stats)],
+                              counters=("hits", "memory_hits", "disk_hits", "misses", "sets", "evictions", "expired",
+                                        "pruned"))
+        + metrics.stats_metrics("ocr_http_client", "OCR.space HTTP client", [({}, ocr_service.client.stats())],
+                                counters=("requests", "attempts", "retries", "failures", "deadline_exceeded",
+                                          "circuit_rejected", "rate_limited", "hedges", "hedges_won",
+                                          "bytes_sent", "bytes_received"))
+        + metrics.stats_metrics("ocr_pool", "OCR worker pool", [({}, worker_pool.stats())],
+                                counters=("completed", "rejected"))
+        + metrics.stats_metrics("ocr_memory", "CPU stage memory budget", [({}, worker_pool.memory.stats())],
+                                counters=("granted", "waited", "timeouts", "rejected"))
+        + metrics.stats_metrics("ocr_engine", "OCR engine", [({'engine': name}, stats) for name, stats in engine_stats.items()],
+                                counters=("calls", "failures", "unavailable"))
+        + metrics.stats_metrics("ocr_circuit", "OCR.space circuit breaker (state_code 0 closed, 1 half-open, 2 open)",
+                                [({}, ocr_service.client.breaker.stats())],
+                                counters=("opened", "rejected", "successes", "failures"))
+        + (metrics.stats_metrics("ocr_rate_limiter", "OCR.space client-side token bucket",
+                                 [({}, ocr_service.client.limiter.stats())],
+                                 counters=("acquired", "waited", "rejected", "throttled", "wait_seconds"))
+           if ocr_service.client.limiter is not None else [])
+        + metrics.stats_metrics("ocr", "Async OCR jobs by status", [({'status': status}, {'jobs': count})
+                                                                   for status, count in job_queue.stats().items()])
+        + metrics.stats_metrics("ocr_phash_index", "p-hash index", [({}, phash_index.stats())])
+        + metrics.stats_metrics("ocr_file_index", "documentHash by file SHA-256", [({}, file_index.stats())],
+                                counters=("hits", "misses", "sets"))
+        + (metrics.stats_metrics("ocr_chain_index", "Contract event index", [({}, chain_follower.stats())],
+                                 counters=("events", "ranges", "rpc_errors", "resets"))
+           if chain_follower is not None else [])
+        + metrics.stats_metrics("ocr_startup", "Seconds from process start to startup phase",
+                                [({'phase': phase}, {'seconds': seconds}) for phase, seconds in STARTUP.phases().items()])
+        + metrics.stats_metrics("ocr_lazy_import", "Seconds spent importing module",
+                                [({'module': module}, {'seconds': seconds})
+                                 for module, seconds in lazy_imports.import_times().items()])
+    )
+
+metrics.REGISTRY.add_collector(_collect_component_metrics)
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Per-request trace id, latency metrics and a Server-Timing header"""
+    trace, token = metrics.start_trace(request.headers.get("x-request-id"))
+    metrics.HTTP_IN_FLIGHT.inc()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        trace.add("total", time.perf_counter() - started)
+        response.headers["X-Request-ID"] = trace.trace_id
+        response.headers["Server-Timing"] = trace.server_timing()
+        return response
+    finally:
+        elapsed = time.perf_counter() - started
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        metrics.HTTP_IN_FLIGHT.dec()
+        metrics.REQUEST_SECONDS.observe(elapsed, route=path, method=request.method)
+        metrics.REQUESTS.inc(route=path, method=request.method, status=status)
+        STARTUP.record_request(request.method, path, elapsed)
+        if path not in ("/metrics", "/health") and (status >= 400 or random.random() < LOG_SAMPLE_RATE):
+            logger.info(f"[{trace.trace_id}] {request.method} {path} {status} {elapsed * 1000:.1f}ms {trace.server_timing()}")
+        metrics.end_trace(token)
+
+# Per-request OCR engine override, e.g. /ocr?engine=local_first
+ENGINE_PATTERN = "^(" + "|".join(POLICIES) + ")$"
+
+# Batch limits
+BATCH_PARALLELISM = int(os.environ.get("OCR_BATCH_PARALLELISM", "8"))
+BATCH_MAX_FILES = int(os.environ.get("OCR_BATCH_MAX_FILES", "500"))
+BATCH_MAX_BYTES = int(os.environ.get("OCR_BATCH_MAX_BYTES", str(100 * 1024 * 1024)))
+MERKLE_MAX_DOCUMENTS = int(os.environ.get("OCR_MERKLE_MAX_DOCUMENTS", "10000"))
+
+async def run_warmup():
+    """
+    Warm everything the first request would otherwise pay for, in the
+    background so startup is not delayed: the imaging stack plus one
+    synthetic document in this process and in every CPU worker, then a
+    pooled connection to OCR.space.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        params = ocr_service.preprocess_params()
+        api, cpu_workers = await asyncio.gather(
+            loop.run_in_executor(None, warm_up, params),
+            worker_pool.warm_up(),
+        )
+        STARTUP.record_warmup("api", api)
+        STARTUP.record_warmup("cpu_workers", cpu_workers)
+        if ocr_service.api_key:
+            STARTUP.record_warmup("ocr_client", await ocr_service.client.warm())
+        STARTUP.mark("warm")
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.warning(f"Warm-up failed, first requests will be slower: {e!r}")
 
 async def keep_alive_loop():
     """Keep-alive loop that pings the service every 10 minutes"""
@@ -96,85 +307,710 @@ async def keep_alive():
     """Manual keep-alive endpoint"""
     return {"status": "awake", "timestamp": datetime.now().isoformat()}
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus metrics: per-stage latency histograms, counters, gauges and memory high-water marks"""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/startup")
+async def startup_report():
+    """Cold-start milestones, the first request and warm-up timings"""
+    return {**STARTUP.report(), "lazy_imports": lazy_imports.import_times()}
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """OCR result cache hit/miss counters"""
+    return ocr_service.cache.stats()
+
+@app.get("/engines/stats")
+async def engine_stats():
+    """Per-engine latency and throughput"""
+    return ocr_service.engines.stats()
+
+@app.get("/pool/stats")
+async def pool_stats():
+    """OCR worker pool occupancy and counters"""
+    return worker_pool.stats()
+
+@app.get("/index/stats")
+async def index_stats():
+    """p-hash index size"""
+    return phash_index.stats()
+
+class IndexedDocument(BaseModel):
+    organizationId: str
+    documentHash: str
+    phash: str
+
+def _check_admin(authorization: Optional[str]) -> Optional[JSONResponse]:
+    """An error response unless the request carries the OCR_ADMIN_TOKEN bearer token"""
+    if not ADMIN_TOKEN:
+        return JSONResponse(content={
+            'success': False,
+            'error': "Index writes are disabled (set OCR_ADMIN_TOKEN)"
+        }, status_code=403)
+    scheme, _, token = (authorization or '').partition(' ')
+    if scheme.lower() != 'bearer' or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        return JSONResponse(content={
+            'success': False,
+            'error': "Invalid or missing admin token"
+        }, status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    return None
+
+@app.post("/index/documents")
+async def index_document(document: IndexedDocument, authorization: Optional[str] = Header(None)):
+    """Add a registered document's p-hash to the near-duplicate index (admin token required)"""
+    error = _check_admin(authorization)
+    if error is not None:
+        return error
+    try:
+        await asyncio.get_running_loop().run_in_executor(
+            None, phash_index.insert, document.organizationId, document.documentHash, document.phash)
+    except ValueError as e:
+        return JSONResponse(content={
+            'success': False,
+            'error': str(e)
+        }, status_code=400)
+    return {'success': True}
+
+@app.delete("/index/documents/{document_hash}")
+async def unindex_document(document_hash: str, org: str = Query(...), authorization: Optional[str] = Header(None)):
+    """Remove a deleted document from the near-duplicate index (admin token required)"""
+    error = _check_admin(authorization)
+    if error is not None:
+        return error
+    if not await asyncio.get_running_loop().run_in_executor(None, phash_index.delete, org, document_hash):
+        return JSONResponse(content={
+            'success': False,
+            'error': "Document not found in index"
+        }, status_code=404)
+    return {'success': True}
+
+@app.get("/similar")
+async def similar_documents(
+    org: str = Query(...),
+    phash: str = Query(...),
+    max_distance: int = Query(10, ge=0, le=64),
+):
+    """Registered documents of an organization within max_distance bits of a p-hash"""
+    started = time.perf_counter()
+    try:
+        matches = await asyncio.get_running_loop().run_in_executor(
+            None, phash_index.search, org, phash, max_distance)
+    except ValueError as e:
+        return JSONResponse(content={
+            'success': False,
+            'error': str(e)
+        }, status_code=400)
+    return {
+        'success': True,
+        'matches': matches,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 3),
+    }
+
+class MerkleDocument(BaseModel):
+    documentHash: str
+    phash: str
+
+class MerkleBatchRequest(BaseModel):
+    documents: List[MerkleDocument]
+
+class MerkleProofRequest(BaseModel):
+    documentHash: str
+    phash: str
+    proof: List[str]
+    root: str
+
+@app.post("/merkle/batch")
+async def build_merkle_batch(batch: MerkleBatchRequest):
+    """
+    Merkle root over a batch of documents (hash and p-hash) plus each one's
+    inclusion proof, for registering the batch with one
+    registerDocumentBatch() call.
+
+    The contract only stores the root, so it cannot refuse a batched
+    document that is already registered on its own; with the chain index
+    configured, such documents are refused here instead (409).
+    """
+    if len(batch.documents) > MERKLE_MAX_DOCUMENTS:
+        return JSONResponse(content={
+            'success': False,
+            'error': f"Too many documents: {len(batch.documents)} (max {MERKLE_MAX_DOCUMENTS})"
+        }, status_code=400)
+    documents = [document.dict() for document in batch.documents]
+    try:
+        if chain_follower is not None:
+            registered = []
+            for document in documents:
+                stored = chain_follower.index.get_document('0x' + document_hash_bytes(document['documentHash']).hex())
+                if stored is not None and not stored['deleted']:
+                    registered.append(document['documentHash'])
+            if registered:
+                return JSONResponse(content={
+                    'success': False,
+                    'error': "Documents already registered on-chain",
+                    'documentHashes': registered,
+                }, status_code=409)
+        tree = await asyncio.get_running_loop().run_in_executor(None, merkle_batch, documents)
+    except ValueError as e:
+        return JSONResponse(content={
+            'success': False,
+            'error': str(e)
+        }, status_code=400)
+    return {'success': True, **tree}
+
+@app.post("/merkle/verify")
+async def verify_merkle_proof(request: MerkleProofRequest):
+    """Check a document's inclusion proof against a batch root (off-chain verifyBatchDocument())"""
+    try:
+        valid = verify_proof(request.documentHash, request.phash, request.proof, request.root)
+    except ValueError as e:
+        return JSONResponse(content={
+            'success': False,
+            'error': str(e)
+        }, status_code=400)
+    return {'success': True, 'valid': valid}
+
+def _registration(document_hash: str, org: str) -> Optional[dict]:
+    """
+    A document's registration under an organization, or None: from the
+    chain index when it is configured, otherwise from the p-hash index
+    (documents added through POST /index/documents): nothing ties those
+    to the contract, so they are marked 'confirmed': False
+    """
+    if chain_follower is not None:
+        document = chain_follower.index.get_document(document_hash)
+        return document if document is not None and document['organizationId'] == org.lower() else None
+    phash = phash_index.get(org, document_hash)
+    if phash is None:
+        return None
+    return {'organizationId': org.lower(), 'phash': phash, 'deleted': False, 'confirmed': False}
+
+def _document_status(document: Optional[dict], query_phash: Optional[int], max_distance: int):
+    """
+    (status, p-hash distance) of a registration as /verify reports it. A
+    match the chain has not confirmed is 'unconfirmed', never 'verified'.
+    """
+    if document is None:
+        return 'not_verified', None
+    if document['deleted']:
+        return 'deleted', None
+    verified = 'verified' if document.get('confirmed', True) else 'unconfirmed'
+    if query_phash is None:
+        return verified, None
+    try:
+        distance = bin(phash_to_int(document['phash']) ^ query_phash).count('1')
+    except ValueError:
+        return 'tampered', None
+    return (verified if distance <= max_distance else 'tampered'), distance
+
+@app.get("/verify")
+async def verify_document(
+    document_hash: str = Query(...),
+    org: str = Query(...),
+    phash: Optional[str] = Query(None),
+    max_distance: int = Query(9, ge=0, le=64),
+    root: Optional[str] = Query(None),
+    proof: Optional[str] = Query(None),
+    batch_phash: Optional[str] = Query(None),
+):
+    """
+    Check a document against an organization's on-chain records, answered
+    from the local event index instead of the subgraph.
+
+    Status is 'verified' (registered, and the p-hash if given is within
+    max_distance bits), 'tampered' (registered but the p-hash is further
+    off), 'deleted' or 'not_verified'. Documents registered in a Merkle
+    batch are checked with ?root=, a comma-separated ?proof= and
+    ?batch_phash=, the p-hash the document was batched with (from
+    /merkle/batch); the proof commits to it, so ?phash= is compared with
+    it as for documents registered one by one. As in verifyBatchDocument(),
+    a revoked batch or one of an inactive organization does not verify.
+    """
+    if chain_follower is None:
+        return JSONResponse(content={
+            'success': False,
+            'error': "Chain index is not configured (set OCR_CHAIN_RPC_URL and OCR_CHAIN_CONTRACT)"
+        }, status_code=503)
+    index = chain_follower.index
+    organization = index.get_organization(org)
+    try:
+        document_hash = '0x' + document_hash_bytes(document_hash).hex()
+        query_phash = phash_to_int(phash) if phash else None
+        if root is not None:
+            if batch_phash is None:
+                raise ValueError("batch_phash is required with root")
+            batch = index.get_batch(root)
+            in_batch = (batch is not None and batch['organizationId'] == org.lower()
+                        and organization is not None and organization['isActive']
+                        and verify_proof(document_hash, batch_phash, proof.split(',') if proof else [], root))
+    except ValueError as e:
+        return JSONResponse(content={
+            'success': False,
+            'error': str(e)
+        }, status_code=400)
+
+    if root is not None:
+        document = {'merkleRoot': root.lower(), **batch, 'phash': batch_phash, 'deleted': False} if in_batch else None
+        status, distance = _document_status(document, query_phash, max_distance)
+    else:
+        document = _registration(document_hash, org)
+        status, distance = _document_status(document, query_phash, max_distance)
+    return {
+        'success': True,
+        'status': status,
+        'documentHash': document_hash,
+        'document': document,
+        'distance': distance,
+        'organizationActive': organization['isActive'] if organization else None,
+        'indexedBlock': index.last_block,
+        'headBlock': chain_follower.head_block,
+    }
+
+@app.post("/verify")
+async def verify_upload(
+    file: UploadFile = File(...),
+    org: str = Query(...),
+    max_distance: int = Query(9, ge=0, le=64),
+    phash_distance: Optional[int] = Query(None, ge=0, le=64),
+    pages: str = Query("first", pattern="^(first|all)$"),
+    engine: Optional[str] = Query(None, pattern=ENGINE_PATTERN),
+    crop: Optional[bool] = Query(None),
+):
+    """
+    Check an upload against an organization's registered documents,
+    running OCR only when cheaper signals cannot decide.
+
+    'path' in the response says what decided:
+      file_hash  the SHA-256 of the upload's bytes is a file /ocr has seen,
+                 so its documentHash is known without decoding it
+      phash      a p-hash from a reduced decode is within phash_distance
+                 bits of a registered document's (only when phash_distance
+                 or OCR_FAST_VERIFY_PHASH_DISTANCE is set: a p-hash does
+                 not see edited text, so this trades assurance for speed;
+                 with card crop on, different cards of one layout are
+                 often only a few bits apart, see benchmarks/verify_bench.py).
+                 It only ever answers verified, unconfirmed or deleted:
+                 further off is inconclusive and left to OCR
+      ocr        the full pipeline ran and the text hash was checked as in
+                 GET /verify, with max_distance for the p-hash
+
+    Without a chain index, registrations come from the p-hash index alone
+    and a match is reported as 'unconfirmed' instead of 'verified'.
+    """
+    error = _validate_upload(file)
+    if error is not None:
+        return error
+    data = await file.read()
+    is_pdf = is_pdf_upload(file.filename, file.content_type)
+    loop = asyncio.get_running_loop()
+    timings = {}
+
+    started = time.perf_counter()
+    sha256 = await loop.run_in_executor(None, file_hash, data)
+    known = await loop.run_in_executor(None, file_index.get, sha256)
+    timings['file_hash_ms'] = round((time.perf_counter() - started) * 1000, 2)
+
+    threshold = FAST_VERIFY_PHASH_DISTANCE if phash_distance is None else phash_distance
+    document_hash, phash, distance = None, None, None
+    try:
+        if known is not None:
+            # Same bytes, same text: no need to look at the pixels
+            path, document_hash, phash = 'file_hash', known['documentHash'], known['phash']
+            document = _registration(document_hash, org)
+            status, _ = _document_status(document, None, max_distance)
+        else:
+            path, document = None, None
+            if threshold is not None and (not is_pdf or pages == "first"):
+                started = time.perf_counter()
+                hashed = await worker_pool.phash(data, is_pdf, crop_card=crop)
+                timings['phash_ms'] = round((time.perf_counter() - started) * 1000, 2)
+                phash = hashed['phash']
+                # Closest registered match decides; entries whose registration
+                # is gone (e.g. after a chain reorg) are skipped. A p-hash
+                # further than the threshold from the registered one is
+                # inconclusive, not 'tampered' (it cannot tell an edit from
+                # another photo of the card): OCR decides those
+                matches = await loop.run_in_executor(None, phash_index.search, org, phash, threshold)
+                for match in matches:
+                    registration = _registration(match['documentHash'], org)
+                    if registration is None:
+                        continue
+                    status, distance = _document_status(registration, phash_to_int(phash), threshold)
+                    if status != 'tampered':
+                        path, document, document_hash = 'phash', registration, match['documentHash']
+                        distance = match['distance'] if distance is None else distance
+                        break
+
+            if path is None:
+                started = time.perf_counter()
+                if is_pdf and pages == "all":
+                    result = await worker_pool.run_pdf_document(data, engine_policy=engine)
+                else:
+                    result = await worker_pool.run(data, is_pdf, engine_policy=engine, crop_card=crop)
+                prepared = ocr_service.prepare_for_smart_contract(result)
+                timings['ocr_ms'] = round((time.perf_counter() - started) * 1000, 2)
+                path, document_hash, phash = 'ocr', prepared['documentHash'], prepared['phash']
+                await loop.run_in_executor(None, file_index.set, sha256, document_hash, phash)
+                document = _registration(document_hash, org)
+                status, distance = _document_status(
+                    document, phash_to_int(phash) if phash else None, max_distance)
+        del data
+
+    except MemoryBudgetError as e:
+        logger.warning(str(e))
+        return JSONResponse(content={
+            'success': False,
+            'error': str(e)
+        }, status_code=413)
+
+    except PoolSaturatedError as e:
+        logger.warning(str(e))
+        return JSONResponse(content={
+            'success': False,
+            'error': "OCR service is busy, please retry shortly"
+        }, status_code=503, headers={"Retry-After": str(e.retry_after)})
+
+    except EngineUnavailableError as e:
+        logger.warning(str(e))
+        return JSONResponse(content={
+            'success': False,
+            'error': "OCR provider is unavailable, please retry shortly"
+        }, status_code=503, headers={"Retry-After": str(math.ceil(e.retry_after))})
+
+    except Exception as e:
+        logger.error(f"Error verifying file: {str(e)}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        return JSONResponse(content={
+            'success': False,
+            'error': f"Verification failed: {str(e)}"
+        }, status_code=500)
+
+    metrics.VERIFICATIONS.inc(path=path, status=status)
+    organization = chain_follower.index.get_organization(org) if chain_follower is not None else None
+    return {
+        'success': True,
+        'status': status,
+        'path': path,
+        'documentHash': document_hash,
+        'document': document,
+        'distance': distance,
+        'phash': phash,
+        'fileHash': sha256,
+        'organizationActive': organization['isActive'] if organization else None,
+        'timings': timings,
+    }
+
+@app.get("/chain/stats")
+async def chain_stats():
+    """Contract event index progress and counts"""
+    if chain_follower is None:
+        return {'enabled': False}
+    return {'enabled': True, **chain_follower.stats()}
+
+@app.get("/jobs/stats")
+async def job_stats():
+    """Job counts by status"""
+    return job_queue.stats()
+
 @app.options("/ocr")
+@app.options("/jobs")
+@app.options("/ocr/batch")
+@app.options("/ocr/pages")
+@app.options("/verify")
 async def ocr_options():
     """Handle CORS preflight requests"""
     return JSONResponse(
         content={},
         headers={
             "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "POST, OPTIONS",
+            "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
             "Access-Control-Allow-Headers": "*",
         }
     )
 
 @app.post("/ocr")
-async def ocr_endpoint(file: UploadFile = File(...)):
-    # Save uploaded file to a temporary location
+async def ocr_endpoint(
+    file: UploadFile = File(...),
+    pages: str = Query("first", pattern="^(first|all)$"),
+    engine: Optional[str] = Query(None, pattern=ENGINE_PATTERN),
+    crop: Optional[bool] = Query(None),
+    fields: Optional[str] = Query(None),
+    format: str = Query("json", pattern=FORMAT_PATTERN),
+):
     try:
-        logger.info(f"Processing file: {file.filename}, size: {file.size} bytes")
+        logger.debug(f"Processing file: {file.filename}, size: {file.size} bytes")
         
-        # Validate file type
-        allowed_types = ["image/jpeg", "image/jpg", "image/png", "application/pdf", "image/tiff", "image/bmp"]
-        if file.content_type not in allowed_types:
-            return JSONResponse(content={
-                'success': False,
-                'error': f"Unsupported file type: {file.content_type}. Supported types: {allowed_types}"
-            }, status_code=400)
-        
-        # Validate file size (16MB limit)
-        if file.size > 16 * 1024 * 1024:
+        # Validate file type and size
+        error = _validate_upload(file)
+        if error is not None:
+            return error
+
+        # Response projection, e.g. ?fields=hexHash,phash
+        try:
+            selected = parse_fields(fields)
+        except ValueError as e:
             return JSONResponse(content={
                 'success': False,
-                'error': "File size must be less than 16MB"
+                'error': str(e)
             }, status_code=400)
         
-        suffix = os.path.splitext(file.filename)[1]
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            shutil.copyfileobj(file.file, tmp)
-            tmp_path = tmp.name
-        
-        logger.info(f"File saved to temporary path: {tmp_path}")
+        # Read the upload into memory; it is decoded straight from these bytes
+        data = await file.read()
+        is_pdf = is_pdf_upload(file.filename, file.content_type)
         
-        # Run OCR
-        logger.info("Starting OCR processing...")
-        result = ocr_service.extract_aadhaar_number(tmp_path)
-        logger.info("OCR processing completed successfully")
+        # Run OCR off the event loop (CPU stage in processes, network stage async)
+        logger.debug("Starting OCR processing...")
+        if is_pdf and pages == "all":
+            result = await worker_pool.run_pdf_document(data, engine_policy=engine)
+        else:
+            result = await worker_pool.run(data, is_pdf, engine_policy=engine, crop_card=crop)
         
         # Prepare for smart contract (hash, fields)
-        logger.info("Preparing data for smart contract...")
         prepared = ocr_service.prepare_for_smart_contract(result)
-        logger.info("Data prepared successfully")
+        # Lets POST /verify recognize this exact file without OCR
+        loop = asyncio.get_running_loop()
+        sha256 = await loop.run_in_executor(None, file_hash, data)
+        del data
+        await loop.run_in_executor(None, file_index.set, sha256, prepared['documentHash'], prepared['phash'])
+        # The text and card fields are personal data: log only what identifies the result
+        if random.random() < LOG_SAMPLE_RATE:
+            logger.info(f"Sending response: {redacted_summary(prepared)}")
         
-        # Log the response being sent
-        response_data = {
+        return encode_response({
             'success': True,
-            'data': prepared
-        }
-        logger.info(f"Sending response: {response_data}")
-        
-        # Clean up temp file
-        os.remove(tmp_path)
-        logger.info("Temporary file cleaned up")
-        
-        # Force garbage collection to free memory
-        import gc
-        gc.collect()
-        
-        return JSONResponse(content=response_data)
+            'data': project(prepared, selected)
+        }, format)
         
+    except MemoryBudgetError as e:
+        logger.warning(str(e))
+        return JSONResponse(content={
+            'success': False,
+            'error': str(e)
+        }, status_code=413)
+
+    except PoolSaturatedError as e:
+        logger.warning(str(e))
+        return JSONResponse(content={
+            'success': False,
+            'error': "OCR service is busy, please retry shortly"
+        }, status_code=503, headers={"Retry-After": str(e.retry_after)})
+
+    except EngineUnavailableError as e:
+        logger.warning(str(e))
+        return JSONResponse(content={
+            'success': False,
+            'error': "OCR provider is unavailable, please retry shortly"
+        }, status_code=503, headers={"Retry-After": str(math.ceil(e.retry_after))})
+
     except Exception as e:
         logger.error(f"Error processing file: {str(e)}")
         logger.error(f"Traceback: {traceback.format_exc()}")
         
-        # Clean up temp file if it exists
-        try:
-            if 'tmp_path' in locals():
-                os.remove(tmp_path)
-        except:
-            pass
-        
         return JSONResponse(content={
             'success': False,
             'error': f"OCR processing failed: {str(e)}"
-        }, status_code=500) 
+        }, status_code=500)
+
+def _validate_upload(file: UploadFile) -> Optional[JSONResponse]:
+    """400 response for an unsupported or oversized upload, None if it is acceptable"""
+    allowed_types = ["image/jpeg", "image/jpg", "image/png", "application/pdf", "image/tiff", "image/bmp"]
+    if file.content_type not in allowed_types:
+        return JSONResponse(content={
+            'success': False,
+            'error': f"Unsupported file type: {file.content_type}. Supported types: {allowed_types}"
+        }, status_code=400)
+
+    # 16MB limit
+    if file.size > 16 * 1024 * 1024:
+        return JSONResponse(content={
+            'success': False,
+            'error': "File size must be less than 16MB"
+        }, status_code=400)
+    return None
+
+@app.post("/jobs")
+async def create_job(
+    file: UploadFile = File(...),
+    pages: str = Query("first", pattern="^(first|all)$"),
+    engine: Optional[str] = Query(None, pattern=ENGINE_PATTERN),
+    webhook: Optional[str] = Query(None, pattern="^https?://"),
+    webhook_fields: Optional[str] = Query(None),
+):
+    """
+    Queue a document for OCR and return its job id immediately.
+
+    The result is fetched with GET /jobs/{id} (optionally long-polling with
+    ?wait=). A webhook URL, on a host in OCR_WEBHOOK_ALLOWED_HOSTS, is
+    POSTed the job id and status when the job finishes, plus the result
+    keys listed in ?webhook_fields= (same names as ?fields= on /ocr).
+    Uploading the same document again returns the existing job.
+    """
+    error = _validate_upload(file)
+    if error is not None:
+        return error
+    try:
+        if webhook is not None:
+            job_runner.webhooks.check(webhook)
+        selected = parse_fields(webhook_fields)
+    except ValueError as e:
+        return JSONResponse(content={
+            'success': False,
+            'error': str(e)
+        }, status_code=400)
+
+    data = await file.read()
+    is_pdf = is_pdf_upload(file.filename, file.content_type)
+    all_pages = is_pdf and pages == "all"
+    loop = asyncio.get_running_loop()
+    dedup_key = await loop.run_in_executor(None, ocr_service.request_key, data, is_pdf, all_pages, engine)
+    job, created = await loop.run_in_executor(
+        None, job_queue.submit, data, dedup_key, file.filename, is_pdf, all_pages, engine, webhook, selected
+    )
+    del data
+    if created:
+        job_runner.notify()
+    logger.info(f"Job {job['jobId']} {'queued' if created else 'deduplicated'}")
+
+    return JSONResponse(content={
+        'success': True,
+        'deduplicated': not created,
+        **job
+    }, status_code=202 if created else 200)
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = Query(0, ge=0, le=60)):
+    """Job status and, once done, the same payload as /ocr. ?wait=N long-polls up to N seconds."""
+    if wait > 0:
+        job = await job_runner.wait(job_id, wait)
+    else:
+        job = await asyncio.get_running_loop().run_in_executor(None, job_queue.get, job_id)
+    if job is None:
+        return JSONResponse(content={
+            'success': False,
+            'error': "Job not found"
+        }, status_code=404)
+    return {'success': True, **job}
+
+@app.post("/ocr/batch")
+async def ocr_batch_endpoint(
+    files: List[UploadFile] = File(...),
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$"),
+    engine: Optional[str] = Query(None, pattern=ENGINE_PATTERN),
+    merkle: bool = Query(False),
+):
+    """
+    OCR many documents at once, streaming one result line per document as it finishes.
+
+    Accepts either several files or a single zip archive. Each line carries
+    the same payload as /ocr; a failed document produces an error line
+    instead of failing the batch. The stream ends with a summary line,
+    which with ?merkle=true also carries the batch Merkle root and proofs.
+    """
+    try:
+        # Uploads are closed once this handler returns, so their bytes are
+        # read now; zip members are only decompressed when processed
+        if len(files) == 1 and (files[0].content_type in ("application/zip", "application/x-zip-compressed")
+                                or (files[0].filename or "").lower().endswith(".zip")):
+            archive = await files[0].read()
+            docs = documents_from_zip(archive, BATCH_MAX_FILES)
+        else:
+            uploads = [(f.filename, await f.read()) for f in files]
+            docs = documents_from_uploads(uploads, BATCH_MAX_FILES, BATCH_MAX_BYTES)
+    except BatchError as e:
+        return JSONResponse(content={
+            'success': False,
+            'error': str(e)
+        }, status_code=400)
+
+    logger.info(f"Processing batch of {len(docs)} documents (parallelism {BATCH_PARALLELISM})")
+
+    async def stream():
+        async for line in run_batch(docs, ocr_service, worker_pool, BATCH_PARALLELISM, engine, merkle):
+            yield format_line(line, format)
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(stream(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+@app.post("/ocr/pages")
+async def ocr_pages_endpoint(
+    file: UploadFile = File(...),
+    engine: Optional[str] = Query(None, pattern=ENGINE_PATTERN),
+):
+    """
+    OCR every page of a PDF, streaming one NDJSON line per page as it is ready.
+
+    The final line carries the combined document payload (same shape as
+    /ocr?pages=all).
+    """
+    if not is_pdf_upload(file.filename, file.content_type):
+        return JSONResponse(content={
+            'success': False,
+            'error': "Only PDF files can be processed page by page"
+        }, status_code=400)
+    if file.size > 16 * 1024 * 1024:
+        return JSONResponse(content={
+            'success': False,
+            'error': "File size must be less than 16MB"
+        }, status_code=400)
+
+    data = await file.read()
+    page_iter = worker_pool.iter_pdf_pages(data, engine_policy=engine)
+    try:
+        # Take the admission slot now so saturation is still a plain 503
+        first_page = await page_iter.__anext__()
+    except MemoryBudgetError as e:
+        return JSONResponse(content={
+            'success': False,
+            'error': str(e)
+        }, status_code=413)
+    except PoolSaturatedError as e:
+        return JSONResponse(content={
+            'success': False,
+            'error': "OCR service is busy, please retry shortly"
+        }, status_code=503, headers={"Retry-After": str(e.retry_after)})
+    except EngineUnavailableError as e:
+        return JSONResponse(content={
+            'success': False,
+            'error': "OCR provider is unavailable, please retry shortly"
+        }, status_code=503, headers={"Retry-After": str(math.ceil(e.retry_after))})
+    except Exception as e:
+        logger.error(f"Error processing PDF: {str(e)}")
+        return JSONResponse(content={
+            'success': False,
+            'error': f"OCR processing failed: {str(e)}"
+        }, status_code=500)
+
+    async def stream():
+        pages = [first_page]
+        try:
+            yield format_line(_page_line(first_page), "ndjson")
+            async for page in page_iter:
+                pages.append(page)
+                yield format_line(_page_line(page), "ndjson")
+            document = ocr_service.prepare_for_smart_contract(combine_pages(pages))
+            yield format_line({'done': True, 'success': True, 'data': document}, "ndjson")
+        except Exception as e:
+            logger.error(f"Error processing PDF pages: {str(e)}")
+            yield format_line({'done': True, 'success': False, 'error': f"OCR processing failed: {str(e)}"}, "ndjson")
+        finally:
+            # A client that disconnects mid-stream stops this generator, not
+            # the page iterator: close it so in-flight pages are cancelled and
+            # the admission slot is released now rather than at GC
+            await page_iter.aclose()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson", headers={"Cache-Control": "no-cache"})
+
+def _page_line(page):
+    """Per-page NDJSON payload"""
+    raw_text = page.get('debug_info', {}).get('raw_text', '')
+    return {
+        'page': page['page'],
+        'success': bool(raw_text),
+        'hexHash': page.get('document_hash'),
+        'phash': page.get('phash'),
+        'rawText': raw_text,
+        'error': page.get('debug_info', {}).get('error'),
+    }
+
+STARTUP.mark("imported")
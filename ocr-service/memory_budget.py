@@ -0,0 +1,138 @@
+import os
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, AsyncIterator
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+
+class MemoryBudgetError(Exception):
+    """Raised when a single document needs more memory than the whole budget."""
+
+    def __init__(self, needed: int, budget: int):
+        super().__init__(
+            f"Document needs about {needed // MB}MB to process, more than the {budget // MB}MB memory budget"
+        )
+        self.needed = needed
+        self.budget = budget
+
+
+class MemoryBudgetTimeout(Exception):
+    """Raised when a reservation could not be granted within its timeout."""
+
+
+class MemoryBudget:
+    """
+    Admission control on estimated memory instead of request count.
+
+    Each CPU-stage job reserves its estimated peak footprint (see
+    ocr_service.estimate_memory) before it starts and releases it when it
+    ends. Jobs that would push the total over the budget wait in FIFO
+    order, so a large scan is not starved by a stream of small photos, and
+    a reservation that waits longer than its timeout fails instead of
+    queueing forever. This bounds peak memory without forcing garbage
+    collections on the hot path.
+    """
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self._reserved = 0
+        self._waiters: deque = deque()
+        self._stats = {
+            "granted": 0,
+            "waited": 0,
+            "timeouts": 0,
+            "rejected": 0,
+            "peak_reserved_bytes": 0,
+        }
+
+    @classmethod
+    def from_env(cls) -> "MemoryBudget":
+        """
+        Build a budget from the environment.
+
+        OCR_MEMORY_BUDGET_MB: memory the CPU stage may use at once across all
+            workers (default 256, sized for a 512MB instance)
+        """
+        return cls(int(float(os.environ.get("OCR_MEMORY_BUDGET_MB", "256")) * MB))
+
+    def _wake(self):
+        """Grant waiting reservations, in arrival order, while they fit."""
+        while self._waiters:
+            needed, future = self._waiters[0]
+            if future.done():
+                self._waiters.popleft()
+                continue
+            if self._reserved + needed > self.budget_bytes:
+                break
+            self._waiters.popleft()
+            self._grant(needed)
+            future.set_result(True)
+
+    def _grant(self, needed: int):
+        self._reserved += needed
+        self._stats["granted"] += 1
+        self._stats["peak_reserved_bytes"] = max(self._stats["peak_reserved_bytes"], self._reserved)
+
+    async def acquire(self, needed: int, timeout: Optional[float] = None):
+        """
+        Reserve memory, waiting for earlier reservations to be released.
+
+        Args:
+            needed (int): Estimated bytes
+            timeout (Optional[float]): Seconds to wait before giving up, None to wait indefinitely
+
+        Raises:
+            MemoryBudgetError: If needed exceeds the whole budget
+            MemoryBudgetTimeout: If the reservation was not granted in time
+        """
+        if needed > self.budget_bytes:
+            self._stats["rejected"] += 1
+            raise MemoryBudgetError(needed, self.budget_bytes)
+        if not self._waiters and self._reserved + needed <= self.budget_bytes:
+            self._grant(needed)
+            return
+
+        self._stats["waited"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((needed, future))
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            # Let whoever was queued behind this reservation go ahead
+            self._wake()
+            raise MemoryBudgetTimeout(f"No memory budget for {needed // MB}MB within {timeout:.0f}s")
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(needed)
+            else:
+                self._wake()
+            raise
+
+    def release(self, needed: int):
+        self._reserved -= needed
+        self._wake()
+
+    @asynccontextmanager
+    async def reserve(self, needed: int, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """Hold a reservation for the duration of a block."""
+        await self.acquire(needed, timeout)
+        try:
+            yield
+        finally:
+            self.release(needed)
+
+    def stats(self) -> Dict[str, Any]:
+        """Budget occupancy and counters."""
+        return {
+            "budget_bytes": self.budget_bytes,
+            "reserved_bytes": self._reserved,
+            "waiting": sum(1 for _, future in self._waiters if not future.done()),
+            **self._stats,
+        }
@@ -0,0 +1,132 @@
+import hashlib
+from typing import Dict, Any, List
+
+# Domain separation (as in RFC 6962): a leaf can never be passed off as an
+# inner node, or the other way round. Must match DocumentVerification.sol
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+
+def document_hash_bytes(document_hash: str) -> bytes:
+    """
+    Parse a documentHash as returned by /ocr ('0x' + 64 hex digits).
+
+    Args:
+        document_hash (str): bytes32 hash, with or without the 0x prefix
+
+    Returns:
+        bytes: The 32 hash bytes
+
+    Raises:
+        ValueError: If it is not 32 bytes of hex
+    """
+    value = document_hash[2:] if document_hash.startswith('0x') else document_hash
+    try:
+        raw = bytes.fromhex(value)
+    except ValueError:
+        raw = b''
+    if len(raw) != 32:
+        raise ValueError(f"Invalid document hash: {document_hash!r}")
+    return raw
+
+
+def leaf_hash(document_hash: bytes, phash: str) -> bytes:
+    """
+    Leaf of one document: its hash and the p-hash it was registered with.
+
+    The p-hash goes into the leaf because a batch stores nothing per
+    document on-chain; committing it here is what lets a verifier compare
+    an upload's p-hash with the registered one (tamper detection), just as
+    for documents registered one by one. It is hashed as the UTF-8 string
+    passed to registerDocument(), after the fixed-size document hash.
+    """
+    return hashlib.sha256(LEAF_PREFIX + document_hash + phash.encode('utf-8')).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    """Inner node over a sorted pair, so a proof needs no left/right flags."""
+    if right < left:
+        left, right = right, left
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def build_levels(leaves: List[bytes]) -> List[List[bytes]]:
+    """Tree levels from the leaves up to the root; an odd last node moves up unchanged."""
+    levels = [leaves]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        levels.append([
+            node_hash(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+            for i in range(0, len(level), 2)
+        ])
+    return levels
+
+
+def merkle_batch(documents: List[Dict[str, str]]) -> Dict[str, Any]:
+    """
+    Build a Merkle tree over a batch of documents, for registering the
+    whole batch on-chain with one registerDocumentBatch() call.
+
+    Leaves are sha256(0x00 || documentHash || phash), inner nodes
+    sha256(0x01 || lower child || higher child), the same SHA-256 as the
+    document hashes themselves. Leaves are sorted, so the root only
+    depends on which documents are in the batch; a repeated documentHash
+    counts once (its first p-hash is kept).
+
+    Args:
+        documents (List[Dict[str, str]]): {'documentHash', 'phash'} as
+            returned by /ocr; a missing p-hash is committed as ''
+
+    Returns:
+        Dict[str, Any]: 'root', 'documentCount' and 'proofs', one
+            {'documentHash', 'phash', 'proof'} per distinct document in
+            input order
+
+    Raises:
+        ValueError: If the batch is empty or a hash is malformed
+    """
+    if not documents:
+        raise ValueError("No documents given")
+    phashes: Dict[bytes, str] = {}
+    for document in documents:
+        phashes.setdefault(document_hash_bytes(document['documentHash']), document.get('phash') or '')
+    leaves = sorted(leaf_hash(document_hash, phash) for document_hash, phash in phashes.items())
+    levels = build_levels(leaves)
+    position = {leaf: index for index, leaf in enumerate(leaves)}
+
+    proofs = []
+    for document_hash, phash in phashes.items():
+        index = position[leaf_hash(document_hash, phash)]
+        proof = []
+        for level in levels[:-1]:
+            sibling = index ^ 1
+            if sibling < len(level):
+                proof.append('0x' + level[sibling].hex())
+            index //= 2
+        proofs.append({'documentHash': '0x' + document_hash.hex(), 'phash': phash, 'proof': proof})
+
+    return {
+        'root': '0x' + levels[-1][0].hex(),
+        'documentCount': len(phashes),
+        'proofs': proofs,
+    }
+
+
+def verify_proof(document_hash: str, phash: str, proof: List[str], root: str) -> bool:
+    """
+    Check a document's inclusion proof against a batch root, exactly as
+    DocumentVerification.verifyBatchDocument() does on-chain.
+
+    Args:
+        document_hash (str): The document's hash
+        phash (str): The p-hash it was batched with (from the batch's proofs)
+        proof (List[str]): Sibling hashes from the leaf up to the root
+        root (str): The batch's Merkle root
+
+    Raises:
+        ValueError: If a hash is malformed
+    """
+    node = leaf_hash(document_hash_bytes(document_hash), phash)
+    for sibling in proof:
+        node = node_hash(node, document_hash_bytes(sibling))
+    return node == document_hash_bytes(root)
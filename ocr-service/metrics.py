@@ -0,0 +1,306 @@
+import time
+import uuid
+import logging
+import resource
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Tuple, Callable, Iterator
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from sub-millisecond hashing up to slow OCR calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Request/response sizes, 4KB to 4MB
+SIZE_BUCKETS = tuple(4096 * 2 ** i for i in range(11))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """A named metric family with a value per label set."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: Dict[Tuple[Tuple[str, str], ...], Any] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(labels: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in self._values.items()]
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_max(self, value: float, **labels):
+        """Keep the highest value seen (high-water mark)."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = max(self._values.get(key, value), value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    def _samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, state in self._values.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, state["counts"]):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, ('le', _format_value(bound)))} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(state['sum'])}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {state['count']}")
+        return lines
+
+
+class Registry:
+    """
+    Process-local metrics in the Prometheus text exposition format.
+
+    Besides the metrics recorded as requests run, collectors registered with
+    add_collector() are called at scrape time to turn the existing stats()
+    dicts (cache, HTTP client, worker pool, engines...) into samples.
+    """
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], List[_Metric]]] = []
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        return self._register(Counter(name, documentation))
+
+    def gauge(self, name: str, documentation: str) -> Gauge:
+        return self._register(Gauge(name, documentation))
+
+    def histogram(self, name: str, documentation: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, buckets))
+
+    def _register(self, metric: _Metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], List[_Metric]]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                for metric in collector():
+                    lines.extend(metric.render())
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {str(e)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "ocr_stage_seconds", "Time spent in each pipeline stage (render, decode, resize, phash, encode, ocr, ...)"
+)
+REQUEST_SECONDS = REGISTRY.histogram("ocr_http_request_seconds", "HTTP request latency by route")
+REQUESTS = REGISTRY.counter("ocr_http_requests_total", "HTTP requests by route and status code")
+HTTP_IN_FLIGHT = REGISTRY.gauge("ocr_http_in_flight", "HTTP requests currently being handled")
+ENCODE_PASSES = REGISTRY.counter("ocr_encode_passes_total", "JPEG encodes run to fit the provider size limit")
+BYTES_SENT = REGISTRY.counter("ocr_engine_bytes_total", "Encoded image bytes sent to OCR engines")
+CARD_CROPS = REGISTRY.counter("ocr_card_crops_total", "Photos run through card detection by whether a card was found")
+VERIFICATIONS = REGISTRY.counter("ocr_verifications_total", "Upload verifications by deciding path and status")
+DOCUMENTS = REGISTRY.counter("ocr_documents_total", "Documents run through the OCR pipeline by source format")
+ENGINE_SECONDS = REGISTRY.histogram("ocr_engine_seconds", "OCR engine call latency by engine and outcome")
+WIRE_BYTES = REGISTRY.histogram("ocr_engine_wire_bytes", "Bytes on the wire per OCR.space request by direction",
+                                SIZE_BUCKETS)
+PEAK_RSS = REGISTRY.gauge("ocr_peak_rss_bytes", "Peak resident set size (high-water mark) by process role")
+
+
+# Per-request trace: id plus stage durations, for logs and the Server-Timing header
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("ocr_trace", default=None)
+
+
+class Trace:
+    """Stage timings collected while one request is handled."""
+
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.stages: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, durations in milliseconds."""
+        return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.stages.items())
+
+
+def start_trace(trace_id: Optional[str] = None) -> Tuple[Trace, contextvars.Token]:
+    trace = Trace(trace_id)
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(token: contextvars.Token):
+    _current_trace.reset(token)
+
+
+def current_trace_id() -> Optional[str]:
+    trace = _current_trace.get()
+    return trace.trace_id if trace else None
+
+
+def observe_stage(stage: str, seconds: float):
+    """Record a stage duration in the histogram and on the current request's trace."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+@contextmanager
+def timed_stage(stage: str) -> Iterator[None]:
+    """Time a block as a pipeline stage (failures are timed too)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+
+def peak_rss_bytes() -> int:
+    """High-water RSS of this process (ru_maxrss is in KB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# CPU-stage statistics (metadata.preprocess) that are stage durations
+_STAGE_STATS = (
+    ("render_ms", "render"),
+    ("decode_ms", "decode"),
+    ("resize_ms", "resize"),
+    ("card_detect_ms", "card_detect"),
+    ("phash_ms", "phash"),
+    ("encode_ms", "encode"),
+)
+
+
+def record_preprocess(stats: Dict[str, Any]):
+    """
+    Record the statistics returned by the CPU stage.
+
+    The CPU stage may run in a worker process, so it reports its timings
+    and peak RSS in its result and they are recorded here, in the process
+    that serves /metrics.
+    """
+    for key, stage in _STAGE_STATS:
+        if key in stats:
+            observe_stage(stage, stats[key] / 1000.0)
+    ENCODE_PASSES.inc(stats.get('encode_passes', 0))
+    BYTES_SENT.inc(stats.get('encoded_bytes', 0))
+    DOCUMENTS.inc(format=stats.get('format') or 'unknown')
+    if 'card_found' in stats:
+        CARD_CROPS.inc(found=str(stats['card_found']).lower())
+    if stats.get('worker_peak_rss_bytes'):
+        PEAK_RSS.set_max(stats['worker_peak_rss_bytes'], role="cpu_worker")
+
+
+def record_transport(transport: Dict[str, Any]):
+    """Record one OCR.space request's bytes on the wire (all attempts) and the API process's peak RSS."""
+    WIRE_BYTES.observe(transport.get('bytes_sent', 0), direction="sent")
+    WIRE_BYTES.observe(transport.get('bytes_received', 0), direction="received")
+    PEAK_RSS.set_max(peak_rss_bytes(), role="api")
+
+
+def stats_metrics(prefix: str, documentation: str, rows: List[Tuple[Dict[str, str], Dict[str, Any]]],
+                  counters: Tuple[str, ...] = ()) -> List[_Metric]:
+    """
+    Turn stats() dicts into metrics at scrape time.
+
+    Args:
+        prefix (str): Metric name prefix
+        documentation (str): HELP text prefix
+        rows (List[Tuple[Dict[str, str], Dict[str, Any]]]): (labels, stats) pairs
+        counters (Tuple[str, ...]): Keys exported as <prefix>_<key>_total
+            counters; other numeric values become <prefix>_<key> gauges
+
+    Returns:
+        List[_Metric]: One metric family per stats key
+    """
+    families: Dict[str, _Metric] = {}
+    for labels, stats in rows:
+        for key, value in stats.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            metric = families.get(key)
+            if metric is None:
+                if key in counters:
+                    metric = Counter(f"{prefix}_{key}_total", f"{documentation}: {key}")
+                else:
+                    metric = Gauge(f"{prefix}_{key}", f"{documentation}: {key}")
+                families[key] = metric
+            metric._values[metric._key(labels)] = value
+    return list(families.values())
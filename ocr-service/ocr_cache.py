@@ -0,0 +1,239 @@
+import os
+import json
+import time
+import copy
+import hashlib
+import sqlite3
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Part of every cache key. Bump it whenever decoding, preprocessing or field
+# extraction changes what a request returns, so results computed by the old
+# pipeline (still on disk for up to the TTL) are never served again
+PIPELINE_VERSION = 2
+
+
+class OCRCache:
+    """
+    Content-addressed cache for OCR results.
+
+    Entries are keyed by the SHA-256 of the uploaded bytes plus the
+    preprocessing parameters, so the same scan uploaded again skips the
+    decode/encode pipeline and the OCR.space round trip entirely.
+
+    Two tiers are used:
+      * an in-process LRU with size and TTL eviction
+      * an optional SQLite store that survives restarts and is shared by
+        every uvicorn worker pointing at the same file
+
+    Expired rows are deleted from the disk tier when it is opened and then,
+    on insert, at most every prune_interval seconds.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 86400.0, db_path: Optional[str] = None,
+                 prune_interval: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self.prune_interval = prune_interval
+
+        self._memory: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "evictions": 0,
+            "expired": 0,
+            "pruned": 0,
+        }
+
+        self._db = None
+        # Row count of the disk tier, kept up to date by this process and
+        # recounted on every prune (other workers write to the same file)
+        self._disk_entries = 0
+        self._next_prune = 0.0
+        if self.db_path:
+            self._init_db()
+
+    @classmethod
+    def from_env(cls) -> "OCRCache":
+        """
+        Build a cache from OCR_CACHE_* environment variables.
+
+        OCR_CACHE_MAX_ENTRIES: size of the in-process LRU (default 256)
+        OCR_CACHE_TTL: entry lifetime in seconds (default 86400)
+        OCR_CACHE_DB: path of the SQLite file for the disk tier (disabled if unset)
+        OCR_CACHE_PRUNE_INTERVAL: seconds between deletes of expired disk rows (default 300)
+        """
+        return cls(
+            max_entries=int(os.environ.get("OCR_CACHE_MAX_ENTRIES", "256")),
+            ttl_seconds=float(os.environ.get("OCR_CACHE_TTL", "86400")),
+            db_path=os.environ.get("OCR_CACHE_DB") or None,
+            prune_interval=float(os.environ.get("OCR_CACHE_PRUNE_INTERVAL", "300")),
+        )
+
+    def _init_db(self):
+        """Open the SQLite disk tier and create the table if needed."""
+        self._db = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+        # WAL lets readers in other workers proceed while one worker writes
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS ocr_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._db.commit()
+        self._prune(time.time())
+        logger.info(f"OCR cache disk tier enabled at {self.db_path}")
+
+    @staticmethod
+    def make_key(data: bytes, params: Dict[str, Any]) -> str:
+        """
+        Build a cache key from PIPELINE_VERSION, the upload bytes and the
+        preprocessing parameters.
+
+        Args:
+            data (bytes): Raw uploaded file content
+            params (Dict[str, Any]): Parameters that influence the OCR output
+
+        Returns:
+            str: Key identifying this (pipeline, content, parameters) triple
+        """
+        content_hash = hashlib.sha256(data).hexdigest()
+        params_hash = hashlib.sha256(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()
+        return f"v{PIPELINE_VERSION}:{content_hash}:{params_hash[:16]}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached result, checking memory first and then disk.
+
+        Returns:
+            Optional[Dict[str, Any]]: A copy of the cached value, or None on miss
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._stats["hits"] += 1
+                    self._stats["memory_hits"] += 1
+                    return copy.deepcopy(value)
+                del self._memory[key]
+                self._stats["expired"] += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM ocr_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    if row[1] > now:
+                        value = json.loads(row[0])
+                        self._store_memory(key, value, row[1])
+                        self._stats["hits"] += 1
+                        self._stats["disk_hits"] += 1
+                        return copy.deepcopy(value)
+                    deleted = self._db.execute("DELETE FROM ocr_cache WHERE key = ?", (key,)).rowcount
+                    self._db.commit()
+                    self._disk_entries = max(0, self._disk_entries - deleted)
+                    self._stats["expired"] += 1
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value: Dict[str, Any]):
+        """
+        Store a result in both tiers.
+
+        Args:
+            key (str): Key from make_key()
+            value (Dict[str, Any]): JSON-serialisable result
+        """
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        stored = copy.deepcopy(value)
+        with self._lock:
+            self._store_memory(key, stored, expires_at)
+            self._stats["sets"] += 1
+            if self._db is not None:
+                try:
+                    if now >= self._next_prune:
+                        self._prune(now)
+                    encoded = json.dumps(stored)
+                    updated = self._db.execute(
+                        "UPDATE ocr_cache SET value = ?, expires_at = ? WHERE key = ?", (encoded, expires_at, key)
+                    ).rowcount
+                    if not updated:
+                        self._db.execute(
+                            "INSERT OR REPLACE INTO ocr_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                            (key, encoded, expires_at)
+                        )
+                        self._disk_entries += 1
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    # The disk tier is best-effort; a failed write must not fail the request
+                    logger.warning(f"OCR cache disk write failed: {e}")
+
+    def _prune(self, now: float):
+        """
+        Delete expired rows from the disk tier and recount it. Rows keyed by an
+        older PIPELINE_VERSION are never hit again and go once they expire.
+        Caller holds the lock (or is __init__).
+        """
+        pruned = self._db.execute("DELETE FROM ocr_cache WHERE expires_at <= ?", (now,)).rowcount
+        self._db.commit()
+        self._disk_entries = self._db.execute("SELECT COUNT(*) FROM ocr_cache").fetchone()[0]
+        self._next_prune = now + self.prune_interval
+        self._stats["pruned"] += pruned
+
+    def _store_memory(self, key: str, value: Dict[str, Any], expires_at: float):
+        """Insert into the LRU tier, evicting the oldest entries when full. Caller holds the lock."""
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def clear(self):
+        """Drop every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM ocr_cache")
+                self._db.commit()
+                self._disk_entries = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return hit/miss counters and tier sizes.
+
+        Returns:
+            Dict[str, Any]: Counter snapshot suitable for a JSON response
+        """
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["memory_entries"] = len(self._memory)
+            snapshot["max_entries"] = self.max_entries
+            snapshot["ttl_seconds"] = self.ttl_seconds
+            snapshot["disk_enabled"] = self._db is not None
+            if self._db is not None:
+                snapshot["disk_entries"] = self._disk_entries
+        lookups = snapshot["hits"] + snapshot["misses"]
+        snapshot["hit_ratio"] = snapshot["hits"] / lookups if lookups else 0.0
+        return snapshot
+
+    def close(self):
+        """Close the disk tier connection."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,444 @@
+import os
+import time
+import json
+import random
+import asyncio
+import logging
+import mimetypes
+import aiohttp
+from collections import deque
+from typing import Dict, Any, Optional, Tuple
+
+from resilience import TokenBucket, CircuitBreaker, RateLimitExceeded
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: rate limiting and transient server failures
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class OCRSpaceError(Exception):
+    """Raised when OCR.space cannot produce a usable response."""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class OCRSpaceUnavailable(OCRSpaceError):
+    """Refused without calling OCR.space: the circuit is open or the rate limit queue is too long."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _provider_fault(status: int, body: str) -> bool:
+    """Whether a response means the provider itself is failing (feeds the circuit breaker)."""
+    if status >= 500:
+        return True
+    if status != 200:
+        # 4xx is about the request (429 is handled by the rate limiter)
+        return False
+    # OCR.space reports overload as a 200 with an E5xx processing error
+    return '"E5' in body and '"IsErroredOnProcessing":true' in body.replace(" ", "")
+
+
+def _multipart(payload: Dict[str, Any]) -> aiohttp.FormData:
+    """
+    multipart/form-data body for one attempt.
+
+    Binary values become file parts streamed from the buffer as-is (no
+    base64, no str copy); the filename and content type follow the
+    payload's 'filetype'. A FormData can only be sent once, so every
+    attempt (retries and hedges) gets its own.
+    """
+    form = aiohttp.FormData()
+    for name, value in payload.items():
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            filename = f"{name}.{payload.get('filetype', 'bin').lower()}"
+            form.add_field(name, value, filename=filename,
+                           content_type=mimetypes.guess_type(filename)[0] or "application/octet-stream")
+        else:
+            form.add_field(name, str(value))
+    return form
+
+
+class OCRSpaceClient:
+    """
+    Long-lived async HTTP client for the OCR.space API.
+
+    One aiohttp session with a keep-alive connection pool is shared by all
+    requests, so TCP/TLS setup is paid once per connection instead of once
+    per upload. There is a single retry policy (exponential backoff with
+    full jitter, honouring Retry-After) and an overall per-request deadline
+    that bounds the total time spent across all attempts.
+
+    Every attempt, retries included, goes through a shared token bucket
+    sized to the account quota and a circuit breaker, so an outage or a
+    rate-limit storm is answered immediately with OCRSpaceUnavailable
+    instead of multiplying requests and tying up workers in backoff. An
+    optional hedge sends a second copy of a slow request and keeps
+    whichever answers first.
+
+    Payloads are sent as multipart/form-data; image bytes go as a binary
+    file part. Each response carries a 'transport' entry with the bytes
+    sent and received for that request across all attempts.
+    """
+
+    def __init__(
+        self,
+        api_url: str,
+        max_connections: int = 32,
+        max_attempts: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 30.0,
+        deadline: float = 60.0,
+        limiter: Optional[TokenBucket] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        max_queue_wait: float = 10.0,
+        hedge_after: Optional[float] = 0.0,
+        hedge_quantile: float = 0.95,
+    ):
+        self.api_url = api_url
+        self.max_connections = max_connections
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.deadline = deadline
+        self.limiter = limiter
+        self.breaker = breaker or CircuitBreaker()
+        # Longest an attempt may queue for a rate limit token
+        self.max_queue_wait = max_queue_wait
+        # Hedge after a fixed delay in seconds (<= 0 disables hedging), or
+        # None to hedge after the recent latency quantile
+        self.hedge_after = hedge_after
+        self.hedge_quantile = hedge_quantile
+        self._latencies: deque = deque(maxlen=200)
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._stats = {
+            "requests": 0,
+            "attempts": 0,
+            "retries": 0,
+            "failures": 0,
+            "deadline_exceeded": 0,
+            "circuit_rejected": 0,
+            "rate_limited": 0,
+            "hedges": 0,
+            "hedges_won": 0,
+            "bytes_sent": 0,
+            "bytes_received": 0,
+        }
+
+    @classmethod
+    def from_env(cls, api_url: str) -> "OCRSpaceClient":
+        """
+        Build a client from OCR_HTTP_* environment variables.
+
+        OCR_HTTP_MAX_CONNECTIONS: keep-alive pool size (default 32)
+        OCR_HTTP_MAX_ATTEMPTS: attempts per request including the first (default 3)
+        OCR_HTTP_DEADLINE: overall seconds allowed per request (default 60)
+        OCR_HTTP_CONNECT_TIMEOUT / OCR_HTTP_READ_TIMEOUT: per-attempt timeouts
+        OCR_HTTP_RATE / OCR_HTTP_BURST: token bucket in requests per second and
+            burst size, matching the account quota (default 5/s, burst 10;
+            a rate of 0 disables the limiter)
+        OCR_HTTP_PROCESSES: processes calling OCR.space with the same key
+            (uvicorn workers plus `python job_queue.py` workers, default 1).
+            The bucket lives in each process, so each one gets this share
+            of OCR_HTTP_RATE and OCR_HTTP_BURST and together they stay
+            within the quota
+        OCR_HTTP_MAX_QUEUE_WAIT: seconds an attempt may wait for a token
+            before the request is refused (default 10)
+        OCR_CIRCUIT_FAILURE_RATE / OCR_CIRCUIT_MIN_CALLS / OCR_CIRCUIT_WINDOW /
+            OCR_CIRCUIT_COOLDOWN: open the circuit when this share of at
+            least MIN_CALLS attempts in the last WINDOW seconds failed, and
+            fail fast for COOLDOWN seconds (defaults 0.5, 10, 30, 30)
+        OCR_HTTP_HEDGE_AFTER: hedging; "off" (default), seconds, or "auto" for
+            the 95th percentile of recent attempt latencies
+        """
+        processes = max(1, int(os.environ.get("OCR_HTTP_PROCESSES", "1")))
+        rate = float(os.environ.get("OCR_HTTP_RATE", "5")) / processes
+        burst = float(os.environ.get("OCR_HTTP_BURST", "10")) / processes
+        hedge = os.environ.get("OCR_HTTP_HEDGE_AFTER", "off")
+        return cls(
+            api_url,
+            max_connections=int(os.environ.get("OCR_HTTP_MAX_CONNECTIONS", "32")),
+            max_attempts=int(os.environ.get("OCR_HTTP_MAX_ATTEMPTS", "3")),
+            deadline=float(os.environ.get("OCR_HTTP_DEADLINE", "60")),
+            connect_timeout=float(os.environ.get("OCR_HTTP_CONNECT_TIMEOUT", "10")),
+            read_timeout=float(os.environ.get("OCR_HTTP_READ_TIMEOUT", "30")),
+            limiter=TokenBucket(rate, burst) if rate > 0 else None,
+            breaker=CircuitBreaker(
+                failure_threshold=float(os.environ.get("OCR_CIRCUIT_FAILURE_RATE", "0.5")),
+                min_calls=int(os.environ.get("OCR_CIRCUIT_MIN_CALLS", "10")),
+                window=float(os.environ.get("OCR_CIRCUIT_WINDOW", "30")),
+                cooldown=float(os.environ.get("OCR_CIRCUIT_COOLDOWN", "30")),
+            ),
+            max_queue_wait=float(os.environ.get("OCR_HTTP_MAX_QUEUE_WAIT", "10")),
+            hedge_after=None if hedge == "auto" else (0.0 if hedge == "off" else float(hedge)),
+        )
+
+    @property
+    def started(self) -> bool:
+        return self._session is not None and not self._session.closed
+
+    async def start(self):
+        """Open the pooled session. Must be called from the event loop that will use it."""
+        if self.started:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=self.max_connections,
+            keepalive_timeout=60,
+            ttl_dns_cache=300,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=None,
+            sock_connect=self.connect_timeout,
+            sock_read=self.read_timeout,
+        )
+        self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        logger.info(f"OCR.space client started (pool size {self.max_connections})")
+
+    async def warm(self) -> Dict[str, Any]:
+        """
+        Open one pooled connection to the API host ahead of the first request,
+        paying DNS, TCP and TLS set-up now. Any HTTP status counts as success;
+        connection errors are returned, not raised.
+        """
+        await self.start()
+        started = time.monotonic()
+        try:
+            async with self._session.head(self.api_url, allow_redirects=False) as response:
+                status = response.status
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"OCR.space connection warm-up failed: {e!r}")
+            return {"ok": False, "error": repr(e), "seconds": round(time.monotonic() - started, 4)}
+        return {"ok": True, "status": status, "seconds": round(time.monotonic() - started, 4)}
+
+    async def close(self):
+        """Close the session and its pooled connections."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+            logger.info("OCR.space client closed")
+
+    async def __aenter__(self) -> "OCRSpaceClient":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Full-jitter exponential backoff, floored by the server's Retry-After hint."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    async def parse(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        POST a form payload to OCR.space and return the parsed JSON body.
+
+        Args:
+            payload (Dict[str, Any]): Form fields for the parse/image endpoint;
+                bytes values are sent as file parts
+
+        Returns:
+            Dict[str, Any]: Parsed OCR.space response, plus 'transport':
+                bytes_sent / bytes_received / sends for this request
+
+        Raises:
+            OCRSpaceError: On a non-retryable error, exhausted retries or an
+                exceeded deadline
+        """
+        if not self.started:
+            raise OCRSpaceError("OCR.space client is not started")
+
+        self._stats["requests"] += 1
+        deadline_at = time.monotonic() + self.deadline
+        try:
+            return await asyncio.wait_for(self._parse_with_retries(payload, deadline_at), timeout=self.deadline)
+        except asyncio.TimeoutError:
+            self._stats["deadline_exceeded"] += 1
+            self._stats["failures"] += 1
+            raise OCRSpaceError(f"OCR.space request exceeded its {self.deadline:.0f}s deadline")
+        except OCRSpaceError:
+            self._stats["failures"] += 1
+            raise
+
+    async def _admit(self, deadline_at: float):
+        """Pass the circuit breaker and take a rate limit token for one attempt."""
+        if not self.breaker.allow():
+            self._stats["circuit_rejected"] += 1
+            retry_after = self.breaker.retry_after()
+            raise OCRSpaceUnavailable(
+                f"OCR.space is failing, not sending requests for the next {retry_after:.0f}s", max(1.0, retry_after)
+            )
+        if self.limiter is None:
+            return
+        try:
+            await self.limiter.acquire(min(self.max_queue_wait, max(0.0, deadline_at - time.monotonic())))
+        except RateLimitExceeded as e:
+            # The token was never used: give the half-open probe slot back
+            self.breaker.release()
+            self._stats["rate_limited"] += 1
+            raise OCRSpaceUnavailable(f"OCR.space rate limit reached, next slot in {e.wait:.0f}s", max(1.0, e.wait))
+        except BaseException:
+            self.breaker.release()
+            raise
+
+    async def _send(self, payload: Dict[str, Any], transfer: Dict[str, int]) -> Tuple[int, str, Optional[str]]:
+        """
+        One HTTP attempt, already admitted. Feeds the breaker, the limiter
+        and the latency window, and adds its bytes to `transfer`.
+
+        Returns:
+            Tuple[int, str, Optional[str]]: (status, body, Retry-After header)
+        """
+        started = time.monotonic()
+        data = _multipart(payload)()
+        transfer["sends"] += 1
+        transfer["bytes_sent"] += data.size
+        self._stats["bytes_sent"] += data.size
+        try:
+            async with self._session.post(self.api_url, data=data) as response:
+                raw = await response.read()
+                status, retry_after = response.status, response.headers.get("Retry-After")
+                body = raw.decode(response.get_encoding(), errors="replace")
+            transfer["bytes_received"] += len(raw)
+            self._stats["bytes_received"] += len(raw)
+        except (aiohttp.ClientConnectionError, aiohttp.ServerTimeoutError, asyncio.TimeoutError):
+            self.breaker.record(False)
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+
+        self.breaker.record(not _provider_fault(status, body))
+        if self.limiter is not None:
+            if status == 429:
+                self.limiter.throttle(float(retry_after) if retry_after and retry_after.isdigit() else None)
+            elif status == 200:
+                self.limiter.recover()
+        if status == 200:
+            self._latencies.append(time.monotonic() - started)
+        return status, body, retry_after
+
+    def _hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, None when hedging is off or there is no latency history yet."""
+        if self.hedge_after is not None:
+            return self.hedge_after if self.hedge_after > 0 else None
+        if len(self._latencies) < 20:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(self.hedge_quantile * len(ordered)))]
+
+    async def _attempt(self, payload: Dict[str, Any], deadline_at: float,
+                       transfer: Dict[str, int]) -> Tuple[int, str, Optional[str]]:
+        """
+        One attempt, hedged: if it has not answered after the hedge delay, a
+        second copy is sent (only when a token is free right away and the
+        circuit is closed) and the first 200 wins; the other is cancelled.
+        """
+        await self._admit(deadline_at)
+        primary = asyncio.create_task(self._send(payload, transfer))
+        delay = self._hedge_delay()
+        if delay is None:
+            return await primary
+
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+        except asyncio.CancelledError:
+            primary.cancel()
+            raise
+        if done or self.breaker.state != CircuitBreaker.CLOSED:
+            return await primary
+        if self.limiter is not None and not self.limiter.try_acquire():
+            return await primary
+        if not self.breaker.allow():
+            return await primary
+
+        self._stats["hedges"] += 1
+        logger.info(f"No OCR.space answer after {delay:.2f}s, sending a hedged request")
+        hedge = asyncio.create_task(self._send(payload, transfer))
+        pending = {primary, hedge}
+        fallback = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result()[0] == 200:
+                        if task is hedge:
+                            self._stats["hedges_won"] += 1
+                        return task.result()
+                    fallback = fallback or task
+            # Neither copy succeeded: report the first failure
+            return fallback.result()
+        finally:
+            for task in (primary, hedge):
+                task.cancel()
+
+    async def _parse_with_retries(self, payload: Dict[str, Any], deadline_at: float) -> Dict[str, Any]:
+        last_error = None
+        transfer = {"bytes_sent": 0, "bytes_received": 0, "sends": 0}
+        for attempt in range(self.max_attempts):
+            self._stats["attempts"] += 1
+            retry_after = None
+            try:
+                logger.info(f"Making API request to OCR.space (attempt {attempt + 1}/{self.max_attempts})...")
+                status, body, retry_header = await self._attempt(payload, deadline_at, transfer)
+                logger.info(f"API response status: {status}")
+
+                if status == 200:
+                    logger.info(f"OCR.space request used {transfer['bytes_sent']} bytes up, "
+                                f"{transfer['bytes_received']} down in {transfer['sends']} send(s)")
+                    try:
+                        parsed = json.loads(body)
+                    except json.JSONDecodeError as e:
+                        logger.error(f"Failed to parse API response: {body[:500]}")
+                        raise OCRSpaceError(f"Failed to parse API response as JSON: {str(e)}", status)
+                    if isinstance(parsed, dict):
+                        parsed["transport"] = transfer
+                    return parsed
+
+                error_msg = f"API request failed with status code: {status}"
+                try:
+                    error_data = json.loads(body)
+                    if isinstance(error_data, dict) and 'ErrorMessage' in error_data:
+                        error_msg += f"\nError: {error_data['ErrorMessage']}"
+                except json.JSONDecodeError:
+                    pass
+                logger.error(f"API Error Response: {body[:500]}")
+
+                if status not in RETRYABLE_STATUSES:
+                    raise OCRSpaceError(error_msg, status)
+                last_error = OCRSpaceError(error_msg, status)
+                if retry_header and retry_header.isdigit():
+                    retry_after = float(retry_header)
+
+            except (aiohttp.ClientConnectionError, aiohttp.ServerTimeoutError, asyncio.TimeoutError) as e:
+                logger.warning(f"API request attempt {attempt + 1} failed: {str(e)}")
+                last_error = OCRSpaceError(f"OCR.space API request failed: {str(e)}")
+
+            if attempt == self.max_attempts - 1:
+                break
+            delay = self._backoff(attempt, retry_after)
+            if time.monotonic() + delay >= deadline_at:
+                break
+            self._stats["retries"] += 1
+            logger.info(f"Retrying in {delay:.2f} seconds...")
+            await asyncio.sleep(delay)
+
+        logger.error("All API attempts failed. OCR.space API is required for processing.")
+        raise last_error or OCRSpaceError("OCR.space API request failed after all retries.")
+
+    def stats(self) -> Dict[str, Any]:
+        """Request, attempt, retry, hedge and transferred byte counters."""
+        return dict(self._stats)
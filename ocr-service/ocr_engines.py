@@ -0,0 +1,308 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Dict, Any, Optional, Callable, List
+
+from ocr_client import OCRSpaceClient, OCRSpaceError, OCRSpaceUnavailable
+from metrics import ENGINE_SECONDS
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Routing policies understood by EngineRouter
+POLICIES = ("remote", "local", "local_first", "remote_first", "race")
+
+
+class OCREngineError(Exception):
+    """Raised when an engine fails to recognise an image."""
+
+
+class EngineUnavailableError(OCREngineError):
+    """Raised without trying when an engine is shedding load; carries a Retry-After hint in seconds."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class OCREngine:
+    """
+    Base class for OCR backends.
+
+    recognize() takes a JPEG buffer and returns a response in the OCR.space
+    JSON shape (ParsedResults / IsErroredOnProcessing / ...), which is what
+    OCRService._process_result already understands. Latency and throughput
+    are tracked per engine.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self._started = time.monotonic()
+        self._stats = {
+            "calls": 0,
+            "failures": 0,
+            "unavailable": 0,
+            "total_seconds": 0.0,
+            "last_ms": 0.0,
+        }
+
+    async def _recognize(self, buffer: bytes) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    async def recognize(self, buffer: bytes) -> Dict[str, Any]:
+        """
+        Recognise text in a JPEG image.
+
+        Args:
+            buffer (bytes): JPEG-encoded image
+
+        Returns:
+            Dict[str, Any]: OCR.space-shaped response with an added 'engine' key
+
+        Raises:
+            OCREngineError: If the engine fails
+        """
+        started = time.monotonic()
+        outcome = "error"
+        try:
+            result = await self._recognize(buffer)
+            outcome = "ok"
+        except EngineUnavailableError:
+            outcome = "unavailable"
+            self._stats["unavailable"] += 1
+            raise
+        except OCREngineError:
+            self._stats["failures"] += 1
+            raise
+        except asyncio.CancelledError:
+            # Lost a race or the client went away
+            outcome = "cancelled"
+            raise
+        except Exception as e:
+            self._stats["failures"] += 1
+            raise OCREngineError(f"{self.name} engine failed: {str(e)}")
+        finally:
+            elapsed = time.monotonic() - started
+            ENGINE_SECONDS.observe(elapsed, engine=self.name, outcome=outcome)
+            self._stats["calls"] += 1
+            self._stats["total_seconds"] += elapsed
+            self._stats["last_ms"] = round(elapsed * 1000, 1)
+        result["engine"] = self.name
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-engine call counts, latency and throughput."""
+        snapshot = dict(self._stats)
+        calls = snapshot["calls"]
+        uptime = time.monotonic() - self._started
+        snapshot["avg_ms"] = round(snapshot["total_seconds"] / calls * 1000, 1) if calls else 0.0
+        snapshot["throughput_per_second"] = round(calls / uptime, 4) if uptime > 0 else 0.0
+        snapshot["total_seconds"] = round(snapshot["total_seconds"], 3)
+        return snapshot
+
+
+class OCRSpaceEngine(OCREngine):
+    """Remote OCR.space API, through the shared pooled client."""
+
+    name = "ocrspace"
+
+    def __init__(self, client: OCRSpaceClient, build_payload: Callable[[bytes], Dict[str, Any]]):
+        super().__init__()
+        self.client = client
+        self.build_payload = build_payload
+
+    async def _recognize(self, buffer: bytes) -> Dict[str, Any]:
+        try:
+            return await self.client.parse(self.build_payload(buffer))
+        except OCRSpaceUnavailable as e:
+            raise EngineUnavailableError(str(e), e.retry_after)
+        except OCRSpaceError as e:
+            raise OCREngineError(str(e))
+
+    def stats(self) -> Dict[str, Any]:
+        """Engine stats plus the client's circuit breaker and rate limiter state."""
+        snapshot = super().stats()
+        snapshot["circuit"] = self.client.breaker.stats()
+        if self.client.limiter is not None:
+            snapshot["rate_limiter"] = self.client.limiter.stats()
+        return snapshot
+
+
+class TesseractEngine(OCREngine):
+    """
+    Local Tesseract, run as a subprocess (the binary ships in the image).
+
+    The JPEG is piped on stdin and text read from stdout, so nothing touches
+    disk and the event loop is never blocked. A semaphore caps concurrent
+    tesseract processes at the number of CPUs.
+    """
+
+    name = "tesseract"
+
+    def __init__(self, binary: str = "tesseract", language: str = "eng", psm: int = 3,
+                 concurrency: Optional[int] = None, timeout: float = 60.0):
+        super().__init__()
+        self.binary = binary
+        self.language = language
+        self.psm = psm
+        self.timeout = timeout
+        self.concurrency = concurrency or os.cpu_count() or 1
+        self._semaphore = None
+
+    async def _recognize(self, buffer: bytes) -> Dict[str, Any]:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            started = time.monotonic()
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    self.binary, "stdin", "stdout", "-l", self.language, "--psm", str(self.psm),
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    # Each process is single-threaded; parallelism comes from the semaphore
+                    env={**os.environ, "OMP_THREAD_LIMIT": "1"},
+                )
+            except FileNotFoundError:
+                raise OCREngineError(f"Tesseract binary not found: {self.binary}")
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(buffer), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                raise OCREngineError(f"Tesseract timed out after {self.timeout:.0f}s")
+
+            if process.returncode != 0:
+                raise OCREngineError(f"Tesseract exited with {process.returncode}: {stderr.decode('utf-8', 'replace')[:300]}")
+
+            text = stdout.decode('utf-8', 'replace')
+            return {
+                "ParsedResults": [{"ParsedText": text}],
+                "OCRExitCode": 1,
+                "IsErroredOnProcessing": False,
+                "ProcessingTimeInMilliseconds": str(int((time.monotonic() - started) * 1000)),
+            }
+
+
+def _has_text(result: Dict[str, Any]) -> bool:
+    """Whether a response contains usable text."""
+    if result.get("IsErroredOnProcessing"):
+        return False
+    return any(
+        (r.get("ParsedText") or "").strip()
+        for r in result.get("ParsedResults") or [] if isinstance(r, dict)
+    )
+
+
+class EngineRouter:
+    """
+    Chooses an OCR engine per request according to a policy.
+
+    remote        OCR.space only (the historical behaviour)
+    local         Tesseract only; no network, no quota
+    local_first   Tesseract, falling back to OCR.space on failure or empty text
+    remote_first  OCR.space, falling back to Tesseract
+    race          both at once, first usable answer wins and the other is cancelled
+
+    With fallback_when_unavailable, an engine that refuses work (open
+    circuit, rate limit queue full) is replaced by the local engine even
+    under the remote policy. Off by default: Tesseract text differs from
+    OCR.space text, so the document hash of the same card would too.
+    """
+
+    def __init__(self, remote: Optional[OCREngine], local: Optional[OCREngine], default_policy: str = "remote",
+                 fallback_when_unavailable: bool = False):
+        if default_policy not in POLICIES:
+            raise ValueError(f"Unknown OCR engine policy: {default_policy}. Expected one of {POLICIES}")
+        self.remote = remote
+        self.local = local
+        self.default_policy = default_policy
+        self.fallback_when_unavailable = fallback_when_unavailable
+
+    def _engines_for(self, policy: str) -> List[OCREngine]:
+        order = {
+            "remote": [self.remote],
+            "local": [self.local],
+            "local_first": [self.local, self.remote],
+            "remote_first": [self.remote, self.local],
+            "race": [self.local, self.remote],
+        }[policy]
+        engines = [engine for engine in order if engine is not None]
+        if not engines:
+            raise OCREngineError(f"No OCR engine available for policy '{policy}'")
+        return engines
+
+    async def recognize(self, buffer: bytes, policy: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Recognise text with the engines selected by the policy.
+
+        Args:
+            buffer (bytes): JPEG-encoded image
+            policy (Optional[str]): Per-request policy, defaults to default_policy
+
+        Returns:
+            Dict[str, Any]: OCR.space-shaped response from the winning engine
+        """
+        policy = policy or self.default_policy
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown OCR engine policy: {policy}. Expected one of {POLICIES}")
+        engines = self._engines_for(policy)
+        if policy == "race" and len(engines) > 1:
+            return await self._race(engines, buffer)
+
+        last_error = None
+        empty_result = None
+        for engine in engines:
+            try:
+                result = await engine.recognize(buffer)
+            except OCREngineError as e:
+                logger.warning(str(e))
+                last_error = e
+                if (isinstance(e, EngineUnavailableError) and self.fallback_when_unavailable
+                        and self.local is not None and self.local not in engines):
+                    logger.info(f"{engine.name} unavailable, falling back to {self.local.name}")
+                    # Picked up by this loop on its next iteration
+                    engines.append(self.local)
+                continue
+            # Fall through to the next engine only when this one found nothing
+            if _has_text(result):
+                return result
+            logger.info(f"{engine.name} returned no text, falling back")
+            empty_result = empty_result or result
+        if empty_result is not None:
+            return empty_result
+        raise last_error
+
+    async def _race(self, engines: List[OCREngine], buffer: bytes) -> Dict[str, Any]:
+        tasks = [asyncio.create_task(engine.recognize(buffer)) for engine in engines]
+        fallback = None
+        last_error = None
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    result = await next_done
+                except OCREngineError as e:
+                    last_error = e
+                    continue
+                if _has_text(result):
+                    return result
+                fallback = fallback or result
+        finally:
+            for task in tasks:
+                task.cancel()
+        if fallback is not None:
+            return fallback
+        raise last_error
+
+    def stats(self) -> Dict[str, Any]:
+        """Stats for every configured engine."""
+        return {
+            "default_policy": self.default_policy,
+            "fallback_when_unavailable": self.fallback_when_unavailable,
+            "engines": {
+                engine.name: engine.stats()
+                for engine in (self.remote, self.local) if engine is not None
+            },
+        }
@@ -1,25 +1,46 @@
+from __future__ import annotations
+
 import os
-import requests
 import json
-from typing import Dict, Any, Optional, Tuple
-import cv2
-import base64
-from PIL import Image
+from typing import Dict, Any, Optional, Tuple, Union, List, Iterator
 import io
 import re
-import numpy as np
 import hashlib
-from pdf2image import convert_from_path
 import logging
+import asyncio
+import math
 import time
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-import imagehash
-import gc
+import threading
+from lazy_imports import lazy_module, load_all
+from aadhaar_fields import FIELDS, extract_fields
+from ocr_cache import OCRCache
+from metrics import timed_stage, record_preprocess, record_transport, peak_rss_bytes
+from ocr_client import OCRSpaceClient
+from ocr_engines import EngineRouter, OCRSpaceEngine, TesseractEngine
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Heavy imaging stack (~150ms of imports): loaded on first use or by the
+# background warm-up, so the server starts accepting connections sooner
+np = lazy_module("numpy")
+Image = lazy_module("PIL.Image")
+cv2 = lazy_module("cv2")
+pdf2image = lazy_module("pdf2image")
+image_hashes = lazy_module("image_hashes")
+card_detect = lazy_module("card_detect")
+
+# Anything exposing the buffer protocol: bytes, bytearray, memoryview, mmap...
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+def is_pdf_upload(filename: Optional[str], content_type: Optional[str] = None) -> bool:
+    """Decide whether an upload should go through the PDF rasterizer."""
+    if content_type == "application/pdf":
+        return True
+    return bool(filename) and filename.lower().endswith('.pdf')
+
+
 class OCRService:
     # Mapping of class IDs to field names
     CLASS_MAPPING = {
@@ -30,28 +51,55 @@ class OCRService:
         4: "address"
     }
 
-    def __init__(self):
+    def __init__(self, cache: Optional[OCRCache] = None):
         self.api_key = os.environ.get("OCR_API_KEY")
-        self.api_url = "https://api.ocr.space/parse/image"
+        # Overridable to point at a regional endpoint or the local stand-in (benchmarks/fake_ocrspace.py)
+        self.api_url = os.environ.get("OCR_API_URL", "https://api.ocr.space/parse/image")
         self.debug = True
+
+        # Preprocessing parameters (also part of the cache key)
+        self.pdf_dpi = 150
+        self.max_image_dimension = 2000
+        self.max_dim = 1500
+        self.jpeg_quality = 70
+        # Provider upload limit; below min_jpeg_quality the encoder downscales instead
+        self.max_size_kb = int(os.environ.get("OCR_PROVIDER_MAX_KB", "1024"))
+        self.min_jpeg_quality = 40
+        # Crop photos to the detected card before p-hash and encode (overridable per request)
+        self.crop_card = os.environ.get("OCR_CARD_CROP", "0") == "1"
+        # Upper bound on pages OCR'd in multi-page mode
+        self.pdf_max_pages = int(os.environ.get("OCR_PDF_MAX_PAGES", "50"))
+
+        # Content-addressed result cache (in-process LRU + optional SQLite tier)
+        self.cache = cache if cache is not None else OCRCache.from_env()
         
-        # Validate API key
-        if not self.api_key:
+        # Default engine routing policy, see EngineRouter
+        self.engine_policy = os.environ.get("OCR_ENGINE_POLICY", "remote")
+
+        # Validate API key (not needed when running fully on local Tesseract)
+        if not self.api_key and self.engine_policy != "local":
             logger.error("OCR_API_KEY environment variable not set. OCR.space API key is required.")
             raise ValueError("OCR_API_KEY environment variable is required for OCR processing.")
-        else:
+        elif self.api_key:
             logger.info(f"OCR Service initialized with API key: {self.api_key[:8]}...")
         
-        # Create a session with retry strategy
-        self.session = requests.Session()
-        retry_strategy = Retry(
-            total=3,
-            backoff_factor=1,
-            status_forcelist=[429, 500, 502, 503, 504],
+        # Long-lived pooled HTTP client; started and closed by the FastAPI lifespan
+        self.client = OCRSpaceClient.from_env(self.api_url)
+        self.engines = self._build_router(self.client)
+        # Event loop thread owning self.client for the synchronous API (created on first use)
+        self._sync_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sync_lock = threading.Lock()
+
+    def _build_router(self, client: OCRSpaceClient) -> EngineRouter:
+        """Wire the OCR.space and Tesseract engines behind the routing policy."""
+        remote = OCRSpaceEngine(client, self.build_payload) if self.api_key else None
+        local = TesseractEngine(
+            binary=os.environ.get("OCR_TESSERACT_BIN", "tesseract"),
+            language='eng',
         )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        self.session.mount("http://", adapter)
-        self.session.mount("https://", adapter)
+        # OCR_ENGINE_FALLBACK=local: use Tesseract while OCR.space is refusing work
+        fallback = os.environ.get("OCR_ENGINE_FALLBACK", "none") == "local"
+        return EngineRouter(remote, local, self.engine_policy, fallback_when_unavailable=fallback)
 
     def _generate_hash(self, text: str) -> str:
         """
@@ -93,50 +141,11 @@ class OCRService:
         # Convert to bytes
         return bytes.fromhex(hex_hash)
 
-    def _extract_fields(self, text: str) -> Tuple[str, str, str]:
-        """
-        Extract name, contact number, and residence from OCR text.
-        
-        Args:
-            text (str): Raw OCR text
-            
-        Returns:
-            Tuple[str, str, str]: (name, contact_number, residence)
-        """
-        # Initialize fields
-        name = ""
-        contact_number = ""
-        residence = ""
-        
-        # Split text into lines
-        lines = text.split('\n')
-        
-        # Extract name (usually after "GOVERNMENT OF INDIA")
-        for i, line in enumerate(lines):
-            if "GOVERNMENT OF INDIA" in line and i + 1 < len(lines):
-                name = lines[i + 1].strip()
-                break
-        
-        # Extract contact number (look for "Mobile No:" or similar)
-        for line in lines:
-            if "Mobile No:" in line:
-                contact_number = re.search(r'\d{10}', line)
-                if contact_number:
-                    contact_number = contact_number.group()
-                break
-        
-        # Extract residence (usually contains address)
-        for line in lines:
-            if any(keyword in line.lower() for keyword in ['address', 'residence', 'location']):
-                residence = line.strip()
-                break
-        
-        return name, contact_number, residence
-
     def prepare_for_smart_contract(self, ocr_result: Dict[str, Any]) -> Dict[str, Any]:
         """
         Prepare OCR result for smart contract integration.
-        Now only extracts all text and hashes it, does not parse specific fields.
+        The document hash covers the whole text; name, contact number and
+        residence are the fields extracted from it (empty when not found).
         """
         if not ocr_result.get('debug_info', {}).get('raw_text'):
             raise ValueError("No text content found in OCR result")
@@ -144,19 +153,102 @@ class OCRService:
         # Generate hash and convert to bytes32
         hex_hash = self._generate_hash(raw_text)
         bytes32_hash = self._convert_to_bytes32(hex_hash)
-        return {
+        # Multi-page documents and results cached before extraction carry no fields yet
+        fields = ocr_result.get('fields') or extract_fields(raw_text)
+        prepared = {
             'documentHash': '0x' + bytes32_hash.hex(),
-            'name': '',
-            'contactNumber': '',
-            'residence': '',
+            'name': fields['name'] or '',
+            'contactNumber': fields['mobile'] or '',
+            'residence': fields['address'] or '',
             'rawText': raw_text,
             'hexHash': hex_hash,
             'phash': ocr_result.get('phash', None)
         }
+        # Multi-page PDFs also carry per-page hashes
+        if 'pages' in ocr_result:
+            prepared['pages'] = [
+                {'page': page['page'], 'hexHash': page['document_hash'], 'phash': page['phash']}
+                for page in ocr_result['pages']
+            ]
+        return prepared
+
+    def _cache_params(self, is_pdf: bool, all_pages: bool = False, engine_policy: Optional[str] = None,
+                      crop_card: Optional[bool] = None) -> Dict[str, Any]:
+        """Parameters that change the OCR output for the same input bytes."""
+        params = self.preprocess_params(crop_card)
+        params.update({
+            'is_pdf': is_pdf,
+            'all_pages': all_pages,
+            'engine_policy': engine_policy or self.engine_policy,
+            'language': 'eng',
+            'ocr_engine': '2',
+        })
+        return params
+
+    def request_key(self, data: BytesLike, is_pdf: bool, all_pages: bool = False,
+                    engine_policy: Optional[str] = None, crop_card: Optional[bool] = None) -> str:
+        """Content-addressed key of an OCR request: same bytes and parameters, same key."""
+        return OCRCache.make_key(data, self._cache_params(is_pdf, all_pages, engine_policy, crop_card))
+
+    def cache_lookup(self, data: BytesLike, is_pdf: bool, all_pages: bool = False,
+                     engine_policy: Optional[str] = None,
+                     crop_card: Optional[bool] = None) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Compute the cache key for an upload and look it up.
+
+        Args:
+            data (BytesLike): Raw uploaded file content
+            is_pdf (bool): Whether the content is a PDF
+            all_pages (bool): Whether every PDF page is OCR'd, not just the first
+            engine_policy (Optional[str]): OCR engine policy, defaults to the service's
+            crop_card (Optional[bool]): Crop photos to the card, defaults to the service's
+
+        Returns:
+            Tuple[str, Optional[Dict[str, Any]]]: (cache key, cached result or None)
+        """
+        cache_key = self.request_key(data, is_pdf, all_pages, engine_policy, crop_card)
+
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"OCR cache hit for {cache_key[:16]}...")
+            cached["metadata"]["cache_hit"] = True
+        return cache_key, cached
+
+    def cache_store(self, cache_key: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Store a fresh OCR result in the cache and tag it as a miss.
+
+        Args:
+            cache_key (str): Key returned by cache_lookup()
+            result (Dict[str, Any]): Result from the OCR pipeline
+
+        Returns:
+            Dict[str, Any]: The same result, annotated with cache metadata
+        """
+        # Only cache usable results so transient API errors are retried next time
+        if result.get('debug_info', {}).get('raw_text'):
+            self.cache.set(cache_key, result)
+        result["metadata"]["cache_hit"] = False
+        return result
+
+    def preprocess_params(self, crop_card: Optional[bool] = None) -> Dict[str, Any]:
+        """Preprocessing parameters passed to preprocess_image(), with an optional per-request crop override."""
+        return {
+            'pdf_dpi': self.pdf_dpi,
+            'max_image_dimension': self.max_image_dimension,
+            'max_dim': self.max_dim,
+            'jpeg_quality': self.jpeg_quality,
+            'min_jpeg_quality': self.min_jpeg_quality,
+            'max_size_kb': self.max_size_kb,
+            'crop_card': self.crop_card if crop_card is None else crop_card,
+        }
 
     def extract_aadhaar_number(self, image_path: str) -> Dict[str, Any]:
         """
         Extract Aadhaar number from an Aadhaar card image using OCR.space API.
+
+        Thin wrapper over extract_from_bytes() for callers that have a file
+        on disk.
         
         Args:
             image_path (str): Path to the image file
@@ -164,210 +256,201 @@ class OCRService:
         Returns:
             Dict[str, Any]: Extracted Aadhaar number and metadata
         """
-        try:
-            logger.info(f"Starting OCR processing for file: {image_path}")
-            
-            # Read and preprocess the image (support PDF and images)
-            # Memory optimization: Use lower DPI and limit image size early
-            image = None
-            pil_image = None
-            max_image_dimension = 2000  # Limit max dimension to reduce memory
-            
-            if image_path.lower().endswith('.pdf'):
-                logger.info("Processing PDF file")
-                # Convert first page of PDF to image with reduced DPI to save memory
-                # Reduced from 300 to 150 DPI to cut memory usage by ~75%
-                pages = convert_from_path(image_path, dpi=150, first_page=1, last_page=1)
-                if pages:
-                    pil_image = pages[0]  # PIL Image
-                    # Resize if too large before converting to numpy
-                    if max(pil_image.size) > max_image_dimension:
-                        scale = max_image_dimension / max(pil_image.size)
-                        new_size = (int(pil_image.size[0] * scale), int(pil_image.size[1] * scale))
-                        pil_image = pil_image.resize(new_size, Image.LANCZOS)
-                        logger.info(f"PDF image resized to: {pil_image.size}")
-                    image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
-                    logger.info(f"PDF converted to image, shape: {image.shape}")
-                    # Clean up pages list to free memory
-                    del pages
-                    gc.collect()
-                else:
-                    raise ValueError("Could not convert PDF to image")
-            else:
-                logger.info("Processing image file")
-                # Check image dimensions before loading full image
-                pil_image_temp = Image.open(image_path)
-                width, height = pil_image_temp.size
-                pil_image_temp.close()
-                
-                # Resize if too large before loading into memory
-                if max(width, height) > max_image_dimension:
-                    scale = max_image_dimension / max(width, height)
-                    new_size = (int(width * scale), int(height * scale))
-                    pil_image = Image.open(image_path).resize(new_size, Image.LANCZOS)
-                    image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_BGR2RGB)
-                    logger.info(f"Image resized from {width}x{height} to {new_size}")
-                else:
-                    image = cv2.imread(image_path)
-                    if image is not None:
-                        pil_image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-            
-            if image is None or pil_image is None:
-                raise ValueError(f"Could not read image at {image_path}")
-
-            # --- p-hash generation ---
-            phash = str(imagehash.phash(pil_image))
-            logger.info(f"Generated p-hash: {phash}")
-
-            logger.info(f"Original image shape: {image.shape}")
-
-            # Resize and compress image to fit under 1MB for OCR.space API
-            # Further reduce size if already large to save memory
-            max_size_kb = 1024
-            encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), 70]  # Start with quality 70
-            max_dim = 1500
-            h, w = image.shape[:2]
-            if max(h, w) > max_dim:
-                scale = max_dim / max(h, w)
-                # Create new resized image
-                resized_image = cv2.resize(image, (int(w * scale), int(h * scale)))
-                # Free old image memory
-                del image
-                image = resized_image
-                logger.info(f"Image resized to: {image.shape}")
-                gc.collect()  # Force garbage collection after resize
-                
-            # Compress and check size
-            success, buffer = cv2.imencode('.jpg', image, encode_param)
-            while success and len(buffer) > max_size_kb * 1024 and encode_param[1] > 10:
-                encode_param[1] -= 10  # Lower quality
-                success, buffer = cv2.imencode('.jpg', image, encode_param)
-                
-            logger.info(f"Encoded image size (KB): {len(buffer) / 1024}")
-            
-            if len(buffer) > max_size_kb * 1024:
-                raise ValueError("Image could not be compressed below 1MB for OCR.space API.")
-                
-            base64_image = f"data:image/jpeg;base64,{base64.b64encode(buffer).decode('utf-8')}"
-
-            # Prepare API request
-            payload = {
-                'apikey': self.api_key,
-                'language': 'eng',
-                'isOverlayRequired': 'true',
-                'OCREngine': '2',  # Using the more accurate OCR engine
-                'base64Image': base64_image,
-                'scale': 'true',
-                'detectOrientation': 'true',
-                'isTable': 'false',
-                'filetype': 'jpg'
-            }
+        with open(image_path, 'rb') as f:
+            data = f.read()
+        return self.extract_from_bytes(data, is_pdf_upload(image_path))
+
+    def extract_from_bytes(self, data: BytesLike, is_pdf: bool = False,
+                           engine_policy: Optional[str] = None, crop_card: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Extract Aadhaar number from an in-memory upload.
 
-            logger.info("Making API request to OCR.space...")
-
-            # Try the API request with timeout and retries
-            try:
-                # Configure session with better timeout and retry settings
-                session = requests.Session()
-                session.mount('https://', requests.adapters.HTTPAdapter(
-                    max_retries=3,
-                    pool_connections=10,
-                    pool_maxsize=10
-                ))
-                
-                # Exponential backoff retry logic
-                max_retries = 3
-                base_delay = 2
-                
-                for attempt in range(max_retries):
-                    try:
-                        logger.info(f"Making API request to OCR.space (attempt {attempt + 1}/{max_retries})...")
-                        
-                        response = session.post(
-                            self.api_url,
-                            data=payload,
-                            timeout=(15, 45)  # Increased timeouts: (connect, read)
-                        )
-                        
-                        logger.info(f"API response status: {response.status_code}")
-                        
-                        # Check if request was successful
-                        if response.status_code != 200:
-                            error_msg = f"API request failed with status code: {response.status_code}"
-                            try:
-                                error_data = response.json()
-                                if 'ErrorMessage' in error_data:
-                                    error_msg += f"\nError: {error_data['ErrorMessage']}"
-                                logger.error(f"API Error Response: {error_data}")
-                            except:
-                                logger.error(f"API Error Response (raw): {response.text}")
-                            raise Exception(error_msg)
-                        
-                        # Parse JSON response
-                        try:
-                            result = response.json()
-                            logger.info("API response parsed successfully")
-                        except json.JSONDecodeError as e:
-                            logger.error(f"Failed to parse API response: {response.text}")
-                            raise Exception(f"Failed to parse API response as JSON: {str(e)}")
-
-                        # Process the result
-                        processed_result = self._process_result(result, image)
-                        processed_result["phash"] = phash
-                        logger.info("OCR processing completed successfully")
-                        
-                        # Clean up memory
-                        del image
-                        del pil_image
-                        del base64_image
-                        gc.collect()
-                        
-                        return processed_result
-                        
-                    except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
-                        logger.warning(f"API request attempt {attempt + 1} failed: {str(e)}")
-                        
-                        if attempt < max_retries - 1:
-                            delay = base_delay * (2 ** attempt)  # Exponential backoff
-                            logger.info(f"Retrying in {delay} seconds...")
-                            time.sleep(delay)
-                        else:
-                            logger.error("All API attempts failed. OCR.space API is required for processing.")
-                            raise Exception("OCR.space API request failed after all retries. Please check your API key and network connection.")
-                            
-            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
-                logger.error(f"OCR API request failed after all retries: {str(e)}")
-                # Clean up memory before raising error
-                del image
-                del pil_image
-                gc.collect()
-                raise Exception(f"OCR.space API request failed: {str(e)}. Please check your network connection and API key.")
-
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Network error during API request: {str(e)}")
-            raise Exception(f"Network error during API request: {str(e)}")
+        Results are cached by the SHA-256 of the content plus the
+        preprocessing parameters, so re-uploads of the same scan skip the
+        whole pipeline.
+
+        Args:
+            data (BytesLike): Raw image or PDF bytes
+            is_pdf (bool): Whether the content is a PDF
+            engine_policy (Optional[str]): OCR engine policy, defaults to the service's
+            crop_card (Optional[bool]): Crop photos to the card, defaults to the service's
+
+        Returns:
+            Dict[str, Any]: Extracted Aadhaar number and metadata
+        """
+        cache_key, cached = self.cache_lookup(data, is_pdf, engine_policy=engine_policy, crop_card=crop_card)
+        if cached is not None:
+            return cached
+        return self.cache_store(cache_key, self._run_ocr(data, is_pdf, engine_policy, crop_card))
+
+    def _run_ocr(self, data: BytesLike, is_pdf: bool, engine_policy: Optional[str] = None,
+                 crop_card: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Run the full decode, compress and OCR.space pipeline without caching.
+        
+        Args:
+            data (BytesLike): Raw image or PDF bytes
+            is_pdf (bool): Whether the content is a PDF
+            engine_policy (Optional[str]): OCR engine policy, defaults to the service's
+            crop_card (Optional[bool]): Crop photos to the card, defaults to the service's
+            
+        Returns:
+            Dict[str, Any]: Extracted Aadhaar number and metadata
+        """
+        try:
+            logger.info(f"Starting OCR processing ({len(data)} bytes)")
+            prepared = preprocess_image(data, is_pdf, self.preprocess_params(crop_card))
+            result = self._run_sync(self.call_api(prepared['buffer'], engine_policy))
+            return self.finish_result(result, prepared)
         except Exception as e:
             logger.error(f"Error during OCR processing: {str(e)}")
             raise Exception(f"Error during OCR processing: {str(e)}")
 
-    def _validate_aadhaar_number(self, text: str) -> Optional[str]:
+    def extract_pdf_pages(self, data: BytesLike, engine_policy: Optional[str] = None) -> Iterator[Dict[str, Any]]:
         """
-        Validate and format the extracted Aadhaar number.
+        OCR every page of a PDF, yielding each page's result as soon as it is ready.
+
+        Pages are rendered lazily one at a time, so memory stays flat no
+        matter how long the document is.
+
+        Args:
+            data (BytesLike): Raw PDF bytes
+            engine_policy (Optional[str]): OCR engine policy, defaults to the service's
+
+        Yields:
+            Dict[str, Any]: Per-page result (extract_aadhaar_number() shape plus 'page')
         """
-        # Remove all non-digit characters
-        digits = re.sub(r'\D', '', text)
-        
-        # Check if we have exactly 12 digits
-        if len(digits) == 12:
-            # Format as XXXX XXXX XXXX
-            return f"{digits[:4]} {digits[4:8]} {digits[8:]}"
-        return None
+        params = self.preprocess_params()
+        page_count, max_points = pdf_info(data)
+        page_count = min(page_count, self.pdf_max_pages)
+        dpi = pdf_render_dpi(max_points, params['pdf_dpi'], _target_dim(params))
+        for page_number in range(1, page_count + 1):
+            prepared = preprocess_pdf_page(data, page_number, dpi, params)
+            result = self._run_sync(self.call_api(prepared['buffer'], engine_policy))
+            page = self.finish_result(result, prepared)
+            page['page'] = page_number
+            yield page
+
+    def extract_pdf_document(self, data: BytesLike, engine_policy: Optional[str] = None) -> Dict[str, Any]:
+        """
+        OCR every page of a PDF and combine them into one cached document result.
+
+        Args:
+            data (BytesLike): Raw PDF bytes
+            engine_policy (Optional[str]): OCR engine policy, defaults to the service's
+
+        Returns:
+            Dict[str, Any]: Combined result, see combine_pages()
+        """
+        cache_key, cached = self.cache_lookup(data, True, all_pages=True, engine_policy=engine_policy)
+        if cached is not None:
+            return cached
+        pages = list(self.extract_pdf_pages(data, engine_policy))
+        return self.cache_store(cache_key, combine_pages(pages))
+
+    def _run_sync(self, coro):
+        """
+        Run a coroutine for the synchronous API on the service's own event loop thread.
+
+        The loop is started once and owns self.client, so synchronous
+        callers share its connection pool, rate limiter, circuit breaker
+        and engine stats instead of building a client per call.
+
+        Raises:
+            RuntimeError: If the client was already started by another
+                event loop (async callers must use call_api() directly)
+        """
+        with self._sync_lock:
+            if self._sync_loop is None:
+                if self.client.started:
+                    coro.close()
+                    raise RuntimeError("OCR client is owned by a running event loop; use the async API")
+                self._sync_loop = asyncio.new_event_loop()
+                threading.Thread(target=self._sync_loop.run_forever, name="ocr-sync-loop", daemon=True).start()
+                asyncio.run_coroutine_threadsafe(self.client.start(), self._sync_loop).result()
+        return asyncio.run_coroutine_threadsafe(coro, self._sync_loop).result()
+
+    def close_sync(self):
+        """Close the client and stop the synchronous API's loop thread, if it was started."""
+        with self._sync_lock:
+            if self._sync_loop is None:
+                return
+            asyncio.run_coroutine_threadsafe(self.client.close(), self._sync_loop).result()
+            self._sync_loop.call_soon_threadsafe(self._sync_loop.stop)
+            self._sync_loop = None
+
+    def finish_result(self, result: Dict[str, Any], prepared: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Turn a raw OCR.space response into the service result.
+
+        Args:
+            result (Dict[str, Any]): Parsed OCR.space JSON
+            prepared (Dict[str, Any]): Output of preprocess_image()
+
+        Returns:
+            Dict[str, Any]: Extracted Aadhaar number and metadata
+        """
+        with timed_stage("process_result"):
+            processed_result = self._process_result(result, prepared['image_shape'])
+        record_preprocess(prepared.get('stats', {}))
+        processed_result["phash"] = prepared['phash']
+        processed_result["metadata"]["preprocess"] = prepared.get('stats', {})
+        processed_result["metadata"]["engine"] = result.get('engine')
+        if result.get('transport'):
+            record_transport(result['transport'])
+            # Bytes on the wire and this process's memory high-water mark after the call
+            processed_result["metadata"]["transport"] = {**result['transport'], 'api_peak_rss_bytes': peak_rss_bytes()}
+        logger.debug("OCR processing completed successfully")
+        return processed_result
 
-    def _process_result(self, result: Dict[str, Any], image: np.ndarray) -> Dict[str, Any]:
+    def build_payload(self, buffer: bytes) -> Dict[str, Any]:
+        """
+        Build the OCR.space form payload for an encoded JPEG.
+
+        The JPEG goes as a binary 'file' part, referenced as-is: no base64
+        data URI, so the provider size limit applies to the encoded bytes.
+
+        Args:
+            buffer (bytes): JPEG-encoded image
+
+        Returns:
+            Dict[str, Any]: Form fields for the parse/image endpoint
+        """
+        return {
+            'apikey': self.api_key,
+            'language': 'eng',
+            'isOverlayRequired': 'false',  # Word boxes are never used
+            'OCREngine': '2',  # Using the more accurate OCR engine
+            'file': buffer,
+            'scale': 'true',
+            'detectOrientation': 'true',
+            'isTable': 'false',
+            'filetype': 'jpg'
+        }
+
+    async def call_api(self, buffer: bytes, engine_policy: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Recognise an encoded JPEG with the engines chosen by the routing policy.
+
+        This is the OCR stage of the pipeline; it never blocks the event
+        loop (OCR.space goes through the shared pooled client, Tesseract
+        runs as a subprocess).
+
+        Args:
+            buffer (bytes): JPEG-encoded image
+            engine_policy (Optional[str]): OCR engine policy, defaults to the service's
+
+        Returns:
+            Dict[str, Any]: OCR.space-shaped response from the engine that answered
+        """
+        with timed_stage("ocr"):
+            return await self.engines.recognize(buffer, engine_policy)
+
+    def _process_result(self, result: Dict[str, Any], image_shape: Tuple[int, int]) -> Dict[str, Any]:
         """
         Process the OCR.space API result and extract Aadhaar number.
         """
-        logger.info("Processing OCR result...")
+        logger.debug("Processing OCR result...")
         
         # Safely convert processing time to float
         try:
@@ -379,14 +462,15 @@ class OCRService:
             "metadata": {
                 "processing_time": processing_time,
                 "image_dimensions": {
-                    "width": image.shape[1],
-                    "height": image.shape[0]
+                    "width": image_shape[1],
+                    "height": image_shape[0]
                 },
                 "ocr_engine": result.get("OCRExitCode", "Unknown"),
                 "is_error": result.get("IsErroredOnProcessing", False)
             },
             "aadhaar_number": None,
             "confidence": 0.0,
+            "fields": dict.fromkeys(FIELDS),
             "debug_info": {},
             "document_hash": None
         }
@@ -421,14 +505,13 @@ class OCRService:
         # Generate hash of the extracted text
         processed["document_hash"] = self._generate_hash(all_text)
 
-        # Look for 12-digit number pattern
-        digits = re.findall(r'\d{12}', all_text)
-        if digits:
-            formatted_number = self._validate_aadhaar_number(digits[0])
-            if formatted_number:
-                processed["aadhaar_number"] = formatted_number
-                processed["confidence"] = 1.0  # OCR.space doesn't provide confidence scores
-                logger.info(f"Found Aadhaar number: {formatted_number}")
+        # All card fields in one scan; the Aadhaar number is checksum-validated
+        fields = extract_fields(all_text)
+        digits = fields.pop("aadhaar_candidates")
+        processed["fields"] = fields
+        if fields["aadhaar_number"]:
+            processed["aadhaar_number"] = fields["aadhaar_number"]
+            processed["confidence"] = 1.0  # OCR.space doesn't provide confidence scores
 
         # Store debug information
         processed["debug_info"] = {
@@ -439,9 +522,536 @@ class OCRService:
             "ocr_exit_code": result.get("OCRExitCode", "Unknown")
         }
 
-        logger.info("Result processing completed")
+        logger.debug("Result processing completed")
         return processed
 
+
+# OpenCV reduced-resolution decode flags (by name, so cv2 stays unloaded
+# until the first decode); for JPEG these scale in the DCT domain, so only
+# a fraction of the full-size pixels are ever produced
+REDUCED_DECODE_FLAGS = (
+    (8, "IMREAD_REDUCED_COLOR_8"),
+    (4, "IMREAD_REDUCED_COLOR_4"),
+    (2, "IMREAD_REDUCED_COLOR_2"),
+)
+
+
+# Longest side phash_image() decodes to without a card crop: far more than
+# pHash's 32x32 sample, and small enough for a 1/8 JPEG decode of a photo
+PHASH_DECODE_DIM = 384
+# Registered p-hashes come from the original pipeline, which read images of
+# up to this size (stored, before rotation) with cv2.imread, applying their
+# EXIF orientation, and larger ones with PIL, which ignores it. Decoding
+# follows the same rule so uploads keep matching those hashes
+EXIF_ORIENTATION_MAX_DIM = 2000
+
+
+def read_image_header(data: BytesLike) -> Tuple[Optional[str], int, int]:
+    """
+    Read the format and dimensions of an image without decoding its pixels.
+
+    Args:
+        data (BytesLike): Raw image bytes
+
+    Returns:
+        Tuple[Optional[str], int, int]: (PIL format name, width, height), or
+            (None, 0, 0) if PIL cannot parse the header
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            return img.format, img.size[0], img.size[1]
+    except Exception:
+        return None, 0, 0
+
+
+def decode_plan(fmt: Optional[str], width: int, height: int, target_dim: int) -> Tuple[int, int]:
+    """
+    Choose the OpenCV decode flag for an image: the largest JPEG reduction
+    that still leaves the longest side at or above target_dim. EXIF
+    orientation is applied up to EXIF_ORIENTATION_MAX_DIM and ignored above.
+
+    Returns:
+        Tuple[int, int]: (imdecode flag, reduction factor)
+    """
+    orientation = 0 if max(width, height) <= EXIF_ORIENTATION_MAX_DIM else cv2.IMREAD_IGNORE_ORIENTATION
+    if fmt == 'JPEG':
+        for reduce_factor, reduced_flag in REDUCED_DECODE_FLAGS:
+            if max(width, height) // reduce_factor >= target_dim:
+                return getattr(cv2, reduced_flag) | orientation, reduce_factor
+    return cv2.IMREAD_COLOR | orientation, 1
+
+
+def estimate_memory(data: BytesLike, is_pdf: bool, params: Dict[str, Any],
+                    max_points: Optional[float] = None) -> int:
+    """
+    Estimate the peak memory the CPU stage needs for an upload, from headers only.
+
+    Images: the upload plus its copy into the worker, the decoded pixels
+    (after any reduced JPEG decode), the resized image, its RGB/grayscale
+    p-hash views and the encoded output. PDF pages: the pdftoppm bitmap
+    is held about four times over (PPM bytes, PIL image, RGB copy, BGR
+    copy) before the resize. Nothing is decoded.
+
+    Args:
+        data (BytesLike): Raw image or PDF bytes
+        is_pdf (bool): Whether the content is a PDF
+        params (Dict[str, Any]): Output of OCRService.preprocess_params()
+        max_points (Optional[float]): Longest side of a PDF page in points,
+            from pdf_info() (A4 at the render DPI is assumed if unknown)
+
+    Returns:
+        int: Estimated bytes
+    """
+    target_dim = _target_dim(params)
+    upload = 2 * len(data)
+    encoded = params['max_size_kb'] * 1024
+
+    if is_pdf:
+        longest = (max_points or 842.0) / 72.0 * pdf_render_dpi(max_points, params['pdf_dpi'], target_dim)
+        rendered = int(longest * longest / 1.414) * 3
+        resized = min(rendered, int(target_dim * target_dim / 1.414) * 3)
+        return upload + 4 * rendered + 2 * resized + encoded
+
+    fmt, width, height = read_image_header(data)
+    if not width or not height:
+        # Unknown header: assume a worst case proportional to the upload
+        return upload + 10 * len(data) + 3 * target_dim * target_dim * 3 + encoded
+    _, factor = decode_plan(fmt, width, height, target_dim)
+    decoded_w, decoded_h = math.ceil(width / factor), math.ceil(height / factor)
+    decoded = decoded_w * decoded_h * 3
+    scale = min(1.0, target_dim / max(decoded_w, decoded_h))
+    resized = int(decoded * scale * scale)
+    # The card crop is at most the resized image again
+    cropped = resized if params.get('crop_card') else 0
+    return upload + decoded + 2 * resized + resized // 3 + cropped + encoded
+
+
+def decode_image(data: BytesLike, target_dim: int) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    Decode an image to BGR with its longest side at most target_dim.
+
+    Picks the cheapest decode that still meets the target: for JPEGs larger
+    than 2x the target a DCT-domain reduced decode (1/2, 1/4 or 1/8) is used,
+    then a single INTER_AREA resize lands on the exact size.
+
+    Args:
+        data (BytesLike): Raw image bytes
+        target_dim (int): Maximum length of the longest side
+
+    Returns:
+        Tuple[np.ndarray, Dict[str, Any]]: (BGR image, decode statistics)
+    """
+    fmt, width, height = read_image_header(data)
+    flag, factor = decode_plan(fmt, width, height, target_dim)
+
+    # Decode once from a zero-copy view of the upload bytes
+    started = time.perf_counter()
+    image = cv2.imdecode(np.frombuffer(memoryview(data), dtype=np.uint8), flag)
+    if image is None:
+        raise ValueError("Could not decode image data")
+    decoded = time.perf_counter()
+
+    h, w = image.shape[:2]
+    if max(h, w) > target_dim:
+        scale = target_dim / max(h, w)
+        image = cv2.resize(image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+    resized = time.perf_counter()
+
+    logger.info(
+        f"Decoded {fmt or 'image'} {width}x{height} at 1/{factor} scale, "
+        f"resized to {image.shape[1]}x{image.shape[0]}"
+    )
+    return image, {
+        'format': fmt,
+        'source_width': width,
+        'source_height': height,
+        'decode_factor': factor,
+        'decode_ms': round((decoded - started) * 1000, 2),
+        'resize_ms': round((resized - decoded) * 1000, 2),
+    }
+
+
+# Rough slope of ln(JPEG size) against quality in the 30-90 range; only used
+# for the first guess, later guesses use the slope actually observed
+JPEG_LOG_SIZE_SLOPE = 0.025
+# Aim slightly below the limit so the predicted quality usually fits first time
+ENCODE_TARGET_MARGIN = 0.95
+
+
+def encode_jpeg_to_size(
+    image: np.ndarray,
+    max_bytes: int,
+    quality: int = 70,
+    min_quality: int = 40,
+    max_passes: int = 4,
+) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    JPEG-encode an image so the result fits within max_bytes.
+
+    The first encode at the requested quality usually fits. When it does
+    not, the next quality is predicted from the observed size with a
+    log-linear model (secant updates after each miss) instead of stepping
+    down by 10. If the predicted quality is below min_quality the image is
+    downscaled instead, since fewer pixels cost less legibility than heavy
+    quantization. This usually takes one or two encodes.
+
+    Args:
+        image (np.ndarray): BGR image
+        max_bytes (int): Size limit of the encoded output
+        quality (int): Starting (and maximum) JPEG quality
+        min_quality (int): Lowest quality tried before downscaling
+        max_passes (int): Maximum number of encodes
+
+    Returns:
+        Tuple[np.ndarray, Dict[str, Any]]: (encoded buffer, encode statistics)
+
+    Raises:
+        ValueError: If no encode within max_passes fits
+    """
+    started = time.perf_counter()
+    target = max_bytes * ENCODE_TARGET_MARGIN
+    scale = 1.0
+    current = image
+    passes = 0
+    history = []  # (quality, ln(size)) at the current scale
+
+    while passes < max_passes:
+        passes += 1
+        success, buffer = cv2.imencode('.jpg', current, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+        if not success:
+            raise ValueError("JPEG encoding failed")
+        size = len(buffer)
+        if size <= max_bytes:
+            break
+        history.append((quality, math.log(size)))
+
+        # Predict the quality that lands on the target size
+        slope = JPEG_LOG_SIZE_SLOPE
+        if len(history) >= 2:
+            (q1, l1), (q2, l2) = history[-2], history[-1]
+            if q1 != q2 and l1 != l2:
+                slope = max((l1 - l2) / (q1 - q2), 0.005)
+        next_quality = int(math.floor(quality - (math.log(size) - math.log(target)) / slope))
+
+        if next_quality >= min_quality and next_quality < quality:
+            quality = next_quality
+            continue
+
+        # Too much quantization needed (or no progress): trade pixels instead.
+        # Encoded size is roughly proportional to pixel count.
+        step = math.sqrt(target / size)
+        scale *= min(step, 0.95)
+        h, w = image.shape[:2]
+        current = cv2.resize(image, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+        quality = max(quality, min_quality)
+        history = []
+    else:
+        raise ValueError(f"Image could not be compressed below {max_bytes // 1024}KB for the OCR provider.")
+
+    return buffer, {
+        'encode_passes': passes,
+        'encode_ms': round((time.perf_counter() - started) * 1000, 2),
+        'jpeg_quality': quality,
+        'encode_scale': round(scale, 3),
+        'encoded_bytes': len(buffer),
+        'encoded_shape': current.shape[:2],
+    }
+
+
+def pdf_info(data: BytesLike) -> Tuple[int, Optional[float]]:
+    """
+    Read the page count and first-page size of a PDF without rendering it.
+
+    Args:
+        data (BytesLike): Raw PDF bytes
+
+    Returns:
+        Tuple[int, Optional[float]]: (page count, longest side of the first
+            page in points or None if unknown)
+    """
+    try:
+        info = pdf2image.pdfinfo_from_bytes(bytes(data))
+    except Exception as e:
+        logger.warning(f"pdfinfo failed: {str(e)}")
+        return 1, None
+    match = re.match(r'([\d.]+) x ([\d.]+)', info.get('Page size', ''))
+    max_points = max(float(match.group(1)), float(match.group(2))) if match else None
+    return int(info.get('Pages', 1) or 1), max_points
+
+
+def pdf_render_dpi(max_points: Optional[float], dpi: int, target_dim: int) -> int:
+    """Lower the rasterization DPI so a page of max_points renders at about target_dim."""
+    if not max_points:
+        return dpi
+    rendered = max_points / 72.0 * dpi
+    if rendered <= target_dim:
+        return dpi
+    return max(36, int(target_dim * 72.0 / max_points))
+
+
+def _target_dim(params: Dict[str, Any]) -> int:
+    # Everything downstream works on the OCR-sized image, so decode straight to it
+    return min(params['max_image_dimension'], params['max_dim'])
+
+
+def _render_pdf_page(data: BytesLike, page_number: int, dpi: int, target_dim: int) -> Tuple[np.ndarray, str, Dict[str, Any]]:
+    """Rasterize one PDF page with pdftoppm and p-hash it."""
+    started = time.perf_counter()
+    pages = pdf2image.convert_from_bytes(bytes(data), dpi=dpi, first_page=page_number, last_page=page_number)
+    if not pages:
+        raise ValueError(f"Could not convert PDF page {page_number} to image")
+    pil_image = pages[0].convert('RGB')
+    del pages
+    if max(pil_image.size) > target_dim:
+        scale = target_dim / max(pil_image.size)
+        new_size = (int(pil_image.size[0] * scale), int(pil_image.size[1] * scale))
+        pil_image = pil_image.resize(new_size, Image.LANCZOS)
+    rendered = time.perf_counter()
+    phash = image_hashes.phash_hex(pil_image)
+    hashed = time.perf_counter()
+    image = cv2.cvtColor(np.asarray(pil_image), cv2.COLOR_RGB2BGR)
+    del pil_image
+    logger.info(f"PDF page {page_number} converted to image at {dpi} DPI, shape: {image.shape}")
+    return image, phash, {
+        'format': 'PDF',
+        'pdf_dpi': dpi,
+        'page': page_number,
+        'render_ms': round((rendered - started) * 1000, 2),
+        'phash_ms': round((hashed - rendered) * 1000, 2),
+    }
+
+
+def _image_phash(image: np.ndarray) -> str:
+    """p-hash of a BGR image, computed without a full-size copy."""
+    # Swap to RGB in place and wrap the same pixel buffer as a PIL image
+    # for the p-hash, then swap back for encoding
+    cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+    h, w = image.shape[:2]
+    pil_image = Image.frombuffer('RGB', (w, h), image, 'raw', 'RGB', 0, 1)
+    phash = image_hashes.phash_hex(pil_image)
+    del pil_image
+    cv2.cvtColor(image, cv2.COLOR_RGB2BGR, dst=image)
+    return phash
+
+
+def _encode_prepared(image: np.ndarray, phash: str, stats: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    """Final part of the CPU stage: size-targeted JPEG encode and result packing."""
+    logger.debug(f"Generated p-hash: {phash}")
+    logger.debug(f"Image shape for OCR: {image.shape}")
+
+    # Compress to fit under the provider's size limit (1MB for OCR.space)
+    max_bytes = params['max_size_kb'] * 1024
+    buffer, encode_stats = encode_jpeg_to_size(
+        image, max_bytes, params['jpeg_quality'], params['min_jpeg_quality']
+    )
+    stats.update(encode_stats)
+    # Reported back because this may run in a worker process
+    stats['worker_peak_rss_bytes'] = peak_rss_bytes()
+    logger.info(
+        f"Encoded image size (KB): {len(buffer) / 1024} "
+        f"(quality {encode_stats['jpeg_quality']}, scale {encode_stats['encode_scale']}, "
+        f"{encode_stats['encode_passes']} passes)"
+    )
+
+    return {
+        'buffer': buffer.tobytes(),
+        'phash': phash,
+        'image_shape': encode_stats['encoded_shape'],
+        'stats': stats,
+    }
+
+
+def preprocess_image(data: BytesLike, is_pdf: bool, params: Dict[str, Any],
+                     dpi: Optional[int] = None) -> Dict[str, Any]:
+    """
+    CPU stage of the OCR pipeline: decode, p-hash, resize and JPEG-encode.
+
+    The upload is decoded exactly once, straight from memory and at (close
+    to) the final resolution, so there is a single resize and no temporary
+    file. With params['crop_card'] photos are cropped to the detected card
+    (perspective-corrected, landscape) before the p-hash and the encode.
+    For PDFs only the first page is used. This is a module-level
+    function (not a method) so it can be shipped to a ProcessPoolExecutor
+    worker without pickling the OCRService instance.
+
+    Args:
+        data (BytesLike): Raw image or PDF bytes
+        is_pdf (bool): Whether the content is a PDF
+        params (Dict[str, Any]): Output of OCRService.preprocess_params()
+        dpi (Optional[int]): PDF render DPI, when the caller already read the
+            page size (see pdf_render_dpi()); otherwise pdf_info() is run here
+
+    Returns:
+        Dict[str, Any]: {'buffer': JPEG bytes, 'phash': hex string,
+                         'image_shape': (height, width) of the encoded image,
+                         'stats': preprocessing statistics}
+    """
+    target_dim = _target_dim(params)
+
+    if is_pdf:
+        logger.debug("Processing PDF file")
+        # Render the first page at a DPI that already lands near the target size
+        if dpi is None:
+            dpi = pdf_render_dpi(pdf_info(data)[1], params['pdf_dpi'], target_dim)
+        image, phash, stats = _render_pdf_page(data, 1, dpi, target_dim)
+    else:
+        logger.debug("Processing image file")
+        image, stats = decode_image(data, target_dim)
+        if params.get('crop_card'):
+            image, crop_stats = card_detect.crop_card(image)
+            stats.update(crop_stats)
+
+        started = time.perf_counter()
+        phash = _image_phash(image)
+        stats['phash_ms'] = round((time.perf_counter() - started) * 1000, 2)
+
+    return _encode_prepared(image, phash, stats, params)
+
+
+def phash_image(data: BytesLike, is_pdf: bool, params: Dict[str, Any],
+                dpi: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Cheap CPU stage for verification: only the p-hash, with no encode.
+
+    pHash only looks at a 32x32 thumbnail, so images (and the PDF's first
+    page) are decoded at no more than PHASH_DECODE_DIM, which lands within
+    a bit or two of the p-hash preprocess_image() gives the same upload.
+    With params['crop_card'] the image is decoded at the OCR size as
+    usual: the detected outline moves with the decode size, and a slightly
+    different crop can change the hash by dozens of bits.
+
+    Args:
+        data (BytesLike): Raw image or PDF bytes
+        is_pdf (bool): Whether the content is a PDF
+        params (Dict[str, Any]): Output of OCRService.preprocess_params()
+        dpi (Optional[int]): PDF render DPI, as for preprocess_image()
+
+    Returns:
+        Dict[str, Any]: {'phash': hex string, 'stats': decode statistics}
+    """
+    target_dim = _target_dim(params) if params.get('crop_card') else min(_target_dim(params), PHASH_DECODE_DIM)
+    if is_pdf:
+        if dpi is None:
+            dpi = pdf_render_dpi(pdf_info(data)[1], params['pdf_dpi'], target_dim)
+        _, phash, stats = _render_pdf_page(data, 1, dpi, target_dim)
+        return {'phash': phash, 'stats': stats}
+
+    image, stats = decode_image(data, target_dim)
+    if params.get('crop_card'):
+        image, crop_stats = card_detect.crop_card(image)
+        stats.update(crop_stats)
+    started = time.perf_counter()
+    phash = _image_phash(image)
+    stats['phash_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return {'phash': phash, 'stats': stats}
+
+
+def preprocess_pdf_page(data: BytesLike, page_number: int, dpi: int, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    CPU stage for a single page of a multi-page PDF.
+
+    Each call runs its own pdftoppm for just that page, so pages can be
+    rasterized in parallel by separate workers and no more than one page
+    per worker is ever held decoded in memory.
+
+    Args:
+        data (BytesLike): Raw PDF bytes
+        page_number (int): 1-based page number
+        dpi (int): Render DPI, from pdf_render_dpi()
+        params (Dict[str, Any]): Output of OCRService.preprocess_params()
+
+    Returns:
+        Dict[str, Any]: Same shape as preprocess_image()
+    """
+    image, phash, stats = _render_pdf_page(data, page_number, dpi, _target_dim(params))
+    return _encode_prepared(image, phash, stats, params)
+
+
+def warm_up(params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Load the imaging stack and push one small synthetic photo through the
+    CPU stage, so the first real request pays neither the imports nor the
+    first-call costs (codec tables, DCT matrices, allocator growth).
+
+    Module-level for the same reason as preprocess_image(): the worker
+    pool runs it in each CPU worker.
+
+    Args:
+        params (Dict[str, Any]): Output of OCRService.preprocess_params()
+
+    Returns:
+        Dict[str, Any]: pid, seconds per lazily imported module and total seconds
+    """
+    started = time.perf_counter()
+    imports = load_all()
+    image = np.full((480, 640, 3), 230, dtype=np.uint8)
+    cv2.putText(image, "0000 0000 0000", (40, 240), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (30, 30, 30), 3)
+    preprocess_image(cv2.imencode('.jpg', image)[1], False, params)
+    return {
+        'pid': os.getpid(),
+        'imports': {name: round(seconds, 4) for name, seconds in imports.items()},
+        'seconds': round(time.perf_counter() - started, 4),
+    }
+
+
+def combine_pages(pages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge per-page OCR results into one document-level result.
+
+    The document text is the page texts concatenated in page order, so the
+    document hash is deterministic and, for a single-page PDF, identical to
+    the hash produced by the first-page-only path. The document p-hash is
+    the first page's, matching what is already registered on-chain.
+
+    Args:
+        pages (List[Dict[str, Any]]): Per-page results in page order
+
+    Returns:
+        Dict[str, Any]: Result with the same shape as extract_aadhaar_number(),
+            plus a 'pages' summary list
+    """
+    if not pages:
+        raise ValueError("PDF has no pages")
+    raw_text = "".join(page.get('debug_info', {}).get('raw_text', '') for page in pages)
+    found_digits = [d for page in pages for d in page.get('debug_info', {}).get('found_digits', [])]
+    first = pages[0]
+    aadhaar_number = next((page['aadhaar_number'] for page in pages if page.get('aadhaar_number')), None)
+    errors = [
+        f"page {page['page']}: {page['debug_info']['error']}"
+        for page in pages if page.get('debug_info', {}).get('error')
+    ]
+
+    combined = {
+        "metadata": {
+            "processing_time": sum(page['metadata'].get('processing_time', 0.0) for page in pages),
+            "image_dimensions": first['metadata'].get('image_dimensions'),
+            "ocr_engine": first['metadata'].get('ocr_engine'),
+            "is_error": all(page['metadata'].get('is_error') for page in pages),
+            "page_count": len(pages),
+        },
+        "aadhaar_number": aadhaar_number,
+        "confidence": 1.0 if aadhaar_number else 0.0,
+        "debug_info": {
+            "raw_text": raw_text,
+            "found_digits": found_digits,
+            "page_errors": errors,
+        },
+        "document_hash": hashlib.sha256(raw_text.encode('utf-8')).hexdigest() if raw_text else None,
+        "phash": first.get('phash'),
+        "pages": [
+            {
+                "page": page['page'],
+                "document_hash": page.get('document_hash'),
+                "phash": page.get('phash'),
+                "aadhaar_number": page.get('aadhaar_number'),
+                "text_length": len(page.get('debug_info', {}).get('raw_text', '')),
+            }
+            for page in pages
+        ],
+    }
+    return combined
+
+
 # Example usage
 if __name__ == "__main__":
     ocr_service = OCRService()
@@ -0,0 +1,384 @@
+import os
+import re
+import sqlite3
+import logging
+import threading
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+
+import numpy as np
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+HASH_BITS = 64
+# Multi-index hashing splits each 64-bit hash into CHUNKS substrings of CHUNK_BITS
+CHUNKS = 4
+CHUNK_BITS = HASH_BITS // CHUNKS
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+# Below this size a straight scan is always cheaper than probing the chunk tables
+LINEAR_SCAN_LIMIT = 1024
+# Cost of a chunk-table probe and of one candidate it yields, in hashes of a
+# plain vectorized scan (measured with benchmarks/phash_index_bench.py); a
+# query probes the tables only when that is cheaper than scanning everything
+PROBE_COST = 180
+CANDIDATE_COST = 18
+# Inserts kept outside a partition's sorted arrays before they are rebuilt
+PENDING_LIMIT = 4096
+# Exactly the hex digits: int(x, 16) also takes signs, underscores and spaces
+PHASH_PATTERN = re.compile(r'[0-9a-fA-F]{%d}' % (HASH_BITS // 4))
+
+
+def phash_to_int(phash: str) -> int:
+    """
+    Parse a 64-bit p-hash hex string (as produced by imagehash) into an int.
+
+    Raises:
+        ValueError: If the string is not 16 hex characters
+    """
+    value = phash[2:] if phash.startswith('0x') else phash
+    if not PHASH_PATTERN.fullmatch(value):
+        raise ValueError(f"p-hash must be {HASH_BITS // 4} hex characters")
+    return int(value, 16)
+
+
+def _popcount(value: int) -> int:
+    return bin(value).count("1")
+
+
+if hasattr(np, 'bitwise_count'):
+    _popcount_array = np.bitwise_count
+else:
+    # numpy < 2.0: count set bits byte by byte
+    _BYTE_POPCOUNT = np.array([_popcount(byte) for byte in range(256)], dtype=np.uint8)
+
+    def _popcount_array(values: np.ndarray) -> np.ndarray:
+        return _BYTE_POPCOUNT[values.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+@lru_cache(maxsize=None)
+def _chunk_neighbours(radius: int) -> np.ndarray:
+    """All CHUNK_BITS-bit masks with at most `radius` bits set."""
+    masks = np.arange(1 << CHUNK_BITS, dtype=np.uint64)
+    return masks[_popcount_array(masks) <= radius].astype(np.uint16)
+
+
+def _gather_ranges(order: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    """order[lo[0]:hi[0]] + order[lo[1]:hi[1]] + ... without a Python loop."""
+    lengths = hi - lo
+    ends = np.cumsum(lengths)
+    starts = np.repeat(lo - ends + lengths, lengths)
+    return order[starts + np.arange(ends[-1] if len(ends) else 0)]
+
+
+class _Partition:
+    """
+    Hashes of one organization.
+
+    Most of them sit in numpy arrays (values plus one sorted copy of each
+    chunk), so a query is a few vectorized binary searches and a popcount
+    over the candidates rather than a Python loop. Inserts first go to a
+    small pending buffer that queries scan directly; compact() merges it
+    in once it grows past PENDING_LIMIT.
+    """
+
+    def __init__(self):
+        # All live hashes; the arrays below are derived from it
+        self.hashes: Dict[str, int] = {}
+        self._pending: Dict[str, int] = {}
+        self._slots: Dict[str, int] = {}
+        self._ids = np.empty(0, dtype=object)
+        self._values = np.empty(0, dtype=np.uint64)
+        self._alive = np.empty(0, dtype=bool)
+        self._dead = 0
+        self._keys: List[np.ndarray] = []
+        self._order: List[np.ndarray] = []
+
+    def add(self, document_hash: str, value: int):
+        self.remove(document_hash)
+        self.hashes[document_hash] = value
+        self._pending[document_hash] = value
+
+    def remove(self, document_hash: str) -> bool:
+        if self.hashes.pop(document_hash, None) is None:
+            return False
+        if self._pending.pop(document_hash, None) is None:
+            self._alive[self._slots.pop(document_hash)] = False
+            self._dead += 1
+        return True
+
+    def needs_compaction(self) -> bool:
+        return len(self._pending) > PENDING_LIMIT or self._dead > max(PENDING_LIMIT, len(self._values) // 4)
+
+    def compact(self):
+        """Rebuild the arrays from all live hashes and empty the pending buffer."""
+        self._ids = np.array(list(self.hashes), dtype=object)
+        self._values = np.fromiter(self.hashes.values(), dtype=np.uint64, count=len(self.hashes))
+        self._alive = np.ones(len(self._values), dtype=bool)
+        self._slots = {document_hash: slot for slot, document_hash in enumerate(self.hashes)}
+        self._pending = {}
+        self._dead = 0
+        self._keys, self._order = [], []
+        for i in range(CHUNKS):
+            chunks = ((self._values >> np.uint64(i * CHUNK_BITS)) & np.uint64(CHUNK_MASK)).astype(np.uint16)
+            order = np.argsort(chunks, kind='stable')
+            self._keys.append(chunks[order])
+            self._order.append(order)
+
+    def candidates(self, value: int, max_distance: int) -> np.ndarray:
+        """
+        Slots of the documents that may lie within max_distance, with
+        repeats (a document can turn up under several chunks).
+
+        By the pigeonhole principle, a hash within distance r differs from
+        the query by at most r // CHUNKS bits in at least one chunk, so
+        probing every chunk value within that radius finds all matches.
+        """
+        masks = _chunk_neighbours(max_distance // CHUNKS)
+        found = []
+        for i in range(CHUNKS):
+            probes = np.uint16((value >> (i * CHUNK_BITS)) & CHUNK_MASK) ^ masks
+            lo = np.searchsorted(self._keys[i], probes, side='left')
+            hi = np.searchsorted(self._keys[i], probes, side='right')
+            found.append(_gather_ranges(self._order[i], lo, hi))
+        return np.concatenate(found)
+
+    def _use_tables(self, max_distance: int) -> bool:
+        size = len(self._values)
+        probes = CHUNKS * len(_chunk_neighbours(max_distance // CHUNKS))
+        expected = (probes * size) >> CHUNK_BITS
+        return size > LINEAR_SCAN_LIMIT and probes * PROBE_COST + expected * CANDIDATE_COST < size
+
+    def search(self, value: int, max_distance: int) -> List[Tuple[str, int, int]]:
+        """(documentHash, p-hash, distance) of every document within max_distance."""
+        query = np.uint64(value)
+        if self._use_tables(max_distance):
+            slots = self.candidates(value, max_distance)
+            slots = slots[self._alive[slots]]
+            hit = slots[_popcount_array(self._values[slots] ^ query) <= max_distance]
+            # Only the few hits need de-duplicating, not every candidate
+            hit = np.unique(hit)
+        else:
+            hit = np.flatnonzero(self._alive & (_popcount_array(self._values ^ query) <= max_distance))
+        stored = self._values[hit]
+        matches = list(zip(self._ids[hit].tolist(), stored.tolist(),
+                           _popcount_array(stored ^ query).tolist()))
+        for document_hash, stored in self._pending.items():
+            distance = _popcount(stored ^ value)
+            if distance <= max_distance:
+                matches.append((document_hash, stored, distance))
+        return matches
+
+
+class PHashIndex:
+    """
+    Near-duplicate index over 64-bit perceptual hashes.
+
+    Hashes are partitioned per organization and indexed with multi-index
+    hashing (4 x 16-bit chunks, each kept as a sorted numpy array), so a
+    radius query touches only a few ranges instead of every stored hash.
+    Where that costs more than a vectorized popcount over the whole
+    partition (small partitions, large radii) the query scans instead. An optional SQLite file keeps the index across
+    restarts; it is written through on every change and loaded on startup.
+
+    Searching a large partition takes milliseconds; callers on the event
+    loop should run it in an executor.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path
+        self._partitions: Dict[str, _Partition] = {}
+        # Organization of every indexed document (a document belongs to one)
+        self._owners: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._db = None
+        if self.db_path:
+            self._init_db()
+            self._load()
+
+    @classmethod
+    def from_env(cls) -> "PHashIndex":
+        """
+        Build an index from the environment.
+
+        OCR_PHASH_INDEX_DB: path of the SQLite file for persistence (in-memory only if unset)
+        """
+        return cls(db_path=os.environ.get("OCR_PHASH_INDEX_DB") or None)
+
+    def _init_db(self):
+        self._db = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS phash_index ("
+            "document_hash TEXT PRIMARY KEY, organization_id TEXT NOT NULL, phash TEXT NOT NULL)"
+        )
+        self._db.commit()
+
+    def _load(self):
+        count = 0
+        for document_hash, organization_id, phash in self._db.execute(
+            "SELECT document_hash, organization_id, phash FROM phash_index"
+        ):
+            try:
+                self._add(organization_id, document_hash, phash_to_int(phash))
+                count += 1
+            except ValueError:
+                logger.warning(f"Skipping malformed p-hash for {document_hash}")
+        for partition in self._partitions.values():
+            partition.compact()
+        logger.info(f"p-hash index loaded {count} hashes from {self.db_path}")
+
+    @staticmethod
+    def _normalize(key: str) -> str:
+        return key.lower()
+
+    def _partition(self, organization_id: str) -> _Partition:
+        partition = self._partitions.get(organization_id)
+        if partition is None:
+            partition = self._partitions[organization_id] = _Partition()
+        return partition
+
+    def _add(self, organization_id: str, document_hash: str, value: int):
+        """Index one normalized entry in memory, dropping a stale one under another organization. Caller holds the lock."""
+        owner = self._owners.get(document_hash)
+        if owner is not None and owner != organization_id:
+            self._partitions[owner].remove(document_hash)
+        self._owners[document_hash] = organization_id
+        self._partition(organization_id).add(document_hash, value)
+
+    def _remove(self, organization_id: str, document_hash: str) -> bool:
+        """Drop one normalized entry from memory. Caller holds the lock."""
+        if self._owners.get(document_hash) != organization_id:
+            return False
+        del self._owners[document_hash]
+        return self._partitions[organization_id].remove(document_hash)
+
+    def _compact(self, organization_ids: Iterable[str]):
+        for organization_id in set(organization_ids):
+            partition = self._partitions.get(organization_id)
+            if partition is not None and partition.needs_compaction():
+                partition.compact()
+
+    def insert(self, organization_id: str, document_hash: str, phash: str):
+        """
+        Add (or replace) a document's p-hash.
+
+        Args:
+            organization_id (str): Organization the document is registered under
+            document_hash (str): On-chain document hash, used as the document id
+            phash (str): 64-bit p-hash hex string
+        """
+        self.insert_many([(organization_id, document_hash, phash)])
+
+    def insert_many(self, documents: Iterable[Tuple[str, str, str]]):
+        """
+        Add (or replace) several documents' p-hashes, written in one transaction.
+
+        Args:
+            documents (Iterable[Tuple[str, str, str]]): (organizationId,
+                documentHash, phash) triples, see insert()
+
+        Raises:
+            ValueError: If a p-hash is malformed (nothing is written)
+        """
+        rows = [
+            (self._normalize(document_hash), self._normalize(organization_id), phash_to_int(phash))
+            for organization_id, document_hash, phash in documents
+        ]
+        with self._lock:
+            for document_hash, organization_id, value in rows:
+                self._add(organization_id, document_hash, value)
+            self._compact(organization_id for _, organization_id, _ in rows)
+            if self._db is not None and rows:
+                with self._db:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO phash_index (document_hash, organization_id, phash) VALUES (?, ?, ?)",
+                        [(document_hash, organization_id, f"{value:016x}") for document_hash, organization_id, value in rows]
+                    )
+
+    def delete(self, organization_id: str, document_hash: str) -> bool:
+        """
+        Remove a document from the index.
+
+        Returns:
+            bool: Whether the document was present
+        """
+        return self.delete_many([(organization_id, document_hash)]) == 1
+
+    def delete_many(self, documents: Iterable[Tuple[str, str]]) -> int:
+        """
+        Remove several documents, written in one transaction.
+
+        Args:
+            documents (Iterable[Tuple[str, str]]): (organizationId, documentHash) pairs
+
+        Returns:
+            int: How many of them were present
+        """
+        rows = [(self._normalize(organization_id), self._normalize(document_hash))
+                for organization_id, document_hash in documents]
+        with self._lock:
+            removed = sum(self._remove(organization_id, document_hash) for organization_id, document_hash in rows)
+            self._compact(organization_id for organization_id, _ in rows)
+            if self._db is not None and rows:
+                with self._db:
+                    self._db.executemany(
+                        "DELETE FROM phash_index WHERE document_hash = ? AND organization_id = ?",
+                        [(document_hash, organization_id) for organization_id, document_hash in rows]
+                    )
+            return removed
+
+    def get(self, organization_id: str, document_hash: str) -> Optional[str]:
+        """The p-hash of a document registered under an organization, or None."""
+        with self._lock:
+            partition = self._partitions.get(self._normalize(organization_id))
+            value = partition.hashes.get(self._normalize(document_hash)) if partition else None
+        return None if value is None else f"{value:016x}"
+
+    def documents(self) -> List[Tuple[str, str, str]]:
+        """Every indexed (organizationId, documentHash, phash), as insert_many() takes them."""
+        with self._lock:
+            return [(organization_id, document_hash, f"{value:016x}")
+                    for organization_id, partition in self._partitions.items()
+                    for document_hash, value in partition.hashes.items()]
+
+    def search(self, organization_id: str, phash: str, max_distance: int) -> List[Dict[str, Any]]:
+        """
+        Find an organization's documents within a Hamming distance of a p-hash.
+
+        Args:
+            organization_id (str): Organization to search
+            phash (str): Query p-hash hex string
+            max_distance (int): Maximum Hamming distance in bits (inclusive)
+
+        Returns:
+            List[Dict[str, Any]]: Matches sorted by distance, each with
+                documentHash, phash and distance
+        """
+        value = phash_to_int(phash)
+        with self._lock:
+            partition = self._partitions.get(self._normalize(organization_id))
+            if partition is None:
+                return []
+            found = partition.search(value, max_distance)
+        matches = [
+            {'documentHash': document_hash, 'phash': f"{stored:016x}", 'distance': distance}
+            for document_hash, stored, distance in found
+        ]
+        matches.sort(key=lambda match: (match['distance'], match['documentHash']))
+        return matches
+
+    def stats(self) -> Dict[str, Any]:
+        """Partition and hash counts."""
+        with self._lock:
+            return {
+                'organizations': len(self._partitions),
+                'hashes': sum(len(p.hashes) for p in self._partitions.values()),
+                'persistent': self._db is not None,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
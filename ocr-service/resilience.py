@@ -0,0 +1,242 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Dict, Any, Optional
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a token would not be available within the allowed wait."""
+
+    def __init__(self, wait: float):
+        super().__init__(f"Rate limit: next slot in {wait:.1f}s")
+        self.wait = wait
+
+
+class TokenBucket:
+    """
+    Client-side rate limiter shared by every request to one provider.
+
+    Tokens refill at `rate` per second up to `burst`. The rate adapts to the
+    provider (AIMD): a 429 halves it (never below min_rate) and pauses the
+    whole bucket for the server's Retry-After, then every success adds back
+    a twentieth of the configured rate. Waiters are served in arrival order,
+    and a caller that would wait longer than it is allowed to is refused up
+    front instead of holding its worker in the queue.
+    """
+
+    def __init__(self, rate: float, burst: float, min_rate: Optional[float] = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.min_rate = min_rate if min_rate is not None else rate / 10
+        self._tokens = self.burst
+        self._refilled = time.monotonic()
+        self._paused_until = 0.0
+        self._waiting = 0
+        self._lock = None
+        self._stats = {
+            "acquired": 0,
+            "waited": 0,
+            "rejected": 0,
+            "throttled": 0,
+            "wait_seconds": 0.0,
+        }
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def expected_wait(self) -> float:
+        """Seconds until a new caller would get a token, counting everyone queued ahead."""
+        now = time.monotonic()
+        self._refill(now)
+        deficit = self._waiting + 1 - self._tokens
+        return max(0.0, self._paused_until - now) + max(0.0, deficit / self.rate)
+
+    def try_acquire(self) -> bool:
+        """Take a token only if one is available right now and nobody is queued."""
+        now = time.monotonic()
+        self._refill(now)
+        if self._waiting or now < self._paused_until or self._tokens < 1:
+            return False
+        self._tokens -= 1
+        self._stats["acquired"] += 1
+        return True
+
+    async def acquire(self, max_wait: float):
+        """
+        Take a token, waiting in FIFO order for the refill.
+
+        Args:
+            max_wait (float): Longest acceptable wait in seconds
+
+        Raises:
+            RateLimitExceeded: If the expected wait is longer than max_wait
+        """
+        if self.try_acquire():
+            return
+        wait = self.expected_wait()
+        if wait > max_wait:
+            self._stats["rejected"] += 1
+            raise RateLimitExceeded(wait)
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        self._stats["waited"] += 1
+        self._waiting += 1
+        started = time.monotonic()
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if now >= self._paused_until and self._tokens >= 1:
+                        self._tokens -= 1
+                        break
+                    await asyncio.sleep(max(self._paused_until - now, (1 - self._tokens) / self.rate))
+        finally:
+            self._waiting -= 1
+            self._stats["wait_seconds"] += time.monotonic() - started
+        self._stats["acquired"] += 1
+
+    def throttle(self, retry_after: Optional[float] = None):
+        """The provider rate-limited us: halve the rate and pause for Retry-After."""
+        self._stats["throttled"] += 1
+        self.rate = max(self.min_rate, self.rate / 2)
+        if retry_after:
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        logger.warning(f"Provider rate limit hit, client rate lowered to {self.rate:.2f}/s")
+
+    def recover(self):
+        """A request went through: creep back towards the configured rate."""
+        if self.rate < self.max_rate:
+            self._refill(time.monotonic())
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill(time.monotonic())
+        return {
+            "rate": round(self.rate, 3),
+            "max_rate": self.max_rate,
+            "tokens": round(self._tokens, 2),
+            "waiting": self._waiting,
+            "paused_seconds": round(max(0.0, self._paused_until - time.monotonic()), 2),
+            **{key: round(value, 3) if isinstance(value, float) else value for key, value in self._stats.items()},
+        }
+
+
+class CircuitBreaker:
+    """
+    Error-rate circuit breaker for a remote dependency.
+
+    closed     calls flow; outcomes over the last `window` seconds are kept
+    open       entered when at least `min_calls` outcomes are in the window
+               and the failure share reaches `failure_threshold`; every
+               call is refused for `cooldown` seconds
+    half_open  after the cooldown up to `probes` trial calls are let
+               through; a success closes the circuit, a failure re-opens it
+    """
+
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+    # Numeric codes for the metrics surface
+    STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, failure_threshold: float = 0.5, window: float = 30.0, min_calls: int = 10,
+                 cooldown: float = 30.0, probes: int = 1):
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.probes = probes
+        self.state = self.CLOSED
+        self._outcomes: deque = deque()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._stats = {"opened": 0, "rejected": 0, "successes": 0, "failures": 0}
+
+    def _trim(self, now: float):
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            _, ok = self._outcomes.popleft()
+            if not ok:
+                self._failures -= 1
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now (counts as a probe when half-open)."""
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.cooldown:
+                self._stats["rejected"] += 1
+                return False
+            self.state = self.HALF_OPEN
+            self._probes_in_flight = 0
+            logger.info("Circuit half-open, probing the provider")
+        if self.state == self.HALF_OPEN:
+            if self._probes_in_flight >= self.probes:
+                self._stats["rejected"] += 1
+                return False
+            self._probes_in_flight += 1
+        return True
+
+    def record(self, ok: bool):
+        """Record the outcome of an allowed call."""
+        now = time.monotonic()
+        self._stats["successes" if ok else "failures"] += 1
+        if self.state == self.HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            if ok:
+                self._close()
+            else:
+                self._open(now)
+            return
+        if self.state == self.OPEN:
+            # A call allowed before the circuit opened; its outcome is stale
+            return
+        self._outcomes.append((now, ok))
+        if not ok:
+            self._failures += 1
+        self._trim(now)
+        if len(self._outcomes) >= self.min_calls and self._failures / len(self._outcomes) >= self.failure_threshold:
+            self._open(now)
+
+    def release(self):
+        """An allowed call ended without an outcome (e.g. cancelled)."""
+        if self.state == self.HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def _open(self, now: float):
+        self.state = self.OPEN
+        self._opened_at = now
+        self._stats["opened"] += 1
+        self._outcomes.clear()
+        self._failures = 0
+        logger.warning(f"Circuit opened: failing fast for {self.cooldown:.0f}s")
+
+    def _close(self):
+        self.state = self.CLOSED
+        self._outcomes.clear()
+        self._failures = 0
+        logger.info("Circuit closed, provider recovered")
+
+    def retry_after(self) -> float:
+        """Seconds until the circuit will let a probe through."""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.cooldown - (time.monotonic() - self._opened_at))
+
+    def stats(self) -> Dict[str, Any]:
+        self._trim(time.monotonic())
+        calls = len(self._outcomes)
+        return {
+            "state": self.state,
+            "state_code": self.STATE_CODES[self.state],
+            "window_calls": calls,
+            "window_failure_rate": round(self._failures / calls, 3) if calls else 0.0,
+            "retry_after_seconds": round(self.retry_after(), 1),
+            **self._stats,
+        }
@@ -0,0 +1,73 @@
+from typing import Dict, Any, List, Optional
+
+import msgpack
+from fastapi.responses import JSONResponse, Response
+
+# Keys of the /ocr payload (OCRService.prepare_for_smart_contract()) that ?fields= may select
+RESPONSE_FIELDS = ('documentHash', 'name', 'contactNumber', 'residence', 'rawText', 'hexHash', 'phash', 'pages')
+
+# ?format= values and their media types
+FORMATS = {
+    'json': 'application/json',
+    'msgpack': 'application/vnd.msgpack',
+}
+FORMAT_PATTERN = "^(" + "|".join(FORMATS) + ")$"
+
+
+def parse_fields(spec: Optional[str]) -> Optional[List[str]]:
+    """
+    Parse a ?fields= projection such as "hexHash,phash".
+
+    Args:
+        spec (Optional[str]): Comma-separated payload keys, or None for all of them
+
+    Returns:
+        Optional[List[str]]: Selected keys in the order given, or None for the full payload
+
+    Raises:
+        ValueError: If a key is not part of the payload
+    """
+    if spec is None:
+        return None
+    fields = [field.strip() for field in spec.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in RESPONSE_FIELDS]
+    if unknown or not fields:
+        raise ValueError(f"Unknown fields: {unknown}. Available fields: {list(RESPONSE_FIELDS)}")
+    return fields
+
+
+def project(payload: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """Only the selected keys of a payload (all of it when fields is None); absent keys are skipped."""
+    if fields is None:
+        return payload
+    return {field: payload[field] for field in fields if field in payload}
+
+
+def encode_response(content: Dict[str, Any], response_format: str = 'json', status_code: int = 200) -> Response:
+    """
+    Serialize a response body as JSON or MessagePack.
+
+    Args:
+        content (Dict[str, Any]): Response body
+        response_format (str): 'json' or 'msgpack'
+        status_code (int): HTTP status
+
+    Returns:
+        Response: Encoded response with the matching media type
+    """
+    if response_format == 'msgpack':
+        return Response(content=msgpack.packb(content), status_code=status_code, media_type=FORMATS['msgpack'])
+    return JSONResponse(content=content, status_code=status_code)
+
+
+def redacted_summary(payload: Dict[str, Any]) -> str:
+    """
+    One log line describing an /ocr payload without the personal data in it:
+    a hash prefix, the text length and which card fields were found.
+    """
+    found = [field for field in ('name', 'contactNumber', 'residence') if payload.get(field)]
+    summary = (f"documentHash {(payload.get('hexHash') or '')[:12]}..., "
+               f"{len(payload.get('rawText') or '')} chars of text, fields found: {', '.join(found) or 'none'}")
+    if 'pages' in payload:
+        summary += f", {len(payload['pages'])} pages"
+    return summary
@@ -0,0 +1,78 @@
+import os
+import time
+import logging
+from typing import Dict, Any, Optional
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+def process_start_time() -> float:
+    """
+    Wall-clock time this process was started, so interpreter start-up and
+    imports before this module count too.
+
+    Read from /proc (start ticks since boot + boot time, 10ms resolution);
+    falls back to now, i.e. the time this module was imported.
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            # The command name may contain spaces; fields resume after its ')'
+            fields = f.read().rsplit(")", 1)[1].split()
+        start_ticks = int(fields[19])
+        with open("/proc/stat") as f:
+            btime = next(int(line.split()[1]) for line in f if line.startswith("btime "))
+        return btime + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration):
+        return time.time()
+
+
+class StartupTimer:
+    """
+    Cold-start milestones, in seconds since the process was started.
+
+    Phases, in the order they normally happen:
+        imported       application module fully imported
+        ready          lifespan startup done, accepting requests
+        first_request  first request answered (any route)
+        warm           background warm-up finished
+
+    Each phase is recorded once; later marks are ignored.
+    """
+
+    def __init__(self):
+        self.process_started = process_start_time()
+        self._phases: Dict[str, float] = {}
+        self._warmup: Dict[str, Any] = {}
+        self.first_request: Optional[Dict[str, Any]] = None
+
+    def mark(self, phase: str) -> float:
+        """Record a phase (once) and return its offset from process start."""
+        if phase not in self._phases:
+            self._phases[phase] = time.time() - self.process_started
+            logger.info(f"Startup phase '{phase}' reached after {self._phases[phase]:.3f}s")
+        return self._phases[phase]
+
+    def record_request(self, method: str, path: str, elapsed: float):
+        """Remember the first request served and how long it took."""
+        if self.first_request is None:
+            self.first_request = {"method": method, "path": path, "latency_seconds": round(elapsed, 4)}
+            self.mark("first_request")
+
+    def record_warmup(self, step: str, details: Any):
+        self._warmup[step] = details
+
+    def phases(self) -> Dict[str, float]:
+        return dict(self._phases)
+
+    def report(self) -> Dict[str, Any]:
+        """Phase offsets, the first request and the warm-up steps."""
+        return {
+            "process_started": self.process_started,
+            "phases": {phase: round(seconds, 4) for phase, seconds in self._phases.items()},
+            "first_request": self.first_request,
+            "warmup": dict(self._warmup),
+        }
+
+
+STARTUP = StartupTimer()
@@ -0,0 +1,61 @@
+import pytest
+
+from aadhaar_fields import FIELDS, extract_fields, verhoeff_check_digit, verhoeff_valid
+
+FRONT = """GOVERNMENT OF INDIA
+Ramesh Kumar
+DOB: 01-02-1990
+MALE
+2341 2341 2346
+Mobile No: 9876543210
+Address: 12 MG Road, Bengaluru
+Karnataka 560001
+"""
+
+
+@pytest.mark.parametrize('number, check', [('236', '3'), ('12345', '1'), ('23412341234', '6')])
+def test_verhoeff_check_digit(number, check):
+    assert verhoeff_check_digit(number) == check
+    assert verhoeff_valid(number + check)
+
+
+def test_verhoeff_catches_typos():
+    assert not verhoeff_valid('234123412345')
+    # Adjacent transposition
+    assert not verhoeff_valid('243123412346')
+
+
+def test_front_side():
+    fields = extract_fields(FRONT)
+    assert fields == {
+        'name': 'Ramesh Kumar',
+        'aadhaar_number': '2341 2341 2346',
+        'dob': '01/02/1990',
+        'gender': 'Male',
+        'address': '12 MG Road, Bengaluru, Karnataka 560001',
+        'mobile': '9876543210',
+        'aadhaar_candidates': ['234123412346'],
+    }
+
+
+def test_windows_line_endings():
+    assert extract_fields(FRONT.replace('\n', '\r\n'))['name'] == 'Ramesh Kumar'
+
+
+def test_name_after_header_and_year_of_birth():
+    fields = extract_fields("Government of India\nSita Devi\nFemale\nYOB: 1985\n2341-2341-2346\n")
+    assert fields['name'] == 'Sita Devi'
+    assert fields['dob'] == '1985'
+    assert fields['gender'] == 'Female'
+    assert fields['aadhaar_number'] == '2341 2341 2346'
+
+
+def test_checksum_and_vid_filter_candidates():
+    fields = extract_fields("2341 2341 2345\nVID: 9123 4567 8901 2345\n234123412346\n")
+    # The misread comes first but fails the checksum; the 16-digit VID is no candidate
+    assert fields['aadhaar_candidates'] == ['234123412345', '234123412346']
+    assert fields['aadhaar_number'] == '2341 2341 2346'
+
+
+def test_empty_text():
+    assert extract_fields('') == {**dict.fromkeys(FIELDS), 'aadhaar_candidates': []}
@@ -0,0 +1,116 @@
+import os
+import json
+
+import pytest
+
+from chain_index import ChainIndex, DOCUMENT_BATCH_REVOKED, decode_log
+
+# eth_getLogs output for one run through the contract's events (and one
+# foreign Transfer log), ABI-encoded by a reference encoder
+with open(os.path.join(os.path.dirname(__file__), 'fixtures', 'document_verification_logs.json')) as f:
+    LOGS = json.load(f)
+
+CONTRACT = '0x5fbdb2315678afecb367f032d93f642f64180aa3'
+ORG = '0x5768f996d53a8ccd5c92503083fe22a3e05791d56896c81d7c0713c3c42e5dee'
+DOC_1 = '0xb0b844a0f0678d32672edace703b3616e69cc1d3c0e545589c4cb6d9e79c9fb1'
+DOC_2 = '0x0e8223b65851a9e05672e0574ac4c13a0402e973e07073970ebb1c574c6ee736'
+ROOT = '0xa09d2d88666026e2d0e66b37a9795672b721d439330cc22c34336d889cb22a5a'
+ADMIN = '0xf39fd6e51aad88f6f4ce6ab8827279cfffb92266'
+
+
+def test_decode_log():
+    events = [decode_log(log) for log in LOGS]
+    assert events == [
+        {'block': 2, 'event': 'OrganizationRegistered', 'organizationId': ORG, 'name': 'Test Org', 'admin': ADMIN},
+        {'block': 3, 'event': 'DocumentRegistered', 'documentHash': DOC_1, 'organizationId': ORG, 'owner': ADMIN,
+         'phash': 'c3c3c3c33c3c3c3c'},
+        {'block': 4, 'event': 'DocumentRegistered', 'documentHash': DOC_2, 'organizationId': ORG, 'owner': ADMIN,
+         'phash': '0f0f0f0ff0f0f0f0'},
+        {'block': 5, 'event': 'DocumentVerified', 'documentHash': DOC_1, 'organizationId': ORG},
+        {'block': 6, 'event': 'DocumentDeleted', 'documentHash': DOC_2, 'organizationId': ORG},
+        {'block': 7, 'event': 'DocumentBatchRegistered', 'merkleRoot': ROOT, 'organizationId': ORG,
+         'documentCount': 3},
+        {'block': 8, 'event': 'OrganizationEdited', 'organizationId': ORG, 'name': 'Renamed Org', 'isActive': False},
+        None,
+    ]
+
+
+def test_decode_log_is_case_insensitive():
+    log = dict(LOGS[1], topics=[topic.upper().replace('0X', '0x') for topic in LOGS[1]['topics']])
+    assert decode_log(log)['documentHash'] == DOC_1
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = ChainIndex(db_path=str(tmp_path / 'chain.sqlite3'), contract=CONTRACT, start_block=1)
+    yield index
+    index.close()
+
+
+def events():
+    return [event for event in map(decode_log, LOGS) if event is not None]
+
+
+def test_apply(index):
+    index.apply(events(), 8, '0xabc')
+    assert index.last_block == 8 and index.last_block_hash == '0xabc'
+    assert index.get_document(DOC_1) == {'organizationId': ORG, 'phash': 'c3c3c3c33c3c3c3c', 'owner': ADMIN,
+                                         'block': 3, 'verified': True, 'deleted': False}
+    assert index.get_document(DOC_2.upper().replace('0X', '0x'))['deleted']
+    assert index.get_organization(ORG) == {'name': 'Renamed Org', 'admin': ADMIN, 'isActive': False}
+    assert index.get_batch(ROOT) == {'organizationId': ORG, 'documentCount': 3, 'block': 7}
+    assert {document['documentHash'] for document in index.documents()} == {DOC_1, DOC_2}
+
+
+def test_reregistering_a_deleted_document(index):
+    index.apply(events(), 8)
+    registered = dict(events()[2], block=9, phash='ffffffffffffffff')
+    index.apply([registered], 9)
+    assert index.get_document(DOC_2)['phash'] == 'ffffffffffffffff'
+    assert not index.get_document(DOC_2)['deleted']
+
+
+def test_revoked_batch(index, tmp_path):
+    index.apply(events(), 8)
+    # DocumentBatchRevoked(root, org, admin, timestamp), as DocumentDeleted is laid out
+    revoked = dict(LOGS[5], topics=[DOCUMENT_BATCH_REVOKED] + LOGS[5]['topics'][1:],
+                   data=LOGS[4]['data'], blockNumber='0x9')
+    event = decode_log(revoked)
+    assert event == {'block': 9, 'event': 'DocumentBatchRevoked', 'merkleRoot': ROOT, 'organizationId': ORG}
+    index.apply([event], 9)
+    assert index.get_batch(ROOT) is None
+    index.close()
+    reopened = ChainIndex(db_path=str(tmp_path / 'chain.sqlite3'), contract=CONTRACT, start_block=1)
+    assert reopened.get_batch(ROOT) is None and reopened.stats()['batches'] == 0
+    reopened.close()
+
+
+def test_restart_resumes(index, tmp_path):
+    index.apply(events()[:3], 4, '0x04')
+    index.apply(events()[3:], 8, '0x08')
+    index.close()
+    reopened = ChainIndex(db_path=str(tmp_path / 'chain.sqlite3'), contract=CONTRACT, start_block=1)
+    assert (reopened.last_block, reopened.last_block_hash) == (8, '0x08')
+    assert reopened.get_document(DOC_1)['verified']
+    assert reopened.get_organization(ORG)['name'] == 'Renamed Org'
+    assert reopened.get_batch(ROOT)['documentCount'] == 3
+    reopened.close()
+
+
+def test_reset(index, tmp_path):
+    index.apply(events(), 8, '0x08')
+    index.reset()
+    assert index.last_block == 0 and index.last_block_hash is None
+    assert index.documents() == [] and index.get_organization(ORG) is None and index.get_batch(ROOT) is None
+    index.close()
+    reopened = ChainIndex(db_path=str(tmp_path / 'chain.sqlite3'), contract=CONTRACT, start_block=1)
+    assert reopened.last_block == 0 and reopened.documents() == []
+    reopened.close()
+
+
+def test_other_contract_starts_over(index, tmp_path):
+    index.apply(events(), 8, '0x08')
+    index.close()
+    other = ChainIndex(db_path=str(tmp_path / 'chain.sqlite3'), contract='0x' + '11' * 20, start_block=5)
+    assert other.last_block == 4 and other.documents() == []
+    other.close()
@@ -0,0 +1,148 @@
+"""
+Chain index against a JSON-RPC node seeded by scripts/seed-documents.js:
+GET /verify and /similar answered from the contract's events, and a reorg
+dropping a registration from both the chain index and the p-hash index.
+
+Skipped unless OCR_NODE_SEED is set. To run against a Hardhat node:
+    npx hardhat node
+    SEED_OUT=seed.json npx hardhat run scripts/seed-documents.js --network localhost
+    OCR_NODE_SEED=../seed.json python -m pytest -q tests/test_chain_node.py
+
+OCR_NODE_RPC_URL overrides the node's URL (default http://127.0.0.1:8545).
+The reorg is simulated with evm_snapshot / evm_revert, so run it against a
+node nothing else is using.
+"""
+import os
+import sys
+import json
+import time
+import importlib
+import urllib.request
+
+import pytest
+
+SEED = os.environ.get("OCR_NODE_SEED")
+RPC_URL = os.environ.get("OCR_NODE_RPC_URL", "http://127.0.0.1:8545")
+
+pytestmark = pytest.mark.skipif(not SEED, reason="OCR_NODE_SEED is not set (needs a seeded node, see module docstring)")
+
+
+def rpc(method: str, params: list = ()):
+    request = urllib.request.Request(
+        RPC_URL,
+        data=json.dumps({'jsonrpc': '2.0', 'id': 1, 'method': method, 'params': list(params)}).encode(),
+        headers={'Content-Type': 'application/json'},
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        body = json.load(response)
+    if body.get('error'):
+        raise RuntimeError(f"{method}: {body['error']}")
+    return body['result']
+
+
+def head_block() -> int:
+    return int(rpc('eth_blockNumber'), 16)
+
+
+def wait_for(client, condition, timeout: float = 30.0) -> dict:
+    """Poll /chain/stats until condition(stats) holds."""
+    deadline = time.monotonic() + timeout
+    while True:
+        stats = client.get('/chain/stats').json()
+        if condition(stats):
+            return stats
+        if time.monotonic() > deadline:
+            raise AssertionError(f"Chain index did not catch up: {stats}")
+        time.sleep(0.1)
+
+
+@pytest.fixture(scope='module')
+def seed():
+    with open(SEED) as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope='module')
+def client(seed, tmp_path_factory):
+    tmp = tmp_path_factory.mktemp('chain_node')
+    env = {
+        'OCR_API_KEY': 'test',
+        'OCR_JOB_WORKERS': '0',
+        'OCR_WARMUP': '0',
+        'OCR_JOB_DB': str(tmp / 'jobs.sqlite3'),
+        'OCR_PHASH_INDEX_DB': str(tmp / 'phash_index.sqlite3'),
+        'OCR_CHAIN_RPC_URL': RPC_URL,
+        'OCR_CHAIN_CONTRACT': seed['contract'],
+        'OCR_CHAIN_START_BLOCK': str(seed['startBlock']),
+        'OCR_CHAIN_INDEX_DB': str(tmp / 'chain_index.sqlite3'),
+        'OCR_CHAIN_CONFIRMATIONS': '0',
+        'OCR_CHAIN_POLL_INTERVAL': '0.1',
+    }
+    saved = {key: os.environ.get(key) for key in env}
+    os.environ.update(env)
+    try:
+        # main reads its configuration at import time
+        sys.modules.pop('main', None)
+        main = importlib.import_module('main')
+        from fastapi.testclient import TestClient
+        with TestClient(main.app) as client:
+            head = head_block()
+            wait_for(client, lambda stats: stats['last_block'] >= head)
+            yield client
+    finally:
+        sys.modules.pop('main', None)
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def similar(client, organization_id: str, phash: str) -> set:
+    response = client.get('/similar', params={'org': organization_id, 'phash': phash, 'max_distance': 0})
+    return {match['documentHash'] for match in response.json()['matches']}
+
+
+def test_statuses_match_the_chain(client, seed):
+    organization_id = seed['organizationId']
+    for document in seed['documents']:
+        body = client.get('/verify', params={'document_hash': document['documentHash'], 'org': organization_id,
+                                             'phash': document['phash']}).json()
+        assert body['status'] == document['status'], document
+        indexed = document['documentHash'].lower() in similar(client, organization_id, document['phash'])
+        assert indexed == (document['status'] != 'deleted'), document
+
+    for proof in seed['batch']['proofs']:
+        body = client.get('/verify', params={
+            'document_hash': proof['documentHash'], 'org': organization_id, 'phash': proof['phash'],
+            'root': seed['batch']['root'], 'proof': ','.join(proof['proof']), 'batch_phash': proof['phash'],
+        }).json()
+        assert body['status'] == 'verified', proof
+
+
+def test_reorg_drops_orphaned_registration(client, seed):
+    organization_id = seed['organizationId']
+    reorg = seed['reorg']
+    params = {'document_hash': reorg['documentHash'], 'org': organization_id, 'phash': reorg['phash']}
+    resets = client.get('/chain/stats').json()['resets']
+
+    snapshot = rpc('evm_snapshot')
+    rpc('eth_sendTransaction', [{'from': reorg['from'], 'to': reorg['to'], 'data': reorg['data']}])
+    rpc('evm_mine')
+    head = head_block()
+    wait_for(client, lambda stats: stats['last_block'] >= head)
+    assert client.get('/verify', params=params).json()['status'] == 'verified'
+    assert reorg['documentHash'].lower() in similar(client, organization_id, reorg['phash'])
+
+    # Replace the registration's blocks with empty ones past the indexed height
+    assert rpc('evm_revert', [snapshot])
+    for _ in range(3):
+        rpc('evm_mine')
+    head = head_block()
+    wait_for(client, lambda stats: stats['resets'] > resets and stats['last_block'] >= head)
+
+    assert client.get('/verify', params=params).json()['status'] == 'not_verified'
+    assert reorg['documentHash'].lower() not in similar(client, organization_id, reorg['phash'])
+    # Registrations the reorg did not touch are indexed again
+    document = next(document for document in seed['documents'] if document['status'] == 'verified')
+    assert document['documentHash'].lower() in similar(client, organization_id, document['phash'])
@@ -0,0 +1,50 @@
+import cv2
+import imagehash
+import numpy as np
+import pytest
+from PIL import Image
+
+from image_hashes import hash_images, phash_hex, to_hex
+
+
+def pages():
+    """Pages where most DCT coefficients are zero, plus ordinary ones."""
+    rng = np.random.default_rng(11)
+    images = {f"uniform-{value}": np.full((300, 200), value, np.uint8) for value in (0, 1, 128, 240, 254, 255)}
+    images['blank-rgb'] = np.full((400, 300, 3), 255, np.uint8)
+    for i in range(5):
+        rows = rng.integers(0, 256, (int(rng.integers(2, 400)), 1)).astype(np.uint8)
+        images[f"row-constant-{i}"] = np.repeat(rows, int(rng.integers(2, 400)), axis=1)
+        columns = rng.integers(0, 256, (1, int(rng.integers(2, 400)))).astype(np.uint8)
+        images[f"column-constant-{i}"] = np.repeat(columns, int(rng.integers(2, 400)), axis=0)
+        half = rng.integers(0, 256, (int(rng.integers(10, 300)), int(rng.integers(5, 150)))).astype(np.uint8)
+        images[f"mirrored-{i}"] = np.hstack([half, half[:, ::-1]])
+        text = np.full((400, 600), int(rng.integers(180, 256)), np.uint8)
+        for row in range(5):
+            cv2.putText(text, f"LINE {row} {rng.integers(10 ** 6)}", (20, 60 + 70 * row),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1.4, int(rng.integers(0, 80)), 3)
+        images[f"text-{i}"] = text
+        images[f"noise-{i}"] = rng.integers(0, 256, (int(rng.integers(32, 600)), int(rng.integers(32, 600))),
+                                            dtype=np.uint8)
+    boxed = np.full((300, 300), 255, np.uint8)
+    cv2.rectangle(boxed, (50, 50), (250, 250), 0, -1)
+    images['boxed'] = boxed
+    return images
+
+
+PAGES = pages()
+
+
+@pytest.mark.parametrize('name', sorted(PAGES))
+def test_phash_matches_imagehash(name):
+    image = Image.fromarray(PAGES[name])
+    assert phash_hex(image) == str(imagehash.phash(image))
+
+
+def test_blank_page():
+    assert phash_hex(Image.new('L', (2480, 3508), 255)) == '8000000000000000'
+
+
+def test_batch_matches_single_images():
+    images = [Image.fromarray(PAGES[name]) for name in sorted(PAGES)]
+    assert to_hex(hash_images(images, ("phash",))["phash"]) == [str(imagehash.phash(image)) for image in images]
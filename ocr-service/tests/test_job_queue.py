@@ -0,0 +1,99 @@
+import time
+
+import pytest
+
+from job_queue import JobQueue, QUEUED, RUNNING, DONE, FAILED
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(db_path=str(tmp_path / 'jobs.sqlite3'), lease_seconds=60, max_attempts=2)
+    yield queue
+    queue.close()
+
+
+def test_submit_deduplicates_by_key(queue):
+    job, created = queue.submit(b'scan', 'key-1', 'a.png', False)
+    assert created and job['status'] == QUEUED
+    again, created = queue.submit(b'scan', 'key-1', 'a.png', False)
+    assert not created and again['jobId'] == job['jobId']
+    _, created = queue.submit(b'other', 'key-2', 'b.png', False)
+    assert created
+
+
+def test_claims_oldest_first_with_upload(queue):
+    first, _ = queue.submit(b'one', 'key-1', 'a.png', False, webhook_fields=['name', 'dob'])
+    queue.submit(b'two', 'key-2', 'b.pdf', True, all_pages=True)
+    job = queue.claim()
+    assert job['jobId'] == first['jobId']
+    assert job['status'] == RUNNING and job['attempts'] == 1
+    assert job['data'] == b'one' and job['webhookFields'] == ['name', 'dob']
+    second = queue.claim()
+    assert second['is_pdf'] and second['all_pages']
+    assert queue.claim() is None
+
+
+def test_expired_lease_is_claimed_again(queue):
+    queue.lease_seconds = 0.05
+    job, _ = queue.submit(b'scan', 'key-1', None, False)
+    assert queue.claim()['jobId'] == job['jobId']
+    assert queue.claim() is None
+    time.sleep(0.1)
+    reclaimed = queue.claim()
+    assert reclaimed['jobId'] == job['jobId'] and reclaimed['attempts'] == 2
+
+
+def test_renewed_lease_is_kept(queue):
+    queue.lease_seconds = 0.2
+    queue.submit(b'scan', 'key-1', None, False)
+    job = queue.claim()
+    time.sleep(0.12)
+    queue.renew(job['jobId'])
+    time.sleep(0.12)
+    assert queue.claim() is None
+
+
+def test_release_does_not_count_the_attempt(queue):
+    queue.submit(b'scan', 'key-1', None, False)
+    job = queue.claim()
+    queue.release(job['jobId'])
+    assert queue.get(job['jobId'])['status'] == QUEUED
+    assert queue.claim()['attempts'] == 1
+
+
+def test_failures_retry_up_to_max_attempts(queue):
+    queue.submit(b'scan', 'key-1', None, False)
+    job = queue.claim()
+    assert not queue.fail(job['jobId'], 'boom', job['attempts'])
+    job = queue.claim()
+    assert queue.fail(job['jobId'], 'boom again', job['attempts'])
+    failed = queue.get(job['jobId'])
+    assert failed['status'] == FAILED and failed['error'] == 'boom again'
+    assert queue.claim() is None
+    # A failed job does not block a new submission of the same content
+    _, created = queue.submit(b'scan', 'key-1', None, False)
+    assert created
+
+
+def test_complete_stores_result_and_purge_drops_it(queue):
+    queue.submit(b'scan', 'key-1', None, False)
+    job = queue.claim()
+    queue.complete(job['jobId'], {'text': 'hello'})
+    done = queue.get(job['jobId'])
+    assert done['status'] == DONE and done['data'] == {'text': 'hello'}
+    assert queue.stats() == {QUEUED: 0, RUNNING: 0, DONE: 1, FAILED: 0}
+
+    assert queue.purge() == 0
+    queue.ttl_seconds = 0
+    assert queue.purge() == 1
+    assert queue.get(job['jobId']) is None
+
+
+def test_jobs_survive_reopening(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite3')
+    queue = JobQueue(db_path=path)
+    job, _ = queue.submit(b'scan', 'key-1', None, False)
+    queue.close()
+    reopened = JobQueue(db_path=path)
+    assert reopened.claim()['jobId'] == job['jobId']
+    reopened.close()
@@ -0,0 +1,61 @@
+import pytest
+
+from merkle import document_hash_bytes, merkle_batch, verify_proof
+
+# Same batch and expectations as test/DocumentBatch.test.js, so the service
+# and the contract's tests agree on the leaf and node encoding
+DOCUMENTS = [
+    {'documentHash': '0x' + '01' * 32, 'phash': 'c3c3c3c33c3c3c3c'},
+    {'documentHash': '0x' + '02' * 32, 'phash': '0f0f0f0ff0f0f0f0'},
+    {'documentHash': '0x' + '03' * 32, 'phash': 'ffff0000ffff0000'},
+]
+ROOT = '0xa09d2d88666026e2d0e66b37a9795672b721d439330cc22c34336d889cb22a5a'
+PROOF_1 = ['0xcf8671de7bbffb904329a379dcbc0aff05804e074b5b041a7e4634d7f3112a30']
+
+
+def test_matches_js_vector():
+    batch = merkle_batch(DOCUMENTS)
+    assert batch['root'] == ROOT
+    assert batch['documentCount'] == 3
+    assert batch['proofs'][0] == {'documentHash': DOCUMENTS[0]['documentHash'], 'phash': 'c3c3c3c33c3c3c3c',
+                                  'proof': PROOF_1}
+
+
+def test_every_proof_verifies():
+    batch = merkle_batch(DOCUMENTS)
+    for proof in batch['proofs']:
+        assert verify_proof(proof['documentHash'], proof['phash'], proof['proof'], batch['root'])
+
+
+def test_proof_commits_to_phash_and_root():
+    assert not verify_proof(DOCUMENTS[0]['documentHash'], '0f0f0f0ff0f0f0f0', PROOF_1, ROOT)
+    assert not verify_proof(DOCUMENTS[1]['documentHash'], 'c3c3c3c33c3c3c3c', PROOF_1, ROOT)
+    assert not verify_proof(DOCUMENTS[0]['documentHash'], 'c3c3c3c33c3c3c3c', PROOF_1, '0x' + '00' * 32)
+
+
+def test_root_ignores_order_and_duplicates():
+    shuffled = [DOCUMENTS[2], DOCUMENTS[0], DOCUMENTS[1], dict(DOCUMENTS[0], phash='0000000000000000')]
+    batch = merkle_batch(shuffled)
+    assert batch['root'] == ROOT
+    assert batch['documentCount'] == 3
+    # The first p-hash of a repeated document is the one committed
+    assert [proof['phash'] for proof in batch['proofs']] == ['ffff0000ffff0000', 'c3c3c3c33c3c3c3c', '0f0f0f0ff0f0f0f0']
+
+
+@pytest.mark.parametrize('count', [1, 2, 5, 16, 33])
+def test_odd_and_even_sizes(count):
+    documents = [{'documentHash': f"0x{i:064x}", 'phash': f"{i:016x}"} for i in range(1, count + 1)]
+    batch = merkle_batch(documents)
+    assert len(batch['proofs']) == count
+    for proof in batch['proofs']:
+        assert verify_proof(proof['documentHash'], proof['phash'], proof['proof'], batch['root'])
+
+
+def test_rejects_bad_input():
+    with pytest.raises(ValueError):
+        merkle_batch([])
+    with pytest.raises(ValueError):
+        merkle_batch([{'documentHash': '0x1234', 'phash': ''}])
+    with pytest.raises(ValueError):
+        document_hash_bytes('0x' + 'zz' * 32)
+    assert document_hash_bytes('01' * 32) == b'\x01' * 32
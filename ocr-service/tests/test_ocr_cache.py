@@ -0,0 +1,113 @@
+import sqlite3
+
+import pytest
+
+import ocr_cache
+from ocr_cache import OCRCache
+
+
+def test_make_key_covers_content_and_params():
+    key = OCRCache.make_key(b'scan', {'crop_card': True, 'max_side': 1600})
+    assert key == OCRCache.make_key(b'scan', {'max_side': 1600, 'crop_card': True})
+    assert key != OCRCache.make_key(b'scan', {'crop_card': False, 'max_side': 1600})
+    assert key != OCRCache.make_key(b'other', {'crop_card': True, 'max_side': 1600})
+
+
+def test_make_key_covers_pipeline_version(monkeypatch):
+    key = OCRCache.make_key(b'scan', {'crop_card': True})
+    monkeypatch.setattr(ocr_cache, 'PIPELINE_VERSION', ocr_cache.PIPELINE_VERSION + 1)
+    assert OCRCache.make_key(b'scan', {'crop_card': True}) != key
+
+
+def test_lru_evicts_least_recently_used():
+    cache = OCRCache(max_entries=2)
+    cache.set('a', {'text': 'a'})
+    cache.set('b', {'text': 'b'})
+    assert cache.get('a') == {'text': 'a'}
+    cache.set('c', {'text': 'c'})
+    assert cache.get('b') is None
+    assert cache.get('a') == {'text': 'a'} and cache.get('c') == {'text': 'c'}
+    stats = cache.stats()
+    assert stats['evictions'] == 1 and stats['memory_entries'] == 2
+    assert stats['hits'] == 3 and stats['misses'] == 1
+
+
+def test_values_are_copies():
+    cache = OCRCache()
+    value = {'fields': {'name': 'A'}}
+    cache.set('k', value)
+    value['fields']['name'] = 'B'
+    cached = cache.get('k')
+    cached['fields']['name'] = 'C'
+    assert cache.get('k') == {'fields': {'name': 'A'}}
+
+
+def test_entries_expire():
+    cache = OCRCache(ttl_seconds=0)
+    cache.set('k', {'text': 'a'})
+    assert cache.get('k') is None
+    assert cache.stats()['expired'] == 1
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'cache.sqlite3')
+
+
+def test_disk_tier_is_shared(db_path):
+    writer = OCRCache(db_path=db_path)
+    writer.set('k', {'text': 'a'})
+    reader = OCRCache(db_path=db_path)
+    assert reader.get('k') == {'text': 'a'}
+    assert reader.get('k') == {'text': 'a'}
+    stats = reader.stats()
+    assert stats['disk_hits'] == 1 and stats['memory_hits'] == 1 and stats['disk_entries'] == 1
+    writer.close()
+    reader.close()
+
+
+def test_disk_tier_drops_expired_rows(db_path):
+    cache = OCRCache(db_path=db_path)
+    cache.set('k', {'text': 'a'})
+    cache.close()
+    with sqlite3.connect(db_path) as db:
+        db.execute("UPDATE ocr_cache SET expires_at = 0")
+    reopened = OCRCache(db_path=db_path)
+    assert reopened.get('k') is None
+    assert reopened.stats()['disk_entries'] == 0
+    reopened.close()
+
+
+def test_clear_empties_both_tiers(db_path):
+    cache = OCRCache(db_path=db_path)
+    cache.set('k', {'text': 'a'})
+    cache.clear()
+    assert cache.get('k') is None
+    assert cache.stats()['disk_entries'] == 0
+    cache.close()
+
+
+def test_insert_prunes_expired_rows(db_path):
+    cache = OCRCache(db_path=db_path, prune_interval=0)
+    cache.set('old', {'text': 'a'})
+    with sqlite3.connect(db_path) as db:
+        db.execute("UPDATE ocr_cache SET expires_at = 0")
+    # Never looked up again, the row still goes on the next insert
+    cache.set('new', {'text': 'b'})
+    with sqlite3.connect(db_path) as db:
+        assert [row[0] for row in db.execute("SELECT key FROM ocr_cache")] == ['new']
+    stats = cache.stats()
+    assert stats['pruned'] == 1 and stats['disk_entries'] == 1
+    cache.close()
+
+
+def test_stats_do_not_count_rows(db_path):
+    cache = OCRCache(db_path=db_path)
+    cache.set('a', {'text': 'a'})
+    cache.set('a', {'text': 'b'})
+    cache.set('b', {'text': 'b'})
+    statements = []
+    cache._db.set_trace_callback(statements.append)
+    assert cache.stats()['disk_entries'] == 2
+    assert statements == []
+    cache.close()
@@ -0,0 +1,145 @@
+import random
+import sqlite3
+
+import pytest
+
+from phash_index import PHashIndex, phash_to_int
+
+ORG = '0x' + '01' * 32
+OTHER = '0x' + '02' * 32
+
+
+def doc(i: int) -> str:
+    return f"0x{i:064x}"
+
+
+def flip(phash: str, *bits: int) -> str:
+    value = phash_to_int(phash)
+    for bit in bits:
+        value ^= 1 << bit
+    return f"{value:016x}"
+
+
+def test_insert_search_delete():
+    index = PHashIndex()
+    index.insert(ORG, doc(1), 'c3c3c3c33c3c3c3c')
+    index.insert(ORG, doc(2), flip('c3c3c3c33c3c3c3c', 0, 9, 40))
+    index.insert(OTHER, doc(3), 'c3c3c3c33c3c3c3c')
+
+    matches = index.search(ORG, flip('c3c3c3c33c3c3c3c', 63), 4)
+    assert [(match['documentHash'], match['distance']) for match in matches] == [(doc(1), 1), (doc(2), 4)]
+    assert [match['documentHash'] for match in index.search(ORG, 'c3c3c3c33c3c3c3c', 2)] == [doc(1)]
+
+    assert index.delete(ORG, doc(1))
+    assert not index.delete(ORG, doc(1))
+    assert index.get(ORG, doc(1)) is None
+    assert [match['documentHash'] for match in index.search(ORG, 'c3c3c3c33c3c3c3c', 4)] == [doc(2)]
+    # Organizations are searched separately
+    assert [match['documentHash'] for match in index.search(OTHER, 'c3c3c3c33c3c3c3c', 64)] == [doc(3)]
+    assert index.search('0x' + '03' * 32, 'c3c3c3c33c3c3c3c', 64) == []
+
+
+def test_keys_are_case_insensitive():
+    index = PHashIndex()
+    index.insert(ORG.upper().replace('0X', '0x'), doc(10).upper().replace('0X', '0x'), 'C3C3C3C33C3C3C3C')
+    assert index.get(ORG, doc(10)) == 'c3c3c3c33c3c3c3c'
+    assert index.delete(ORG, doc(10))
+
+
+def test_reinsert_replaces_and_moves_between_organizations():
+    index = PHashIndex()
+    index.insert(ORG, doc(1), '0000000000000000')
+    index.insert(ORG, doc(1), 'ffffffffffffffff')
+    assert index.search(ORG, '0000000000000000', 8) == []
+    index.insert(OTHER, doc(1), 'ffffffffffffffff')
+    assert index.get(ORG, doc(1)) is None
+    assert index.get(OTHER, doc(1)) == 'ffffffffffffffff'
+    # Deleting under the wrong organization leaves it alone
+    assert not index.delete(ORG, doc(1))
+    assert index.stats()['hashes'] == 1
+
+
+def test_malformed_phash_writes_nothing():
+    index = PHashIndex()
+    with pytest.raises(ValueError):
+        index.insert_many([(ORG, doc(1), '00'), (ORG, doc(2), 'not-a-hash')])
+    with pytest.raises(ValueError):
+        index.search(ORG, 'xyz', 4)
+    assert index.stats()['hashes'] == 0
+
+
+def test_phash_to_int():
+    assert phash_to_int('c3c3c3c33c3c3c3c') == phash_to_int('0xC3C3C3C33C3C3C3C') == 0xc3c3c3c33c3c3c3c
+
+
+@pytest.mark.parametrize('phash', ['-000000000000001', '+000000000000001', '00000000_0000001',
+                                   ' 000000000000001', '0x-000000000000001', '0x0x00000000000001'])
+def test_phash_to_int_takes_only_hex_digits(phash):
+    # int(x, 16) accepts all of these; -1 would overflow the uint64 arrays
+    with pytest.raises(ValueError):
+        phash_to_int(phash)
+    with pytest.raises(ValueError):
+        PHashIndex().search(ORG, phash, 4)
+
+
+def test_rejected_insert_leaves_index_loadable(tmp_path):
+    path = str(tmp_path / 'phash.sqlite3')
+    index = PHashIndex(db_path=path)
+    index.insert(ORG, doc(1), 'c3c3c3c33c3c3c3c')
+    for phash in ('-000000000000001', '00000000_0000001'):
+        with pytest.raises(ValueError):
+            index.insert(ORG, doc(2), phash)
+    index.close()
+
+    reopened = PHashIndex(db_path=path)
+    assert reopened.documents() == [(ORG, doc(1), 'c3c3c3c33c3c3c3c')]
+    reopened.close()
+
+
+def test_load_skips_malformed_rows(tmp_path):
+    path = str(tmp_path / 'phash.sqlite3')
+    PHashIndex(db_path=path).close()
+    # Rows an older version let through
+    with sqlite3.connect(path) as db:
+        db.executemany("INSERT INTO phash_index (document_hash, organization_id, phash) VALUES (?, ?, ?)",
+                       [(doc(1), ORG, 'c3c3c3c33c3c3c3c'), (doc(2), ORG, '-000000000000001')])
+    db.close()
+
+    reopened = PHashIndex(db_path=path)
+    assert reopened.stats()['hashes'] == 1
+    assert [match['documentHash'] for match in reopened.search(ORG, 'c3c3c3c33c3c3c3c', 64)] == [doc(1)]
+    reopened.close()
+
+
+@pytest.mark.parametrize('size', [50, 5000])
+def test_search_matches_brute_force(size):
+    rng = random.Random(size)
+    index = PHashIndex()
+    stored = {doc(i): rng.getrandbits(64) for i in range(size)}
+    index.insert_many([(ORG, document_hash, f"{value:016x}") for document_hash, value in stored.items()])
+    for document_hash in list(stored)[::7]:
+        del stored[document_hash]
+    index.delete_many([(ORG, document_hash) for document_hash in list(map(doc, range(size)))[::7]])
+
+    values = list(stored.values())
+    for _ in range(50):
+        query = rng.choice(values) ^ rng.getrandbits(64) & rng.getrandbits(64) & rng.getrandbits(64)
+        for max_distance in (0, 6, 12):
+            expected = {document_hash for document_hash, value in stored.items()
+                        if bin(value ^ query).count('1') <= max_distance}
+            found = index.search(ORG, f"{query:016x}", max_distance)
+            assert {match['documentHash'] for match in found} == expected
+            assert [match['distance'] for match in found] == sorted(match['distance'] for match in found)
+
+
+def test_persists_across_restarts(tmp_path):
+    path = str(tmp_path / 'phash.sqlite3')
+    index = PHashIndex(db_path=path)
+    index.insert_many([(ORG, doc(1), 'c3c3c3c33c3c3c3c'), (ORG, doc(2), '0f0f0f0ff0f0f0f0')])
+    index.delete(ORG, doc(2))
+    index.close()
+
+    reopened = PHashIndex(db_path=path)
+    assert reopened.documents() == [(ORG, doc(1), 'c3c3c3c33c3c3c3c')]
+    assert [match['documentHash'] for match in reopened.search(ORG, 'c3c3c3c33c3c3c3c', 0)] == [doc(1)]
+    reopened.close()
@@ -0,0 +1,124 @@
+import time
+import asyncio
+
+import pytest
+
+from resilience import CircuitBreaker, RateLimitExceeded, TokenBucket
+
+
+def test_bucket_burst_then_empty():
+    bucket = TokenBucket(rate=1, burst=3)
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+    assert bucket.stats()['acquired'] == 3
+
+
+def test_bucket_refills():
+    bucket = TokenBucket(rate=50, burst=1)
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    time.sleep(0.05)
+    assert bucket.try_acquire()
+
+
+def test_acquire_waits_for_a_token():
+    bucket = TokenBucket(rate=20, burst=1)
+    bucket.try_acquire()
+    started = time.monotonic()
+    asyncio.run(bucket.acquire(max_wait=1.0))
+    assert time.monotonic() - started >= 0.03
+    stats = bucket.stats()
+    assert stats['waited'] == 1 and stats['acquired'] == 2 and stats['waiting'] == 0
+
+
+def test_acquire_refuses_long_waits():
+    bucket = TokenBucket(rate=1, burst=1)
+    bucket.try_acquire()
+    with pytest.raises(RateLimitExceeded) as error:
+        asyncio.run(bucket.acquire(max_wait=0.1))
+    assert error.value.wait > 0.1
+    assert bucket.stats()['rejected'] == 1
+
+
+def test_throttle_and_recover():
+    bucket = TokenBucket(rate=10, burst=5, min_rate=2)
+    bucket.throttle()
+    assert bucket.rate == 5
+    bucket.throttle()
+    bucket.throttle()
+    assert bucket.rate == 2
+    bucket.recover()
+    assert bucket.rate == pytest.approx(2.5)
+    for _ in range(100):
+        bucket.recover()
+    assert bucket.rate == 10
+
+
+def test_throttle_pauses_for_retry_after():
+    bucket = TokenBucket(rate=100, burst=5)
+    bucket.throttle(retry_after=0.1)
+    assert not bucket.try_acquire()
+    assert bucket.expected_wait() > 0.05
+    time.sleep(0.12)
+    assert bucket.try_acquire()
+
+
+def failing_breaker(**kwargs) -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=0.5, window=30, min_calls=4, **kwargs)
+    for ok in (True, False, True, False):
+        assert breaker.allow()
+        breaker.record(ok)
+    return breaker
+
+
+def test_breaker_needs_min_calls():
+    breaker = CircuitBreaker(failure_threshold=0.5, min_calls=4)
+    for _ in range(3):
+        breaker.record(False)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_opens_on_failure_rate():
+    breaker = failing_breaker(cooldown=30)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.retry_after() > 29
+    stats = breaker.stats()
+    assert stats['opened'] == 1 and stats['rejected'] == 1 and stats['state_code'] == 2
+
+
+def test_half_open_probe_success_closes():
+    breaker = failing_breaker(cooldown=0.05, probes=1)
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only one probe at a time
+    assert not breaker.allow()
+    breaker.record(True)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_half_open_probe_failure_reopens():
+    breaker = failing_breaker(cooldown=0.05)
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.stats()['opened'] == 2
+
+
+def test_released_probe_frees_its_slot():
+    breaker = failing_breaker(cooldown=0.05)
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_outcomes_leave_the_window():
+    breaker = CircuitBreaker(failure_threshold=0.5, window=0.05, min_calls=2)
+    breaker.record(False)
+    time.sleep(0.06)
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.stats()['window_calls'] == 1
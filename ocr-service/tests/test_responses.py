@@ -0,0 +1,29 @@
+import pytest
+
+from responses import parse_fields, project, redacted_summary
+
+PAYLOAD = {
+    'documentHash': '0x' + 'ab' * 32,
+    'hexHash': '0x' + 'ab' * 32,
+    'phash': 'c3c3c3c33c3c3c3c',
+    'name': 'Ramesh Kumar',
+    'contactNumber': '9876543210',
+    'residence': '12 MG Road, Bengaluru, Karnataka 560001',
+    'rawText': 'GOVERNMENT OF INDIA\nRamesh Kumar\n2341 2341 2346\n',
+}
+
+
+def test_redacted_summary_has_no_personal_data():
+    summary = redacted_summary(PAYLOAD)
+    assert summary == (f"documentHash 0xababababab..., {len(PAYLOAD['rawText'])} chars of text, "
+                       "fields found: name, contactNumber, residence")
+    for value in ('Ramesh', '9876543210', 'Bengaluru', '2341', 'c3c3'):
+        assert value not in summary
+
+
+def test_projection():
+    assert parse_fields(None) is None
+    assert parse_fields('hexHash, phash') == ['hexHash', 'phash']
+    assert project(PAYLOAD, ['phash', 'pages']) == {'phash': 'c3c3c3c33c3c3c3c'}
+    with pytest.raises(ValueError):
+        parse_fields('hexHash,aadhaar')
@@ -0,0 +1,89 @@
+"""
+GET /verify for documents of a Merkle batch, answered from a chain index
+filled directly (no RPC endpoint is contacted).
+"""
+import sys
+import importlib
+
+import pytest
+
+from chain_index import ChainIndex, ChainFollower
+from merkle import merkle_batch
+
+CONTRACT = '0x' + 'ab' * 20
+ORG = '0x' + '01' * 32
+ADMIN = '0x' + '22' * 20
+DOCUMENTS = [
+    {'documentHash': '0x' + '01' * 32, 'phash': 'c3c3c3c33c3c3c3c'},
+    {'documentHash': '0x' + '02' * 32, 'phash': '0f0f0f0ff0f0f0f0'},
+    {'documentHash': '0x' + '03' * 32, 'phash': 'ffff0000ffff0000'},
+]
+
+
+@pytest.fixture
+def main(monkeypatch, tmp_path):
+    for name in ('OCR_CHAIN_RPC_URL', 'OCR_CHAIN_CONTRACT', 'OCR_PHASH_INDEX_DB'):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv('OCR_API_KEY', 'test')
+    monkeypatch.setenv('OCR_JOB_WORKERS', '0')
+    monkeypatch.setenv('OCR_WARMUP', '0')
+    monkeypatch.setenv('OCR_JOB_DB', str(tmp_path / 'jobs.sqlite3'))
+    # main reads its configuration at import time
+    sys.modules.pop('main', None)
+    yield importlib.import_module('main')
+    sys.modules.pop('main', None)
+
+
+@pytest.fixture
+def index(main, monkeypatch, tmp_path):
+    index = ChainIndex(db_path=str(tmp_path / 'chain.sqlite3'), contract=CONTRACT)
+    monkeypatch.setattr(main, 'chain_follower', ChainFollower(index, 'http://127.0.0.1:9'))
+    yield index
+    index.close()
+
+
+@pytest.fixture
+def client(main, index):
+    from fastapi.testclient import TestClient
+    with TestClient(main.app) as client:
+        yield client
+
+
+def register(index, batch, block=2):
+    index.apply([
+        {'event': 'OrganizationRegistered', 'block': 1, 'organizationId': ORG, 'name': 'Org', 'admin': ADMIN},
+        {'event': 'DocumentBatchRegistered', 'block': block, 'merkleRoot': batch['root'], 'organizationId': ORG,
+         'documentCount': batch['documentCount']},
+    ], block)
+
+
+def verify(client, batch, member=0):
+    proof = batch['proofs'][member]
+    return client.get('/verify', params={
+        'document_hash': proof['documentHash'], 'org': ORG, 'phash': proof['phash'], 'root': batch['root'],
+        'proof': ','.join(proof['proof']), 'batch_phash': proof['phash'],
+    }).json()
+
+
+def test_batch_member_verifies(client, index):
+    batch = merkle_batch(DOCUMENTS)
+    register(index, batch)
+    body = verify(client, batch)
+    assert (body['status'], body['distance'], body['organizationActive']) == ('verified', 0, True)
+
+
+def test_revoked_batch_does_not_verify(client, index):
+    batch = merkle_batch(DOCUMENTS)
+    register(index, batch)
+    index.apply([{'event': 'DocumentBatchRevoked', 'block': 3, 'merkleRoot': batch['root'],
+                  'organizationId': ORG}], 3)
+    assert verify(client, batch)['status'] == 'not_verified'
+
+
+def test_inactive_organization_does_not_verify(client, index):
+    batch = merkle_batch(DOCUMENTS)
+    register(index, batch)
+    index.apply([{'event': 'OrganizationEdited', 'block': 3, 'organizationId': ORG, 'name': 'Org',
+                  'isActive': False}], 3)
+    body = verify(client, batch)
+    assert (body['status'], body['organizationActive']) == ('not_verified', False)
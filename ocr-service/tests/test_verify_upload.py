@@ -0,0 +1,170 @@
+"""
+POST /verify's p-hash path and the index it reads, through the app (chain
+index filled directly, no RPC endpoint or OCR.space: the OCR path is
+replaced where a test needs it).
+"""
+import io
+import sys
+import importlib
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+from ocr_service import preprocess_image, phash_image
+
+ORG = '0x' + '01' * 32
+DOCUMENT = '0x' + 'd1' * 32
+ORIENTATION = 0x0112
+ADMIN_TOKEN = 'admin-secret'
+
+
+def card_photo() -> np.ndarray:
+    """A landscape 'card' with no symmetry, so a rotated decode hashes very differently."""
+    rng = np.random.default_rng(7)
+    image = np.full((1200, 1800, 3), 235, np.uint8)
+    image[:, :, 0] = np.linspace(120, 250, 1800, dtype=np.uint8)
+    cv2.rectangle(image, (80, 80), (520, 620), (60, 90, 140), -1)
+    for row in range(6):
+        cv2.putText(image, f"LINE {row} {rng.integers(10 ** 6)}", (640, 180 + row * 140),
+                    cv2.FONT_HERSHEY_SIMPLEX, 2.2, (20, 20, 20), 5)
+    cv2.rectangle(image, (80, 900), (1700, 1080), (30, 30, 30), -1)
+    return image
+
+
+def jpeg_with_orientation(image: np.ndarray, quality: int, orientation: int = 6) -> bytes:
+    """JPEG as a phone writes it: the pixels as shot plus an EXIF rotation tag."""
+    exif = Image.Exif()
+    exif[ORIENTATION] = orientation
+    buffer = io.BytesIO()
+    Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB)).save(buffer, 'JPEG', quality=quality, exif=exif)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def main(tmp_path, monkeypatch):
+    for name in ('OCR_CHAIN_RPC_URL', 'OCR_CHAIN_CONTRACT', 'OCR_PHASH_INDEX_DB', 'OCR_FILE_INDEX_DB',
+                 'OCR_CACHE_DB', 'OCR_FAST_VERIFY_PHASH_DISTANCE'):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv('OCR_API_KEY', 'test')
+    monkeypatch.setenv('OCR_ADMIN_TOKEN', ADMIN_TOKEN)
+    monkeypatch.setenv('OCR_JOB_WORKERS', '0')
+    monkeypatch.setenv('OCR_WARMUP', '0')
+    monkeypatch.setenv('OCR_JOB_DB', str(tmp_path / 'jobs.sqlite3'))
+    # main reads its configuration at import time
+    sys.modules.pop('main', None)
+    yield importlib.import_module('main')
+    sys.modules.pop('main', None)
+
+
+@pytest.fixture
+def client(main):
+    from fastapi.testclient import TestClient
+    with TestClient(main.app) as client:
+        yield client
+
+
+def register_on_chain(main, tmp_path, monkeypatch, phash: str):
+    """Register DOCUMENT with this p-hash in a chain index (no RPC endpoint is contacted)."""
+    from chain_index import ChainIndex, ChainFollower
+
+    index = ChainIndex(db_path=str(tmp_path / 'chain.sqlite3'), contract='0x' + 'ab' * 20)
+    index.apply([{'event': 'DocumentRegistered', 'block': 1, 'documentHash': DOCUMENT, 'organizationId': ORG,
+                  'owner': '0x' + '22' * 20, 'phash': phash}], 1)
+    monkeypatch.setattr(main, 'chain_follower', ChainFollower(index, 'http://127.0.0.1:9'))
+
+
+def index_document(client, phash: str, token: str = ADMIN_TOKEN):
+    return client.post('/index/documents', headers={'Authorization': f"Bearer {token}"},
+                       json={'organizationId': ORG, 'documentHash': DOCUMENT, 'phash': phash})
+
+
+def verify(client, data: bytes, **params):
+    response = client.post('/verify', params={'org': ORG, **params},
+                           files={'file': ('card.jpg', data, 'image/jpeg')})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_index_writes_need_the_admin_token(main, client):
+    phash = 'c3c3c3c33c3c3c3c'
+    assert index_document(client, phash, token='wrong').status_code == 401
+    assert client.post('/index/documents', json={
+        'organizationId': ORG, 'documentHash': DOCUMENT, 'phash': phash}).status_code == 401
+    assert client.delete(f"/index/documents/{DOCUMENT}", params={'org': ORG}).status_code == 401
+    assert main.phash_index.get(ORG, DOCUMENT) is None
+
+    assert index_document(client, phash).json()['success']
+    assert client.delete(f"/index/documents/{DOCUMENT}", params={'org': ORG},
+                         headers={'Authorization': f"Bearer {ADMIN_TOKEN}"}).json()['success']
+
+    main.ADMIN_TOKEN = None
+    assert index_document(client, phash).status_code == 403
+
+
+def test_index_only_match_is_unconfirmed(main, client):
+    upload = jpeg_with_orientation(card_photo(), quality=90)
+    phash = phash_image(upload, False, main.ocr_service.preprocess_params())['phash']
+    assert index_document(client, phash).json()['success']
+
+    # Without a chain index nothing ties the entry to the contract
+    body = verify(client, upload, phash_distance=4)
+    assert (body['path'], body['status'], body['documentHash']) == ('phash', 'unconfirmed', DOCUMENT)
+
+
+def baseline_phash(data: bytes, tmp_path) -> str:
+    """The p-hash the original pipeline registered: cv2.imread (EXIF applied) up
+    to 2000px, PIL with a LANCZOS resize to 2000px (EXIF ignored) above."""
+    import imagehash
+
+    path = tmp_path / 'registered.jpg'
+    path.write_bytes(data)
+    pil_image = Image.open(path)
+    width, height = pil_image.size
+    if max(width, height) <= 2000:
+        pil_image = Image.fromarray(cv2.cvtColor(cv2.imread(str(path)), cv2.COLOR_BGR2RGB))
+    else:
+        scale = 2000 / max(width, height)
+        pil_image = pil_image.resize((int(width * scale), int(height * scale)), Image.LANCZOS)
+    return str(imagehash.phash(pil_image))
+
+
+@pytest.mark.parametrize('size', [(1800, 1200), (3000, 2000)])
+def test_exif_rotated_registration_verifies_by_phash(main, client, tmp_path, monkeypatch, size):
+    photo = cv2.resize(card_photo(), size)
+    registered = jpeg_with_orientation(photo, quality=95)
+    phash = baseline_phash(registered, tmp_path)
+    params = main.ocr_service.preprocess_params()
+    assert preprocess_image(registered, False, params)['phash'] == phash
+    assert phash_image(registered, False, params)['phash'] == phash
+    register_on_chain(main, tmp_path, monkeypatch, phash)
+    main.phash_index.insert(ORG, DOCUMENT, phash)
+
+    # Same photo, other bytes (re-saved by a messenger app, tag kept)
+    body = verify(client, jpeg_with_orientation(photo, quality=80), phash_distance=4)
+    assert (body['path'], body['status'], body['documentHash']) == ('phash', 'verified', DOCUMENT)
+    assert body['distance'] <= 4
+
+
+def test_phash_beyond_threshold_falls_back_to_ocr(main, client, tmp_path, monkeypatch):
+    photo = card_photo()
+    upload = jpeg_with_orientation(photo, quality=90)
+    near = phash_image(upload, False, main.ocr_service.preprocess_params())['phash']
+    far = f"{int(near, 16) ^ 0xffff_0000_0000_ffff:016x}"
+    # The index entry is near the upload, but the registration on-chain is far off
+    register_on_chain(main, tmp_path, monkeypatch, far)
+    main.phash_index.insert(ORG, DOCUMENT, near)
+
+    ran_ocr = []
+
+    async def fake_ocr(data, is_pdf, engine_policy=None, crop_card=None):
+        ran_ocr.append(True)
+        return {'debug_info': {'raw_text': 'GOVERNMENT OF INDIA\nSomeone Else\n'}, 'phash': near}
+
+    monkeypatch.setattr(main.worker_pool, 'run', fake_ocr)
+    body = verify(client, upload, phash_distance=4)
+    assert ran_ocr
+    assert body['path'] == 'ocr'
+    # The OCR'd text is not a registered document, whatever the p-hash says
+    assert body['status'] == 'not_verified'
@@ -0,0 +1,70 @@
+"""
+OCRWorkerPool's PDF page window when the consumer goes away, with the CPU
+stage in threads and the render replaced by one that blocks until released.
+"""
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import worker_pool
+from memory_budget import MemoryBudget, MB
+from worker_pool import OCRWorkerPool
+
+
+@pytest.fixture
+def render(monkeypatch):
+    started = []
+    release = threading.Event()
+
+    def preprocess_pdf_page(data, page_number, dpi, params):
+        started.append(page_number)
+        release.wait(10)
+        return {'buffer': b'', 'page': page_number}
+
+    monkeypatch.setattr(worker_pool, 'pdf_info', lambda data: (3, 612.0))
+    monkeypatch.setattr(worker_pool, 'pdf_render_dpi', lambda *args: 150)
+    monkeypatch.setattr(worker_pool, 'estimate_memory', lambda *args: MB)
+    monkeypatch.setattr(worker_pool, 'preprocess_pdf_page', preprocess_pdf_page)
+    yield SimpleNamespace(started=started, release=release)
+    release.set()
+
+
+def test_cancelled_pages_hold_memory_until_rendered(render):
+    service = SimpleNamespace(
+        pdf_max_pages=10,
+        preprocess_params=lambda crop_card=None: {'pdf_dpi': 150, 'max_image_dimension': 1500, 'max_dim': 1500},
+    )
+    pool = OCRWorkerPool(service, cpu_workers=0, cpu_concurrency=2, page_window=2,
+                         memory_budget=MemoryBudget(16 * MB))
+
+    async def scenario():
+        pool.start()
+
+        async def consume():
+            async for _ in pool.iter_pdf_pages(b'%PDF'):
+                pass
+
+        consumer = asyncio.create_task(consume())
+        while len(render.started) < 2:
+            await asyncio.sleep(0.01)
+        consumer.cancel()
+        await asyncio.sleep(0.1)
+        # Both renders are still running, so their reservations are held
+        assert not consumer.done()
+        assert pool.memory.stats()['reserved_bytes'] == 2 * MB
+
+        render.release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await consumer
+        assert pool.memory.stats()['reserved_bytes'] == 0
+        assert pool._in_flight == 0
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        render.release.set()
+        pool.shutdown()
+    # The third page was never started
+    assert sorted(render.started) == [1, 2]
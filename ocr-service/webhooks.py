@@ -0,0 +1,96 @@
+import os
+import socket
+import logging
+import ipaddress
+from urllib.parse import urlsplit
+from typing import Dict, Any, List, Iterable
+
+from aiohttp.abc import AbstractResolver
+from aiohttp.resolver import DefaultResolver
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+def is_public_address(host: str) -> bool:
+    """Whether an IP address is globally routable (not private, loopback, link-local, multicast...)."""
+    address = ipaddress.ip_address(host)
+    return address.is_global and not address.is_multicast
+
+
+class PublicResolver(AbstractResolver):
+    """
+    DNS resolver that drops every non-public address.
+
+    Used by the webhook session, so the addresses that were checked are the
+    ones connected to: a host cannot pass a check and then resolve to an
+    internal address for the request itself (DNS rebinding).
+    """
+
+    def __init__(self):
+        self._resolver = DefaultResolver()
+
+    async def resolve(self, host: str, port: int = 0, family: int = socket.AF_INET) -> List[Dict[str, Any]]:
+        addresses = [address for address in await self._resolver.resolve(host, port, family)
+                     if is_public_address(address['host'])]
+        if not addresses:
+            raise OSError(f"{host} does not resolve to a public address")
+        return addresses
+
+    async def close(self):
+        await self._resolver.close()
+
+
+class WebhookPolicy:
+    """
+    Which URLs job webhooks may be sent to.
+
+    Only http(s) URLs whose host is on the allowlist pass; an entry starting
+    with a dot also allows its subdomains (".example.com"). With an empty
+    allowlist webhooks are refused altogether. Hosts given as IP addresses
+    must be public; names are checked when they are resolved, see
+    PublicResolver.
+    """
+
+    def __init__(self, allowed_hosts: Iterable[str] = ()):
+        self.allowed_hosts = {host.strip().lower() for host in allowed_hosts if host.strip()}
+
+    @classmethod
+    def from_env(cls) -> "WebhookPolicy":
+        """
+        Build a policy from the environment.
+
+        OCR_WEBHOOK_ALLOWED_HOSTS: comma-separated hosts job webhooks may be
+            sent to, ".example.com" for a domain and its subdomains
+            (unset: webhooks are refused)
+        """
+        return cls(os.environ.get("OCR_WEBHOOK_ALLOWED_HOSTS", "").split(","))
+
+    def _allowed(self, host: str) -> bool:
+        if host in self.allowed_hosts:
+            return True
+        return any(entry.startswith('.') and (host.endswith(entry) or host == entry[1:])
+                   for entry in self.allowed_hosts)
+
+    def check(self, url: str):
+        """
+        Raises:
+            ValueError: If jobs may not POST to this URL
+        """
+        if not self.allowed_hosts:
+            raise ValueError("Webhooks are disabled (set OCR_WEBHOOK_ALLOWED_HOSTS)")
+        parts = urlsplit(url)
+        host = (parts.hostname or '').lower()
+        if parts.scheme not in ('http', 'https') or not host:
+            raise ValueError("Webhook must be an http(s) URL")
+        if parts.username or parts.password:
+            raise ValueError("Webhook URL must not contain credentials")
+        if not self._allowed(host):
+            raise ValueError(f"Webhook host {host} is not allowed")
+        try:
+            public = is_public_address(host)
+        except ValueError:
+            # A name, checked again when it is resolved
+            return
+        if not public:
+            raise ValueError(f"Webhook host {host} is not a public address")
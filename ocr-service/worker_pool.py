@@ -0,0 +1,388 @@
+import os
+import math
+import time
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple, AsyncIterator
+
+from metrics import timed_stage
+from memory_budget import MemoryBudget, MemoryBudgetTimeout
+from ocr_service import (
+    OCRService, BytesLike, preprocess_image, preprocess_pdf_page, phash_image,
+    pdf_info, pdf_render_dpi, combine_pages, estimate_memory, warm_up, PHASH_DECODE_DIM,
+)
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class PoolSaturatedError(Exception):
+    """Raised when the in-flight queue is full; carries a Retry-After hint in seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"OCR worker pool is saturated, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _plan_upload(data: BytesLike, is_pdf: bool, params: Dict[str, Any]) -> Tuple[int, Optional[int]]:
+    """
+    Memory estimate for the CPU stage of one upload and, for a PDF, the
+    first page's render DPI: pdfinfo reads the page size once for both.
+    """
+    if not is_pdf:
+        return estimate_memory(data, False, params), None
+    _, max_points = pdf_info(data)
+    dpi = pdf_render_dpi(max_points, params['pdf_dpi'], min(params['max_image_dimension'], params['max_dim']))
+    return estimate_memory(data, True, params, max_points), dpi
+
+
+class OCRWorkerPool:
+    """
+    Runs the OCR pipeline off the event loop.
+
+    The CPU stage (decode, p-hash, resize, JPEG encode) runs in a process
+    pool so it neither holds the GIL nor blocks the loop; the network stage
+    (OCR.space call) is native async on the shared pooled client. Each stage
+    has its own concurrency limit, and the total number of requests admitted
+    at once is bounded so overload is answered with a fast 503 instead of a
+    queue that grows without limit. The CPU stage is further gated by a
+    memory budget: each job reserves its estimated decode footprint (from
+    the image header) before it runs.
+    """
+
+    def __init__(
+        self,
+        ocr_service: OCRService,
+        cpu_workers: int = 2,
+        max_in_flight: int = 32,
+        cpu_concurrency: Optional[int] = None,
+        network_concurrency: int = 16,
+        page_window: int = 4,
+        memory_budget: Optional[MemoryBudget] = None,
+        memory_wait: float = 10.0,
+    ):
+        self.ocr_service = ocr_service
+        self.cpu_workers = cpu_workers
+        self.max_in_flight = max_in_flight
+        # cpu_workers == 0 runs the CPU stage in threads (useful on tiny instances)
+        self.cpu_concurrency = cpu_concurrency or max(cpu_workers, 1)
+        self.network_concurrency = network_concurrency
+        # Pages of one PDF that may be rendering/OCR'ing at the same time
+        self.page_window = max(1, page_window)
+        self.memory = memory_budget or MemoryBudget.from_env()
+        # How long a fail-fast request may queue for memory before a 503
+        self.memory_wait = memory_wait
+
+        self._cpu_pool = None
+        self._cpu_semaphore = None
+        self._network_semaphore = None
+        self._admission = None
+        self._in_flight = 0
+        self._rejected = 0
+        self._completed = 0
+        # Exponentially weighted average job time, used for the Retry-After hint
+        self._avg_latency = 5.0
+
+    @classmethod
+    def from_env(cls, ocr_service: OCRService) -> "OCRWorkerPool":
+        """
+        Build a pool from OCR_* environment variables.
+
+        OCR_CPU_WORKERS: processes for the CPU stage, 0 to use threads (default 2)
+        OCR_MAX_IN_FLIGHT: requests admitted at once before returning 503 (default 32)
+        OCR_CPU_CONCURRENCY: concurrent CPU stage jobs (default OCR_CPU_WORKERS)
+        OCR_NETWORK_CONCURRENCY: concurrent OCR.space calls (default 16)
+        OCR_PDF_PAGE_WINDOW: pages of one PDF processed concurrently (default 4)
+        OCR_MEMORY_BUDGET_MB: see MemoryBudget.from_env()
+        OCR_MEMORY_WAIT: seconds /ocr may wait for memory before a 503 (default 10)
+        """
+        cpu_concurrency = os.environ.get("OCR_CPU_CONCURRENCY")
+        return cls(
+            ocr_service,
+            cpu_workers=int(os.environ.get("OCR_CPU_WORKERS", "2")),
+            max_in_flight=int(os.environ.get("OCR_MAX_IN_FLIGHT", "32")),
+            cpu_concurrency=int(cpu_concurrency) if cpu_concurrency else None,
+            network_concurrency=int(os.environ.get("OCR_NETWORK_CONCURRENCY", "16")),
+            page_window=int(os.environ.get("OCR_PDF_PAGE_WINDOW", "4")),
+            memory_budget=MemoryBudget.from_env(),
+            memory_wait=float(os.environ.get("OCR_MEMORY_WAIT", "10")),
+        )
+
+    def start(self):
+        """Create the executors and stage semaphores. Call from the running event loop."""
+        if self.cpu_workers > 0:
+            self._cpu_pool = ProcessPoolExecutor(max_workers=self.cpu_workers)
+            # The first submit forks every worker: do it now, while this process
+            # has no other threads. Forking later, while a thread is inside a
+            # (lazy) import, can leave the child deadlocked on the import lock
+            self._cpu_pool.submit(os.getpid).result()
+        else:
+            self._cpu_pool = ThreadPoolExecutor(max_workers=self.cpu_concurrency, thread_name_prefix="ocr-cpu")
+        self._cpu_semaphore = asyncio.Semaphore(self.cpu_concurrency)
+        self._network_semaphore = asyncio.Semaphore(self.network_concurrency)
+        self._admission = asyncio.Condition()
+        logger.info(
+            f"OCR worker pool started (cpu_workers={self.cpu_workers}, network_concurrency={self.network_concurrency}, "
+            f"max_in_flight={self.max_in_flight})"
+        )
+
+    async def warm_up(self) -> Dict[str, Any]:
+        """
+        Run ocr_service.warm_up() once per CPU worker so each process has the
+        imaging stack imported before the first real document arrives.
+
+        Jobs are submitted together so the pool starts all of its processes;
+        the executor does not guarantee one job per process, so the distinct
+        worker pids that answered are reported.
+        """
+        loop = asyncio.get_running_loop()
+        params = self.ocr_service.preprocess_params()
+        started = time.perf_counter()
+        results = await asyncio.gather(*(
+            loop.run_in_executor(self._cpu_pool, warm_up, params)
+            for _ in range(max(1, self.cpu_workers))
+        ))
+        return {
+            "workers": sorted({result["pid"] for result in results}),
+            "slowest_seconds": max(result["seconds"] for result in results),
+            "seconds": round(time.perf_counter() - started, 4),
+        }
+
+    def shutdown(self):
+        """Stop the executors, letting running jobs finish."""
+        if self._cpu_pool:
+            self._cpu_pool.shutdown(wait=True, cancel_futures=True)
+        logger.info("OCR worker pool stopped")
+
+    def _retry_after(self) -> int:
+        """Estimate how long until a slot frees up."""
+        return max(1, math.ceil(self._avg_latency))
+
+    async def _admit(self, wait: bool):
+        """Take an in-flight slot, either waiting for one or failing fast."""
+        async with self._admission:
+            if self._in_flight >= self.max_in_flight:
+                if not wait:
+                    self._rejected += 1
+                    raise PoolSaturatedError(self._retry_after())
+                await self._admission.wait_for(lambda: self._in_flight < self.max_in_flight)
+            self._in_flight += 1
+
+    async def _release(self):
+        async with self._admission:
+            self._in_flight -= 1
+            self._admission.notify()
+
+    async def _run_cpu(self, fn, *args):
+        """
+        Run fn(*args) on the CPU workers.
+
+        Cancelling the caller does not stop a call a worker has already
+        started, so that call is waited out before the cancellation
+        propagates: the memory reservation and CPU slot held around it are
+        only given back once the worker is really done with the job.
+        """
+        future = self._cpu_pool.submit(fn, *args)
+        waiter = asyncio.wrap_future(future)
+        try:
+            return await asyncio.shield(waiter)
+        except asyncio.CancelledError:
+            if not future.cancel():
+                await asyncio.gather(waiter, return_exceptions=True)
+            raise
+
+    async def run(self, data: BytesLike, is_pdf: bool = False, wait: bool = False,
+                  engine_policy: Optional[str] = None, crop_card: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Run the cached OCR pipeline for one upload without blocking the event loop.
+
+        Args:
+            data (BytesLike): Raw uploaded bytes
+            is_pdf (bool): Whether the content is a PDF
+            wait (bool): Queue for a slot instead of failing fast when the
+                pool is saturated (used by batch processing, which already
+                caps its own parallelism)
+            engine_policy (Optional[str]): OCR engine policy, see EngineRouter
+            crop_card (Optional[bool]): Crop photos to the detected card,
+                defaults to the service's setting
+
+        Returns:
+            Dict[str, Any]: Same result as OCRService.extract_aadhaar_number()
+
+        Raises:
+            PoolSaturatedError: If max_in_flight requests are already admitted
+                and wait is False
+        """
+        with timed_stage("admission"):
+            await self._admit(wait)
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        try:
+            # SHA-256 + optional SQLite lookup: small, but still blocking
+            with timed_stage("cache_lookup"):
+                cache_key, cached = await loop.run_in_executor(
+                    None, self.ocr_service.cache_lookup, data, is_pdf, False, engine_policy, crop_card
+                )
+            if cached is not None:
+                return cached
+
+            params = self.ocr_service.preprocess_params(crop_card)
+            needed, dpi = await loop.run_in_executor(None, _plan_upload, data, is_pdf, params)
+            try:
+                with timed_stage("memory_wait"):
+                    await self.memory.acquire(needed, None if wait else self.memory_wait)
+            except MemoryBudgetTimeout as e:
+                logger.warning(str(e))
+                self._rejected += 1
+                raise PoolSaturatedError(self._retry_after())
+            try:
+                async with self._cpu_semaphore:
+                    prepared = await self._run_cpu(preprocess_image, data, is_pdf, params, dpi)
+            finally:
+                self.memory.release(needed)
+
+            async with self._network_semaphore:
+                api_result = await self.ocr_service.call_api(prepared['buffer'], engine_policy)
+
+            result = self.ocr_service.finish_result(api_result, prepared)
+            self._completed += 1
+            self._avg_latency = 0.8 * self._avg_latency + 0.2 * (time.monotonic() - started)
+            return self.ocr_service.cache_store(cache_key, result)
+        finally:
+            await self._release()
+
+    async def phash(self, data: BytesLike, is_pdf: bool = False, wait: bool = False,
+                    crop_card: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Run only the p-hash part of the CPU stage (see phash_image()).
+
+        Admitted, memory-gated and run on the CPU workers like run(), but
+        there is no encode and no OCR call.
+
+        Returns:
+            Dict[str, Any]: {'phash', 'stats'}
+
+        Raises:
+            PoolSaturatedError: If the pool is saturated and wait is False
+        """
+        with timed_stage("admission"):
+            await self._admit(wait)
+        loop = asyncio.get_running_loop()
+        try:
+            params = self.ocr_service.preprocess_params(crop_card)
+            # Estimate (and render a PDF) at the size phash_image() actually decodes to
+            estimate_params = params if params['crop_card'] else dict(
+                params, max_dim=min(params['max_dim'], PHASH_DECODE_DIM))
+            needed, dpi = await loop.run_in_executor(None, _plan_upload, data, is_pdf, estimate_params)
+            try:
+                with timed_stage("memory_wait"):
+                    await self.memory.acquire(needed, None if wait else self.memory_wait)
+            except MemoryBudgetTimeout as e:
+                logger.warning(str(e))
+                self._rejected += 1
+                raise PoolSaturatedError(self._retry_after())
+            try:
+                async with self._cpu_semaphore:
+                    with timed_stage("phash_only"):
+                        return await self._run_cpu(phash_image, data, is_pdf, params, dpi)
+            finally:
+                self.memory.release(needed)
+        finally:
+            await self._release()
+
+    async def _ocr_pdf_page(self, data: BytesLike, page_number: int, dpi: int, params: Dict[str, Any],
+                            engine_policy: Optional[str], needed: int) -> Dict[str, Any]:
+        """Render, encode and OCR one PDF page under the per-stage and memory limits."""
+        async with self.memory.reserve(needed), self._cpu_semaphore:
+            prepared = await self._run_cpu(preprocess_pdf_page, data, page_number, dpi, params)
+        async with self._network_semaphore:
+            api_result = await self.ocr_service.call_api(prepared['buffer'], engine_policy)
+        page = self.ocr_service.finish_result(api_result, prepared)
+        page['page'] = page_number
+        return page
+
+    async def iter_pdf_pages(self, data: BytesLike, wait: bool = False,
+                             engine_policy: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        OCR every page of a PDF, yielding results in page order as they finish.
+
+        Up to page_window pages are in flight at once, each rasterized by
+        its own pdftoppm in a CPU worker, so long documents are rendered in
+        parallel while memory stays bounded by the window, not the page count.
+
+        Args:
+            data (BytesLike): Raw PDF bytes
+            wait (bool): Queue for a slot instead of failing fast when saturated
+            engine_policy (Optional[str]): OCR engine policy, see EngineRouter
+
+        Yields:
+            Dict[str, Any]: Per-page result (extract_aadhaar_number() shape plus 'page')
+
+        Raises:
+            PoolSaturatedError: If the pool is saturated and wait is False
+        """
+        with timed_stage("admission"):
+            await self._admit(wait)
+        pending = deque()
+        try:
+            loop = asyncio.get_running_loop()
+            params = self.ocr_service.preprocess_params()
+            page_count, max_points = await loop.run_in_executor(None, pdf_info, data)
+            page_count = min(page_count, self.ocr_service.pdf_max_pages)
+            dpi = pdf_render_dpi(max_points, params['pdf_dpi'], min(params['max_image_dimension'], params['max_dim']))
+            page_memory = estimate_memory(data, True, params, max_points)
+            logger.info(f"OCR'ing {page_count} PDF pages at {dpi} DPI (window {self.page_window})")
+
+            next_page = 1
+            while next_page <= page_count or pending:
+                while next_page <= page_count and len(pending) < self.page_window:
+                    pending.append(asyncio.create_task(
+                        self._ocr_pdf_page(data, next_page, dpi, params, engine_policy, page_memory)
+                    ))
+                    next_page += 1
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
+            # Pages being rendered hold their memory until their worker finishes
+            await asyncio.gather(*pending, return_exceptions=True)
+            await self._release()
+
+    async def run_pdf_document(self, data: BytesLike, wait: bool = False,
+                               engine_policy: Optional[str] = None) -> Dict[str, Any]:
+        """
+        OCR every page of a PDF and return the cached, combined document result.
+
+        Args:
+            data (BytesLike): Raw PDF bytes
+            wait (bool): Queue for a slot instead of failing fast when saturated
+            engine_policy (Optional[str]): OCR engine policy, see EngineRouter
+
+        Returns:
+            Dict[str, Any]: Combined result, see combine_pages()
+        """
+        loop = asyncio.get_running_loop()
+        with timed_stage("cache_lookup"):
+            cache_key, cached = await loop.run_in_executor(
+                None, self.ocr_service.cache_lookup, data, True, True, engine_policy
+            )
+        if cached is not None:
+            return cached
+        pages = [page async for page in self.iter_pdf_pages(data, wait, engine_policy)]
+        return self.ocr_service.cache_store(cache_key, combine_pages(pages))
+
+    def stats(self) -> Dict[str, Any]:
+        """Current pool occupancy and counters."""
+        return {
+            "in_flight": self._in_flight,
+            "max_in_flight": self.max_in_flight,
+            "cpu_workers": self.cpu_workers,
+            "cpu_concurrency": self.cpu_concurrency,
+            "network_concurrency": self.network_concurrency,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "avg_latency_seconds": round(self._avg_latency, 3),
+            "memory": self.memory.stats(),
+        }
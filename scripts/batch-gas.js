@@ -0,0 +1,62 @@
+const hre = require("hardhat");
+const { buildMerkleBatch } = require("./merkle");
+
+// Gas and wall time of registering N documents one transaction each vs one
+// Merkle batch root. Run against a local node:
+//   npx hardhat node
+//   BATCH_SIZES=10,100,500 npx hardhat run scripts/batch-gas.js --network localhost
+
+async function main() {
+  const { ethers } = hre;
+  const sizes = (process.env.BATCH_SIZES || "10,100,500").split(",").map(Number);
+
+  const DocumentVerification = await ethers.getContractFactory("DocumentVerification");
+  const documentVerification = await DocumentVerification.deploy();
+  await documentVerification.waitForDeployment();
+  const [admin] = await ethers.getSigners();
+  await (await documentVerification.registerOrganization("Gas benchmark", "")).wait();
+  const [organizationId] = await documentVerification.getAdminOrganizations(admin.address);
+
+  const report = {};
+  for (const size of sizes) {
+    const documents = Array.from({ length: size }, (_, i) => ({
+      documentHash: ethers.sha256(ethers.toUtf8Bytes(`gas-${size}-${i}`)),
+      phash: "c3c3c3c33c3c3c3c",
+    }));
+
+    let started = Date.now();
+    let individualGas = 0n;
+    for (const { documentHash, phash } of documents) {
+      const receipt = await (await documentVerification.registerDocument(organizationId, documentHash, phash)).wait();
+      individualGas += receipt.gasUsed;
+    }
+    const individualMs = Date.now() - started;
+
+    started = Date.now();
+    const batch = buildMerkleBatch(documents);
+    const receipt = await (await documentVerification.registerDocumentBatch(organizationId, batch.root, batch.documentCount)).wait();
+    const batchMs = Date.now() - started;
+
+    const { documentHash, phash } = documents[0];
+    const proof = batch.proofs[documentHash];
+    const verifyGas = await documentVerification.verifyBatchDocument.estimateGas(
+      documentHash, phash, organizationId, batch.root, proof);
+
+    report[size] = {
+      individual: { transactions: size, gas: individualGas.toString(), ms: individualMs },
+      batch: { transactions: 1, gas: receipt.gasUsed.toString(), ms: batchMs, proofLength: proof.length },
+      verifyBatchDocumentGas: verifyGas.toString(),
+      gasRatio: Number(individualGas) / Number(receipt.gasUsed),
+    };
+    console.log(`${size} documents: ${individualGas} gas / ${individualMs}ms individually, ` +
+      `${receipt.gasUsed} gas / ${batchMs}ms as a batch`);
+  }
+  console.log(JSON.stringify(report, null, 2));
+}
+
+main()
+  .then(() => process.exit(0))
+  .catch((error) => {
+    console.error(error);
+    process.exit(1);
+  });
@@ -0,0 +1,61 @@
+const { ethers } = require("ethers");
+
+// Same tree as ocr-service/merkle.py and DocumentVerification.verifyBatchDocument:
+// leaf = sha256(0x00 || documentHash || phash), node = sha256(0x01 || lower || higher)
+
+function leafHash(documentHash, phash) {
+  return ethers.sha256(ethers.concat(["0x00", documentHash, ethers.toUtf8Bytes(phash)]));
+}
+
+function nodeHash(a, b) {
+  return BigInt(a) < BigInt(b)
+    ? ethers.sha256(ethers.concat(["0x01", a, b]))
+    : ethers.sha256(ethers.concat(["0x01", b, a]));
+}
+
+/**
+ * Build a Merkle batch over documents.
+ * @param documents { documentHash, phash } as returned by the OCR service;
+ *   a repeated documentHash counts once, with its first p-hash
+ * @returns { root, documentCount, proofs } with proofs keyed by document hash
+ */
+function buildMerkleBatch(documents) {
+  const phashes = new Map();
+  for (const { documentHash, phash } of documents) {
+    const hash = documentHash.toLowerCase();
+    if (!phashes.has(hash)) {
+      phashes.set(hash, phash);
+    }
+  }
+  const hashes = [...phashes.keys()];
+  const leaves = hashes.map((hash) => leafHash(hash, phashes.get(hash))).sort((a, b) => (BigInt(a) < BigInt(b) ? -1 : 1));
+  const levels = [leaves];
+  while (levels[levels.length - 1].length > 1) {
+    const level = levels[levels.length - 1];
+    const next = [];
+    for (let i = 0; i < level.length; i += 2) {
+      // An odd last node moves up unchanged
+      next.push(i + 1 < level.length ? nodeHash(level[i], level[i + 1]) : level[i]);
+    }
+    levels.push(next);
+  }
+
+  const position = new Map(leaves.map((leaf, index) => [leaf, index]));
+  const proofs = {};
+  for (const hash of hashes) {
+    let index = position.get(leafHash(hash, phashes.get(hash)));
+    const proof = [];
+    for (const level of levels.slice(0, -1)) {
+      const sibling = index ^ 1;
+      if (sibling < level.length) {
+        proof.push(level[sibling]);
+      }
+      index = Math.floor(index / 2);
+    }
+    proofs[hash] = proof;
+  }
+
+  return { root: levels[levels.length - 1][0], documentCount: hashes.length, proofs };
+}
+
+module.exports = { leafHash, nodeHash, buildMerkleBatch };
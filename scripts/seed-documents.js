@@ -0,0 +1,85 @@
+const fs = require("fs");
+const hre = require("hardhat");
+const { buildMerkleBatch } = require("./merkle");
+
+// Deploy a fresh contract and fill it with documents in every state, for
+// ocr-service/benchmarks/chain_index_bench.py and
+// ocr-service/tests/test_chain_node.py. Run against a local node:
+//   npx hardhat node
+//   SEED_DOCUMENTS=500 SEED_OUT=seed.json npx hardhat run scripts/seed-documents.js --network localhost
+
+async function main() {
+  const { ethers } = hre;
+  const count = Number(process.env.SEED_DOCUMENTS || "200");
+  const out = process.env.SEED_OUT || "seed.json";
+
+  const DocumentVerification = await ethers.getContractFactory("DocumentVerification");
+  const documentVerification = await DocumentVerification.deploy();
+  await documentVerification.waitForDeployment();
+  const startBlock = (await documentVerification.deploymentTransaction().wait()).blockNumber;
+  const [admin] = await ethers.getSigners();
+  await (await documentVerification.registerOrganization("Seed organization", "Chain index benchmark")).wait();
+  const [organizationId] = await documentVerification.getAdminOrganizations(admin.address);
+
+  const documents = [];
+  for (let i = 0; i < count; i++) {
+    const documentHash = ethers.sha256(ethers.toUtf8Bytes(`seed-${i}`));
+    const phash = ethers.hexlify(ethers.randomBytes(8)).slice(2);
+    await (await documentVerification.registerDocument(organizationId, documentHash, phash)).wait();
+    documents.push({ documentHash, phash, status: "verified" });
+  }
+  // A few documents in the other states /verify reports
+  for (const document of documents.filter((_, i) => i % 10 === 1)) {
+    await (await documentVerification.deleteDocument(organizationId, document.documentHash)).wait();
+    document.status = "deleted";
+  }
+  for (const document of documents.filter((_, i) => i % 10 === 2)) {
+    await (await documentVerification.verifyDocument(document.documentHash, organizationId)).wait();
+  }
+
+  const batchDocuments = Array.from({ length: 16 }, (_, i) => ({
+    documentHash: ethers.sha256(ethers.toUtf8Bytes(`seed-batch-${i}`)),
+    phash: ethers.hexlify(ethers.randomBytes(8)).slice(2),
+  }));
+  const batch = buildMerkleBatch(batchDocuments);
+  await (await documentVerification.registerDocumentBatch(organizationId, batch.root, batch.documentCount)).wait();
+
+  // Not sent here: ocr-service/tests/test_chain_node.py sends it from the
+  // admin account (the node's accounts are unlocked), then reverts it to
+  // simulate a reorg
+  const reorgDocument = {
+    documentHash: ethers.sha256(ethers.toUtf8Bytes("seed-reorg")),
+    phash: ethers.hexlify(ethers.randomBytes(8)).slice(2),
+  };
+  const reorg = {
+    ...reorgDocument,
+    from: admin.address,
+    to: await documentVerification.getAddress(),
+    data: documentVerification.interface.encodeFunctionData("registerDocument", [
+      organizationId, reorgDocument.documentHash, reorgDocument.phash,
+    ]),
+  };
+
+  // Let the last transactions reach the service's confirmation depth
+  for (let i = 0; i < 5; i++) {
+    await hre.network.provider.send("evm_mine");
+  }
+
+  const seed = {
+    contract: await documentVerification.getAddress(),
+    startBlock,
+    organizationId,
+    documents,
+    batch: { root: batch.root, documents: batchDocuments, proofs: batch.proofs },
+    reorg,
+  };
+  fs.writeFileSync(out, JSON.stringify(seed, null, 2));
+  console.log(`Seeded ${count} documents into ${seed.contract} (from block ${startBlock}), wrote ${out}`);
+}
+
+main()
+  .then(() => process.exit(0))
+  .catch((error) => {
+    console.error(error);
+    process.exit(1);
+  });
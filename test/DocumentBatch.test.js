@@ -0,0 +1,206 @@
+const { expect } = require("chai");
+const { ethers } = require("hardhat");
+const { buildMerkleBatch, leafHash, nodeHash } = require("../scripts/merkle");
+
+// Documents as the OCR service returns them (sha256 of the OCR text, 64-bit p-hash)
+function documents(count, seed = "doc") {
+  return Array.from({ length: count }, (_, i) => ({
+    documentHash: ethers.sha256(ethers.toUtf8Bytes(`${seed}-${i}`)),
+    phash: ethers.sha256(ethers.toUtf8Bytes(`${seed}-phash-${i}`)).slice(2, 18),
+  }));
+}
+
+describe("DocumentVerification batches", function () {
+  let documentVerification;
+  let owner;
+  let addr1;
+  let organizationId;
+
+  beforeEach(async function () {
+    [owner, addr1] = await ethers.getSigners();
+    const DocumentVerification = await ethers.getContractFactory("DocumentVerification");
+    documentVerification = await DocumentVerification.deploy();
+    await documentVerification.waitForDeployment();
+
+    await (await documentVerification.registerOrganization("Org", "Test organization")).wait();
+    [organizationId] = await documentVerification.getAdminOrganizations(owner.address);
+  });
+
+  describe("Batch Registration", function () {
+    it("Should register a batch root in one transaction", async function () {
+      const batch = buildMerkleBatch(documents(10));
+
+      await expect(documentVerification.registerDocumentBatch(organizationId, batch.root, batch.documentCount))
+        .to.emit(documentVerification, "DocumentBatchRegistered");
+
+      const stored = await documentVerification.documentBatches(batch.root);
+      expect(stored.organizationId).to.equal(organizationId);
+      expect(stored.owner).to.equal(owner.address);
+      expect(stored.documentCount).to.equal(10);
+    });
+
+    it("Should not allow registering the same root twice", async function () {
+      const batch = buildMerkleBatch(documents(4));
+      await documentVerification.registerDocumentBatch(organizationId, batch.root, batch.documentCount);
+
+      await expect(
+        documentVerification.registerDocumentBatch(organizationId, batch.root, batch.documentCount)
+      ).to.be.revertedWithCustomError(documentVerification, "BatchAlreadyRegistered");
+    });
+
+    it("Should only allow the organization admin", async function () {
+      const batch = buildMerkleBatch(documents(4));
+
+      await expect(
+        documentVerification.connect(addr1).registerDocumentBatch(organizationId, batch.root, batch.documentCount)
+      ).to.be.revertedWithCustomError(documentVerification, "NotOrganizationAdmin");
+    });
+  });
+
+  describe("Batch Verification", function () {
+    it("Should verify every document of a batch against its proof", async function () {
+      // Odd count, so one leaf moves up a level without a sibling
+      const docs = documents(13);
+      const batch = buildMerkleBatch(docs);
+      await documentVerification.registerDocumentBatch(organizationId, batch.root, batch.documentCount);
+
+      for (const { documentHash, phash } of docs) {
+        expect(await documentVerification.verifyBatchDocument(
+          documentHash, phash, organizationId, batch.root, batch.proofs[documentHash])).to.equal(true);
+      }
+    });
+
+    it("Should match the root built by the OCR service", async function () {
+      // Vector from ocr-service merkle.merkle_batch()
+      const docs = [["01", "c3c3c3c33c3c3c3c"], ["02", "0f0f0f0ff0f0f0f0"], ["03", "ffff0000ffff0000"]]
+        .map(([byte, phash]) => ({ documentHash: "0x" + byte.repeat(32), phash }));
+      const batch = buildMerkleBatch(docs);
+      expect(batch.root).to.equal("0xa09d2d88666026e2d0e66b37a9795672b721d439330cc22c34336d889cb22a5a");
+      expect(batch.proofs[docs[0].documentHash]).to.deep.equal([
+        "0xcf8671de7bbffb904329a379dcbc0aff05804e074b5b041a7e4634d7f3112a30",
+      ]);
+    });
+
+    it("Should reject a document outside the batch or a tampered proof", async function () {
+      const docs = documents(8);
+      const batch = buildMerkleBatch(docs);
+      await documentVerification.registerDocumentBatch(organizationId, batch.root, batch.documentCount);
+      const { documentHash, phash } = docs[0];
+
+      const outsider = documents(1, "other")[0];
+      expect(await documentVerification.verifyBatchDocument(
+        outsider.documentHash, outsider.phash, organizationId, batch.root, batch.proofs[documentHash])).to.equal(false);
+      const tampered = [...batch.proofs[documentHash]];
+      tampered[1] = ethers.ZeroHash;
+      expect(await documentVerification.verifyBatchDocument(documentHash, phash, organizationId, batch.root, tampered))
+        .to.equal(false);
+    });
+
+    it("Should commit each document's p-hash", async function () {
+      const docs = documents(8);
+      const batch = buildMerkleBatch(docs);
+      await documentVerification.registerDocumentBatch(organizationId, batch.root, batch.documentCount);
+      const { documentHash, phash } = docs[0];
+
+      // A proof only holds with the p-hash the document was batched with,
+      // so a verifier can compare it with the p-hash of the copy it holds
+      const other = (phash[0] === "0" ? "1" : "0") + phash.slice(1);
+      expect(await documentVerification.verifyBatchDocument(
+        documentHash, other, organizationId, batch.root, batch.proofs[documentHash])).to.equal(false);
+      expect(await documentVerification.verifyBatchDocument(
+        documentHash, "", organizationId, batch.root, batch.proofs[documentHash])).to.equal(false);
+    });
+
+    it("Should not accept an inner node as a document", async function () {
+      const docs = documents(4);
+      const batch = buildMerkleBatch(docs);
+      await documentVerification.registerDocumentBatch(organizationId, batch.root, batch.documentCount);
+
+      // Without leaf/node prefixes, the parent of two leaves plus the rest
+      // of the proof would pass as a document of its own
+      const { documentHash, phash } = docs[0];
+      const [sibling, uncle] = batch.proofs[documentHash];
+      const parent = nodeHash(leafHash(documentHash, phash), sibling);
+      expect(await documentVerification.verifyBatchDocument(parent, "", organizationId, batch.root, [uncle]))
+        .to.equal(false);
+    });
+
+    it("Should not verify against an unknown root or another organization", async function () {
+      const docs = documents(4);
+      const batch = buildMerkleBatch(docs);
+      const { documentHash, phash } = docs[0];
+
+      await expect(
+        documentVerification.verifyBatchDocument(documentHash, phash, organizationId, batch.root, batch.proofs[documentHash])
+      ).to.be.revertedWithCustomError(documentVerification, "BatchNotFound");
+
+      await documentVerification.registerDocumentBatch(organizationId, batch.root, batch.documentCount);
+      await expect(
+        documentVerification.verifyBatchDocument(documentHash, phash, ethers.ZeroHash, batch.root, batch.proofs[documentHash])
+      ).to.be.revertedWithCustomError(documentVerification, "BatchNotFound");
+    });
+  });
+
+  describe("Batch Revocation", function () {
+    it("Should stop verifying a revoked batch", async function () {
+      const docs = documents(4);
+      const batch = buildMerkleBatch(docs);
+      const { documentHash, phash } = docs[0];
+      await documentVerification.registerDocumentBatch(organizationId, batch.root, batch.documentCount);
+
+      await expect(documentVerification.revokeDocumentBatch(organizationId, batch.root))
+        .to.emit(documentVerification, "DocumentBatchRevoked");
+      await expect(
+        documentVerification.verifyBatchDocument(documentHash, phash, organizationId, batch.root, batch.proofs[documentHash])
+      ).to.be.revertedWithCustomError(documentVerification, "BatchNotFound");
+    });
+
+    it("Should only allow the admin of the batch's organization", async function () {
+      const batch = buildMerkleBatch(documents(4));
+      await documentVerification.registerDocumentBatch(organizationId, batch.root, batch.documentCount);
+
+      await expect(
+        documentVerification.connect(addr1).revokeDocumentBatch(organizationId, batch.root)
+      ).to.be.revertedWithCustomError(documentVerification, "NotOrganizationAdmin");
+
+      await (await documentVerification.connect(addr1).registerOrganization("Other", "")).wait();
+      const [otherId] = await documentVerification.getAdminOrganizations(addr1.address);
+      await expect(
+        documentVerification.connect(addr1).revokeDocumentBatch(otherId, batch.root)
+      ).to.be.revertedWithCustomError(documentVerification, "BatchNotFound");
+    });
+
+    it("Should not verify batches of an inactive organization", async function () {
+      const docs = documents(4);
+      const batch = buildMerkleBatch(docs);
+      const { documentHash, phash } = docs[0];
+      await documentVerification.registerDocumentBatch(organizationId, batch.root, batch.documentCount);
+
+      await (await documentVerification.editOrganization(organizationId, "Org", "Test organization", false)).wait();
+      await expect(
+        documentVerification.verifyBatchDocument(documentHash, phash, organizationId, batch.root, batch.proofs[documentHash])
+      ).to.be.revertedWithCustomError(documentVerification, "OrganizationInactive");
+
+      await (await documentVerification.editOrganization(organizationId, "Org", "Test organization", true)).wait();
+      expect(await documentVerification.verifyBatchDocument(
+        documentHash, phash, organizationId, batch.root, batch.proofs[documentHash])).to.equal(true);
+    });
+  });
+
+  describe("Gas", function () {
+    it("Should cost less than registering the documents one by one", async function () {
+      const count = 20;
+      let individualGas = 0n;
+      for (const { documentHash, phash } of documents(count)) {
+        const receipt = await (await documentVerification.registerDocument(organizationId, documentHash, phash)).wait();
+        individualGas += receipt.gasUsed;
+      }
+      const batch = buildMerkleBatch(documents(count, "batch"));
+      const receipt = await (await documentVerification.registerDocumentBatch(organizationId, batch.root, batch.documentCount)).wait();
+
+      console.log(`      ${count} documents: ${individualGas} gas in ${count} transactions, ` +
+        `batch ${receipt.gasUsed} gas in 1 transaction`);
+      expect(receipt.gasUsed * BigInt(count)).to.be.lessThan(individualGas);
+    });
+  });
+});